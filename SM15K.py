@@ -14,7 +14,42 @@ import time
 import csv
 import datetime
 import sys
+import os
 import logging
+import bisect
+import heapq
+import http.server
+import random
+import enum
+import array
+import collections
+import math
+import decimal
+import multiprocessing
+import multiprocessing.connection
+import struct
+import gzip
+import json
+import socketserver
+import sqlite3
+import queue
+import operator
+import errno
+import ipaddress
+import selectors
+import xml.etree.ElementTree
+import argparse
+from multiprocessing import shared_memory, resource_tracker
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
 
 """ Module to handle communication with DELTA POWER SUPPLY  """
 
@@ -38,6 +73,79 @@ else:
     logger.propagate = False
 
 
+class SystemClock:
+    """
+        System Clock
+        -----------------------------------------------------------------------------------------------------------------
+        Wall clock of the operations, dataloggers and console stamps: time(), monotonic(), sleep(seconds),
+        wait(event, seconds), now() and strftime(format). Module level clock is used by all of them, replace it to run
+        them on another time base, e.g. SM15K.clock = SM15K.VirtualClock(speed=500) together with DeviceSimulator.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+
+    def __str__(self):
+        return f'System Clock, for details print object.__doc__'
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def wait(self, event, seconds):
+        return event.wait(seconds)
+
+    def now(self):
+        return datetime.datetime.fromtimestamp(self.time())
+
+    def strftime(self, format):
+        return time.strftime(format, time.localtime(self.time()))
+
+
+class VirtualClock(SystemClock):
+    """
+        Virtual Clock
+        -----------------------------------------------------------------------------------------------------------------
+        speed: Virtual seconds per real second, sleeps are shortened and time runs faster by this factor.
+        -----------------------------------------------------------------------------------------------------------------
+        start: Virtual epoch time at creation, default is the current time.
+        -----------------------------------------------------------------------------------------------------------------
+        Device latency stays real, so one transaction costs speed times its round trip in virtual time. Against real
+        devices keep speed = 1, the watchdog of the device runs on real time.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+
+    def __init__(self, speed=100.0, start=None):
+        self.speed = float(speed)
+        self._realStart = time.monotonic()
+        self._start = start if start is not None else time.time()
+
+    def __str__(self):
+        return f'Virtual Clock at {self.speed:g}x, for details print object.__doc__'
+
+    def elapsed(self):
+        return (time.monotonic() - self._realStart) * self.speed
+
+    def time(self):
+        return self._start + self.elapsed()
+
+    def monotonic(self):
+        return self._realStart + self.elapsed()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds / self.speed)
+
+    def wait(self, event, seconds):
+        return event.wait(None if seconds is None else max(0.0, seconds) / self.speed)
+
+
+clock = SystemClock()
+
+
 class ColorPrinter:
     """
         Colorfull Terminal Printing
@@ -73,7 +181,7 @@ class ColorPrinter:
         Any message is being printed with defined stamp to create functional colorful printing
         """
         sys.stdout.write(ColorPrinter.red)
-        now = datetime.datetime.now()
+        now = clock.now()
         text = f'{now.strftime("%d/%m/%Y - %X")}: {message} \n{self.spacer}'
         print(text)
         sys.stdout.write(ColorPrinter.normal)
@@ -86,7 +194,7 @@ class ColorPrinter:
         Any message is being printed with defined stamp to create functional colorful printing
         """
         sys.stdout.write(ColorPrinter.green)
-        now = datetime.datetime.now()
+        now = clock.now()
         text = f'{now.strftime("%d/%m/%Y - %X")}: {message} \n{self.spacer}'
         print(text)
         sys.stdout.write(ColorPrinter.normal)
@@ -99,7 +207,7 @@ class ColorPrinter:
         Any message is being printed with defined stamp to create functional colorful printing
         """
         sys.stdout.write(ColorPrinter.blue)
-        now = datetime.datetime.now()
+        now = clock.now()
         text = f'{now.strftime("%d/%m/%Y - %X")}: {message} \n{self.spacer}'
         print(text)
         sys.stdout.write(ColorPrinter.normal)
@@ -112,7 +220,7 @@ class ColorPrinter:
         Any message is being printed with defined stamp to create functional colorful printing
         """
         sys.stdout.write(ColorPrinter.normal)
-        now = datetime.datetime.now()
+        now = clock.now()
         text = f'{now.strftime("%d/%m/%Y - %X")}: {message} \n{self.spacer}'
         print(text)
         sys.stdout.write(ColorPrinter.normal)
@@ -142,7 +250,7 @@ class ColorPrinter:
         else:
             logger.debug("Color is defined wrong! Default color is used!")
             sys.stdout.write(ColorPrinter.green)
-        now = datetime.datetime.now()
+        now = clock.now()
         text = f'{now.strftime("%d/%m/%Y - %X")}: {message} \n{self.spacer}'
         print(text)
         sys.stdout.write(ColorPrinter.normal)
@@ -155,10 +263,28 @@ cprint = ColorPrinter()
 class Communication:
     """
     Class attributers that are set according to device settings.
+    metrics: Counters and latency histograms of every transaction, set it to None to switch instrumentation off.
+    addHook(before, after): Registers tracing callbacks around every transaction, they cost nothing when not registered.
+    resilience: ResiliencePolicy with retries, backoff and per device circuit breaker, None (default) is off.
+    transport: Object with exchange(IPV4, sentBytes, query) used instead of the socket (e.g. ReplayTransport).
+    coalescing: QueryCoalescer sharing identical read only queries of concurrent callers, None (default) is off.
+    timeouts: AdaptiveTimeouts giving per device connect and read timeouts from the observed round trip times, capped
+    at timeout, None (default) uses the fixed timeout for both.
+    compound: Batches (snapshot, state reconciliation, recipes) are sent as one ';' separated message if True. The
+    manual documents one terminator after every command and query only, so False (default) sends every part alone.
+    Replies are read until the terminators of all queries of the message have been received.
     """
     port_name = 8462
     buffer_size = 1024
     timeout = 10
+    metrics = None
+    resilience = None
+    transport = None
+    coalescing = None
+    timeouts = None
+    compound = False
+    _beforeHooks = ()
+    _afterHooks = ()
 
     def __str__(self):
         return f'This is created to be able to communicate with Socket!'
@@ -169,17 +295,134 @@ class Communication:
         communication.settimeout(Communication.timeout)
         return communication
 
+    @staticmethod
+    def observe(IPV4, message, start, error=None):
+        """
+        :param start: time.perf_counter() value taken before the transaction has been started
+        :param error: Exception raised by the transaction, None if it has been succeeded
+        Records the transaction to Communication.metrics if instrumentation is active
+        """
+        metrics = Communication.metrics
+        if metrics is not None:
+            metrics.observe(IPV4, message, CommunicationMetrics.outcomeLabel(error), time.perf_counter() - start)
+
+    @staticmethod
+    def addHook(before=None, after=None):
+        """
+        :param before: Called as before(IPV4, message, sentBytes, start) before the transaction
+        :param after: Called as after(IPV4, message, sentBytes, receivedBytes, start, end, error) after the transaction
+        Timestamps are time.perf_counter() values (monotonic), receivedBytes is None for commands and failures
+        and error is None if the transaction has been succeeded. Exceptions raised by hooks are logged and ignored.
+        """
+        if before is not None:
+            Communication._beforeHooks = Communication._beforeHooks + (before,)
+        if after is not None:
+            Communication._afterHooks = Communication._afterHooks + (after,)
+
+    @staticmethod
+    def removeHook(before=None, after=None):
+        Communication._beforeHooks = tuple(hook for hook in Communication._beforeHooks if hook is not before)
+        Communication._afterHooks = tuple(hook for hook in Communication._afterHooks if hook is not after)
+
+    @staticmethod
+    def clearHooks():
+        Communication._beforeHooks = ()
+        Communication._afterHooks = ()
+
+    @staticmethod
+    def _runHooks(hooks, *arguments):
+        for hook in hooks:
+            try:
+                hook(*arguments)
+            except Exception:
+                logger.exception(f'Communication hook {hook} has been failed!')
+
+    @staticmethod
+    def expectedReplies(send_message):
+        """
+        :return: Number of reply terminators of a message, one per terminated line which has a query
+        """
+        return max(1, sum(1 for line in send_message.split(b'\n')[:-1] if b'?' in line))
+
+    @staticmethod
+    def receive(communication, send_message):
+        """
+        Reads the reply until all expected terminators have arrived, a reply split into several TCP segments is joined.
+        """
+        expected = Communication.expectedReplies(send_message)
+        received = b''
+        while received.count(b'\n') < expected:
+            chunk = communication.recv(Communication.buffer_size)
+            if not chunk:
+                raise ConnectionResetError(f'Reply has been cut by the device after {len(received)} bytes!')
+            received += chunk
+        return received
+
+    @staticmethod
+    def _exchange(IPV4, send_message, query):
+        timeouts = Communication.timeouts
+        if timeouts is not None:
+            return timeouts.exchange(IPV4, send_message, query)
+        communication = Communication.openSocket()
+        try:
+            communication.connect((IPV4, Communication.port_name))
+            communication.sendall(send_message)
+            if query:
+                return Communication.receive(communication, send_message)
+            return None
+        finally:
+            communication.close()
+
+    @staticmethod
+    def _transact(IPV4, message, send_message, query, exchange=None):
+        """
+        Single path of every transaction with the device, it runs hooks and records metrics around exchange.
+        :param exchange: Callable as exchange(IPV4, send_message, query) returning received bytes or None
+        """
+        beforeHooks = Communication._beforeHooks
+        afterHooks = Communication._afterHooks
+        start = time.perf_counter()
+        if beforeHooks:
+            Communication._runHooks(beforeHooks, IPV4, message, send_message, start)
+        try:
+            if Communication.transport is not None:
+                exchange = Communication.transport.exchange
+            received = (exchange or Communication._exchange)(IPV4, send_message, query)
+        except OSError as error:
+            Communication.observe(IPV4, message, start, error)
+            if afterHooks:
+                Communication._runHooks(afterHooks, IPV4, message, send_message, None, start, time.perf_counter(),
+                                        error)
+            raise
+        Communication.observe(IPV4, message, start)
+        if afterHooks:
+            Communication._runHooks(afterHooks, IPV4, message, send_message, received, start, time.perf_counter(),
+                                    None)
+        return received
+
+    @staticmethod
+    def _resilientCall(IPV4, message, send_message, query):
+        policy = Communication.resilience
+        if policy is None:
+            return Communication._transact(IPV4, message, send_message, query)
+        return policy.call(IPV4, message, lambda: Communication._transact(IPV4, message, send_message, query))
+
+    @staticmethod
+    def _call(IPV4, message, send_message, query):
+        coalescing = Communication.coalescing
+        if query and coalescing is not None and coalescing.isShareable(message):
+            return coalescing.call(IPV4, message,
+                                   lambda: Communication._resilientCall(IPV4, message, send_message, query))
+        return Communication._resilientCall(IPV4, message, send_message, query)
+
     @staticmethod
     def sendMessage(IPV4, message):
         """
         :param message: Message that is going to be sent to Delta which works as command lines!
         :return: It returns the message has been sent to Delta!
         """
-        send_message = bytes(message, 'utf-8')
-        communication = Communication.openSocket()
-        communication.connect((IPV4, Communication.port_name))
-        communication.send(send_message)
-        communication.close()
+        send_message = CommandEncoder.encode(message)
+        Communication._call(IPV4, message, send_message, query=False)
         logger.debug(f'{send_message} has been sent to Delta!')
         return send_message
 
@@ -189,1579 +432,5963 @@ class Communication:
         :param message: Message that is going to be sent to Delta to get back as query!
         :return: It returns the message has been received from Delta!
         """
-        send_message = bytes(message, 'utf-8')
-        communication = Communication.openSocket()
-        communication.connect((IPV4, Communication.port_name))
-        communication.send(send_message)
-        communication_message = communication.recv(Communication.buffer_size).decode('UTF-8')
-        communication.close()
+        send_message = CommandEncoder.encode(message)
+        communication_message = Communication._call(IPV4, message, send_message, query=True).decode('UTF-8')
         received_message = communication_message.rstrip('\n')
         logger.debug(f'{received_message} has been received from Delta!')
         return received_message
 
+    @staticmethod
+    def sendBatch(IPV4, messages):
+        """
+        :param messages: Commands sent in this order, as one ';' separated message if Communication.compound
+        :return: Messages which have been sent
+        """
+        if Communication.compound:
+            return [Communication.sendMessage(IPV4, ';'.join(message.rstrip('\n') for message in messages) + '\n')]
+        return [Communication.sendMessage(IPV4, message) for message in messages]
 
-class SM15K:
+    @staticmethod
+    def queryBatch(IPV4, queries):
+        """
+        :param queries: Queries (with or without <term>), as one ';' separated message if Communication.compound
+        :return: List of the replies in the order of the queries
+        """
+        if not Communication.compound:
+            return [Communication.sendReceiveMessage(IPV4, query.rstrip('\n') + '\n') for query in queries]
+        reply = Communication.sendReceiveMessage(IPV4, ';'.join(query.rstrip('\n') for query in queries) + '\n')
+        values = reply.replace('\n', ';').split(';')
+        if len(values) != len(queries):
+            raise ValueError(f'Reply of {IPV4} has {len(values)} values instead of {len(queries)}!')
+        return values
 
-    def __init__(self, IPV4):
-        self.IPV4 = IPV4
-        self.source = SourceSubsystem(self.IPV4)
-        self.measure = MeasureSubsystem(self.IPV4)
-        self.system = SystemSubsystem(self.IPV4)
-        self.output = OutputSubsystem(self.IPV4)
-        self.shutdown = ShutdownOperation(self.IPV4)
 
-    def __str__(self):
-        return f'Manual: General Instruction - page 8 - Queries and Commands, for details print object.__doc__'
+class TimingHistogram:
+    """
+        Timing Histogram
+        -----------------------------------------------------------------------------------------------------------------
+        Fixed bucket histogram for durations in seconds, cheap enough to be updated at every device transaction.
+        -----------------------------------------------------------------------------------------------------------------
+        buckets: Upper bounds of the buckets in seconds, anything above the last bound is counted in the +Inf bucket.
+        -----------------------------------------------------------------------------------------------------------------
+        observe(value): Adds one observation to the histogram.
+        -----------------------------------------------------------------------------------------------------------------
+        quantile(q): Approximated quantile, upper bound of the bucket which holds the q-th observation.
+        -----------------------------------------------------------------------------------------------------------------
+        summary(): Dictionary of count, sum, min, max, mean, p50, p90 and p99.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    defaultBuckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets=None):
+        self.buckets = tuple(sorted(buckets)) if buckets else TimingHistogram.defaultBuckets
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self._lock = threading.Lock()
 
+    def __str__(self):
+        return f'Timing Histogram, for details print object.__doc__'
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+
+    def quantile(self, q):
+        with self._lock:
+            if self.count == 0:
+                return None
+            rank = q * self.count
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank and count:
+                    return self.buckets[index] if index < len(self.buckets) else self.max
+            return self.max
+
+    def summary(self):
+        return {'count': self.count, 'sum': self.sum, 'min': self.min, 'max': self.max,
+                'mean': self.sum / self.count if self.count else None,
+                'p50': self.quantile(0.5), 'p90': self.quantile(0.9), 'p99': self.quantile(0.99)}
+
+
+class CommunicationMetrics:
     """
-        Manual: General Instruction - page 8 - Queries and Commands
+        Communication Metrics
         -----------------------------------------------------------------------------------------------------------------
-        IDN = "*IDN?<term>" Read the identification string of the Delta Power Supply
+        Keeps a counter and a latency histogram per device, per SCPI command and per outcome.
         -----------------------------------------------------------------------------------------------------------------
-        PUD = "*PUD?<term>" Read the protected user data of the Delta Power Supply
+        Command label is the query itself (MEASure:CURrent?) or the header of a command without its parameters
+        (SOURce:VOLtage), batched commands are labelled with all their headers (SOURce:VOLtage;SOURce:CURrent).
+        Outcome label is one of ok, timeout, connection_refused or error.
         -----------------------------------------------------------------------------------------------------------------
-        CLS = "*CLS<term>" Clear the error queue of the Delta Power Supply
+        observe(IPV4, message, outcome, duration): Adds one transaction.
         -----------------------------------------------------------------------------------------------------------------
-        RST = "*RST<term>" Set the power supply in a save defined state of the Delta Power Supply
+        series(): List of (device, command, outcome, histogram) for every seen combination.
+        -----------------------------------------------------------------------------------------------------------------
+        prometheusText(): All series in Prometheus text exposition format.
+        -----------------------------------------------------------------------------------------------------------------
+        Off by default like the other transport features, Communication.metrics = CommunicationMetrics() switches it
+        on for every caller (MetricsExporter does it if it is off).
         -----------------------------------------------------------------------------------------------------------------
-        Note: All commands can be tested with 'TestGeneralInstructions Method'
-        :return Queries will return the Received Message!
-        :return Commands will return the Command has been sent!
     """
 
-    def Identification(self, IDN="*IDN?\n"):
-        """
-        IDN = "*IDN?<term>" Read the identification string of the Delta Power Supply
-        """
-        return Communication().sendReceiveMessage(self.IPV4, message=IDN)
+    def __init__(self, buckets=None):
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
 
-    def ProtectedUserData(self, PUD="*PUD?\n"):
-        """
-        PUD = "*PUD?<term>" Read the protected user data of the Delta Power Supply
-        """
-        return Communication().sendReceiveMessage(self.IPV4, message=PUD)
+    def __str__(self):
+        return f'Communication Metrics, for details print object.__doc__'
 
-    def ClearErrorQueue(self, CLS="*CLS\n"):
-        """
-        CLS = "*CLS<term>" Clear the error queue of the Delta Power Supply
-        """
-        return Communication().sendMessage(self.IPV4, message=CLS)
+    @staticmethod
+    def commandLabel(message):
+        command = message.strip()
+        if command.endswith('?'):
+            return command
+        return ';'.join(part.strip().split(' ', 1)[0] for part in command.split(';'))
 
-    def ResetDefinedState(self, RST="*RST\n"):
-        """
-        RST = "*RST<term>" Set the power supply in a save defined state of the Delta Power Supply
-        """
-        return Communication().sendMessage(self.IPV4, message=RST)
+    @staticmethod
+    def outcomeLabel(error):
+        if error is None:
+            return 'ok'
+        if isinstance(error, socket.timeout):
+            return 'timeout'
+        if isinstance(error, ConnectionRefusedError):
+            return 'connection_refused'
+        return 'error'
+
+    def observe(self, IPV4, message, outcome, duration):
+        key = (IPV4, CommunicationMetrics.commandLabel(message), outcome)
+        histogram = self._series.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._series.setdefault(key, TimingHistogram(self.buckets))
+        histogram.observe(duration)
+
+    def series(self):
+        with self._lock:
+            return [(device, command, outcome, histogram)
+                    for (device, command, outcome), histogram in sorted(self._series.items())]
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
 
-    def TestGeneralInstructions(self):
-        logger.debug("Self Identification runs:")
-        self.Identification()
-        logger.debug("Protected user data runs:")
-        self.ProtectedUserData()
-        logger.debug("Clear Error Queue runs:")
-        self.ClearErrorQueue()
-        logger.debug("Reset Defined State runs:")
-        self.ResetDefinedState()
-        return None
+    @staticmethod
+    def _labels(device, command, outcome, extra=''):
+        escaped = [str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                   for value in (device, command, outcome)]
+        return f'{{device="{escaped[0]}",command="{escaped[1]}",outcome="{escaped[2]}"{extra}}}'
+
+    def prometheusText(self):
+        series = self.series()
+        lines = ['# HELP sm15k_requests_total Number of transactions with the power supply.',
+                 '# TYPE sm15k_requests_total counter']
+        for device, command, outcome, histogram in series:
+            lines.append(f'sm15k_requests_total{self._labels(device, command, outcome)} {histogram.count}')
+        lines += ['# HELP sm15k_request_duration_seconds Duration of transactions with the power supply.',
+                  '# TYPE sm15k_request_duration_seconds histogram']
+        for device, command, outcome, histogram in series:
+            with histogram._lock:
+                counts = list(histogram.counts)
+                total, count = histogram.sum, histogram.count
+            cumulative = 0
+            for bound, bucketCount in zip(histogram.buckets, counts):
+                cumulative += bucketCount
+                labels = self._labels(device, command, outcome, f',le="{bound}"')
+                lines.append(f'sm15k_request_duration_seconds_bucket{labels} {cumulative}')
+            labels = self._labels(device, command, outcome, ',le="+Inf"')
+            lines.append(f'sm15k_request_duration_seconds_bucket{labels} {count}')
+            lines.append(f'sm15k_request_duration_seconds_sum{self._labels(device, command, outcome)} {total}')
+            lines.append(f'sm15k_request_duration_seconds_count{self._labels(device, command, outcome)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsExporter(threading.Thread):
+    """
+        Metrics Exporter Functional Operation
+        -----------------------------------------------------------------------------------------------------------------
+        host: Address to serve the metrics at, default is only local host.
+        -----------------------------------------------------------------------------------------------------------------
+        port: Port to serve the metrics at, metrics are served at http://host:port/metrics
+        -----------------------------------------------------------------------------------------------------------------
+        metrics: CommunicationMetrics to be served, default is Communication.metrics which is switched on if it is off
+        -----------------------------------------------------------------------------------------------------------------
+    """
 
+    def __init__(self, host='127.0.0.1', port=9462, metrics=None, deamonState=True):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.metrics = metrics
+        if metrics is None and Communication.metrics is None:
+            Communication.metrics = CommunicationMetrics()
+        self.deamonState = deamonState
+        self.setDaemon(self.deamonState)
+        exporter = self
+
+        class MetricsHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                metrics = exporter.metrics if exporter.metrics is not None else Communication.metrics
+                body = (metrics.prometheusText() if metrics is not None else '').encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f'Metrics exporter: {format % args}')
+
+        self.server = http.server.ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
 
-class SourceSubsystem:
+    def __str__(self):
+        return f'Metrics Exporter at http://{self.host}:{self.port}/metrics, for details print object.__doc__'
+
+    def stop(self):
+        logger.debug('Metrics exporter stop event has been started!')
+        self.server.shutdown()
+
+    def run(self):
+        logger.debug(f'Metrics exporter has been started at http://{self.host}:{self.port}/metrics!')
+        self.server.serve_forever()
+        self.server.server_close()
+        logger.debug('Metrics exporter has been stopped!')
+
+
+class DeviceUnavailableError(ConnectionError):
     """
-    Manual: Source Subsystem - page 9 and 10 - Queries and Commands
-    -----------------------------------------------------------------------------------------------------------------
-    MaximumVoltage = "SOURce:VOLtage:MAXimum?<term>" Read the maximum output voltage
-    -----------------------------------------------------------------------------------------------------------------
-    MaximumCurrent = "SOURce:CURrent:MAXimum?<term>" Read the maximum output current
-    -----------------------------------------------------------------------------------------------------------------
-    MaximumNegativeCurrent = "SOURce:CURrent:NEGative:MAXimum?<term>" Read the maximum negative output current
-    -----------------------------------------------------------------------------------------------------------------
-    MaximumPower = "SOURce:POWer:MAXimum?<term>" Read the maximum output power
-    -----------------------------------------------------------------------------------------------------------------
-    MaximumNegativePower = "SOURce:POWer:NEGative:MAXimum?<term>" Read the maximum negative output power
-    -----------------------------------------------------------------------------------------------------------------
-    SetVoltage = "SOURce:VOLtage<sp><NR2><term>" To set the output voltage of the power supply
-    -----------------------------------------------------------------------------------------------------------------
-    ReadVoltageSet = "SOURce:VOLTage?<term>" To see last voltage set point of the power supply
-    -----------------------------------------------------------------------------------------------------------------
-    SetCurrent = "SOURce:CURrent<sp><NR2><term>" To set the output current of the power supply
-    -----------------------------------------------------------------------------------------------------------------
-    ReadCurrentSet = "SOURce:CURrent?<term>" To see last current set point of the power supply
-    -----------------------------------------------------------------------------------------------------------------
-    SetNegativeCurrent = "SOURce:CURrent:NEGative<sp><NR2><term>" To set the output negative current of the power supply
-    -----------------------------------------------------------------------------------------------------------------
-    ReadNegativeCurrentSet = "SOURce:CURrent:NEGative?<term>" To see last negative current set point of the power supply
-    -----------------------------------------------------------------------------------------------------------------
-    SetPower = "SOURce:POWer<sp><NR2><term>" To set the output power of the power supply
-    -----------------------------------------------------------------------------------------------------------------
-    ReadPowerSet = "SOURce:POWer?<term>" To see last output power set point of the power supply
-    -----------------------------------------------------------------------------------------------------------------
-    SetNegativePower = "SOURce:POWer:NEGative<sp><NR2><term>" To set the negative output power of the power supply
-    -----------------------------------------------------------------------------------------------------------------
-    ReadNegativePowerSet = "SOURce:POWer:NEGative?<term>" To see last negative output power set point of the power supply
-    -----------------------------------------------------------------------------------------------------------------
-    VoltageStepSize = "SOURce:VOLtage:STEpsize?<term>" To read the programming stepsize of the output voltage
-    -----------------------------------------------------------------------------------------------------------------
-    CurrentStepSize = "SOURce:CURrent:STEpsize?<term>" To read the programming stepsize of the output current
-    -----------------------------------------------------------------------------------------------------------------
-    PowerStepSize = "SOURce:POWer:STEpsize?<term>" To read the programming stepsize of the output power
-    -----------------------------------------------------------------------------------------------------------------
-    Note: All commands can be tested with 'TestSourceSubsystem Method'
-    :return Queries will return the Received Message!
-    :return Commands will return the Command has been sent!
+    Raised without contacting the device while its circuit breaker is open.
     """
 
-    def __init__(self, IPV4):
+
+class CircuitBreaker:
+    """
+        Device Circuit Breaker
+        -----------------------------------------------------------------------------------------------------------------
+        IPV4: Address of the device that is guarded
+        -----------------------------------------------------------------------------------------------------------------
+        failureThreshold: Number of consecutive failures to open the breaker. While it is open, transactions with the
+        device fail immediately instead of waiting for the timeout, so a dead supply does not block the others.
+        -----------------------------------------------------------------------------------------------------------------
+        resetTimeout: Time after which one trial transaction is allowed again (seconds).
+        -----------------------------------------------------------------------------------------------------------------
+        reconnects: Number of recoveries after failed transactions, downtime: Total time between first failure and
+        recovery (seconds), opens: Number of times the breaker has been opened.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    closed = 'closed'
+    open = 'open'
+    halfOpen = 'half_open'
+
+    def __init__(self, IPV4, failureThreshold=5, resetTimeout=30.0):
         self.IPV4 = IPV4
+        self.failureThreshold = failureThreshold
+        self.resetTimeout = resetTimeout
+        self.state = CircuitBreaker.closed
+        self.failures = 0
+        self.opens = 0
+        self.reconnects = 0
+        self.downtime = 0.0
+        self._downSince = None
+        self._openedAt = None
+        self._trial = False
+        self._lock = threading.Lock()
 
     def __str__(self):
-        return f'Manual: Source Subsystem - page 9 and 10 - Queries and Commands, for details print object.__doc__'
+        return f'Circuit Breaker of {self.IPV4} is {self.state}, for details print object.__doc__'
 
-    def MaximumVoltage(self, MaximumVoltage="SOURce:VOLtage:MAXimum?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MaximumVoltage)
+    def allow(self):
+        """
+        :return: True if a transaction may be sent, while half open only one trial transaction is let through
+        """
+        with self._lock:
+            if self.state == CircuitBreaker.open:
+                if time.monotonic() - self._openedAt < self.resetTimeout:
+                    return False
+                self.state = CircuitBreaker.halfOpen
+                logger.debug(f'Circuit breaker of {self.IPV4} is half open!')
+            elif self.state == CircuitBreaker.halfOpen and self._trial:
+                return False
+            self._trial = self.state == CircuitBreaker.halfOpen
+            return True
+
+    def releaseTrial(self):
+        with self._lock:
+            self._trial = False
+
+    def recordSuccess(self):
+        with self._lock:
+            self._trial = False
+            if self._downSince is not None:
+                self.downtime += time.monotonic() - self._downSince
+                self.reconnects += 1
+                self._downSince = None
+                logger.debug(f'Communication with {self.IPV4} has been recovered!')
+            self.state = CircuitBreaker.closed
+            self.failures = 0
+
+    def recordFailure(self):
+        with self._lock:
+            now = time.monotonic()
+            self._trial = False
+            self.failures += 1
+            if self._downSince is None:
+                self._downSince = now
+            if self.state == CircuitBreaker.halfOpen or (self.state == CircuitBreaker.closed and
+                                                          self.failures >= self.failureThreshold):
+                self.state = CircuitBreaker.open
+                self._openedAt = now
+                self.opens += 1
+                logger.warning(f'Circuit breaker of {self.IPV4} has been opened after {self.failures} failures!')
+
+    def report(self):
+        with self._lock:
+            downtime = self.downtime
+            if self._downSince is not None:
+                downtime += time.monotonic() - self._downSince
+            return {'state': self.state, 'failures': self.failures, 'opens': self.opens,
+                    'reconnects': self.reconnects, 'downtime': downtime}
+
+
+class ResiliencePolicy:
+    """
+        Resilient Transport Policy
+        -----------------------------------------------------------------------------------------------------------------
+        retries: Number of extra attempts for idempotent queries, commands and queue reading queries are never repeated.
+        -----------------------------------------------------------------------------------------------------------------
+        backoffBase, backoffMaximum: Exponential backoff between attempts, base * 2 ** attempt limited to maximum (seconds)
+        -----------------------------------------------------------------------------------------------------------------
+        jitter: Fraction of the backoff that is randomized (0 -> no jitter, 1 -> full jitter)
+        -----------------------------------------------------------------------------------------------------------------
+        failureThreshold, resetTimeout: Settings of the per device CircuitBreaker
+        -----------------------------------------------------------------------------------------------------------------
+        report(): Dictionary of breaker state, failures, opens, reconnects and downtime per device.
+        -----------------------------------------------------------------------------------------------------------------
+        Off by default, switch it on with Communication.resilience = ResiliencePolicy(). An open breaker never refuses
+        output off (OUTPut 0 / OUTPut OFF) or transactions inside SafetyScope (ShutdownOperation), they are always sent.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    nonIdempotentQueries = ('SYSTem:ERRor?', 'SYSTem:WARning?')
+    outputOff = ('OUTPUT 0', 'OUTPUT OFF')
+
+    def __init__(self, retries=2, backoffBase=0.1, backoffMaximum=2.0, jitter=0.5, failureThreshold=5,
+                 resetTimeout=30.0):
+        self.retries = retries
+        self.backoffBase = backoffBase
+        self.backoffMaximum = backoffMaximum
+        self.jitter = jitter
+        self.failureThreshold = failureThreshold
+        self.resetTimeout = resetTimeout
+        self._breakers = {}
+        self._lock = threading.Lock()
 
-    def MaximumCurrent(self, MaximumCurrent="SOURce:CURrent:MAXimum?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MaximumCurrent)
+    def __str__(self):
+        return f'Resilience Policy, for details print object.__doc__'
 
-    def MaximumNegativeCurrent(self, MaximumNegativeCurrent="SOURce:CURrent:NEGative:MAXimum?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MaximumNegativeCurrent)
+    def breaker(self, IPV4):
+        breaker = self._breakers.get(IPV4)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(IPV4, CircuitBreaker(IPV4, self.failureThreshold,
+                                                                         self.resetTimeout))
+        return breaker
 
-    def MaximumPower(self, MaximumPower="SOURce:POWer:MAXimum?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MaximumPower)
+    def isIdempotent(self, message):
+        command = message.strip()
+        return command.endswith('?') and command not in ResiliencePolicy.nonIdempotentQueries
 
-    def MaximumNegativePower(self, MaximumNegativePower="SOURce:POWer:NEGative:MAXimum?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MaximumNegativePower)
+    @staticmethod
+    def isSafety(message):
+        return SafetyScope.isActive() or any(part.strip().upper() in ResiliencePolicy.outputOff
+                                             for part in message.split(';'))
+
+    def backoff(self, attempt):
+        delay = min(self.backoffMaximum, self.backoffBase * 2 ** attempt)
+        return delay * (1 - self.jitter * random.random())
+
+    def call(self, IPV4, message, function):
+        breaker = self.breaker(IPV4)
+        attempts = self.retries + 1 if self.isIdempotent(message) else 1
+        safety = ResiliencePolicy.isSafety(message)
+        for attempt in range(attempts):
+            if not breaker.allow() and not safety:
+                raise DeviceUnavailableError(f'Circuit breaker of {IPV4} is open, {message.strip()} is not sent!')
+            try:
+                result = function()
+            except OSError as error:
+                breaker.recordFailure()
+                if attempt + 1 >= attempts:
+                    raise
+                logger.debug(f'{message.strip()} to {IPV4} has been failed ({error}), it is being retried!')
+                time.sleep(self.backoff(attempt))
+                continue
+            except BaseException:
+                breaker.releaseTrial()
+                raise
+            breaker.recordSuccess()
+            return result
+
+    def report(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {IPV4: breaker.report() for IPV4, breaker in breakers.items()}
+
+
+class SafetyScope:
+    """
+        Safety Scope
+        -----------------------------------------------------------------------------------------------------------------
+        with SafetyScope(): ... -> Transactions of this thread inside the block are sent even if the circuit breaker
+        of the device is open (ResiliencePolicy), ShutdownOperation runs in it so a shutdown is never refused.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    _active = threading.local()
 
-    def SetVoltage(self, voltage):
-        message = f'SOURce:VOLtage {voltage}\n'
-        return Communication().sendMessage(self.IPV4, message=message)
+    def __str__(self):
+        return f'Safety Scope, for details print object.__doc__'
 
-    def ReadVoltageSet(self, ReadVoltageSet="SOURce:VOLtage?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadVoltageSet)
+    @staticmethod
+    def isActive():
+        return getattr(SafetyScope._active, 'depth', 0) > 0
 
-    def SetCurrent(self, current):
-        message = f'SOURce:CURrent {current}\n'
-        return Communication().sendMessage(self.IPV4, message=message)
+    def __enter__(self):
+        SafetyScope._active.depth = getattr(SafetyScope._active, 'depth', 0) + 1
+        return self
 
-    def ReadCurrentSet(self, ReadCurrentSet="SOURce:CURrent?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadCurrentSet)
+    def __exit__(self, *exception):
+        SafetyScope._active.depth -= 1
+        return False
 
-    def SetNegativeCurrent(self, negativecurrent):
-        message = f'SOURce:CURrent:NEGative {negativecurrent}\n'
-        return Communication().sendMessage(self.IPV4, message=message)
 
-    def ReadNegativeCurrentSet(self, ReadNegativeCurrentSet="SOURce:CURrent:NEGative?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadNegativeCurrentSet)
+class RoundTripEstimator:
+    """
+        Round Trip Time Estimator
+        -----------------------------------------------------------------------------------------------------------------
+        Smoothed round trip time and its variation as TCP does (RFC 6298): first sample srtt = rtt, rttvar = rtt / 2,
+        then rttvar = 3/4 rttvar + 1/4 |srtt - rtt| and srtt = 7/8 srtt + 1/8 rtt. Timeout is srtt + 4 rttvar limited to
+        floor and ceiling, initial until the first sample. Every expired timeout doubles it until the next sample, at most
+        to backoffLimit times the estimate (and ceiling), so a dead device keeps failing fast.
+        -----------------------------------------------------------------------------------------------------------------
+    """
 
-    def SetPower(self, power):
-        message = f"SOURce:POWer {power}\n"
-        return Communication().sendMessage(self.IPV4, message=message)
+    def __init__(self, initial=3.0, floor=0.5, ceiling=10.0, backoffLimit=4):
+        self.floor = floor
+        self.ceiling = ceiling
+        self.backoffLimit = backoffLimit
+        self.srtt = None
+        self.rttvar = None
+        self.estimate = min(ceiling, max(floor, initial))
+        self.timeout = self.estimate
+        self.samples = 0
+        self.expired = 0
+        self._lock = threading.Lock()
 
-    def ReadPowerSet(self, ReadPowerSet="SOURce:POWer?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadPowerSet)
+    def __str__(self):
+        return f'Round Trip Estimator, timeout {self.timeout:.3f} s, for details print object.__doc__'
 
-    def SetNegativePower(self, negativepower):
-        message = f'SOURce:POWer:NEGative {negativepower}\n'
-        return Communication().sendMessage(self.IPV4, message=message)
+    def observe(self, rtt):
+        with self._lock:
+            if self.srtt is None:
+                self.srtt = rtt
+                self.rttvar = rtt / 2
+            else:
+                self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+                self.srtt = 0.875 * self.srtt + 0.125 * rtt
+            self.samples += 1
+            self.estimate = min(self.ceiling, max(self.floor, self.srtt + 4 * self.rttvar))
+            self.timeout = self.estimate
 
-    def ReadNegativePowerSet(self, ReadNegativePowerSet="SOURce:POWer:NEGative?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadNegativePowerSet)
+    def expire(self):
+        with self._lock:
+            self.expired += 1
+            self.timeout = min(self.ceiling, self.timeout * 2, self.estimate * self.backoffLimit)
 
-    def ReadVoltageStepSize(self, ReadVoltageStepSize="SOURce:VOLtage:STEpsize?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadVoltageStepSize)
+    def report(self):
+        with self._lock:
+            return {'srtt': self.srtt, 'rttvar': self.rttvar, 'timeout': self.timeout, 'samples': self.samples,
+                    'expired': self.expired}
 
-    def ReadCurrentStepSize(self, ReadCurrentStepSize="SOURce:CURrent:STEpsize?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadCurrentStepSize)
 
-    def ReadPowerStepSize(self, ReadPowerStepSize="SOURce:POWer:STEpsize?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadPowerStepSize)
+class AdaptiveTimeouts:
+    """
+        Adaptive Per Device Timeouts
+        -----------------------------------------------------------------------------------------------------------------
+        Off by default, Communication.timeouts = AdaptiveTimeouts() switches it on for every caller.
+        -----------------------------------------------------------------------------------------------------------------
+        initial: Timeout (seconds) of a device until its first round trip has been observed, None (default) is
+        Communication.timeout.
+        -----------------------------------------------------------------------------------------------------------------
+        connectFloor, connectCeiling: Limits of the connect timeout, estimated from the observed connect times. The
+        floor is above the 1 s first SYN retransmission of the host, so one lost SYN is not a failure.
+        -----------------------------------------------------------------------------------------------------------------
+        readFloor, readCeiling: Limits of the read timeout, estimated from the time between send and reply. The floor
+        leaves room for queries which take the device longer than the usual ones, raise it if such queries time out.
+        -----------------------------------------------------------------------------------------------------------------
+        Ceilings None (default) are Communication.timeout, and every timeout is capped at Communication.timeout at
+        the time of the exchange, so a user set Communication.timeout is never exceeded.
+        -----------------------------------------------------------------------------------------------------------------
+        Every device has its own RoundTripEstimator for connecting and for reading, so a healthy unit answering in
+        milliseconds times out after about readFloor seconds when it dies, instead of waiting for the fixed
+        Communication.timeout.
+        -----------------------------------------------------------------------------------------------------------------
+        report(): Dictionary of connect and read estimates per device.
+        -----------------------------------------------------------------------------------------------------------------
+    """
 
-    def TestSourceSubsystem(self):
-        logger.debug("Maximum Voltage runs:")
-        self.MaximumVoltage()
-        logger.debug("Maximum Current runs:")
-        self.MaximumCurrent()
-        logger.debug("Maximum Negative Current runs:")
-        self.MaximumNegativeCurrent()
-        logger.debug("Maximum Power runs:")
-        self.MaximumPower()
-        logger.debug("Maximum Negative Power runs:")
-        self.MaximumNegativePower()
-        logger.debug("Set Voltage runs:")
-        self.SetVoltage(5)
-        logger.debug("Read Last Voltage Set runs:")
-        self.ReadVoltageSet()
-        logger.debug("Set Current runs:")
-        self.SetCurrent(5)
-        logger.debug("Read Last Current Set runs:")
-        self.ReadCurrentSet()
-        logger.debug("Set Negative Current Set runs:")
-        self.SetNegativeCurrent(-5)
-        logger.debug("Read Last Negative Current Set runs:")
-        self.ReadNegativeCurrentSet()
-        logger.debug("Set Power Set runs:")
-        self.SetPower(100)
-        logger.debug("Read Last Power Set runs:")
-        self.ReadPowerSet()
-        logger.debug("Set Negative Power Set runs:")
-        self.SetNegativePower(-100)
-        logger.debug("Read Last Negative Power Set runs:")
-        self.ReadNegativePowerSet()
-        logger.debug("Read Voltage Stepsize runs:")
-        self.ReadVoltageStepSize()
-        logger.debug("Read Current Stepsize runs:")
-        self.ReadCurrentStepSize()
-        logger.debug("Read Power Stepsize runs:")
-        self.ReadPowerStepSize()
+    def __init__(self, initial=None, connectFloor=1.5, connectCeiling=None, readFloor=3.0, readCeiling=None):
+        self.initial = initial
+        self.connectFloor = connectFloor
+        self.connectCeiling = connectCeiling
+        self.readFloor = readFloor
+        self.readCeiling = readCeiling
+        self._devices = {}
+        self._lock = threading.Lock()
 
+    def __str__(self):
+        return f'Adaptive Timeouts of {len(self._devices)} devices, for details print object.__doc__'
 
-class MeasureSubsystem:
+    def estimators(self, IPV4):
+        """
+        :return: (connect, read) RoundTripEstimator of the device
+        """
+        estimators = self._devices.get(IPV4)
+        if estimators is None:
+            timeout = Communication.timeout
+            initial = timeout if self.initial is None else self.initial
+            with self._lock:
+                estimators = self._devices.setdefault(IPV4, (
+                    RoundTripEstimator(initial, self.connectFloor,
+                                       timeout if self.connectCeiling is None else self.connectCeiling),
+                    RoundTripEstimator(initial, self.readFloor,
+                                       timeout if self.readCeiling is None else self.readCeiling)))
+        return estimators
+
+    def exchange(self, IPV4, send_message, query):
+        """
+        Communication._exchange with the connect and read timeouts of the device, observing both round trips
+        """
+        connect, read = self.estimators(IPV4)
+        communication = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            communication.settimeout(min(connect.timeout, Communication.timeout))
+            start = time.perf_counter()
+            try:
+                communication.connect((IPV4, Communication.port_name))
+            except socket.timeout:
+                connect.expire()
+                raise
+            sent = time.perf_counter()
+            connect.observe(sent - start)
+            communication.settimeout(min(read.timeout, Communication.timeout))
+            communication.sendall(send_message)
+            if not query:
+                return None
+            try:
+                received = Communication.receive(communication, send_message)
+            except socket.timeout:
+                read.expire()
+                raise
+            read.observe(time.perf_counter() - sent)
+            return received
+        finally:
+            communication.close()
+
+    def report(self):
+        with self._lock:
+            devices = dict(self._devices)
+        return {IPV4: {'connect': connect.report(), 'read': read.report()}
+                for IPV4, (connect, read) in devices.items()}
+
+
+class QueryCoalescer:
     """
-    Manual: Measure Subsystem - page 10, 11 and 12 - Queries and Commands
-    -----------------------------------------------------------------------------------------------------------------
-    MeasureVoltage = "MEASure:VOLtage?<term>" To measure output voltage of the power supply
-    -----------------------------------------------------------------------------------------------------------------
-    MeasureCurrent = "MEASure:CURrent?<term>" To measure output current of the power supply
-    -----------------------------------------------------------------------------------------------------
-    MeasurePower = "MEASure:POWer?<term>" To measure output power of the power supply
-    -----------------------------------------------------------------------------------------------------------------
-    SetAhMeasurementState = "MEASure:INStrument<sp>AH,STATE,<setting><term>" To enable the current measurement
-        instrument <setting>: OFF, ON, SUSPEND or RESUME Turning the instrument ON will reset all previous measurements
-    -----------------------------------------------------------------------------------------------------------------
-    ReadAhMeasurementSetState = "MEASure:INStrument<sp>AH,STATE?<term>" To read enable status (OFF, ON, SUSPEND or RESUME)
-    -----------------------------------------------------------------------------------------------------------------
-    ReadAhMeasurementTimeHours = "MEASure:INStrument<sp>AH,TIMEHR?<term>" To read the time the instrument is active
-        (hours with three decimals) If the instrument is not enabled, the result will be zero
-    -----------------------------------------------------------------------------------------------------------------
-    ReadAhMeasurementTimeSeconds = "MEASure:INStrument<sp>AH,TIMESEC?<term>" To read the time the instrument is active
-        (seconds with one decimal) If the instrument is not enabled, the result will be zero
-    -----------------------------------------------------------------------------------------------------------------
-    MeasureAhPositiveTotal = "MEASure:INStrument<sp>AH,POS,TOTAL?<term>"  To read the total Ah for positive current - w
-        Scientifiec Notation If the instrument is not enabled, the result will be zero.
-    -----------------------------------------------------------------------------------------------------------------
-    MeasureAhNegativeTotal = "MEASure:INStrument<sp>AH,NEG,TOTAL?<term>"  To read the total Ah for negative current - w
-        Scientifiec Notation If the instrument is not enabled, the result will be zero.
-    -----------------------------------------------------------------------------------------------------------------
-    MeasureAhMinimumCurrent = "MEASure:INStrument<sp>AH,POS,IMIN?<term>" To read minimum positive current during the time
-        the instrument is enabled. Result will be in Ampere, if the instrument is not enabled, the result will be zero.
-    -----------------------------------------------------------------------------------------------------------------
-    MeasureAhMaximumCurrent = "MEASure:INStrument<sp>AH,POS,IMAX?<term>" To read maximum positive current during the time
-        the instrument is enabled. Result will be in Ampere, if the instrument is not enabled, the result will be zero.
-    -----------------------------------------------------------------------------------------------------------------
-    MeasureAhMinimumNegativeCurrent = "MEASure:INStrument<sp>AH,NEG,IMIN?<term>" To read minimum negative current during
-        the time the instrument is enabled. Result will be in Ampere, if the instrument is not enabled, the result will be zero.
-    -----------------------------------------------------------------------------------------------------------------
-    MeasureAhMaximumNegativeCurrent = "MEASure:INStrument<sp>AH,NEG,IMAX?<term>" To read maximum negative current during
-        the time the instrument is enabled. Result will be in Ampere, if the instrument is not enabled, the result will be zero.
-    -----------------------------------------------------------------------------------------------------------------
-    SetWhMeasurementState = "MEASure:INStrument<sp>WH,STATE,<setting><term>" To enable the power measurement
-        instrument <setting>: OFF, ON, SUSPEND or RESUME Turning the instrument ON will reset all previous measurements
-    -----------------------------------------------------------------------------------------------------------------
-    ReadWhMeasurementSetState = "MEASure:INStrument<sp>WH,STATE?<term>" To read enable status (OFF, ON, SUSPEND or RESUME)
-    -----------------------------------------------------------------------------------------------------------------
-    ReadWhMeasurementTimeHours = "MEASure:INStrument<sp>WH,TIMEHR?<term>" To read the time the instrument is active
-        (hours with three decimals) If the instrument is not enabled, the result will be zero
-    -----------------------------------------------------------------------------------------------------------------
-    ReadWhMeasurementTimeSeconds = "MEASure:INStrument<sp>WH,TIMESEC?<term>" To read the time the instrument is active
-        (seconds with one decimal) If the instrument is not enabled, the result will be zero
-    -----------------------------------------------------------------------------------------------------------------
-    MeasureWhPositiveTotal = "MEASure:INStrument<sp>WH,POS,TOTAL?<term>"  To read the total Wh for positive power - w
-        Scientifiec Notation If the instrument is not enabled, the result will be zero.
-    -----------------------------------------------------------------------------------------------------------------
-    MeasureWhNegativeTotal = "MEASure:INStrument<sp>WH,NEG,TOTAL?<term>"  To read the total Wh for negative power - w
-        Scientifiec Notation If the instrument is not enabled, the result will be zero.
-    -----------------------------------------------------------------------------------------------------------------
-    MeasureWhMinimumCurrent = "MEASure:INStrument<sp>WH,POS,PMIN?<term>" To read minimum positive power during the time
-        the instrument is enabled. Result will be in Watts, if the instrument is not enabled, the result will be zero.
-    -----------------------------------------------------------------------------------------------------------------
-    MeasureWhMaximumCurrent = "MEASure:INStrument<sp>WH,POS,PMAX?<term>" To read maximum positive power during the time
-        the instrument is enabled. Result will be in Watts, if the instrument is not enabled, the result will be zero.
-    -----------------------------------------------------------------------------------------------------------------
-    MeasureWhMinimumNegativeCurrent = "MEASure:INStrument<sp>WH,NEG,PMIN?<term>" To read minimum negative power during
-        the time the instrument is enabled. Result will be in Watss, if the instrument is not enabled, the result will be zero.
-    -----------------------------------------------------------------------------------------------------------------
-    MeasureWhMaximumNegativeCurrent = "MEASure:INStrument<sp>WH,NEG,PMAX?<term>" To read maximum negative power during
-        the time the instrument is enabled. Result will be in Watts, if the instrument is not enabled, the result will be zero.
-    -----------------------------------------------------------------------------------------------------------------
-    MeasureTemperature = "MEASure:TEMperature?<term>" To read highest internal temperature of the power supply
-    -----------------------------------------------------------------------------------------------------------------
-    Note: All commands can be tested with 'TestMeasureSubsystem Method'
-    :return Queries will return the Received Message!
-    :return Commands will return the Command has been sent!
+        Query Coalescing
+        -----------------------------------------------------------------------------------------------------------------
+        window: Freshness window (seconds), a reply which has been received less than window ago is shared as well.
+        window=0 shares only requests which are in flight at the same time.
+        -----------------------------------------------------------------------------------------------------------------
+        excluded: Queries which are never shared, default are the queue reading queries (SYSTem:ERRor?, WARning?).
+        -----------------------------------------------------------------------------------------------------------------
+        Communication.coalescing = QueryCoalescer(window=0.05) switches it on for every caller. Identical read only
+        queries to one device (every ';' part ends with '?') wait for the one in flight and get its reply, so watchdog,
+        datalogger and operation threads polling the same supply cause one device request. Commands are never shared
+        and failures are only shared with the callers which were already waiting.
+        -----------------------------------------------------------------------------------------------------------------
+        report(): Dictionary of queries, device requests and shared replies.
+        -----------------------------------------------------------------------------------------------------------------
     """
 
-    def __init__(self, IPV4):
+    def __init__(self, window=0.05, excluded=ResiliencePolicy.nonIdempotentQueries):
+        self.window = window
+        self.excluded = frozenset(excluded)
+        self.queries = 0
+        self.requests = 0
+        self.shared = 0
+        self._shareable = {}
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return f'Query Coalescer, for details print object.__doc__'
+
+    def isShareable(self, message):
+        shareable = self._shareable.get(message)
+        if shareable is None:
+            parts = [part.strip() for part in message.strip().split(';')]
+            shareable = all(part.endswith('?') for part in parts) and not self.excluded.intersection(parts)
+            self._shareable[message] = shareable
+        return shareable
+
+    def call(self, IPV4, message, function):
+        """
+        :param function: Device request of the query, called only by the first of the identical callers
+        :return: Received bytes of the shared (or own) device request
+        """
+        key = (IPV4, message)
+        with self._lock:
+            self.queries += 1
+            flight = self._flights.get(key)
+            if flight is not None and (flight['received'] is None or
+                                       time.monotonic() - flight['received'] <= self.window):
+                self.shared += 1
+                leader = False
+            else:
+                flight = {'done': threading.Event(), 'received': None, 'reply': None, 'error': None}
+                self._flights[key] = flight
+                self.requests += 1
+                leader = True
+        if not leader:
+            flight['done'].wait()
+            if flight['error'] is not None:
+                raise flight['error']
+            return flight['reply']
+        try:
+            flight['reply'] = function()
+        except BaseException as error:
+            flight['error'] = error
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            raise
+        finally:
+            flight['received'] = time.monotonic()
+            flight['done'].set()
+        return flight['reply']
+
+    def report(self):
+        with self._lock:
+            return {'queries': self.queries, 'requests': self.requests, 'shared': self.shared}
+
+
+class SessionRecorder:
+    """
+        Session Recorder
+        -----------------------------------------------------------------------------------------------------------------
+        fileName: Session file, plain lines of JSON (NDJSON). First line is the header, each next line is one exchange
+        [offset, duration, IPV4, message, reply, outcome]; offset is seconds since the session start, reply is None for
+        commands and failures, outcome is the CommunicationMetrics outcome label. Every line is flushed when written,
+        so the file stays readable up to the last exchange after a crash. Older .gz sessions are still loaded.
+        -----------------------------------------------------------------------------------------------------------------
+        start() registers a Communication hook so every exchange with every device is recorded, stop() closes the file.
+        Sessions are answered again by ReplayTransport.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    version = 1
+
+    def __init__(self, fileName=None):
+        self.fileName = fileName or f'Session {datetime.datetime.now().strftime("%d_%m_%Y-%H_%M_%S")}.jsonl'
+        self.exchanges = 0
+        self._file = None
+        self._start = None
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return f'Session Recorder to {self.fileName}, for details print object.__doc__'
+
+    def start(self):
+        self._file = open(self.fileName, 'w', encoding='utf-8', buffering=1)
+        self._start = time.perf_counter()
+        self._file.write(json.dumps({'version': SessionRecorder.version, 'started': time.time()}) + '\n')
+        Communication.addHook(after=self.record)
+        logger.debug(f'Session recording to {self.fileName} has been started!')
+        return self
+
+    def record(self, IPV4, message, sentBytes, receivedBytes, start, end, error):
+        reply = receivedBytes.decode('UTF-8') if receivedBytes is not None else None
+        line = json.dumps([round(start - self._start, 6), round(end - start, 6), IPV4, message, reply,
+                           CommunicationMetrics.outcomeLabel(error)], separators=(',', ':'))
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line + '\n')
+                self.exchanges += 1
+
+    def stop(self):
+        Communication.removeHook(after=self.record)
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        logger.debug(f'Session recording to {self.fileName} has been stopped after {self.exchanges} exchanges!')
+
+    @staticmethod
+    def load(fileName):
+        """
+        :return: Header dictionary and list of exchanges of the session file, a torn last line (crash) is dropped
+        """
+        opener = gzip.open if fileName.endswith('.gz') else open
+        with opener(fileName, 'rt', encoding='utf-8') as sessionFile:
+            header = json.loads(sessionFile.readline())
+            exchanges = []
+            for line in sessionFile:
+                try:
+                    exchanges.append(json.loads(line))
+                except ValueError:
+                    logger.debug(f'Torn line of the session {fileName} has been dropped!')
+            return header, exchanges
+
+
+class ReplayTransport:
+    """
+        Replay Transport
+        -----------------------------------------------------------------------------------------------------------------
+        fileName: Session file written by SessionRecorder.
+        -----------------------------------------------------------------------------------------------------------------
+        pace: 'fast' answers immediately, 'original' waits until the recorded offset of each exchange.
+        -----------------------------------------------------------------------------------------------------------------
+        Exchanges are kept as one recorded sequence per device. Each exchange takes the first pending exchange of the
+        same message in the sequence of its device, pending queries of other threads may be passed but a query never
+        passes a pending command, so replies follow the commands around them as recorded. Otherwise (or when the
+        message is used up) the last reply of the message is repeated.
+        Recorded failures are raised again (timeout, connection refused). Commands are accepted. Set Communication.transport = ReplayTransport(...) or use
+        install() / uninstall(); no supply is needed while it is installed.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    errors = {'timeout': socket.timeout, 'connection_refused': ConnectionRefusedError, 'error': OSError}
+
+    def __init__(self, fileName, pace='fast'):
+        self.fileName = fileName
+        self.pace = pace
+        self.header, exchanges = SessionRecorder.load(fileName)
+        self._sequences = {}
+        for offset, duration, IPV4, message, reply, outcome in exchanges:
+            self._sequences.setdefault(IPV4, []).append([message, (offset, duration, reply, outcome)])
+        self._cursors = {}
+        self._last = {}
+        self._start = None
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return f'Replay Transport of {self.fileName}, for details print object.__doc__'
+
+    def install(self):
+        self._start = time.perf_counter()
+        Communication.transport = self
+        return self
+
+    def uninstall(self):
+        if Communication.transport is self:
+            Communication.transport = None
+
+    def _next(self, IPV4, message, query):
+        sequence = self._sequences.get(IPV4, ())
+        cursor = self._cursors.get(IPV4, 0)
+        for index in range(cursor, len(sequence)):
+            pending = sequence[index][0]
+            if query and pending is not None and pending != message and '?' not in pending:
+                return None
+            if pending == message:
+                entry = sequence[index][1]
+                sequence[index][0] = None
+                while cursor < len(sequence) and sequence[cursor][0] is None:
+                    cursor += 1
+                self._cursors[IPV4] = cursor
+                return entry
+        return None
+
+    def exchange(self, IPV4, send_message, query):
+        key = (IPV4, send_message.decode('utf-8'))
+        with self._lock:
+            if self._start is None:
+                self._start = time.perf_counter()
+            entry = self._next(IPV4, key[1], query)
+            if entry is not None:
+                self._last[key] = entry
+            else:
+                entry = self._last.get(key)
+        if entry is None:
+            if query:
+                raise ConnectionRefusedError(f'{key[1].strip()} of {IPV4} is not in the session {self.fileName}!')
+            return None
+        offset, duration, reply, outcome = entry
+        if self.pace == 'original':
+            delay = offset + duration - (time.perf_counter() - self._start)
+            if delay > 0:
+                time.sleep(delay)
+        if outcome != 'ok':
+            raise ReplayTransport.errors.get(outcome, OSError)(f'Replayed {outcome} of {IPV4}!')
+        return reply.encode('utf-8') if query and reply is not None else None
+
+
+class PersistentConnection:
+    """
+        Persistent Device Connection
+        -----------------------------------------------------------------------------------------------------------------
+        IPV4: Address of the desired device to keep the connection open
+        -----------------------------------------------------------------------------------------------------------------
+        Keeps one socket open to the device instead of opening a new one for each message. If the device drops the
+        connection, it is opened again once and the message is sent again. Reconnect count is kept in reconnects.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+
+    def __init__(self, IPV4, timeout=None):
         self.IPV4 = IPV4
+        self.timeout = Communication.timeout if timeout is None else timeout
+        self.reconnects = 0
+        self._socket = None
+        self._lock = threading.Lock()
 
     def __str__(self):
-        return f'Manual: Measure Subsystem - page 10, 11 and 12 - Queries and Commands, for details print object.__doc__'
+        return f'Persistent Connection to {self.IPV4}, for details print object.__doc__'
+
+    def connect(self):
+        if self._socket is None:
+            communication = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            communication.settimeout(self.timeout)
+            communication.connect((self.IPV4, Communication.port_name))
+            self._socket = communication
+            logger.debug(f'Persistent connection to {self.IPV4} has been opened!')
+        return self._socket
+
+    def close(self):
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            finally:
+                self._socket = None
+            logger.debug(f'Persistent connection to {self.IPV4} has been closed!')
+
+    def _exchange(self, IPV4, send_message, query):
+        communication = self.connect()
+        communication.sendall(send_message)
+        if not query:
+            return None
+        return Communication.receive(communication, send_message)
+
+    def _reconnectingExchange(self, IPV4, send_message, query):
+        try:
+            return self._exchange(IPV4, send_message, query)
+        except OSError:
+            self.close()
+            self.reconnects += 1
+            logger.debug(f'Persistent connection to {self.IPV4} is being reopened!')
+            return self._exchange(IPV4, send_message, query)
+
+    def _transact(self, message, query):
+        send_message = CommandEncoder.encode(message)
+        with self._lock:
+            return Communication._transact(self.IPV4, message, send_message, query,
+                                           exchange=self._reconnectingExchange)
+
+    def sendMessage(self, message):
+        """
+        :param message: Message that is going to be sent to Delta which works as command lines!
+        :return: It returns the message has been sent to Delta!
+        """
+        send_message = CommandEncoder.encode(message)
+        self._transact(message, query=False)
+        logger.debug(f'{send_message} has been sent to Delta!')
+        return send_message
 
-    def MeasureVoltage(self, MeasureVoltage="MEASure:VOLtage?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MeasureVoltage)
+    def sendReceiveMessage(self, message):
+        """
+        :param message: Message that is going to be sent to Delta to get back as query!
+        :return: It returns the message has been received from Delta!
+        """
+        received_message = self._transact(message, query=True).decode('UTF-8').rstrip('\n')
+        logger.debug(f'{received_message} has been received from Delta!')
+        return received_message
 
-    def MeasureCurrent(self, MeasureCurrent="MEASure:CURrent?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MeasureCurrent)
 
-    def MeasurePower(self, MeasurePower="MEASure:POWer?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MeasurePower)
+class State(enum.Enum):
+    """
+    ON/OFF state replies of the device, measurement instruments can also be SUSPEND or RESUME.
+    """
+    OFF = 'OFF'
+    ON = 'ON'
+    SUSPEND = 'SUSPEND'
+    RESUME = 'RESUME'
 
-    def SetAhMeasurementState(self, setting):
-        message = f'MEASure:INStrument AH,STATE,{setting}\n'
-        return Communication().sendMessage(self.IPV4, message=message)
+    @classmethod
+    def parse(cls, reply):
+        text = reply.strip().upper()
+        if text == '0':
+            return cls.OFF
+        if text == '1':
+            return cls.ON
+        return cls(text)
 
-    def ReadAhMeasurementSetState(self, ReadAhMeasurementSetState="MEASure:INStrument AH,STATE?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadAhMeasurementSetState)
 
-    def ReadAhMeasurementTimeHours(self, ReadAhMeasurementTimeHours="MEASure:INStrument AH,TIMEHR?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadAhMeasurementTimeHours)
+LimitSetting = collections.namedtuple('LimitSetting', ['value', 'state'])
 
-    def ReadAhMeasurementTimeSeconds(self, ReadAhMeasurementTimeSeconds="MEASure:INStrument AH,TIMESEC?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadAhMeasurementTimeSeconds)
 
-    def MeasureAhPositiveTotal(self, MeasureAhPositiveTotal="MEASure:INStrument AH,POS,TOTAL?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MeasureAhPositiveTotal)
+class TypedResults:
+    """
+        Typed Query Results
+        -----------------------------------------------------------------------------------------------------------------
+        Parsers of the raw query replies, the query itself (without <term>) is the key of the parsers table.
+        -----------------------------------------------------------------------------------------------------------------
+        Measurements and set points -> float
+        -----------------------------------------------------------------------------------------------------------------
+        Limits (SYSTem:LIMits:VOLtage? etc.) -> LimitSetting(value, state) tuple, e.g. LimitSetting(15.0, State.ON)
+        -----------------------------------------------------------------------------------------------------------------
+        Output, remote shut down, front panel and instrument states -> State enum
+        -----------------------------------------------------------------------------------------------------------------
+        Time and date -> (hour, minute, second) and (year, month, day) tuples, None if the answer is UNKNOWN
+        -----------------------------------------------------------------------------------------------------------------
+        Errors and warnings -> (code, message) tuple
+        -----------------------------------------------------------------------------------------------------------------
+        Queries without a parser (identification etc.) are returned as raw string.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    parsers = {}
 
-    def MeasureAhNegativeTotal(self, MeasureAhNegativeTotal="MEASure:INStrument AH,NEG,TOTAL?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MeasureAhNegativeTotal)
+    def __str__(self):
+        return f'Typed Results, for details print object.__doc__'
 
-    def MeasureAhMinimumCurrent(self, MeasureAhMinimumCurrent="MEASure:INStrument AH,POS,IMIN?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MeasureAhMinimumCurrent)
+    @staticmethod
+    def parseFloat(reply):
+        return float(reply)
 
-    def MeasureAhMaximumCurrent(self, MeasureAhMaximumCurrent="MEASure:INStrument AH,POS,IMAX?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MeasureAhMaximumCurrent)
+    @staticmethod
+    def parseLimit(reply):
+        parts = reply.split(',')
+        return LimitSetting(float(parts[0]), State.parse(parts[1]) if len(parts) > 1 else None)
 
-    def MeasureAhMinimumNegativeCurrent(self, MeasureAhMinimumNegativeCurrent="MEASure:INStrument AH,NEG,IMIN?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MeasureAhMinimumNegativeCurrent)
+    @staticmethod
+    def parseClock(reply, separator):
+        if reply.strip().upper() == 'UNKNOWN':
+            return None
+        return tuple(int(part) for part in reply.strip().split(separator))
 
-    def MeasureAhMaximumNegativeCurrent(self, MeasureAhMaximumNegativeCurrent="MEASure:INStrument AH,NEG,IMAX?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MeasureAhMaximumNegativeCurrent)
+    @staticmethod
+    def parseTime(reply):
+        return TypedResults.parseClock(reply, ':')
 
-    def SetWhMeasurementState(self, setting):
-        message = f'MEASure:INStrument WH,STATE,{setting}\n'
-        return Communication().sendMessage(self.IPV4, message=message)
+    @staticmethod
+    def parseDate(reply):
+        return TypedResults.parseClock(reply, '-')
 
-    def ReadWhMeasurementSetState(self, ReadWhMeasurementSetState="MEASure:INStrument WH,STATE?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadWhMeasurementSetState)
+    @staticmethod
+    def parseMessage(reply):
+        code, _, message = reply.partition(',')
+        return int(code), message.strip().strip('"')
 
-    def ReadWhMeasurementTimeHours(self, ReadWhMeasurementTimeHours="MEASure:INStrument WH,TIMEHR?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadWhMeasurementTimeHours)
+    @staticmethod
+    def parseReply(message, reply):
+        """
+        :param message: Query that has been sent to Delta
+        :param reply: Raw reply of the query
+        :return: Typed value of the reply, raw reply if the query has no parser
+        """
+        parser = TypedResults.parsers.get(message.strip())
+        return reply if parser is None else parser(reply)
+
+
+TypedResults.parsers.update({query: TypedResults.parseFloat for query in (
+    'SOURce:VOLtage:MAXimum?', 'SOURce:CURrent:MAXimum?', 'SOURce:CURrent:NEGative:MAXimum?',
+    'SOURce:POWer:MAXimum?', 'SOURce:POWer:NEGative:MAXimum?', 'SOURce:VOLtage?', 'SOURce:CURrent?',
+    'SOURce:CURrent:NEGative?', 'SOURce:POWer?', 'SOURce:POWer:NEGative?', 'SOURce:VOLtage:STEpsize?',
+    'SOURce:CURrent:STEpsize?', 'SOURce:POWer:STEpsize?', 'MEASure:VOLtage?', 'MEASure:CURrent?', 'MEASure:POWer?',
+    'MEASure:TEMperature?', 'MEASure:INStrument AH,TIMEHR?', 'MEASure:INStrument AH,TIMESEC?',
+    'MEASure:INStrument AH,POS,TOTAL?', 'MEASure:INStrument AH,NEG,TOTAL?', 'MEASure:INStrument AH,POS,IMIN?',
+    'MEASure:INStrument AH,POS,IMAX?', 'MEASure:INStrument AH,NEG,IMIN?', 'MEASure:INStrument AH,NEG,IMAX?',
+    'MEASure:INStrument WH,TIMEHR?', 'MEASure:INStrument WH,TIMESEC?', 'MEASure:INStrument WH,POS,TOTAL?',
+    'MEASure:INStrument WH,NEG,TOTAL?', 'MEASure:INStrument WH,POS,PMIN?', 'MEASure:INStrument WH,POS,PMAX?',
+    'MEASure:INStrument WH,NEG,PMIN?', 'MEASure:INStrument WH,NEG,PMAX?', 'SYSTem:COMmunicate:WATchdog SET?',
+    'SYSTem:COMmunicate:WATchdog?')})
+TypedResults.parsers.update({query: TypedResults.parseLimit for query in (
+    'SYSTem:LIMits:VOLtage?', 'SYSTem:LIMits:CURrent?', 'SYSTem:LIMits:CURrent:NEGative?', 'SYSTem:LIMits:POWer?',
+    'SYSTem:LIMits:POWer:NEGative?')})
+TypedResults.parsers.update({query: State.parse for query in (
+    'OUTPut?', 'SYSTem:RSD[:STAtus]?', 'SYSTem:FROntpanel[:STAtus]?', 'SYSTem:FROntpanel:CONtrols?',
+    'MEASure:INStrument AH,STATE?', 'MEASure:INStrument WH,STATE?')})
+TypedResults.parsers.update({'SYSTem:TIMe?': TypedResults.parseTime, 'SYSTem:DATe?': TypedResults.parseDate,
+                             'SYSTem:ERRor?': TypedResults.parseMessage, 'SYSTem:WARning?': TypedResults.parseMessage})
+
+
+class TypedSubsystem:
+    """
+        Typed Subsystem Accessor
+        -----------------------------------------------------------------------------------------------------------------
+        subsystem.typed.<Query>() calls the same query of the subsystem and returns TypedResults.parseReply of its reply,
+        e.g. MyDelta.measure.typed.MeasureCurrent() -> 12.5, MyDelta.system.typed.ReadVoltageLimitSet() ->
+        LimitSetting(value=15.0, state=State.ON). Only the queries of TypedSubsystem.queries (method name -> query) are
+        typed, every other method (commands, identification) is passed through unchanged.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    queries = {'MaximumVoltage': 'SOURce:VOLtage:MAXimum?', 'MaximumCurrent': 'SOURce:CURrent:MAXimum?',
+               'MaximumNegativeCurrent': 'SOURce:CURrent:NEGative:MAXimum?', 'MaximumPower': 'SOURce:POWer:MAXimum?',
+               'MaximumNegativePower': 'SOURce:POWer:NEGative:MAXimum?', 'ReadVoltageSet': 'SOURce:VOLtage?',
+               'ReadCurrentSet': 'SOURce:CURrent?', 'ReadNegativeCurrentSet': 'SOURce:CURrent:NEGative?',
+               'ReadPowerSet': 'SOURce:POWer?', 'ReadNegativePowerSet': 'SOURce:POWer:NEGative?',
+               'ReadVoltageStepSize': 'SOURce:VOLtage:STEpsize?', 'ReadCurrentStepSize': 'SOURce:CURrent:STEpsize?',
+               'ReadPowerStepSize': 'SOURce:POWer:STEpsize?', 'MeasureVoltage': 'MEASure:VOLtage?',
+               'MeasureCurrent': 'MEASure:CURrent?', 'MeasurePower': 'MEASure:POWer?',
+               'ReadAhMeasurementSetState': 'MEASure:INStrument AH,STATE?',
+               'ReadAhMeasurementTimeHours': 'MEASure:INStrument AH,TIMEHR?',
+               'ReadAhMeasurementTimeSeconds': 'MEASure:INStrument AH,TIMESEC?',
+               'MeasureAhPositiveTotal': 'MEASure:INStrument AH,POS,TOTAL?',
+               'MeasureAhNegativeTotal': 'MEASure:INStrument AH,NEG,TOTAL?',
+               'MeasureAhMinimumCurrent': 'MEASure:INStrument AH,POS,IMIN?',
+               'MeasureAhMaximumCurrent': 'MEASure:INStrument AH,POS,IMAX?',
+               'MeasureAhMinimumNegativeCurrent': 'MEASure:INStrument AH,NEG,IMIN?',
+               'MeasureAhMaximumNegativeCurrent': 'MEASure:INStrument AH,NEG,IMAX?',
+               'ReadWhMeasurementSetState': 'MEASure:INStrument WH,STATE?',
+               'ReadWhMeasurementTimeHours': 'MEASure:INStrument WH,TIMEHR?',
+               'ReadWhMeasurementTimeSeconds': 'MEASure:INStrument WH,TIMESEC?',
+               'MeasureWhPositiveTotal': 'MEASure:INStrument WH,POS,TOTAL?',
+               'MeasureWhNegativeTotal': 'MEASure:INStrument WH,NEG,TOTAL?',
+               'MeasureWhMinimumCurrent': 'MEASure:INStrument WH,POS,PMIN?',
+               'MeasureWhMaximumCurrent': 'MEASure:INStrument WH,POS,PMAX?',
+               'MeasureWhMinimumNegativeCurrent': 'MEASure:INStrument WH,NEG,PMIN?',
+               'MeasureWhMaximumNegativeCurrent': 'MEASure:INStrument WH,NEG,PMAX?',
+               'MeasureTemperature': 'MEASure:TEMperature?', 'ReadRemoteShutDownSet': 'SYSTem:RSD[:STAtus]?',
+               'ReadVoltageLimitSet': 'SYSTem:LIMits:VOLtage?', 'ReadCurrentLimitSet': 'SYSTem:LIMits:CURrent?',
+               'ReadNegativeCurrentLimitSet': 'SYSTem:LIMits:CURrent:NEGative?',
+               'ReadPowerLimitSet': 'SYSTem:LIMits:POWer?',
+               'ReadNegativePowerLimitSet': 'SYSTem:LIMits:POWer:NEGative?',
+               'ReadLockFrontpanelSet': 'SYSTem:FROntpanel[:STAtus]?',
+               'ReadLockControlFrontpanelSet': 'SYSTem:FROntpanel:CONtrols?', 'ReadTimeSet': 'SYSTem:TIMe?',
+               'ReadDateSet': 'SYSTem:DATe?', 'ReadErrors': 'SYSTem:ERRor?', 'ReadWarnings': 'SYSTem:WARning?',
+               'ReadWatchdogSet': 'SYSTem:COMmunicate:WATchdog SET?',
+               'ReadCurrentWatchdogState': 'SYSTem:COMmunicate:WATchdog?', 'ReadOutputSet': 'OUTPut?'}
+
+    def __init__(self, subsystem):
+        self._subsystem = subsystem
 
-    def ReadWhMeasurementTimeSeconds(self, ReadWhMeasurementTimeSeconds="MEASure:INStrument WH,TIMESEC?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadWhMeasurementTimeSeconds)
+    def __str__(self):
+        return f'Typed {self._subsystem}'
 
-    def MeasureWhPositiveTotal(self, MeasureWhPositiveTotal="MEASure:INStrument WH,POS,TOTAL?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MeasureWhPositiveTotal)
+    def __getattr__(self, name):
+        method = getattr(self._subsystem, name)
+        query = TypedSubsystem.queries.get(name)
+        if query is None:
+            return method
 
-    def MeasureWhNegativeTotal(self, MeasureWhNegativeTotal="MEASure:INStrument WH,NEG,TOTAL?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MeasureWhNegativeTotal)
+        def typedQuery(*args, **kwargs):
+            message = args[0] if args else next(iter(kwargs.values()), query)
+            return TypedResults.parseReply(message, method(*args, **kwargs))
 
-    def MeasureWhMinimumCurrent(self, MeasureWhMinimumCurrent="MEASure:INStrument WH,POS,PMIN?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MeasureWhMinimumCurrent)
+        typedQuery.__name__ = name
+        return typedQuery
 
-    def MeasureWhMaximumCurrent(self, MeasureWhMaximumCurrent="MEASure:INStrument WH,POS,PMAX?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MeasureWhMaximumCurrent)
 
-    def MeasureWhMinimumNegativeCurrent(self, MeasureWhMinimumNegativeCurrent="MEASure:INStrument WH,NEG,PMIN?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MeasureWhMinimumNegativeCurrent)
+class Sample:
+    """
+        Compact Sample Record
+        -----------------------------------------------------------------------------------------------------------------
+        Base of the __slots__ records of one multi channel sample, fields are given by __slots__ of the subclass.
+        Missing values (gaps) are kept as nan.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    __slots__ = ()
 
-    def MeasureWhMaximumNegativeCurrent(self, MeasureWhMaximumNegativeCurrent="MEASure:INStrument WH,NEG,PMAX?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MeasureWhMaximumNegativeCurrent)
+    def __init__(self, *values):
+        for field, value in zip(self.__slots__, values):
+            setattr(self, field, value)
 
-    def MeasureTemperature(self, MeasureTemperature="MEASure:TEMperature?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=MeasureTemperature)
+    def __iter__(self):
+        return (getattr(self, field) for field in self.__slots__)
 
-    def TestMeasureSubsystem(self):
-        logger.debug("Measure voltage runs:")
-        self.MeasureVoltage()
-        logger.debug("Measure current runs:")
-        self.MeasureCurrent()
-        logger.debug("Measure power runs:")
-        self.MeasurePower()
-        logger.debug("Set Ah Measurement State runs:")
-        self.SetAhMeasurementState('ON')
-        logger.debug("Read Ah Measurement State runs:")
-        self.ReadAhMeasurementSetState()
-        logger.debug("Read Ah Time Hours runs:")
-        self.ReadAhMeasurementTimeHours()
-        logger.debug("Read Ah Time Seconds runs:")
-        self.ReadAhMeasurementTimeSeconds()
-        logger.debug("Measure Ah Positive runs:")
-        self.MeasureAhPositiveTotal()
-        logger.debug("Measure Ah Negative runs:")
-        self.MeasureAhNegativeTotal()
-        logger.debug("Measure Ah Minimum Current runs:")
-        self.MeasureAhMinimumCurrent()
-        logger.debug("Measure Ah Maximum Current runs:")
-        self.MeasureAhMaximumCurrent()
-        logger.debug("Measure Ah Minimum Negative Current runs:")
-        self.MeasureAhMinimumNegativeCurrent()
-        logger.debug("Measure Ah Maximum Negarive Current runs:")
-        self.MeasureAhMinimumNegativeCurrent()
-        logger.debug("Set Wh Measurement State runs:")
-        self.SetWhMeasurementState('ON')
-        logger.debug("Read Wh Measurement State runs:")
-        self.ReadWhMeasurementSetState()
-        logger.debug("Read Wh Time Hours runs:")
-        self.ReadAhMeasurementTimeHours()
-        logger.debug("Read Wh Time Seconds runs:")
-        self.ReadWhMeasurementTimeSeconds()
-        logger.debug("Measure Wh Positive runs:")
-        self.MeasureWhPositiveTotal()
-        logger.debug("Measure Wh Negative runs:")
-        self.MeasureWhNegativeTotal()
-        logger.debug("Measure Wh Minimum Current runs:")
-        self.MeasureWhMinimumCurrent()
-        logger.debug("Measure Wh Maximum Current runs:")
-        self.MeasureWhMaximumCurrent()
-        logger.debug("Measure Wh Minimum Negative Current runs:")
-        self.MeasureWhMinimumNegativeCurrent()
-        logger.debug("Measure Wh Maximum Negarive Current runs:")
-        self.MeasureWhMaximumNegativeCurrent()
-        logger.debug("Measure Temperature runs:")
-        self.MeasureTemperature()
+    def __eq__(self, other):
+        return type(self) is type(other) and tuple(self) == tuple(other)
 
+    def __repr__(self):
+        values = ', '.join(f'{field}={getattr(self, field)!r}' for field in self.__slots__)
+        return f'{type(self).__name__}({values})'
 
-class SystemSubsystem:
+    @staticmethod
+    def valueOf(reply):
+        try:
+            return TypedResults.parseFloat(reply)
+        except (TypeError, ValueError):
+            return math.nan
+
+    @classmethod
+    def fromReplies(cls, timestamp, *replies):
+        return cls(timestamp, *(Sample.valueOf(reply) for reply in replies))
+
+
+class BasicSample(Sample):
+    __slots__ = ('timestamp', 'voltage', 'current', 'power')
+    kind = 'basic'
+
+
+class AhSample(Sample):
+    __slots__ = ('timestamp', 'voltage', 'current', 'power', 'positiveAh', 'negativeAh', 'ahSeconds', 'ahHours')
+    kind = 'ah'
+
+
+class WhSample(Sample):
+    __slots__ = ('timestamp', 'voltage', 'current', 'power', 'positiveWh', 'negativeWh', 'whSeconds', 'whHours')
+    kind = 'wh'
+
+
+class MeasurementSnapshot(Sample):
+    __slots__ = ('timestamp', 'voltage', 'current', 'power', 'temperature', 'positiveAh', 'negativeAh', 'positiveWh',
+                 'negativeWh')
+    kind = 'snapshot'
+
+
+class SampleBuffer:
     """
-    Manual: Measure Subsystem - page 13, 14, 15 and 16 - Queries and Commands
+        Array Backed Sample Buffer
+        -----------------------------------------------------------------------------------------------------------------
+        sampleClass: Sample record class (BasicSample, AhSample or WhSample), one array('d') column is kept per field.
+        -----------------------------------------------------------------------------------------------------------------
+        capacity: Number of samples to keep, oldest samples are overwritten (ring). None keeps all samples.
+        -----------------------------------------------------------------------------------------------------------------
+        Each sample costs 8 bytes per field instead of one string object per field in a list.
+        buffer[index] returns a sample record (oldest first), buffer.column('voltage') returns the column as list.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+
+    def __init__(self, sampleClass, capacity=None):
+        self.sampleClass = sampleClass
+        self.fields = sampleClass.__slots__
+        self.capacity = capacity
+        if capacity:
+            self._columns = [array.array('d', bytes(8 * capacity)) for _ in self.fields]
+        else:
+            self._columns = [array.array('d') for _ in self.fields]
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return f'Sample Buffer of {len(self)} {self.sampleClass.__name__}, for details print object.__doc__'
+
+    def __len__(self):
+        return min(self._count, self.capacity) if self.capacity else self._count
+
+    def append(self, sample):
+        with self._lock:
+            if self.capacity:
+                position = self._count % self.capacity
+                for column, value in zip(self._columns, sample):
+                    column[position] = value
+            else:
+                for column, value in zip(self._columns, sample):
+                    column.append(value)
+            self._count += 1
+
+    def _position(self, index):
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('Sample buffer index out of range!')
+        if self.capacity and self._count > self.capacity:
+            return (self._count + index) % self.capacity
+        return index
+
+    def __getitem__(self, index):
+        with self._lock:
+            position = self._position(index)
+            return self.sampleClass(*(column[position] for column in self._columns))
+
+    def latest(self):
+        return self[-1] if len(self) else None
+
+    def column(self, field):
+        with self._lock:
+            column = self._columns[self.fields.index(field)]
+            return [column[self._position(index)] for index in range(len(self))]
+
+    def clear(self):
+        with self._lock:
+            self._count = 0
+            if not self.capacity:
+                self._columns = [array.array('d') for _ in self.fields]
+
+
+class ChargeAccumulator:
+    """
+        Host Side Coulomb and Energy Accumulator
+        -----------------------------------------------------------------------------------------------------------------
+        capacity: Capacity of the battery in Ah for the state of charge, None keeps soc as None.
+        -----------------------------------------------------------------------------------------------------------------
+        soc: Initial state of charge from 0 to 1.
+        -----------------------------------------------------------------------------------------------------------------
+        correctionGain: Fraction of the drift against the device totals which is learned as current and power offset
+        at every correction, 0 only snaps the totals to the device totals.
+        -----------------------------------------------------------------------------------------------------------------
+        update(sample) integrates current and power of consecutive samples (trapezoid) on the sampling path, no device
+        query is sent. Samples carrying device totals (AhSample, WhSample, MeasurementSnapshot) correct the host totals:
+        the difference is the drift, totals are set to the device totals and the offset is adjusted by the drift rate.
+        Gaps (nan samples) are not integrated, the next device totals close them.
+        -----------------------------------------------------------------------------------------------------------------
+        charge (Ah) and energy (Wh) are net totals since the device instruments were switched ON, charging is positive.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+
+    def __init__(self, capacity=None, soc=None, correctionGain=0.5):
+        self.capacity = capacity
+        self.initialSoc = soc
+        self.correctionGain = correctionGain
+        self.charge = 0.0
+        self.energy = 0.0
+        self.currentOffset = 0.0
+        self.powerOffset = 0.0
+        self.chargeDrift = 0.0
+        self.energyDrift = 0.0
+        self.corrections = 0
+        self.samples = 0
+        self._previous = None
+        self._chargeCorrected = None
+        self._energyCorrected = None
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return f'Charge Accumulator at {self.charge:.6f}Ah, {self.energy:.6f}Wh, for details print object.__doc__'
+
+    @property
+    def soc(self):
+        if self.capacity is None or self.initialSoc is None:
+            return None
+        return min(1.0, max(0.0, self.initialSoc + self.charge / self.capacity))
+
+    def setSoc(self, soc):
+        """
+        Sets the state of charge at this moment, e.g. 1.0 after float charging
+        """
+        with self._lock:
+            self.initialSoc = soc - (self.charge / self.capacity if self.capacity else 0.0)
+
+    @staticmethod
+    def deviceTotal(positive, negative):
+        if math.isnan(positive) or math.isnan(negative):
+            return None
+        return positive - abs(negative)
+
+    def correct(self, total, deviceTotal, lastCorrected, timestamp, offset):
+        drift = deviceTotal - total
+        if lastCorrected is not None and timestamp - lastCorrected > 0:
+            offset -= self.correctionGain * drift * 3600.0 / (timestamp - lastCorrected)
+        return drift, offset
+
+    def update(self, sample):
+        """
+        :param sample: Sample record of a datalogger or a snapshot
+        :return: Net charge (Ah) and energy (Wh) after the sample
+        """
+        timestamp, voltage, current, power = sample.timestamp, sample.voltage, sample.current, sample.power
+        with self._lock:
+            self.samples += 1
+            if math.isnan(current) or math.isnan(power):
+                self._previous = None
+            else:
+                if self._previous is not None:
+                    dt = timestamp - self._previous[0]
+                    if dt > 0:
+                        hours = dt / 3600.0
+                        self.charge += ((self._previous[1] + current) / 2.0 - self.currentOffset) * hours
+                        self.energy += ((self._previous[2] + power) / 2.0 - self.powerOffset) * hours
+                self._previous = (timestamp, current, power)
+            deviceCharge = self.deviceTotal(getattr(sample, 'positiveAh', math.nan),
+                                            getattr(sample, 'negativeAh', math.nan))
+            if deviceCharge is not None:
+                self.chargeDrift, self.currentOffset = self.correct(self.charge, deviceCharge, self._chargeCorrected,
+                                                                    timestamp, self.currentOffset)
+                self.charge = deviceCharge
+                self._chargeCorrected = timestamp
+                self.corrections += 1
+            deviceEnergy = self.deviceTotal(getattr(sample, 'positiveWh', math.nan),
+                                            getattr(sample, 'negativeWh', math.nan))
+            if deviceEnergy is not None:
+                self.energyDrift, self.powerOffset = self.correct(self.energy, deviceEnergy, self._energyCorrected,
+                                                                  timestamp, self.powerOffset)
+                self.energy = deviceEnergy
+                self._energyCorrected = timestamp
+                self.corrections += 1
+            return self.charge, self.energy
+
+    def report(self):
+        with self._lock:
+            return {'charge': self.charge, 'energy': self.energy, 'soc': self.soc, 'currentOffset': self.currentOffset,
+                    'powerOffset': self.powerOffset, 'chargeDrift': self.chargeDrift, 'energyDrift': self.energyDrift,
+                    'corrections': self.corrections, 'samples': self.samples}
+
+
+class HalfCycleTracker:
+    """
+        Half Cycle Summary Tracker
+        -----------------------------------------------------------------------------------------------------------------
+        Follows one charge or discharge half cycle of an operation from the snapshots it already reads: time spent per
+        stage (bulk, absorption, float, discharge, rest), Ah and Wh in and out (trapezoid of current and power) and
+        minimum/maximum voltage and temperature. finish() returns the summary row of CycleSummaryStore.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    stages = ('bulk', 'absorption', 'float', 'discharge', 'rest')
+
+    def __init__(self):
+        self.begin(None, 0, 0.0)
+
+    def __str__(self):
+        return f'Half Cycle Tracker of {self.halfCycle} {self.cycle}, for details print object.__doc__'
+
+    def begin(self, halfCycle, cycle, now):
+        self.halfCycle = halfCycle
+        self.cycle = cycle
+        self.started = now
+        self.stage = None
+        self.stageStarted = now
+        self.durations = dict.fromkeys(HalfCycleTracker.stages, 0.0)
+        self.ahIn = self.ahOut = self.whIn = self.whOut = 0.0
+        self.voltageMinimum = self.temperatureMinimum = math.inf
+        self.voltageMaximum = self.temperatureMaximum = -math.inf
+        self._previous = None
+
+    def enterStage(self, stage, now):
+        if self.stage is not None:
+            self.durations[self.stage] += now - self.stageStarted
+        self.stage = stage
+        self.stageStarted = now
+
+    def update(self, snapshot):
+        voltage, temperature = snapshot.voltage, getattr(snapshot, 'temperature', math.nan)
+        if not math.isnan(voltage):
+            self.voltageMinimum = min(self.voltageMinimum, voltage)
+            self.voltageMaximum = max(self.voltageMaximum, voltage)
+        if not math.isnan(temperature):
+            self.temperatureMinimum = min(self.temperatureMinimum, temperature)
+            self.temperatureMaximum = max(self.temperatureMaximum, temperature)
+        if math.isnan(snapshot.current) or math.isnan(snapshot.power):
+            self._previous = None
+            return
+        if self._previous is not None and snapshot.timestamp > self._previous[0]:
+            hours = (snapshot.timestamp - self._previous[0]) / 3600.0
+            charge = (self._previous[1] + snapshot.current) / 2.0 * hours
+            energy = (self._previous[2] + snapshot.power) / 2.0 * hours
+            if charge >= 0:
+                self.ahIn += charge
+            else:
+                self.ahOut -= charge
+            if energy >= 0:
+                self.whIn += energy
+            else:
+                self.whOut -= energy
+        self._previous = (snapshot.timestamp, snapshot.current, snapshot.power)
+
+    def state(self):
+        return {'halfCycle': self.halfCycle, 'cycle': self.cycle, 'started': self.started, 'stage': self.stage,
+                'stageStarted': self.stageStarted, 'durations': self.durations, 'ahIn': self.ahIn,
+                'ahOut': self.ahOut, 'whIn': self.whIn, 'whOut': self.whOut, 'voltageMinimum': self.voltageMinimum,
+                'voltageMaximum': self.voltageMaximum, 'temperatureMinimum': self.temperatureMinimum,
+                'temperatureMaximum': self.temperatureMaximum}
+
+    def restore(self, state):
+        for name, value in state.items():
+            setattr(self, name, dict(value) if name == 'durations' else value)
+        self._previous = None
+
+    def finish(self, serial, device, now):
+        self.enterStage(None, now)
+        extreme = lambda value: None if math.isinf(value) else value
+        return {'serial': serial, 'device': device, 'cycle': self.cycle, 'half_cycle': self.halfCycle,
+                'started': self.started, 'ended': now, 'duration': now - self.started,
+                **{f'{stage}_seconds': self.durations[stage] for stage in HalfCycleTracker.stages},
+                'ah_in': self.ahIn, 'ah_out': self.ahOut, 'wh_in': self.whIn, 'wh_out': self.whOut,
+                'voltage_min': extreme(self.voltageMinimum), 'voltage_max': extreme(self.voltageMaximum),
+                'temperature_min': extreme(self.temperatureMinimum),
+                'temperature_max': extreme(self.temperatureMaximum)}
+
+
+class CycleSummaryStore:
+    """
+        Per Cycle Summary Index in SQLite
+        -----------------------------------------------------------------------------------------------------------------
+        fileName: SQLite database file, opened in WAL mode so readers do not block the operations writing to it.
+        -----------------------------------------------------------------------------------------------------------------
+        batchSize: Rows committed in one transaction, flushInterval: seconds after which pending rows are committed
+        anyway. Pending rows are committed by flush() and close(), CyclingOperation flushes after every half cycle.
+        -----------------------------------------------------------------------------------------------------------------
+        One row per completed charge or discharge half cycle (columns), indexed by serial and cycle:
+        serial, device, cycle, half_cycle, started, ended, duration, bulk_seconds, absorption_seconds, float_seconds,
+        discharge_seconds, rest_seconds, ah_in, ah_out, wh_in, wh_out, voltage_min, voltage_max, temperature_min,
+        temperature_max
+        -----------------------------------------------------------------------------------------------------------------
+        One store can be shared by any number of CyclingOperation objects (summaryStore=...).
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    columns = ('serial', 'device', 'cycle', 'half_cycle', 'started', 'ended', 'duration', 'bulk_seconds',
+               'absorption_seconds', 'float_seconds', 'discharge_seconds', 'rest_seconds', 'ah_in', 'ah_out', 'wh_in',
+               'wh_out', 'voltage_min', 'voltage_max', 'temperature_min', 'temperature_max')
+
+    def __init__(self, fileName='CycleSummary.sqlite', batchSize=16, flushInterval=60.0):
+        self.fileName = fileName
+        self.batchSize = batchSize
+        self.flushInterval = flushInterval
+        self._pending = []
+        self._lastCommit = time.monotonic()
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(fileName, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        types = {'serial': 'TEXT', 'device': 'TEXT', 'half_cycle': 'TEXT', 'cycle': 'INTEGER'}
+        definition = ', '.join(f'{column} {types.get(column, "REAL")}' for column in CycleSummaryStore.columns)
+        self.connection.execute(f'CREATE TABLE IF NOT EXISTS cycle_summary (id INTEGER PRIMARY KEY, {definition})')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS cycle_summary_serial ON cycle_summary (serial, cycle)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS cycle_summary_device ON cycle_summary (device, cycle)')
+        self.connection.commit()
+        self._insert = f'INSERT INTO cycle_summary ({", ".join(CycleSummaryStore.columns)}) ' \
+                       f'VALUES ({", ".join("?" * len(CycleSummaryStore.columns))})'
+
+    def __str__(self):
+        return f'Cycle Summary Store at {self.fileName}, for details print object.__doc__'
+
+    def add(self, summary):
+        with self._lock:
+            self._pending.append(tuple(summary.get(column) for column in CycleSummaryStore.columns))
+            if len(self._pending) >= self.batchSize or time.monotonic() - self._lastCommit >= self.flushInterval:
+                self._commit()
+
+    def _commit(self):
+        if self._pending:
+            with self.connection:
+                self.connection.executemany(self._insert, self._pending)
+            logger.debug(f'{len(self._pending)} cycle summaries have been committed to {self.fileName}!')
+            self._pending = []
+        self._lastCommit = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._commit()
+
+    def query(self, sql, parameters=()):
+        """
+        :return: Rows of any SQL query on cycle_summary, pending rows are committed first
+        """
+        with self._lock:
+            self._commit()
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def capacityFade(self, serial=None):
+        """
+        :return: (serial, cycle, ah_out, wh_out) of every discharge half cycle, ordered by serial and cycle
+        """
+        where = "half_cycle = 'discharge'" + (' AND serial = ?' if serial is not None else '')
+        return self.query(f'SELECT serial, cycle, ah_out, wh_out FROM cycle_summary WHERE {where} '
+                          f'ORDER BY serial, cycle', (serial,) if serial is not None else ())
+
+    def close(self):
+        with self._lock:
+            self._commit()
+            self.connection.close()
+
+
+class SampleDatabase(threading.Thread):
+    """
+        SQLite Datalogger Backend
+        -----------------------------------------------------------------------------------------------------------------
+        fileName: SQLite database file shared by all dataloggers, opened in WAL mode.
+        -----------------------------------------------------------------------------------------------------------------
+        batchSize: Samples inserted in one transaction, flushInterval: seconds after which queued samples are committed.
+        -----------------------------------------------------------------------------------------------------------------
+        One table per sample record (basic_sample, ah_sample, wh_sample, measurement_snapshot) with a device column and
+        one column per field, indexed on (device, timestamp). Gaps are stored as NULL.
+        -----------------------------------------------------------------------------------------------------------------
+        Dataloggers with database=... put their samples on a queue instead of appending to a txt file, this thread
+        writes them in batched transactions. stop() writes the remaining samples. query(sql) reads at any time.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+
+    def __init__(self, fileName='Datalogger.sqlite', batchSize=500, flushInterval=1.0, deamonState=True):
+        super().__init__()
+        self.fileName = fileName
+        self.batchSize = batchSize
+        self.flushInterval = flushInterval
+        self.deamonState = deamonState
+        self.setDaemon(self.deamonState)
+        self.written = 0
+        self._queue = queue.Queue()
+        self._tables = {}
+        self._reader = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        connection = sqlite3.connect(fileName)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.close()
+
+    def __str__(self):
+        return f'Sample Database at {self.fileName}, for details print object.__doc__'
+
+    @staticmethod
+    def tableName(sampleClass):
+        name = sampleClass.__name__
+        return ''.join(f'_{letter.lower()}' if letter.isupper() and index else letter.lower()
+                       for index, letter in enumerate(name))
+
+    def write(self, IPV4, sample):
+        self._queue.put((IPV4, sample))
+
+    def _insertOf(self, connection, sampleClass):
+        insert = self._tables.get(sampleClass)
+        if insert is None:
+            table = SampleDatabase.tableName(sampleClass)
+            fields = sampleClass.__slots__
+            connection.execute(f'CREATE TABLE IF NOT EXISTS {table} (device TEXT, '
+                               f'{", ".join(f"{field} REAL" for field in fields)})')
+            connection.execute(f'CREATE INDEX IF NOT EXISTS {table}_device_timestamp ON {table} (device, timestamp)')
+            insert = f'INSERT INTO {table} (device, {", ".join(fields)}) VALUES (?{", ?" * len(fields)})'
+            self._tables[sampleClass] = insert
+        return insert
+
+    def _commit(self, connection, batch):
+        rows = {}
+        for IPV4, sample in batch:
+            rows.setdefault(type(sample), []).append((IPV4, *sample))
+        with connection:
+            for sampleClass, values in rows.items():
+                connection.executemany(self._insertOf(connection, sampleClass), values)
+        self.written += len(batch)
+
+    def query(self, sql, parameters=()):
+        """
+        :return: Rows of any SQL query, committed samples are visible while the writer is running
+        """
+        with self._lock:
+            if self._reader is None:
+                self._reader = sqlite3.connect(self.fileName, check_same_thread=False)
+            return self._reader.execute(sql, parameters).fetchall()
+
+    def stop(self):
+        logger.debug('Sample database stop event has been started!')
+        self._stop_event.set()
+
+    def run(self):
+        logger.debug(f'Sample database writer has been started at {self.fileName}!')
+        connection = sqlite3.connect(self.fileName)
+        connection.execute('PRAGMA synchronous=NORMAL')
+        batch = []
+        deadline = time.monotonic() + self.flushInterval
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, min(deadline - time.monotonic(), 0.1))))
+            except queue.Empty:
+                pass
+            if len(batch) >= self.batchSize or (batch and time.monotonic() >= deadline) or \
+                    (batch and self._stop_event.is_set() and self._queue.empty()):
+                self._commit(connection, batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flushInterval
+        connection.close()
+        with self._lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+        logger.debug(f'Sample database writer has been stopped after {self.written} samples!')
+
+
+class SampleStream(threading.Thread):
+    """
+        Streaming Datalogger Backend
+        -----------------------------------------------------------------------------------------------------------------
+        output: Binary file object the samples are written to, default is sys.stdout.buffer (pipes, sockets etc.)
+        -----------------------------------------------------------------------------------------------------------------
+        outputFormat: 'ndjson' writes one JSON object per line, e.g. {"device":"192.168.0.2","record":"basic_sample",
+        "timestamp":1631089800.0,"voltage":12.5,"current":1.0,"power":12.5}, gaps are null.
+        'binary' writes one frame per sample: kind (uint8, index of SampleStream.kinds), number of fields (uint8),
+        device address (4 bytes) and the fields as little endian float64, gaps are nan.
+        -----------------------------------------------------------------------------------------------------------------
+        capacity: Maximum number of samples waiting for the output, the memory of the stream is bounded by it.
+        -----------------------------------------------------------------------------------------------------------------
+        block: If True (default) a full stream blocks the datalogger until the reader catches up (backpressure),
+        if False the sample is dropped and counted in dropped.
+        -----------------------------------------------------------------------------------------------------------------
+        undelivered(): Samples which have not reached the reader because it has gone away (unflushed, queued or written
+        after it).
+        -----------------------------------------------------------------------------------------------------------------
+        Dataloggers with sink=... write their samples to this stream instead of the txt file. The output is flushed
+        whenever the queue runs empty, if the reader goes away (broken pipe) the stream stops and broken is set.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    kinds = (BasicSample, AhSample, WhSample, MeasurementSnapshot)
+    frameHeader = struct.Struct('<BB4s')
+
+    def __init__(self, output=None, outputFormat='ndjson', capacity=1024, block=True, deamonState=True):
+        super().__init__()
+        if outputFormat not in ('ndjson', 'binary'):
+            raise ValueError(f'Unknown stream format {outputFormat}, use ndjson or binary!')
+        self.output = sys.stdout.buffer if output is None else output
+        self.outputFormat = outputFormat
+        self.capacity = capacity
+        self.block = block
+        self.deamonState = deamonState
+        self.setDaemon(self.deamonState)
+        self.written = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.lost = 0
+        self.broken = False
+        self._queue = queue.Queue(maxsize=capacity)
+        self._frames = {}
+        self._stop_event = threading.Event()
+
+    def __str__(self):
+        return f'Sample Stream of {self.outputFormat} records, for details print object.__doc__'
+
+    def write(self, IPV4, sample):
+        if self.broken:
+            self.lost += 1
+            return
+        if self.block:
+            while not (self.broken or self._stop_event.is_set()):
+                try:
+                    self._queue.put((IPV4, sample), timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+        else:
+            try:
+                self._queue.put_nowait((IPV4, sample))
+                return
+            except queue.Full:
+                pass
+        self.dropped += 1
+
+    def undelivered(self):
+        return self.written - self.flushed + self.lost + self._queue.qsize() if self.broken else 0
+
+    def encode(self, IPV4, sample):
+        if self.outputFormat == 'binary':
+            sampleClass = type(sample)
+            frame = self._frames.get(sampleClass)
+            if frame is None:
+                frame = struct.Struct(f'<{len(sampleClass.__slots__)}d')
+                self._frames[sampleClass] = frame
+            return SampleStream.frameHeader.pack(SampleStream.kinds.index(sampleClass), len(sampleClass.__slots__),
+                                                 socket.inet_aton(IPV4)) + frame.pack(*sample)
+        record = {'device': IPV4, 'record': SampleDatabase.tableName(type(sample))}
+        for field in sample.__slots__:
+            value = getattr(sample, field)
+            record[field] = None if isinstance(value, float) and math.isnan(value) else value
+        return (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+
+    def flush(self):
+        try:
+            self.output.flush()
+        except (BrokenPipeError, ConnectionError, ValueError) as error:
+            logger.debug(f'Sample stream reader has gone away: {error}!')
+            self.broken = True
+            return False
+        self.flushed = self.written
+        return True
+
+    def stop(self):
+        logger.debug('Sample stream stop event has been started!')
+        self._stop_event.set()
+
+    def run(self):
+        logger.debug(f'Sample stream has been started with {self.outputFormat} records!')
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            try:
+                IPV4, sample = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                self.output.write(self.encode(IPV4, sample))
+            except (BrokenPipeError, ConnectionError, ValueError) as error:
+                logger.debug(f'Sample stream reader has gone away: {error}!')
+                self.lost += 1
+                self.broken = True
+                break
+            self.written += 1
+            if self._queue.empty() and not self.flush():
+                break
+        if not self.broken:
+            self.flush()
+        logger.debug(f'Sample stream has been stopped after {self.written} samples!')
+
+
+class Checkpoint:
+    """
+        Atomic Checkpoint File
+        -----------------------------------------------------------------------------------------------------------------
+        fileName: JSON file of the checkpoint. save(state) writes a temporary file next to it, flushes it to disk and
+        renames it over the previous one, so a crash leaves the previous or the new checkpoint but never a partial one.
+        -----------------------------------------------------------------------------------------------------------------
+        load() returns the saved state or None, remove() deletes the checkpoint when the operation has been finished.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.saves = 0
+
+    def __str__(self):
+        return f'Checkpoint at {self.fileName}, for details print object.__doc__'
+
+    def save(self, state):
+        temporary = f'{self.fileName}.tmp'
+        with open(temporary, 'w') as checkpointFile:
+            json.dump(state, checkpointFile, separators=(',', ':'))
+            checkpointFile.flush()
+            os.fsync(checkpointFile.fileno())
+        os.replace(temporary, self.fileName)
+        self.saves += 1
+
+    def load(self):
+        try:
+            with open(self.fileName) as checkpointFile:
+                return json.load(checkpointFile)
+        except FileNotFoundError:
+            return None
+
+    def remove(self):
+        for fileName in (self.fileName, f'{self.fileName}.tmp'):
+            try:
+                os.remove(fileName)
+            except FileNotFoundError:
+                pass
+
+
+class CommandEncoder:
+    """
+        Precompiled Command Encoding
+        -----------------------------------------------------------------------------------------------------------------
+        encoded: Constant queries and commands of the subsystems, encoded once when the classes are defined.
+        -----------------------------------------------------------------------------------------------------------------
+        encode(message): Precompiled bytes of a constant message, other messages are encoded at call time.
+        -----------------------------------------------------------------------------------------------------------------
+        setter(header, step): Precompiled message template of a setter which rounds the value to the programming step
+        size of the device and prints only the digits of the step, e.g. step 0.001 -> 14.5 is sent as 14.500.
+        Values which are not numbers (e.g. 'MAX' or '14.5') are sent as str(value) like before.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    encoded = {}
+
+    def __str__(self):
+        return f'Command Encoder, for details print object.__doc__'
+
+    @staticmethod
+    def precompile(subsystemClass):
+        for attribute in vars(subsystemClass).values():
+            for default in getattr(attribute, '__defaults__', None) or ():
+                if isinstance(default, str) and default.endswith('\n'):
+                    CommandEncoder.encoded[default] = default.encode('utf-8')
+        return subsystemClass
+
+    @staticmethod
+    def encode(message):
+        encoded = CommandEncoder.encoded.get(message)
+        return encoded if encoded is not None else message.encode('utf-8')
+
+    @staticmethod
+    def setter(header, step=None, withSetting=False):
+        """
+        :param header: Command header, e.g. SOURce:VOLtage
+        :param step: Programming step size of the value, None sends the value as str(value)
+        :param withSetting: Command has a ',<setting>' after the value (limits)
+        :return: Function building the message from value (and setting) with one precompiled template
+        """
+        tail = ',%s\n' if withSetting else '\n'
+        fallback = f'{header} %s{tail}'
+        if not step:
+            if withSetting:
+                return lambda value, setting: fallback % (value, setting)
+            return lambda value: fallback % (value,)
+        step = float(step)
+        decimals = max(0, -decimal.Decimal(repr(step)).normalize().as_tuple().exponent)
+        template = f'{header} %.{decimals}f{tail}'
+        quantize = None if abs(step - 10 ** -decimals) < 1e-12 else step
+
+        def message(value, *setting):
+            try:
+                if quantize is not None:
+                    value = round(value / quantize) * quantize
+                return template % ((value,) + setting)
+            except TypeError:
+                return fallback % ((value,) + setting)
+
+        return message
+
+
+class SM15K:
+
+    def __init__(self, IPV4):
+        self.IPV4 = IPV4
+        self.source = SourceSubsystem(self.IPV4)
+        self.measure = MeasureSubsystem(self.IPV4)
+        self.system = SystemSubsystem(self.IPV4)
+        self.output = OutputSubsystem(self.IPV4)
+        self.shutdown = ShutdownOperation(self.IPV4)
+
+    def __str__(self):
+        return f'Manual: General Instruction - page 8 - Queries and Commands, for details print object.__doc__'
+
+    """
+        Manual: General Instruction - page 8 - Queries and Commands
+        -----------------------------------------------------------------------------------------------------------------
+        IDN = "*IDN?<term>" Read the identification string of the Delta Power Supply
+        -----------------------------------------------------------------------------------------------------------------
+        PUD = "*PUD?<term>" Read the protected user data of the Delta Power Supply
+        -----------------------------------------------------------------------------------------------------------------
+        CLS = "*CLS<term>" Clear the error queue of the Delta Power Supply
+        -----------------------------------------------------------------------------------------------------------------
+        RST = "*RST<term>" Set the power supply in a save defined state of the Delta Power Supply
+        -----------------------------------------------------------------------------------------------------------------
+        Note: All commands can be tested with 'TestGeneralInstructions Method'
+        :return Queries will return the Received Message!
+        :return Commands will return the Command has been sent!
+    """
+
+    def Identification(self, IDN="*IDN?\n"):
+        """
+        IDN = "*IDN?<term>" Read the identification string of the Delta Power Supply
+        """
+        return Communication.sendReceiveMessage(self.IPV4, message=IDN)
+
+    def ProtectedUserData(self, PUD="*PUD?\n"):
+        """
+        PUD = "*PUD?<term>" Read the protected user data of the Delta Power Supply
+        """
+        return Communication.sendReceiveMessage(self.IPV4, message=PUD)
+
+    def ClearErrorQueue(self, CLS="*CLS\n"):
+        """
+        CLS = "*CLS<term>" Clear the error queue of the Delta Power Supply
+        """
+        return Communication.sendMessage(self.IPV4, message=CLS)
+
+    def ResetDefinedState(self, RST="*RST\n"):
+        """
+        RST = "*RST<term>" Set the power supply in a save defined state of the Delta Power Supply
+        """
+        return Communication.sendMessage(self.IPV4, message=RST)
+
+    def loadStepSizes(self):
+        """
+        Reads the programming step sizes once and uses them to format set points and limits of this object.
+        """
+        stepSizes = {'voltage': self.source.typed.ReadVoltageStepSize(),
+                     'current': self.source.typed.ReadCurrentStepSize(),
+                     'power': self.source.typed.ReadPowerStepSize()}
+        self.source.setStepSizes(**stepSizes)
+        self.system.setStepSizes(**stepSizes)
+        return stepSizes
+
+    def TestGeneralInstructions(self):
+        logger.debug("Self Identification runs:")
+        self.Identification()
+        logger.debug("Protected user data runs:")
+        self.ProtectedUserData()
+        logger.debug("Clear Error Queue runs:")
+        self.ClearErrorQueue()
+        logger.debug("Reset Defined State runs:")
+        self.ResetDefinedState()
+        return None
+
+
+CommandEncoder.precompile(SM15K)
+
+
+class SourceSubsystem:
+    """
+    Manual: Source Subsystem - page 9 and 10 - Queries and Commands
     -----------------------------------------------------------------------------------------------------------------
-    SetRemoteShutDown = "SYSTem:RSD[:STAtus]<sp><boolean><term>" To activate and deactivate remote shutdown
-        Boolean = 0, 1, OFF (Unlocked), ON (Locked)
+    MaximumVoltage = "SOURce:VOLtage:MAXimum?<term>" Read the maximum output voltage
     -----------------------------------------------------------------------------------------------------------------
-    ReadRemoteShutDownSet = "SYSTem:RSD[:STAtus]?<term>" To read last RSD (remote shut down) settings
+    MaximumCurrent = "SOURce:CURrent:MAXimum?<term>" Read the maximum output current
     -----------------------------------------------------------------------------------------------------------------
-    SetVoltageLimit =  "SYSTem:LIMits:VOLtage<sp><NR2>,<boolean><term>" To set the limits of the voltage
-        Off = disabled, On = enabled
+    MaximumNegativeCurrent = "SOURce:CURrent:NEGative:MAXimum?<term>" Read the maximum negative output current
     -----------------------------------------------------------------------------------------------------------------
-    ReadVoltageLimitSet = "SYSTem:LIMits:VOLtage?<term>" To read last voltage limit setting
+    MaximumPower = "SOURce:POWer:MAXimum?<term>" Read the maximum output power
     -----------------------------------------------------------------------------------------------------------------
-    SetCurrentLimit = "SYSTem:LIMits:CURrent<sp><NR2>,<boolean><term>" To set the limits of the positive current
-        Off = disabled, On = enabled
+    MaximumNegativePower = "SOURce:POWer:NEGative:MAXimum?<term>" Read the maximum negative output power
     -----------------------------------------------------------------------------------------------------------------
-    ReadCurrentLimitSet = "SYSTem:LIMits:CURrent?" To read last positive current limit setting
+    SetVoltage = "SOURce:VOLtage<sp><NR2><term>" To set the output voltage of the power supply
     -----------------------------------------------------------------------------------------------------------------
-    SetNegativeCurrentLimit = "SYSTem:LIMits:CURrent:NEGative<sp><NR2>,<boolean><term>" To set the limits of the
-        negative current Off = disabled, On = enabled
+    ReadVoltageSet = "SOURce:VOLTage?<term>" To see last voltage set point of the power supply
     -----------------------------------------------------------------------------------------------------------------
-    ReadNegativeCurrentLimitSet = "SYSTem:LIMits:CURrent:NEGative?<term>" To read last negative current limit setting
+    SetCurrent = "SOURce:CURrent<sp><NR2><term>" To set the output current of the power supply
     -----------------------------------------------------------------------------------------------------------------
-    SetPowerLimit = "SYSTem:LIMits:POWer<sp><NR2>,<boolean><term>" "To set the limits of the positive power
-        Off = disabled, On = enabled"
+    ReadCurrentSet = "SOURce:CURrent?<term>" To see last current set point of the power supply
     -----------------------------------------------------------------------------------------------------------------
-    ReadPowerLimitSet = "SYSTem:LIMits:POWer?<term>" To read last positive power limit setting
+    SetNegativeCurrent = "SOURce:CURrent:NEGative<sp><NR2><term>" To set the output negative current of the power supply
     -----------------------------------------------------------------------------------------------------------------
-    SetNegativePowerLimit = "SYSTem:LIMits:POWer:NEGative<sp><NR2>,<boolean><term>" To set the limits of the
-        negative power Off = disabled, On = enabled
+    ReadNegativeCurrentSet = "SOURce:CURrent:NEGative?<term>" To see last negative current set point of the power supply
     -----------------------------------------------------------------------------------------------------------------
-    ReadNegativePowerLimitSet = "SYSTem:LIMits:POWer:NEGative?<term>" To read last negative power limit setting
+    SetPower = "SOURce:POWer<sp><NR2><term>" To set the output power of the power supply
     -----------------------------------------------------------------------------------------------------------------
-    HighlightFrontpanel = "SYSTem:FROntpanel:HIGhlight<term>" "To highlight front panel
-        - Display on front will blink for about 2 seconds
-        - Buzzer on front is on for about 2 seconds."
+    ReadPowerSet = "SOURce:POWer?<term>" To see last output power set point of the power supply
     -----------------------------------------------------------------------------------------------------------------
-    LockFrontPanel = "SYSTem:FROntpanel[:STAtus]<sp><boolean><term>" To lock the front panel
-        Boolean = 0, 1, OFF (Unlocked), ON (Locked)
+    SetNegativePower = "SOURce:POWer:NEGative<sp><NR2><term>" To set the negative output power of the power supply
     -----------------------------------------------------------------------------------------------------------------
-    ReadLockFrontpanelSet = "SYSTem:FROntpanel[:STAtus]?<term>" To read the last settings about the front lock
+    ReadNegativePowerSet = "SOURce:POWer:NEGative?<term>" To see last negative output power set point of the power supply
     -----------------------------------------------------------------------------------------------------------------
-    LockControlFrontpanel = "SYSTem:FROntpanel:CONtrols<sp><boolean><term>" To lock or unluck front panel and/or control
-        Boolean = 0 (Menu), 1 (Menu & Controls), OFF (Menu), ON (Menu & Controls)
+    VoltageStepSize = "SOURce:VOLtage:STEpsize?<term>" To read the programming stepsize of the output voltage
     -----------------------------------------------------------------------------------------------------------------
-    ReadLockControlFrontpanelSet = "SYSTem:FROntpanel:CONtrols?" To read the last settings about the front lock&control
+    CurrentStepSize = "SOURce:CURrent:STEpsize?<term>" To read the programming stepsize of the output current
     -----------------------------------------------------------------------------------------------------------------
-    SetTime = "SYSTem:TIMe<sp><hour>,<minute>,<second><term>" To set time as hour, minute, second
-        Hour = 0-23 - Minute = 0-59 - Second = 0-59
+    PowerStepSize = "SOURce:POWer:STEpsize?<term>" To read the programming stepsize of the output power
     -----------------------------------------------------------------------------------------------------------------
-    ReadTimeSet = "SYSTem:TIMe?<term>" To read the current time, answer  <hour>:<minute>:<second>
-        The answer will be “UNKNOWN” in case the time was not set.
+    Note: All commands can be tested with 'TestSourceSubsystem Method'
+    Note: Typed replies (float, LimitSetting, State) are available with object.typed.<Query>()
+    :return Queries will return the Received Message!
+    :return Commands will return the Command has been sent!
+    """
+
+    def __init__(self, IPV4):
+        self.IPV4 = IPV4
+        self.typed = TypedSubsystem(self)
+        self.setStepSizes()
+
+    def __str__(self):
+        return f'Manual: Source Subsystem - page 9 and 10 - Queries and Commands, for details print object.__doc__'
+
+    def setStepSizes(self, voltage=None, current=None, power=None):
+        """
+        Set points are rounded to the given programming step sizes, see CommandEncoder.setter
+        """
+        self.voltageMessage = CommandEncoder.setter('SOURce:VOLtage', voltage)
+        self.currentMessage = CommandEncoder.setter('SOURce:CURrent', current)
+        self.negativeCurrentMessage = CommandEncoder.setter('SOURce:CURrent:NEGative', current)
+        self.powerMessage = CommandEncoder.setter('SOURce:POWer', power)
+        self.negativePowerMessage = CommandEncoder.setter('SOURce:POWer:NEGative', power)
+
+    def MaximumVoltage(self, MaximumVoltage="SOURce:VOLtage:MAXimum?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MaximumVoltage)
+
+    def MaximumCurrent(self, MaximumCurrent="SOURce:CURrent:MAXimum?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MaximumCurrent)
+
+    def MaximumNegativeCurrent(self, MaximumNegativeCurrent="SOURce:CURrent:NEGative:MAXimum?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MaximumNegativeCurrent)
+
+    def MaximumPower(self, MaximumPower="SOURce:POWer:MAXimum?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MaximumPower)
+
+    def MaximumNegativePower(self, MaximumNegativePower="SOURce:POWer:NEGative:MAXimum?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MaximumNegativePower)
+
+    def SetVoltage(self, voltage):
+        message = self.voltageMessage(voltage)
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadVoltageSet(self, ReadVoltageSet="SOURce:VOLtage?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadVoltageSet)
+
+    def SetCurrent(self, current):
+        message = self.currentMessage(current)
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadCurrentSet(self, ReadCurrentSet="SOURce:CURrent?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadCurrentSet)
+
+    def SetNegativeCurrent(self, negativecurrent):
+        message = self.negativeCurrentMessage(negativecurrent)
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadNegativeCurrentSet(self, ReadNegativeCurrentSet="SOURce:CURrent:NEGative?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadNegativeCurrentSet)
+
+    def SetPower(self, power):
+        message = self.powerMessage(power)
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadPowerSet(self, ReadPowerSet="SOURce:POWer?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadPowerSet)
+
+    def SetNegativePower(self, negativepower):
+        message = self.negativePowerMessage(negativepower)
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadNegativePowerSet(self, ReadNegativePowerSet="SOURce:POWer:NEGative?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadNegativePowerSet)
+
+    def ReadVoltageStepSize(self, ReadVoltageStepSize="SOURce:VOLtage:STEpsize?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadVoltageStepSize)
+
+    def ReadCurrentStepSize(self, ReadCurrentStepSize="SOURce:CURrent:STEpsize?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadCurrentStepSize)
+
+    def ReadPowerStepSize(self, ReadPowerStepSize="SOURce:POWer:STEpsize?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadPowerStepSize)
+
+    def TestSourceSubsystem(self):
+        logger.debug("Maximum Voltage runs:")
+        self.MaximumVoltage()
+        logger.debug("Maximum Current runs:")
+        self.MaximumCurrent()
+        logger.debug("Maximum Negative Current runs:")
+        self.MaximumNegativeCurrent()
+        logger.debug("Maximum Power runs:")
+        self.MaximumPower()
+        logger.debug("Maximum Negative Power runs:")
+        self.MaximumNegativePower()
+        logger.debug("Set Voltage runs:")
+        self.SetVoltage(5)
+        logger.debug("Read Last Voltage Set runs:")
+        self.ReadVoltageSet()
+        logger.debug("Set Current runs:")
+        self.SetCurrent(5)
+        logger.debug("Read Last Current Set runs:")
+        self.ReadCurrentSet()
+        logger.debug("Set Negative Current Set runs:")
+        self.SetNegativeCurrent(-5)
+        logger.debug("Read Last Negative Current Set runs:")
+        self.ReadNegativeCurrentSet()
+        logger.debug("Set Power Set runs:")
+        self.SetPower(100)
+        logger.debug("Read Last Power Set runs:")
+        self.ReadPowerSet()
+        logger.debug("Set Negative Power Set runs:")
+        self.SetNegativePower(-100)
+        logger.debug("Read Last Negative Power Set runs:")
+        self.ReadNegativePowerSet()
+        logger.debug("Read Voltage Stepsize runs:")
+        self.ReadVoltageStepSize()
+        logger.debug("Read Current Stepsize runs:")
+        self.ReadCurrentStepSize()
+        logger.debug("Read Power Stepsize runs:")
+        self.ReadPowerStepSize()
+
+
+CommandEncoder.precompile(SourceSubsystem)
+
+
+class MeasureSubsystem:
+    """
+    Manual: Measure Subsystem - page 10, 11 and 12 - Queries and Commands
     -----------------------------------------------------------------------------------------------------------------
-    SetDate = "SYSTem:DATe<sp><year>,<month>,<day><term>" To set the date as year, month, day
-        Year = 2019-2099 - Month = 1-12 - Day = 1-31
+    MeasureVoltage = "MEASure:VOLtage?<term>" To measure output voltage of the power supply
     -----------------------------------------------------------------------------------------------------------------
-    ReadDateSet = "SYSTem:DATe?<term>" To read the current date, answer <year>-<month>-<day>
-        The answer will be “UNKNOWN” in case the time was not set.
+    MeasureCurrent = "MEASure:CURrent?<term>" To measure output current of the power supply
+    -----------------------------------------------------------------------------------------------------
+    MeasurePower = "MEASure:POWer?<term>" To measure output power of the power supply
     -----------------------------------------------------------------------------------------------------------------
-    ReadErrors = "SYSTem:ERRor?<term>" To read the error message, If there are no errors (so the queue is empty)
-        the result of this query will be : 0,None<term>. So after 10 readings of SYSTem:ERRor? the queue is empty
-        for sure, or after using the *CLS command.
+    SetAhMeasurementState = "MEASure:INStrument<sp>AH,STATE,<setting><term>" To enable the current measurement
+        instrument <setting>: OFF, ON, SUSPEND or RESUME Turning the instrument ON will reset all previous measurements
     -----------------------------------------------------------------------------------------------------------------
-    ReadWarnings = "SYSTem:WARning?<term>" To read the warning message
-        If there are no warnings, the result of this query will be: 0,None<term>
+    ReadAhMeasurementSetState = "MEASure:INStrument<sp>AH,STATE?<term>" To read enable status (OFF, ON, SUSPEND or RESUME)
     -----------------------------------------------------------------------------------------------------------------
-    SetWatchdog = "SYSTem:COMmunicate:WATchdog<sp>SET,<NR1><term>" To set the Watchdog timer (in ms) - <NR1>= 20…10000
+    ReadAhMeasurementTimeHours = "MEASure:INStrument<sp>AH,TIMEHR?<term>" To read the time the instrument is active
+        (hours with three decimals) If the instrument is not enabled, the result will be zero
     -----------------------------------------------------------------------------------------------------------------
-    ReadWatchdogSet = "SYSTem:COMmunicate:WATchdog<sp>SET?<term>" To read the last setting: (valid until Timeout)
+    ReadAhMeasurementTimeSeconds = "MEASure:INStrument<sp>AH,TIMESEC?<term>" To read the time the instrument is active
+        (seconds with one decimal) If the instrument is not enabled, the result will be zero
     -----------------------------------------------------------------------------------------------------------------
-    ReadCurrentWatchdogState = "SYSTem:COMmunicate:WATchdog?<term>" To read the current state of the Watchdog timer with
-        three possibilities, 20…10000<term> Current timer value in ms, 0<term> Timeout.
-        Clears indicator on Front panel and Web -1<term> Clears Timeout, Watchdog is off.
-        Note:  The indicator on the Front panel and Web will be activated. Enable, disable or query
-            the state of the Watchdog timer to clear the indicators.
+    MeasureAhPositiveTotal = "MEASure:INStrument<sp>AH,POS,TOTAL?<term>"  To read the total Ah for positive current - w
+        Scientifiec Notation If the instrument is not enabled, the result will be zero.
     -----------------------------------------------------------------------------------------------------------------
-    DisableWatchdog = "SYSTem:COMmunicate:WATchdog<sp>STOP<term>" To disable the Watchdog timer
+    MeasureAhNegativeTotal = "MEASure:INStrument<sp>AH,NEG,TOTAL?<term>"  To read the total Ah for negative current - w
+        Scientifiec Notation If the instrument is not enabled, the result will be zero.
     -----------------------------------------------------------------------------------------------------------------
-    TestWatchdog = "SYSTem:COMmunicate:WATchdog<sp>TEST<term>" To test the Watchdog timer
+    MeasureAhMinimumCurrent = "MEASure:INStrument<sp>AH,POS,IMIN?<term>" To read minimum positive current during the time
+        the instrument is enabled. Result will be in Ampere, if the instrument is not enabled, the result will be zero.
     -----------------------------------------------------------------------------------------------------------------
-    Note: All commands can be tested with 'TestSystemSubsystem Method'
+    MeasureAhMaximumCurrent = "MEASure:INStrument<sp>AH,POS,IMAX?<term>" To read maximum positive current during the time
+        the instrument is enabled. Result will be in Ampere, if the instrument is not enabled, the result will be zero.
+    -----------------------------------------------------------------------------------------------------------------
+    MeasureAhMinimumNegativeCurrent = "MEASure:INStrument<sp>AH,NEG,IMIN?<term>" To read minimum negative current during
+        the time the instrument is enabled. Result will be in Ampere, if the instrument is not enabled, the result will be zero.
+    -----------------------------------------------------------------------------------------------------------------
+    MeasureAhMaximumNegativeCurrent = "MEASure:INStrument<sp>AH,NEG,IMAX?<term>" To read maximum negative current during
+        the time the instrument is enabled. Result will be in Ampere, if the instrument is not enabled, the result will be zero.
+    -----------------------------------------------------------------------------------------------------------------
+    SetWhMeasurementState = "MEASure:INStrument<sp>WH,STATE,<setting><term>" To enable the power measurement
+        instrument <setting>: OFF, ON, SUSPEND or RESUME Turning the instrument ON will reset all previous measurements
+    -----------------------------------------------------------------------------------------------------------------
+    ReadWhMeasurementSetState = "MEASure:INStrument<sp>WH,STATE?<term>" To read enable status (OFF, ON, SUSPEND or RESUME)
+    -----------------------------------------------------------------------------------------------------------------
+    ReadWhMeasurementTimeHours = "MEASure:INStrument<sp>WH,TIMEHR?<term>" To read the time the instrument is active
+        (hours with three decimals) If the instrument is not enabled, the result will be zero
+    -----------------------------------------------------------------------------------------------------------------
+    ReadWhMeasurementTimeSeconds = "MEASure:INStrument<sp>WH,TIMESEC?<term>" To read the time the instrument is active
+        (seconds with one decimal) If the instrument is not enabled, the result will be zero
+    -----------------------------------------------------------------------------------------------------------------
+    MeasureWhPositiveTotal = "MEASure:INStrument<sp>WH,POS,TOTAL?<term>"  To read the total Wh for positive power - w
+        Scientifiec Notation If the instrument is not enabled, the result will be zero.
+    -----------------------------------------------------------------------------------------------------------------
+    MeasureWhNegativeTotal = "MEASure:INStrument<sp>WH,NEG,TOTAL?<term>"  To read the total Wh for negative power - w
+        Scientifiec Notation If the instrument is not enabled, the result will be zero.
+    -----------------------------------------------------------------------------------------------------------------
+    MeasureWhMinimumCurrent = "MEASure:INStrument<sp>WH,POS,PMIN?<term>" To read minimum positive power during the time
+        the instrument is enabled. Result will be in Watts, if the instrument is not enabled, the result will be zero.
+    -----------------------------------------------------------------------------------------------------------------
+    MeasureWhMaximumCurrent = "MEASure:INStrument<sp>WH,POS,PMAX?<term>" To read maximum positive power during the time
+        the instrument is enabled. Result will be in Watts, if the instrument is not enabled, the result will be zero.
+    -----------------------------------------------------------------------------------------------------------------
+    MeasureWhMinimumNegativeCurrent = "MEASure:INStrument<sp>WH,NEG,PMIN?<term>" To read minimum negative power during
+        the time the instrument is enabled. Result will be in Watss, if the instrument is not enabled, the result will be zero.
+    -----------------------------------------------------------------------------------------------------------------
+    MeasureWhMaximumNegativeCurrent = "MEASure:INStrument<sp>WH,NEG,PMAX?<term>" To read maximum negative power during
+        the time the instrument is enabled. Result will be in Watts, if the instrument is not enabled, the result will be zero.
+    -----------------------------------------------------------------------------------------------------------------
+    MeasureTemperature = "MEASure:TEMperature?<term>" To read highest internal temperature of the power supply
+    -----------------------------------------------------------------------------------------------------------------
+    snapshot(ah, wh) = "MEASure:VOLtage?;MEASure:CURrent?;MEASure:POWer?;MEASure:TEMperature?<term>" To read all
+        measurements in one transaction as MeasurementSnapshot, Ah/Wh totals are added if ah/wh is True
+    -----------------------------------------------------------------------------------------------------------------
+    Note: All commands can be tested with 'TestMeasureSubsystem Method'
+    Note: Typed replies (float, LimitSetting, State) are available with object.typed.<Query>()
     :return Queries will return the Received Message!
     :return Commands will return the Command has been sent!
     """
 
-    def __init__(self, IPV4):
+    def __init__(self, IPV4):
+        self.IPV4 = IPV4
+        self.typed = TypedSubsystem(self)
+
+    def __str__(self):
+        return f'Manual: Measure Subsystem - page 10, 11 and 12 - Queries and Commands, for details print object.__doc__'
+
+    def MeasureVoltage(self, MeasureVoltage="MEASure:VOLtage?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MeasureVoltage)
+
+    def MeasureCurrent(self, MeasureCurrent="MEASure:CURrent?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MeasureCurrent)
+
+    def MeasurePower(self, MeasurePower="MEASure:POWer?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MeasurePower)
+
+    def SetAhMeasurementState(self, setting):
+        message = f'MEASure:INStrument AH,STATE,{setting}\n'
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadAhMeasurementSetState(self, ReadAhMeasurementSetState="MEASure:INStrument AH,STATE?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadAhMeasurementSetState)
+
+    def ReadAhMeasurementTimeHours(self, ReadAhMeasurementTimeHours="MEASure:INStrument AH,TIMEHR?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadAhMeasurementTimeHours)
+
+    def ReadAhMeasurementTimeSeconds(self, ReadAhMeasurementTimeSeconds="MEASure:INStrument AH,TIMESEC?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadAhMeasurementTimeSeconds)
+
+    def MeasureAhPositiveTotal(self, MeasureAhPositiveTotal="MEASure:INStrument AH,POS,TOTAL?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MeasureAhPositiveTotal)
+
+    def MeasureAhNegativeTotal(self, MeasureAhNegativeTotal="MEASure:INStrument AH,NEG,TOTAL?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MeasureAhNegativeTotal)
+
+    def MeasureAhMinimumCurrent(self, MeasureAhMinimumCurrent="MEASure:INStrument AH,POS,IMIN?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MeasureAhMinimumCurrent)
+
+    def MeasureAhMaximumCurrent(self, MeasureAhMaximumCurrent="MEASure:INStrument AH,POS,IMAX?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MeasureAhMaximumCurrent)
+
+    def MeasureAhMinimumNegativeCurrent(self, MeasureAhMinimumNegativeCurrent="MEASure:INStrument AH,NEG,IMIN?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MeasureAhMinimumNegativeCurrent)
+
+    def MeasureAhMaximumNegativeCurrent(self, MeasureAhMaximumNegativeCurrent="MEASure:INStrument AH,NEG,IMAX?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MeasureAhMaximumNegativeCurrent)
+
+    def SetWhMeasurementState(self, setting):
+        message = f'MEASure:INStrument WH,STATE,{setting}\n'
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadWhMeasurementSetState(self, ReadWhMeasurementSetState="MEASure:INStrument WH,STATE?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadWhMeasurementSetState)
+
+    def ReadWhMeasurementTimeHours(self, ReadWhMeasurementTimeHours="MEASure:INStrument WH,TIMEHR?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadWhMeasurementTimeHours)
+
+    def ReadWhMeasurementTimeSeconds(self, ReadWhMeasurementTimeSeconds="MEASure:INStrument WH,TIMESEC?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadWhMeasurementTimeSeconds)
+
+    def MeasureWhPositiveTotal(self, MeasureWhPositiveTotal="MEASure:INStrument WH,POS,TOTAL?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MeasureWhPositiveTotal)
+
+    def MeasureWhNegativeTotal(self, MeasureWhNegativeTotal="MEASure:INStrument WH,NEG,TOTAL?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MeasureWhNegativeTotal)
+
+    def MeasureWhMinimumCurrent(self, MeasureWhMinimumCurrent="MEASure:INStrument WH,POS,PMIN?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MeasureWhMinimumCurrent)
+
+    def MeasureWhMaximumCurrent(self, MeasureWhMaximumCurrent="MEASure:INStrument WH,POS,PMAX?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MeasureWhMaximumCurrent)
+
+    def MeasureWhMinimumNegativeCurrent(self, MeasureWhMinimumNegativeCurrent="MEASure:INStrument WH,NEG,PMIN?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MeasureWhMinimumNegativeCurrent)
+
+    def MeasureWhMaximumNegativeCurrent(self, MeasureWhMaximumNegativeCurrent="MEASure:INStrument WH,NEG,PMAX?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MeasureWhMaximumNegativeCurrent)
+
+    def MeasureTemperature(self, MeasureTemperature="MEASure:TEMperature?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=MeasureTemperature)
+
+    snapshotQueries = ('MEASure:VOLtage?', 'MEASure:CURrent?', 'MEASure:POWer?', 'MEASure:TEMperature?')
+    snapshotAhQueries = ('MEASure:INStrument AH,POS,TOTAL?', 'MEASure:INStrument AH,NEG,TOTAL?')
+    snapshotWhQueries = ('MEASure:INStrument WH,POS,TOTAL?', 'MEASure:INStrument WH,NEG,TOTAL?')
+
+    def snapshot(self, ah=False, wh=False):
+        """
+        :param ah: Adds positive and negative Ah totals to the snapshot
+        :param wh: Adds positive and negative Wh totals to the snapshot
+        :return: MeasurementSnapshot of voltage, current, power, temperature (and counters, nan if not asked)
+        Queries are sent with Communication.queryBatch, with Communication.compound in one message and one reply so the
+        values belong together. Timestamp is the host time at the midpoint of the round trip(s).
+        """
+        queries = MeasureSubsystem.snapshotQueries
+        if ah:
+            queries += MeasureSubsystem.snapshotAhQueries
+        if wh:
+            queries += MeasureSubsystem.snapshotWhQueries
+        start = clock.time()
+        values = Communication.queryBatch(self.IPV4, queries)
+        end = clock.time()
+        parsed = dict(zip(queries, (Sample.valueOf(value) for value in values)))
+        return MeasurementSnapshot(start + (end - start) / 2,
+                                   *(parsed.get(query, math.nan) for query in
+                                     MeasureSubsystem.snapshotQueries + MeasureSubsystem.snapshotAhQueries +
+                                     MeasureSubsystem.snapshotWhQueries))
+
+    def TestMeasureSubsystem(self):
+        logger.debug("Measure voltage runs:")
+        self.MeasureVoltage()
+        logger.debug("Measure current runs:")
+        self.MeasureCurrent()
+        logger.debug("Measure power runs:")
+        self.MeasurePower()
+        logger.debug("Set Ah Measurement State runs:")
+        self.SetAhMeasurementState('ON')
+        logger.debug("Read Ah Measurement State runs:")
+        self.ReadAhMeasurementSetState()
+        logger.debug("Read Ah Time Hours runs:")
+        self.ReadAhMeasurementTimeHours()
+        logger.debug("Read Ah Time Seconds runs:")
+        self.ReadAhMeasurementTimeSeconds()
+        logger.debug("Measure Ah Positive runs:")
+        self.MeasureAhPositiveTotal()
+        logger.debug("Measure Ah Negative runs:")
+        self.MeasureAhNegativeTotal()
+        logger.debug("Measure Ah Minimum Current runs:")
+        self.MeasureAhMinimumCurrent()
+        logger.debug("Measure Ah Maximum Current runs:")
+        self.MeasureAhMaximumCurrent()
+        logger.debug("Measure Ah Minimum Negative Current runs:")
+        self.MeasureAhMinimumNegativeCurrent()
+        logger.debug("Measure Ah Maximum Negarive Current runs:")
+        self.MeasureAhMinimumNegativeCurrent()
+        logger.debug("Set Wh Measurement State runs:")
+        self.SetWhMeasurementState('ON')
+        logger.debug("Read Wh Measurement State runs:")
+        self.ReadWhMeasurementSetState()
+        logger.debug("Read Wh Time Hours runs:")
+        self.ReadAhMeasurementTimeHours()
+        logger.debug("Read Wh Time Seconds runs:")
+        self.ReadWhMeasurementTimeSeconds()
+        logger.debug("Measure Wh Positive runs:")
+        self.MeasureWhPositiveTotal()
+        logger.debug("Measure Wh Negative runs:")
+        self.MeasureWhNegativeTotal()
+        logger.debug("Measure Wh Minimum Current runs:")
+        self.MeasureWhMinimumCurrent()
+        logger.debug("Measure Wh Maximum Current runs:")
+        self.MeasureWhMaximumCurrent()
+        logger.debug("Measure Wh Minimum Negative Current runs:")
+        self.MeasureWhMinimumNegativeCurrent()
+        logger.debug("Measure Wh Maximum Negarive Current runs:")
+        self.MeasureWhMaximumNegativeCurrent()
+        logger.debug("Measure Temperature runs:")
+        self.MeasureTemperature()
+
+
+CommandEncoder.precompile(MeasureSubsystem)
+
+
+class SystemSubsystem:
+    """
+    Manual: Measure Subsystem - page 13, 14, 15 and 16 - Queries and Commands
+    -----------------------------------------------------------------------------------------------------------------
+    SetRemoteShutDown = "SYSTem:RSD[:STAtus]<sp><boolean><term>" To activate and deactivate remote shutdown
+        Boolean = 0, 1, OFF (Unlocked), ON (Locked)
+    -----------------------------------------------------------------------------------------------------------------
+    ReadRemoteShutDownSet = "SYSTem:RSD[:STAtus]?<term>" To read last RSD (remote shut down) settings
+    -----------------------------------------------------------------------------------------------------------------
+    SetVoltageLimit =  "SYSTem:LIMits:VOLtage<sp><NR2>,<boolean><term>" To set the limits of the voltage
+        Off = disabled, On = enabled
+    -----------------------------------------------------------------------------------------------------------------
+    ReadVoltageLimitSet = "SYSTem:LIMits:VOLtage?<term>" To read last voltage limit setting
+    -----------------------------------------------------------------------------------------------------------------
+    SetCurrentLimit = "SYSTem:LIMits:CURrent<sp><NR2>,<boolean><term>" To set the limits of the positive current
+        Off = disabled, On = enabled
+    -----------------------------------------------------------------------------------------------------------------
+    ReadCurrentLimitSet = "SYSTem:LIMits:CURrent?" To read last positive current limit setting
+    -----------------------------------------------------------------------------------------------------------------
+    SetNegativeCurrentLimit = "SYSTem:LIMits:CURrent:NEGative<sp><NR2>,<boolean><term>" To set the limits of the
+        negative current Off = disabled, On = enabled
+    -----------------------------------------------------------------------------------------------------------------
+    ReadNegativeCurrentLimitSet = "SYSTem:LIMits:CURrent:NEGative?<term>" To read last negative current limit setting
+    -----------------------------------------------------------------------------------------------------------------
+    SetPowerLimit = "SYSTem:LIMits:POWer<sp><NR2>,<boolean><term>" "To set the limits of the positive power
+        Off = disabled, On = enabled"
+    -----------------------------------------------------------------------------------------------------------------
+    ReadPowerLimitSet = "SYSTem:LIMits:POWer?<term>" To read last positive power limit setting
+    -----------------------------------------------------------------------------------------------------------------
+    SetNegativePowerLimit = "SYSTem:LIMits:POWer:NEGative<sp><NR2>,<boolean><term>" To set the limits of the
+        negative power Off = disabled, On = enabled
+    -----------------------------------------------------------------------------------------------------------------
+    ReadNegativePowerLimitSet = "SYSTem:LIMits:POWer:NEGative?<term>" To read last negative power limit setting
+    -----------------------------------------------------------------------------------------------------------------
+    HighlightFrontpanel = "SYSTem:FROntpanel:HIGhlight<term>" "To highlight front panel
+        - Display on front will blink for about 2 seconds
+        - Buzzer on front is on for about 2 seconds."
+    -----------------------------------------------------------------------------------------------------------------
+    LockFrontPanel = "SYSTem:FROntpanel[:STAtus]<sp><boolean><term>" To lock the front panel
+        Boolean = 0, 1, OFF (Unlocked), ON (Locked)
+    -----------------------------------------------------------------------------------------------------------------
+    ReadLockFrontpanelSet = "SYSTem:FROntpanel[:STAtus]?<term>" To read the last settings about the front lock
+    -----------------------------------------------------------------------------------------------------------------
+    LockControlFrontpanel = "SYSTem:FROntpanel:CONtrols<sp><boolean><term>" To lock or unluck front panel and/or control
+        Boolean = 0 (Menu), 1 (Menu & Controls), OFF (Menu), ON (Menu & Controls)
+    -----------------------------------------------------------------------------------------------------------------
+    ReadLockControlFrontpanelSet = "SYSTem:FROntpanel:CONtrols?" To read the last settings about the front lock&control
+    -----------------------------------------------------------------------------------------------------------------
+    SetTime = "SYSTem:TIMe<sp><hour>,<minute>,<second><term>" To set time as hour, minute, second
+        Hour = 0-23 - Minute = 0-59 - Second = 0-59
+    -----------------------------------------------------------------------------------------------------------------
+    ReadTimeSet = "SYSTem:TIMe?<term>" To read the current time, answer  <hour>:<minute>:<second>
+        The answer will be “UNKNOWN” in case the time was not set.
+    -----------------------------------------------------------------------------------------------------------------
+    SetDate = "SYSTem:DATe<sp><year>,<month>,<day><term>" To set the date as year, month, day
+        Year = 2019-2099 - Month = 1-12 - Day = 1-31
+    -----------------------------------------------------------------------------------------------------------------
+    ReadDateSet = "SYSTem:DATe?<term>" To read the current date, answer <year>-<month>-<day>
+        The answer will be “UNKNOWN” in case the time was not set.
+    -----------------------------------------------------------------------------------------------------------------
+    ReadErrors = "SYSTem:ERRor?<term>" To read the error message, If there are no errors (so the queue is empty)
+        the result of this query will be : 0,None<term>. So after 10 readings of SYSTem:ERRor? the queue is empty
+        for sure, or after using the *CLS command.
+    -----------------------------------------------------------------------------------------------------------------
+    ReadWarnings = "SYSTem:WARning?<term>" To read the warning message
+        If there are no warnings, the result of this query will be: 0,None<term>
+    -----------------------------------------------------------------------------------------------------------------
+    SetWatchdog = "SYSTem:COMmunicate:WATchdog<sp>SET,<NR1><term>" To set the Watchdog timer (in ms) - <NR1>= 20…10000
+    -----------------------------------------------------------------------------------------------------------------
+    ReadWatchdogSet = "SYSTem:COMmunicate:WATchdog<sp>SET?<term>" To read the last setting: (valid until Timeout)
+    -----------------------------------------------------------------------------------------------------------------
+    ReadCurrentWatchdogState = "SYSTem:COMmunicate:WATchdog?<term>" To read the current state of the Watchdog timer with
+        three possibilities, 20…10000<term> Current timer value in ms, 0<term> Timeout.
+        Clears indicator on Front panel and Web -1<term> Clears Timeout, Watchdog is off.
+        Note:  The indicator on the Front panel and Web will be activated. Enable, disable or query
+            the state of the Watchdog timer to clear the indicators.
+    -----------------------------------------------------------------------------------------------------------------
+    DisableWatchdog = "SYSTem:COMmunicate:WATchdog<sp>STOP<term>" To disable the Watchdog timer
+    -----------------------------------------------------------------------------------------------------------------
+    TestWatchdog = "SYSTem:COMmunicate:WATchdog<sp>TEST<term>" To test the Watchdog timer
+    -----------------------------------------------------------------------------------------------------------------
+    Note: All commands can be tested with 'TestSystemSubsystem Method'
+    Note: Typed replies (float, LimitSetting, State) are available with object.typed.<Query>()
+    :return Queries will return the Received Message!
+    :return Commands will return the Command has been sent!
+    """
+
+    def __init__(self, IPV4):
+        self.IPV4 = IPV4
+        self.typed = TypedSubsystem(self)
+        self.setStepSizes()
+
+    def __str__(self):
+        return f'Manual: Measure Subsystem - page 13 and 14 - Queries and Commands, for details print object.__doc__'
+
+    def setStepSizes(self, voltage=None, current=None, power=None):
+        """
+        Limits are rounded to the given programming step sizes, see CommandEncoder.setter
+        """
+        self.voltageLimitMessage = CommandEncoder.setter('SYSTem:LIMits:VOLtage', voltage, withSetting=True)
+        self.currentLimitMessage = CommandEncoder.setter('SYSTem:LIMits:CURrent', current, withSetting=True)
+        self.negativeCurrentLimitMessage = CommandEncoder.setter('SYSTem:LIMits:CURrent:NEGative', current,
+                                                                 withSetting=True)
+        self.powerLimitMessage = CommandEncoder.setter('SYSTem:LIMits:POWer', power, withSetting=True)
+        self.negativePowerLimitMessage = CommandEncoder.setter('SYSTem:LIMits:POWer:NEGative', power,
+                                                               withSetting=True)
+
+    def SetRemoteShutDown(self, setting):
+        message = f'SYSTem:RSD[:STAtus] {setting}\n'
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadRemoteShutDownSet(self, ReadRemoteShutDownSet="SYSTem:RSD[:STAtus]?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadRemoteShutDownSet)
+
+    def SetVoltageLimit(self, voltagelimit, setting):
+        message = self.voltageLimitMessage(voltagelimit, setting)
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadVoltageLimitSet(self, ReadVoltageLimitSet="SYSTem:LIMits:VOLtage?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadVoltageLimitSet)
+
+    def SetCurrentLimit(self, currentlimit, setting):
+        message = self.currentLimitMessage(currentlimit, setting)
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadCurrentLimitSet(self, ReadCurrentLimitSet="SYSTem:LIMits:CURrent?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadCurrentLimitSet)
+
+    def SetNegativeCurrentLimit(self, negativecurrentlimit, setting):
+        message = self.negativeCurrentLimitMessage(negativecurrentlimit, setting)
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadNegativeCurrentLimitSet(self, ReadNegativeCurrentLimitSet="SYSTem:LIMits:CURrent:NEGative?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadNegativeCurrentLimitSet)
+
+    def SetPowerLimit(self, powerlimit, setting):
+        message = self.powerLimitMessage(powerlimit, setting)
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadPowerLimitSet(self, ReadPowerLimitSet="SYSTem:LIMits:POWer?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadPowerLimitSet)
+
+    def SetNegativePowerLimit(self, negativepowerlimit, setting):
+        message = self.negativePowerLimitMessage(negativepowerlimit, setting)
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadNegativePowerLimitSet(self, ReadNegativePowerLimitSet="SYSTem:LIMits:POWer:NEGative?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadNegativePowerLimitSet)
+
+    def HighlightFrontpanel(self, message="SYSTem:FROntpanel:HIGhlight\n"):
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def LockFrontPanel(self, setting):
+        message = f'SYSTem:FROntpanel[:STAtus] {setting}\n'
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadLockFrontpanelSet(self, ReadLockFrontpanelSet="SYSTem:FROntpanel[:STAtus]?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadLockFrontpanelSet)
+
+    def LockControlFrontpanel(self, setting):
+        message = f'SYSTem:FROntpanel:CONtrols {setting}\n'
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadLockControlFrontpanelSet(self, ReadLockControlFrontpanelSet="SYSTem:FROntpanel:CONtrols?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadLockControlFrontpanelSet)
+
+    def SetTime(self, hour, minute, second):
+        message = f'SYSTem:TIMe {hour},{minute},{second}\n'
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadTimeSet(self, ReadTimeSet="SYSTem:TIMe?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadTimeSet)
+
+    def SetDate(self, year, month, day):
+        message = f'SYSTem:DATe {year},{month},{day}\n'
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadDateSet(self, ReadDateSet="SYSTem:DATe?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadDateSet)
+
+    def ReadErrors(self, ReadErrors="SYSTem:ERRor?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadErrors)
+
+    def ReadWarnings(self, ReadWarnings="SYSTem:WARning?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadWarnings)
+
+    def SetWatchdog(self, timer):
+        message = f'SYSTem:COMmunicate:WATchdog SET,{timer}\n'
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadWatchdogSet(self, ReadWatchdogSet="SYSTem:COMmunicate:WATchdog SET?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadWatchdogSet)
+
+    def ReadCurrentWatchdogState(self, ReadCurrentWatchdogState="SYSTem:COMmunicate:WATchdog?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadCurrentWatchdogState)
+
+    def DisableWatchdog(self, message="SYSTem:COMmunicate:WATchdog STOP\n"):
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def TestWatchdog(self, message="SYSTem:COMmunicate:WATchdog TEST\n"):
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def TestSystemSubsystem(self):
+        logger.debug("Remote Shut Down Set runs:")
+        self.SetRemoteShutDown('OFF')
+        logger.debug("Read Remote Shut Down Set runs:")
+        self.ReadRemoteShutDownSet()
+        logger.debug("Set Voltage Limit runs:")
+        self.SetVoltageLimit(50, 'ON')
+        logger.debug("Read Voltage Limit Set runs:")
+        self.ReadVoltageLimitSet()
+        logger.debug("Set Current Limit runs:")
+        self.SetCurrentLimit(100, 'ON')
+        logger.debug("Read Current Limit Set runs:")
+        self.ReadCurrentLimitSet()
+        logger.debug("Set Negative Current Limit runs:")
+        self.SetNegativeCurrentLimit(-100, 'ON')
+        logger.debug("Read Negative Current Limit Set runs:")
+        self.ReadNegativeCurrentLimitSet()
+        logger.debug("Set Power Limit runs:")
+        self.SetPowerLimit(4000, 'ON')
+        logger.debug("Read Power Limit Set runs:")
+        self.ReadPowerLimitSet()
+        logger.debug("Set Negative Power Limit runs:")
+        self.SetNegativePowerLimit(-4000, 'ON')
+        logger.debug("Read Negative Power Limit Set runs:")
+        self.ReadNegativePowerLimitSet()
+        logger.debug("Highlight Frontpanel Set runs:")
+        self.HighlightFrontpanel()
+        logger.debug("Set Lock Frontpanel runs:")
+        self.LockFrontPanel('ON')
+        logger.debug("Read Lock Frontpanel Set runs:")
+        self.ReadLockFrontpanelSet()
+        logger.debug("Set Lock Control Frontpanel runs:")
+        self.LockControlFrontpanel('ON')
+        logger.debug("Read Lock Control Frontpanel Set runs:")
+        self.ReadLockControlFrontpanelSet()
+        logger.debug("Time Set runs:")
+        self.SetTime(9, 10, 0)
+        logger.debug("Read Time Set runs:")
+        self.ReadTimeSet()
+        logger.debug("Date Set runs:")
+        self.SetDate(2021, 9, 8)
+        logger.debug("Read Date Set runs:")
+        self.ReadDateSet()
+        logger.debug("Read Errors runs:")
+        self.ReadErrors()
+        logger.debug("Read Warnings runs:")
+        self.ReadWarnings()
+        logger.debug("Set Watchdog runs:")
+        self.SetWatchdog(500)
+        logger.debug("Read Watchdog Set runs:")
+        self.ReadWatchdogSet()
+        logger.debug("Read Current Watchdog State runs:")
+        self.ReadCurrentWatchdogState()
+        logger.debug("Disable Watchdog runs:")
+        self.DisableWatchdog()
+        logger.debug("Test Watchdog runs:")
+        self.TestWatchdog()
+
+
+CommandEncoder.precompile(SystemSubsystem)
+
+
+class OutputSubsystem:
+    """
+    Manual: Output Subsystem - page 17 - Queries and Commands
+    -----------------------------------------------------------------------------------------------------------------
+    SetOutput = "OUTPut<sp><boolean><term>" To switch power supply on/off - boolean = 0, 1, OFF, ON
+    -----------------------------------------------------------------------------------------------------------------
+    ReadOutputSet = "OUTPut?<term> To read the last stage of the output
+    -----------------------------------------------------------------------------------------------------------------
+    Note: All commands can be tested with 'TestOutputSubsystem Method'
+    Note: Typed replies (float, LimitSetting, State) are available with object.typed.<Query>()
+    :return Queries will return the Received Message!
+    :return Commands will return the Command has been sent!
+    """
+
+    def __init__(self, IPV4):
+        self.IPV4 = IPV4
+        self.typed = TypedSubsystem(self)
+
+    def __str__(self):
+        return f'Output Subsystem - page 17 - Queries and Commands, for details print object.__doc__'
+
+    def SetOutput(self, setting):
+        message = f'OUTPut {setting}\n'
+        return Communication.sendMessage(self.IPV4, message=message)
+
+    def ReadOutputSet(self, ReadOutputSet="OUTPut?\n"):
+        return Communication.sendReceiveMessage(self.IPV4, message=ReadOutputSet)
+
+    def TestOutputSubsystem(self):
+        logger.debug("Output State Set runs:")
+        self.SetOutput(1)
+        logger.debug("Read Output State runs: ")
+        self.ReadOutputSet()
+        logger.debug("Output State Set runs:")
+        self.SetOutput(0)
+        logger.debug("Read Output State runs: ")
+        self.ReadOutputSet()
+
+
+CommandEncoder.precompile(OutputSubsystem)
+
+
+class StateReconciler:
+    """
+        Desired State Reconciliation
+        -----------------------------------------------------------------------------------------------------------------
+        IPV4: Address of the device whose limits, set points and output are reconciled
+        -----------------------------------------------------------------------------------------------------------------
+        delta: SM15K object of the device (optional), its step size rounded setters build the messages
+        -----------------------------------------------------------------------------------------------------------------
+        StateReconciler.of(IPV4): Shared reconciler of a device, so operations on one device share its known state.
+        -----------------------------------------------------------------------------------------------------------------
+        apply(desired, verify, diff): desired is a dictionary of settings, e.g. {'voltageLimit': (60, 'ON'),
+        'voltage': 54.6, 'output': 1}. All of them are sent with Communication.sendBatch, ordered output off, limits,
+        set points, output on. With verify the sent settings are read back (Communication.queryBatch) and the known
+        state is taken from the replies. diff=True is an opt-in optimisation that only sends the settings whose
+        message differs from the known state (a desired output is always sent), call refresh() before it since the
+        front panel or another client can change the device. It is ignored in a SafetyScope (shutdown).
+        -----------------------------------------------------------------------------------------------------------------
+        refresh(names): Reads the live state of the settings (Communication.queryBatch), invalidate(names) forgets it.
+        -----------------------------------------------------------------------------------------------------------------
+        compile(desired) -> precompiled batch of all settings, send(compiled) sends it as it is (RecipeOperation).
+        -----------------------------------------------------------------------------------------------------------------
+        Settings: voltageLimit, currentLimit, negativeCurrentLimit, powerLimit, negativePowerLimit -> (value, setting),
+        voltage, current, negativeCurrent, power, negativePower -> value and output -> 0, 1, 'OFF' or 'ON'.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    limits = collections.OrderedDict((
+        ('voltageLimit', ('SYSTem:LIMits:VOLtage?', 'voltageLimitMessage')),
+        ('currentLimit', ('SYSTem:LIMits:CURrent?', 'currentLimitMessage')),
+        ('negativeCurrentLimit', ('SYSTem:LIMits:CURrent:NEGative?', 'negativeCurrentLimitMessage')),
+        ('powerLimit', ('SYSTem:LIMits:POWer?', 'powerLimitMessage')),
+        ('negativePowerLimit', ('SYSTem:LIMits:POWer:NEGative?', 'negativePowerLimitMessage'))))
+    setpoints = collections.OrderedDict((
+        ('voltage', ('SOURce:VOLtage?', 'voltageMessage')),
+        ('current', ('SOURce:CURrent?', 'currentMessage')),
+        ('negativeCurrent', ('SOURce:CURrent:NEGative?', 'negativeCurrentMessage')),
+        ('power', ('SOURce:POWer?', 'powerMessage')),
+        ('negativePower', ('SOURce:POWer:NEGative?', 'negativePowerMessage'))))
+    outputQuery = 'OUTPut?'
+    devices = {}
+    _devicesLock = threading.Lock()
+
+    def __init__(self, IPV4, delta=None):
+        self.IPV4 = IPV4
+        self.source = delta.source if delta is not None else SourceSubsystem(IPV4)
+        self.system = delta.system if delta is not None else SystemSubsystem(IPV4)
+        self.known = {}
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return f'State Reconciler, for details print object.__doc__'
+
+    @classmethod
+    def of(cls, IPV4, delta=None):
+        with cls._devicesLock:
+            if IPV4 not in cls.devices:
+                cls.devices[IPV4] = cls(IPV4, delta)
+            return cls.devices[IPV4]
+
+    @staticmethod
+    def outputSetting(value):
+        if isinstance(value, State):
+            return 1 if value is State.ON else 0
+        if isinstance(value, str):
+            return 1 if State.parse(value) is State.ON else 0
+        return 1 if value else 0
+
+    def message(self, name, value):
+        """
+        :return: Command of a setting, values are sent as float (-0.0 as 0.0) so a read back value builds the same message
+        """
+        if name == 'output':
+            return f'OUTPut {StateReconciler.outputSetting(value)}\n'
+        if name in StateReconciler.limits:
+            value, setting = value
+            if isinstance(setting, State):
+                setting = setting.value
+            return getattr(self.system, StateReconciler.limits[name][1])(float(value) + 0.0, str(setting).upper())
+        if name in StateReconciler.setpoints:
+            return getattr(self.source, StateReconciler.setpoints[name][1])(float(value) + 0.0)
+        raise KeyError(f'{name} is not a reconciled setting!')
+
+    @staticmethod
+    def query(name):
+        if name == 'output':
+            return StateReconciler.outputQuery
+        if name in StateReconciler.limits:
+            return StateReconciler.limits[name][0]
+        return StateReconciler.setpoints[name][0]
+
+    def messages(self, desired):
+        """
+        :return: Ordered (name, message) list of all desired settings, output off first and output on last
+        """
+        unknown = set(desired) - set(StateReconciler.limits) - set(StateReconciler.setpoints) - {'output'}
+        if unknown:
+            raise KeyError(f'{", ".join(sorted(unknown))} are not reconciled settings!')
+        steps = [(name, self.message(name, desired[name]))
+                 for name in list(StateReconciler.limits) + list(StateReconciler.setpoints) if name in desired]
+        if 'output' in desired:
+            output = ('output', self.message('output', desired['output']))
+            if StateReconciler.outputSetting(desired['output']) == 0:
+                steps.insert(0, output)
+            else:
+                steps.append(output)
+        return steps
+
+    def plan(self, desired):
+        """
+        :return: Ordered (name, message) list of the desired settings which differ from the known state
+        """
+        steps = self.messages(desired)
+        with self._lock:
+            return [(name, message) for name, message in steps if name == 'output' or self.known.get(name) != message]
+
+    def compile(self, desired):
+        """
+        :return: (messages, {name: message}) of all desired settings, sent later with send() as they are
+        """
+        steps = self.messages(desired)
+        return tuple(message for _, message in steps), dict(steps)
+
+    def send(self, compiled):
+        """
+        :param compiled: Result of compile(), sent without diffing and taken as the known state
+        """
+        messages, known = compiled
+        try:
+            Communication.sendBatch(self.IPV4, messages)
+        except OSError:
+            self.invalidate(known)
+            raise
+        with self._lock:
+            self.known.update(known)
+
+    def apply(self, desired, verify=True, diff=False):
+        """
+        :param desired: Dictionary of the target settings, see the class documentation
+        :param verify: Reads the sent settings back
+        :param diff: Sends only the settings which differ from the known state, not in a SafetyScope
+        :return: Names of the settings which have been sent
+        """
+        steps = self.plan(desired) if diff and not SafetyScope.isActive() else self.messages(desired)
+        if not steps:
+            return []
+        names = [name for name, _ in steps]
+        self.send((tuple(message for _, message in steps), dict(steps)))
+        if verify:
+            actual = self.refresh(names)
+            for name, message in steps:
+                if actual.get(name) != message:
+                    logger.warning(f'{name} of {self.IPV4} is {actual.get(name)!r} instead of {message!r}!')
+        logger.debug(f'State of {self.IPV4} has been reconciled, {", ".join(names)} have been sent!')
+        return names
+
+    def refresh(self, names=None):
+        """
+        :param names: Settings to read, all settings if None
+        :return: Dictionary of the setting messages built from the live device state
+        """
+        names = list(names) if names is not None else \
+            list(StateReconciler.limits) + list(StateReconciler.setpoints) + ['output']
+        queries = [StateReconciler.query(name) for name in names]
+        try:
+            values = Communication.queryBatch(self.IPV4, queries)
+        except (OSError, ValueError):
+            self.invalidate(names)
+            raise
+        actual = {}
+        for name, query, value in zip(names, queries, values):
+            typed = TypedResults.parseReply(query, value)
+            actual[name] = self.message(name, (typed.value, typed.state) if name in StateReconciler.limits else typed)
+        with self._lock:
+            self.known.update(actual)
+        return actual
+
+    def invalidate(self, names=None):
+        with self._lock:
+            if names is None:
+                self.known.clear()
+            for name in names or ():
+                self.known.pop(name, None)
+
+
+class ShutdownOperation:
+    """
+        Shutdown Functional Operation
+        -----------------------------------------------------------------------------------------------------------------
+        IPV4: Address of the desired device to start shutdown operation
+        -----------------------------------------------------------------------------------------------------------------
+        ShutdownOperation(IPV4).limitShutdownValues() -> limits all limit set points (voltage, current and power) to zero.
+        -----------------------------------------------------------------------------------------------------------------
+        ShutdownOperation(IPV4).setShutdownValues() -> Sets all set points (voltage, current and power) to zero.
+        -----------------------------------------------------------------------------------------------------------------
+        ShutdownOperation(IPV4).setShutdownOutput() -> Sets the output to zero.
+        -----------------------------------------------------------------------------------------------------------------
+        ShutdownOperation(IPV4).shutdown(limits) -> Output, set points (and limits) to zero in one batch which is always
+        sent in full (no diffing against the known state) and verified, see StateReconciler.
+        -----------------------------------------------------------------------------------------------------------------
+        All of them run in SafetyScope, an open circuit breaker (ResiliencePolicy) never refuses a shutdown.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    outputState = {'output': 0}
+    valueState = {name: 0 for name in StateReconciler.setpoints}
+    limitState = {name: (0, 'ON') for name in StateReconciler.limits}
+
+    def __init__(self, IPV4):
+        self.IPV4 = IPV4
+
+    def __str__(self):
+        return f'Shutdown Operation, for details print object.__doc__'
+
+    def shutdown(self, limits=True):
+        with SafetyScope():
+            desired = dict(ShutdownOperation.outputState, **ShutdownOperation.valueState)
+            if limits:
+                desired.update(ShutdownOperation.limitState)
+            return StateReconciler.of(self.IPV4).apply(desired)
+
+    def limitShutdownValues(self):
+        with SafetyScope():
+            SystemSubsystem(self.IPV4).SetVoltageLimit(0, 'ON')
+            SystemSubsystem(self.IPV4).ReadVoltageLimitSet()
+            SystemSubsystem(self.IPV4).SetCurrentLimit(0, 'ON')
+            SystemSubsystem(self.IPV4).ReadVoltageLimitSet()
+            SystemSubsystem(self.IPV4).SetNegativeCurrentLimit(0, 'ON')
+            SystemSubsystem(self.IPV4).ReadNegativeCurrentLimitSet()
+            SystemSubsystem(self.IPV4).SetPowerLimit(0, 'ON')
+            SystemSubsystem(self.IPV4).ReadPowerLimitSet()
+            SystemSubsystem(self.IPV4).SetNegativePowerLimit(0, 'ON')
+            SystemSubsystem(self.IPV4).ReadNegativePowerLimitSet()
+            StateReconciler.of(self.IPV4).invalidate(StateReconciler.limits)
+
+    def setShutdownValues(self):
+        with SafetyScope():
+            SourceSubsystem(self.IPV4).SetVoltage(0)
+            SourceSubsystem(self.IPV4).ReadVoltageSet()
+            SourceSubsystem(self.IPV4).SetCurrent(0)
+            SourceSubsystem(self.IPV4).ReadCurrentSet()
+            SourceSubsystem(self.IPV4).SetNegativeCurrent(0)
+            SourceSubsystem(self.IPV4).ReadNegativeCurrentSet()
+            SourceSubsystem(self.IPV4).SetPower(0)
+            SourceSubsystem(self.IPV4).ReadPowerSet()
+            SourceSubsystem(self.IPV4).SetNegativePower(0)
+            SourceSubsystem(self.IPV4).ReadNegativePowerSet()
+            StateReconciler.of(self.IPV4).invalidate(StateReconciler.setpoints)
+
+    def setShutdownOutput(self):
+        with SafetyScope():
+            OutputSubsystem(self.IPV4).SetOutput(0)
+            OutputSubsystem(self.IPV4).ReadOutputSet()
+            SystemSubsystem(self.IPV4).HighlightFrontpanel()
+
+    def removeLimitShutdownValues(self):
+        with SafetyScope():
+            SystemSubsystem(self.IPV4).SetVoltageLimit(0, 'OFF')
+            SystemSubsystem(self.IPV4).ReadVoltageLimitSet()
+            SystemSubsystem(self.IPV4).SetCurrentLimit(0, 'OFF')
+            SystemSubsystem(self.IPV4).ReadVoltageLimitSet()
+            SystemSubsystem(self.IPV4).SetNegativeCurrentLimit(0, 'OFF')
+            SystemSubsystem(self.IPV4).ReadNegativeCurrentLimitSet()
+            SystemSubsystem(self.IPV4).SetPowerLimit(0, 'OFF')
+            SystemSubsystem(self.IPV4).ReadPowerLimitSet()
+            SystemSubsystem(self.IPV4).SetNegativePowerLimit(0, 'OFF')
+            SystemSubsystem(self.IPV4).ReadNegativePowerLimitSet()
+            StateReconciler.of(self.IPV4).invalidate(StateReconciler.limits)
+
+
+class WatchdogOperation(threading.Thread):
+    """
+        Watchdog Functional Operation
+        -----------------------------------------------------------------------------------------------------------------
+        IPV4: Address of the desired device to start shutdown operation
+        -----------------------------------------------------------------------------------------------------------------
+        Timer: It is the set point for the watchdog operation, if watchdog time cannot be triggered withing this time
+        period, it will switch of the output of the delta for safety.
+        -----------------------------------------------------------------------------------------------------------------
+        Sleeptime: This thread operates at given time period and sleeps at that timeline for the rest of the main operation.
+        -----------------------------------------------------------------------------------------------------------------
+        Be careful while setting it that timer is higher than sleep time for proper operation.
+        -----------------------------------------------------------------------------------------------------------------
+        If device fails with watch operation, it must be resetted manualy for safety reasons.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+
+    def __init__(self, IPV4, timer, sleeptime, deamonState=True):
+        super().__init__()
+        self.IPV4 = IPV4
+        self.timer = timer * 1000
+        self.sleeptime = sleeptime
+        self.deamonState = deamonState
+        self._stop_event = threading.Event()
+        self.setDaemon(self.deamonState)
+
+    def __str__(self):
+        return f'Watchdog Operation, for details print object.__doc__'
+
+    def stop(self):
+        logger.debug("Stop watchdog thread has been called!")
+        return self._stop_event.set()
+
+    def disableWatchdog(self):
+        return SystemSubsystem(self.IPV4).DisableWatchdog()
+
+    def run(self):
+        logger.debug("Watchdog thread has been started!")
+        SystemSubsystem(self.IPV4).SetWatchdog(self.timer)
+        while not self._stop_event.is_set():
+            logger.debug("Watchdog thread is running!")
+            clock.sleep(self.sleeptime)
+            if SystemSubsystem(self.IPV4).typed.ReadWatchdogSet() != 0:
+                logger.debug('Watchdog is still active!')
+            else:
+                logger.debug('Watchdog has been failed!')
+                self.stop()
+        logger.debug("Watchdog thread has been stopped!")
+
+
+class WatchdogKeepaliveOperation(threading.Thread):
+    """
+        Watchdog Keepalive Functional Operation
+        -----------------------------------------------------------------------------------------------------------------
+        IPV4: Address of the desired device to start watchdog keepalive operation
+        -----------------------------------------------------------------------------------------------------------------
+        Timer: It is the set point for the watchdog operation (seconds), if watchdog time cannot be triggered withing this
+        time period, it will switch of the output of the delta for safety.
+        -----------------------------------------------------------------------------------------------------------------
+        Sleeptime: Initial and maximum heartbeat period (seconds). It is lowered automatically when the host is loaded.
+        -----------------------------------------------------------------------------------------------------------------
+        warningFraction: Warning is given when remaining margin drops below this fraction of timer.
+        -----------------------------------------------------------------------------------------------------------------
+        targetFraction: Heartbeat period is adjusted to keep this fraction of timer as margin.
+        -----------------------------------------------------------------------------------------------------------------
+        minimumSleeptime: Lowest heartbeat period that adjustment is allowed to use (seconds).
+        -----------------------------------------------------------------------------------------------------------------
+        Heartbeats are sent over one persistent connection. Heartbeat interval and round trip time are kept in
+        intervalHistogram and roundTripHistogram, lowest seen margin is kept in minimumMargin. report() returns all.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+
+    def __init__(self, IPV4, timer, sleeptime, warningFraction=0.25, targetFraction=0.5, minimumSleeptime=0.05,
+                 deamonState=True):
+        super().__init__()
+        self.IPV4 = IPV4
+        self.timer = timer * 1000
+        self.timerSeconds = timer
+        self.sleeptime = sleeptime
+        self.maximumSleeptime = sleeptime
+        self.minimumSleeptime = minimumSleeptime
+        self.warningFraction = warningFraction
+        self.targetFraction = targetFraction
+        self.deamonState = deamonState
+        self.connection = PersistentConnection(self.IPV4)
+        self.intervalHistogram = TimingHistogram(buckets=[timer * step / 10 for step in range(1, 11)])
+        self.roundTripHistogram = TimingHistogram()
+        self.minimumMargin = None
+        self.warnings = 0
+        self.overhead = 0.0
+        self._stop_event = threading.Event()
+        self.setDaemon(self.deamonState)
+
+    def __str__(self):
+        return f'Watchdog Keepalive Operation, for details print object.__doc__'
+
+    def stop(self):
+        logger.debug("Stop watchdog keepalive thread has been called!")
+        return self._stop_event.set()
+
+    def disableWatchdog(self):
+        return self.connection.sendMessage("SYSTem:COMmunicate:WATchdog STOP\n")
+
+    def heartbeat(self):
+        start = clock.monotonic()
+        reply = self.connection.sendReceiveMessage("SYSTem:COMmunicate:WATchdog SET?\n")
+        end = clock.monotonic()
+        self.roundTripHistogram.observe(end - start)
+        return reply, start + (end - start) / 2
+
+    def updateMargin(self, interval, requested):
+        self.intervalHistogram.observe(interval)
+        margin = self.timerSeconds - interval
+        if self.minimumMargin is None or margin < self.minimumMargin:
+            self.minimumMargin = margin
+        if margin < self.warningFraction * self.timerSeconds:
+            self.warnings += 1
+            logger.warning(f'Watchdog margin of {self.IPV4} is {margin:.3f}s of {self.timerSeconds}s!')
+            cprint.printError(f'Watchdog margin of {self.IPV4} is {margin:.3f}s of {self.timerSeconds}s!')
+        self.overhead = max(interval - requested, self.overhead * 0.9, 0.0)
+        target = self.timerSeconds * (1 - self.targetFraction) - self.overhead
+        self.sleeptime = min(self.maximumSleeptime, max(self.minimumSleeptime, target))
+        return margin
+
+    def missedHeartbeat(self, error, lastBeat):
+        margin = self.timerSeconds - (clock.monotonic() - lastBeat)
+        logger.warning(f'Watchdog heartbeat of {self.IPV4} has been failed: {error}')
+        if margin < self.warningFraction * self.timerSeconds:
+            self.warnings += 1
+            cprint.printError(f'Watchdog heartbeat of {self.IPV4} has been failed, margin is {margin:.3f}s of '
+                              f'{self.timerSeconds}s!')
+        return margin
+
+    def report(self):
+        return {'IPV4': self.IPV4, 'timer': self.timerSeconds, 'sleeptime': self.sleeptime,
+                'minimumMargin': self.minimumMargin, 'warnings': self.warnings,
+                'reconnects': self.connection.reconnects, 'interval': self.intervalHistogram.summary(),
+                'roundTrip': self.roundTripHistogram.summary()}
+
+    def run(self):
+        logger.debug("Watchdog keepalive thread has been started!")
+        self.connection.sendMessage(f'SYSTem:COMmunicate:WATchdog SET,{self.timer}\n')
+        lastBeat = clock.monotonic()
+        while not self._stop_event.is_set():
+            requested = self.sleeptime
+            if clock.wait(self._stop_event, requested):
+                break
+            try:
+                reply, beat = self.heartbeat()
+            except OSError as error:
+                self.missedHeartbeat(error, lastBeat)
+                continue
+            self.updateMargin(beat - lastBeat, requested)
+            lastBeat = beat
+            if TypedResults.parseReply('SYSTem:COMmunicate:WATchdog SET?', reply) != 0:
+                logger.debug('Watchdog is still active!')
+            else:
+                logger.debug('Watchdog has been failed!')
+                self.stop()
+        self.connection.close()
+        logger.debug("Watchdog keepalive thread has been stopped!")
+
+
+class ConsoleSummary:
+    """
+        Rate Limited Console Summary
+        -----------------------------------------------------------------------------------------------------------------
+        interval: Minimum time between two printed lines of the same device (seconds)
+        -----------------------------------------------------------------------------------------------------------------
+        printColor: Color of the printed summary line. Available colors are purple, blue, cyan, green, yellow, red, normal
+        -----------------------------------------------------------------------------------------------------------------
+        update(IPV4, template, *values): Counts the sample and prints template % values only once per interval per
+        device together with the number of samples since the last printed line. Formatting is skipped otherwise.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+
+    def __init__(self, interval=10, printColor='green'):
+        self.interval = interval
+        self.printColor = printColor
+        self._last = {}
+        self._samples = {}
+
+    def __str__(self):
+        return f'Console Summary, for details print object.__doc__'
+
+    def update(self, IPV4, template, *values):
+        samples = self._samples.get(IPV4, 0) + 1
+        now = clock.monotonic()
+        last = self._last.get(IPV4)
+        if last is not None and now - last < self.interval:
+            self._samples[IPV4] = samples
+            return None
+        self._last[IPV4] = now
+        self._samples[IPV4] = 0
+        return cprint.printColorful(f'{IPV4} | {samples} samples | {template % values}', self.printColor)
+
+
+class DataloggerPublisher:
+    """
+        Datalogger Sample Publishing
+        -----------------------------------------------------------------------------------------------------------------
+        Shared part of the Basic, Ah and Wh dataloggers, every class gives its sampleClass, template (console line of
+        the high rate mode) and dataFrame() (its own dataframe).
+        -----------------------------------------------------------------------------------------------------------------
+        bufferSize: Number of typed samples kept in memory at object.samples (SampleBuffer), None keeps all.
+        -----------------------------------------------------------------------------------------------------------------
+        sharedMemory: Publishes every sample to TelemetryRing(IPV4, kind) for readers on the same host, kind is the
+        kind of the sampleClass ('basic', 'ah' or 'wh'). The block is kept after stop so readers can still read it.
+        -----------------------------------------------------------------------------------------------------------------
+        accumulator: ChargeAccumulator updated with every sample (host side Ah, Wh and state of charge).
+        -----------------------------------------------------------------------------------------------------------------
+        database: SampleDatabase receiving every sample instead of the txt file (no txt file is created).
+        -----------------------------------------------------------------------------------------------------------------
+        sink: Any other object with write(IPV4, sample) receiving every sample instead of the txt file, e.g. a
+        SampleStream to stdout (no txt file is created).
+        -----------------------------------------------------------------------------------------------------------------
+        highRate: High rate mode, debug log is formatted lazily and console echo is off unless consoleEcho is True.
+        A rate limited summary line is printed once per summaryInterval seconds instead.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    sampleClass = None
+    template = None
+
+    def setupPublishing(self, printColor, highRate, consoleEcho, summaryInterval, bufferSize, sharedMemory,
+                        accumulator, database, sink=None):
+        self.highRate = highRate
+        self.consoleEcho = not highRate if consoleEcho is None else consoleEcho
+        self.consoleSummary = ConsoleSummary(summaryInterval, printColor) if highRate else None
+        self.samples = SampleBuffer(self.sampleClass, capacity=bufferSize)
+        self.telemetryRing = TelemetryRing(self.IPV4, self.sampleClass.kind, create=True) if sharedMemory else None
+        self.accumulator = accumulator
+        self.database = database
+        self.sink = sink
+
+    def dataFrame(self):
+        raise NotImplementedError
+
+    def textFile(self):
+        return self.database is None and self.sink is None
+
+    def reportHighRate(self, dataFrame):
+        values = dataFrame[1:len(self.sampleClass.__slots__)]
+        logger.debug(self.template, *values)
+        if self.consoleEcho:
+            cprint.printColorful(self.template % tuple(values), self.printColor)
+        self.consoleSummary.update(self.IPV4, self.template, *values)
+        return dataFrame
+
+    def markGap(self, error):
+        logger.warning(f'Datalogger sample of {self.IPV4} has been missed: {error}')
+        dataFrame = self.dataFrame()
+        for index in range(1, len(dataFrame)):
+            dataFrame[index] = 'GAP'
+        self.publishSample(self.sampleClass.fromReplies(clock.time(),
+                                                        *dataFrame[1:len(self.sampleClass.__slots__)]))
+        return dataFrame
+
+    def publishSample(self, sample):
+        self.samples.append(sample)
+        if self.accumulator is not None:
+            self.accumulator.update(sample)
+        if self.database is not None:
+            self.database.write(self.IPV4, sample)
+        if self.sink is not None:
+            self.sink.write(self.IPV4, sample)
+        if self.telemetryRing is not None:
+            self.telemetryRing.publish(sample)
+        return sample
+
+    def closePublishing(self):
+        if self.telemetryRing is not None:
+            self.telemetryRing.close()
+
+
+class BasicDataloggerOperation(DataloggerPublisher, threading.Thread):
+    """
+        Basic Datalogger Functional Operation
+        -----------------------------------------------------------------------------------------------------------------
+        Its own dataframe (one per instance) is; dataFrameBasic = ['Voltage', 'Current', 'Power']
+        -----------------------------------------------------------------------------------------------------------------
+        IPV4: Address of the desired device to start shutdown operation
+        -----------------------------------------------------------------------------------------------------------------
+        loggingTime: It is also same with sleep time of the thread. Function will work at every logging time
+        -----------------------------------------------------------------------------------------------------------------
+        printColor: It is used for optional color printing for the logged data at terminal. Default color is green.
+        Note: Available colors are, purple, blue, cyan, green, yellow, red and normal
+        -----------------------------------------------------------------------------------------------------------------
+        bufferSize, sharedMemory, accumulator, database, sink, highRate: Sample publishing, see DataloggerPublisher.
+        -----------------------------------------------------------------------------------------------------------------
+        There are three main logger types, be sure that one of them is being used only!
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    dataFrameBasic = ['Voltage', 'Current', 'Power']
+    fileName = 'BasicDatalogger'
+    sampleClass = BasicSample
+    template = 'Voltage: %sV, Current: %sA, Power: %sW'
+
+    def __init__(self, IPV4, loggingTime, printColor='green', deamonState=True, highRate=False, consoleEcho=None,
+                 summaryInterval=10, bufferSize=3600, sharedMemory=False,
+                 accumulator=None, database=None, sink=None):
+        super().__init__()
+        self.IPV4 = IPV4
+        self.printColor = printColor
+        self.loggingTime = loggingTime
+        self.deamonState = deamonState
+        self.setDaemon(self.deamonState)
+        self.setupPublishing(printColor, highRate, consoleEcho, summaryInterval, bufferSize, sharedMemory, accumulator,
+                             database, sink)
+        self._stop_event = threading.Event()
+        self.finalName = f'{BasicDataloggerOperation.fileName} {clock.now().strftime("%d_%m_%Y-%H_%M_%S")}.txt'
+        if self.textFile():
+            open(f'{self.finalName}', "w+").close()
+        self.dataFrameBasic = ['Timestamp'] + BasicDataloggerOperation.dataFrameBasic
+
+    def __str__(self):
+        return f'Basic Datalogger Operation, for details print object.__doc__'
+
+    def csvLogger(self):
+        csvFile = open(self.finalName, 'a', newline='')
+        write = csv.writer(csvFile)
+        write.writerow(self.dataFrameBasic)
+        csvFile.close()
+        self.dataFrameBasic[0] = clock.strftime('%d-%m-%Y %H:%M:%S')
+        return self.dataFrameBasic
+
+    def updateBasicDataFrame(self):
+        values = [MeasureSubsystem(self.IPV4).MeasureVoltage(),
+                  MeasureSubsystem(self.IPV4).MeasureCurrent(),
+                  MeasureSubsystem(self.IPV4).MeasurePower()]
+        self.dataFrameBasic[1:4] = values
+        self.publishSample(BasicSample.fromReplies(clock.time(), *values))
+        if self.highRate:
+            return self.reportHighRate(self.dataFrameBasic)
+        logger.debug(
+            f'Voltage: {self.dataFrameBasic[1]}V, Current: {self.dataFrameBasic[2]}A, '
+            f'Power: {self.dataFrameBasic[3]}W')
+        cprint.printColorful(
+            f'Voltage: {self.dataFrameBasic[1]}V, Current: {self.dataFrameBasic[2]}A, '
+            f'Power: {self.dataFrameBasic[3]}W', self.printColor)
+        return self.dataFrameBasic
+
+    def dataFrame(self):
+        return self.dataFrameBasic
+
+    def stop(self):
+        logger.debug('Datalogger stop event has been started!')
+        self._stop_event.set()
+
+    def run(self):
+        logger.debug('Datalogger thread class has been started!')
+        while not self._stop_event.is_set():
+            logger.debug('Datalogger thread class for basic dataframe is running!')
+            if self.textFile():
+                self.csvLogger()
+            try:
+                self.updateBasicDataFrame()
+            except (OSError, ValueError) as error:
+                self.markGap(error)
+            clock.sleep(self.loggingTime)
+        self.closePublishing()
+        logger.debug('Datalogger thread class has been stopped!')
+
+
+class AhDataloggerOperation(DataloggerPublisher, threading.Thread):
+    """
+        Ah Datalogger Functional Operation
+        -----------------------------------------------------------------------------------------------------------------
+        Its own dataframe (one per instance) is; dataFrameAh = ['Voltage', 'Current', 'Power', 'PositiveAh', 'NegativeAh', 'AhSeconds', 'AhHours']
+        -----------------------------------------------------------------------------------------------------------------
+        IPV4: Address of the desired device to start shutdown operation
+        -----------------------------------------------------------------------------------------------------------------
+        loggingTime: It is also same with sleep time of the thread. Function will work at every logging time
+        -----------------------------------------------------------------------------------------------------------------
+        printColor: It is used for optional color printing for the logged data at terminal. Default color is green.
+        Note: Available colors are, purple, blue, cyan, green, yellow, red and normal
+        -----------------------------------------------------------------------------------------------------------------
+        bufferSize, sharedMemory, accumulator, database, sink, highRate: Sample publishing, see DataloggerPublisher.
+        -----------------------------------------------------------------------------------------------------------------
+        There are three main logger types, be sure that one of them is being used only especially Ah vs Wh!
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    dataFrameAh = ['Voltage', 'Current', 'Power', 'PositiveAh', 'NegativeAh', 'AhSeconds', 'AhHours']
+    fileName = 'AhDatalogger'
+    sampleClass = AhSample
+    template = ('Voltage: %sV, Current: %sA, Power: %sW, PositiveAh: %s, NegativeAh: %s, AhSeconds: %s, '
+                'AhHours: %s')
+
+    def __init__(self, IPV4, loggingTime, printColor='green', deamonState=True, highRate=False, consoleEcho=None,
+                 summaryInterval=10, bufferSize=3600, sharedMemory=False,
+                 accumulator=None, database=None, sink=None):
+        super().__init__()
         self.IPV4 = IPV4
+        self.loggingTime = loggingTime
+        self.printColor = printColor
+        self.deamonState = deamonState
+        self.setDaemon(self.deamonState)
+        self.setupPublishing(printColor, highRate, consoleEcho, summaryInterval, bufferSize, sharedMemory, accumulator,
+                             database, sink)
+        self._stop_event = threading.Event()
+        self.finalName = f'{AhDataloggerOperation.fileName} {clock.now().strftime("%d_%m_%Y-%H_%M_%S")}.txt'
+        if self.textFile():
+            open(f'{self.finalName}', "w+").close()
+        self.dataFrameAh = ['Timestamp'] + AhDataloggerOperation.dataFrameAh
 
     def __str__(self):
-        return f'Manual: Measure Subsystem - page 13 and 14 - Queries and Commands, for details print object.__doc__'
-
-    def SetRemoteShutDown(self, setting):
-        message = f'SYSTem:RSD[:STAtus] {setting}\n'
-        return Communication().sendMessage(self.IPV4, message=message)
-
-    def ReadRemoteShutDownSet(self, ReadRemoteShutDownSet="SYSTem:RSD[:STAtus]?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadRemoteShutDownSet)
-
-    def SetVoltageLimit(self, voltagelimit, setting):
-        message = f'SYSTem:LIMits:VOLtage {voltagelimit},{setting}\n'
-        return Communication().sendMessage(self.IPV4, message=message)
-
-    def ReadVoltageLimitSet(self, ReadVoltageLimitSet="SYSTem:LIMits:VOLtage?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadVoltageLimitSet)
+        return f'Ah Datalogger Operation, for details print object.__doc__'
 
-    def SetCurrentLimit(self, currentlimit, setting):
-        message = f'SYSTem:LIMits:CURrent {currentlimit},{setting}\n'
-        return Communication().sendMessage(self.IPV4, message=message)
+    def csvLogger(self):
+        csvFile = open(self.finalName, 'a', newline='')
+        write = csv.writer(csvFile)
+        write.writerow(self.dataFrameAh)
+        csvFile.close()
+        self.dataFrameAh[0] = clock.strftime('%d-%m-%Y %H:%M:%S')
+        return self.dataFrameAh
 
-    def ReadCurrentLimitSet(self, ReadCurrentLimitSet="SYSTem:LIMits:CURrent?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadCurrentLimitSet)
+    def updateAhDataFrame(self):
+        values = [MeasureSubsystem(self.IPV4).MeasureVoltage(),
+                  MeasureSubsystem(self.IPV4).MeasureCurrent(),
+                  MeasureSubsystem(self.IPV4).MeasurePower(),
+                  MeasureSubsystem(self.IPV4).MeasureAhPositiveTotal(),
+                  MeasureSubsystem(self.IPV4).MeasureAhNegativeTotal(),
+                  MeasureSubsystem(self.IPV4).ReadAhMeasurementTimeSeconds(),
+                  MeasureSubsystem(self.IPV4).ReadAhMeasurementTimeHours()]
+        self.dataFrameAh[1:8] = values
+        self.publishSample(AhSample.fromReplies(clock.time(), *values))
+        if self.highRate:
+            return self.reportHighRate(self.dataFrameAh)
+        logger.debug(
+            f'Voltage: {self.dataFrameAh[1]}V, Current: {self.dataFrameAh[2]}A, '
+            f'Power: {self.dataFrameAh[3]}W, PositiveAh: {self.dataFrameAh[4]}, '
+            f'NegativeAh: {self.dataFrameAh[5]}, AhSeconds: {self.dataFrameAh[6]} '
+            f'AhHours: {self.dataFrameAh[7]}')
+        cprint.printColorful(
+            f'Voltage: {self.dataFrameAh[1]}V, Current: {self.dataFrameAh[2]}A, '
+            f'Power: {self.dataFrameAh[3]}W, PositiveAh: {self.dataFrameAh[4]}, '
+            f'NegativeAh: {self.dataFrameAh[5]}, AhSeconds: {self.dataFrameAh[6]} '
+            f'AhHours: {self.dataFrameAh[7]}', self.printColor)
+        return self.dataFrameAh
 
-    def SetNegativeCurrentLimit(self, negativecurrentlimit, setting):
-        message = f'SYSTem:LIMits:CURrent:NEGative {negativecurrentlimit},{setting}\n'
-        return Communication().sendMessage(self.IPV4, message=message)
+    def dataFrame(self):
+        return self.dataFrameAh
 
-    def ReadNegativeCurrentLimitSet(self, ReadNegativeCurrentLimitSet="SYSTem:LIMits:CURrent:NEGative?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadNegativeCurrentLimitSet)
+    def stop(self):
+        logger.debug('Datalogger stop event has been started!')
+        self._stop_event.set()
 
-    def SetPowerLimit(self, powerlimit, setting):
-        message = f'SYSTem:LIMits:POWer {powerlimit},{setting}\n'
-        return Communication().sendMessage(self.IPV4, message=message)
+    def run(self):
+        logger.debug('Datalogger thread class has been started!')
+        MeasureSubsystem(self.IPV4).SetAhMeasurementState('ON')
+        while not self._stop_event.is_set():
+            logger.debug('Datalogger thread class for Ah dataframe is running!')
+            if self.textFile():
+                self.csvLogger()
+            try:
+                self.updateAhDataFrame()
+            except (OSError, ValueError) as error:
+                self.markGap(error)
+            clock.sleep(self.loggingTime)
+        self.closePublishing()
+        logger.debug('Datalogger thread class has been stopped!')
 
-    def ReadPowerLimitSet(self, ReadPowerLimitSet="SYSTem:LIMits:POWer?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadPowerLimitSet)
 
-    def SetNegativePowerLimit(self, negativepowerlimit, setting):
-        message = f'SYSTem:LIMits:POWer:NEGative {negativepowerlimit},{setting}\n'
-        return Communication().sendMessage(self.IPV4, message=message)
+class WhDataloggerOperation(DataloggerPublisher, threading.Thread):
+    """
+        Ah Datalogger Functional Operation
+        -----------------------------------------------------------------------------------------------------------------
+        Its own dataframe (one per instance) is; dataFrameWh = ['Voltage', 'Current', 'Power', 'PositiveWh', 'NegativeWh', 'WhSeconds', 'WhHours']
+        -----------------------------------------------------------------------------------------------------------------
+        IPV4: Address of the desired device to start shutdown operation
+        -----------------------------------------------------------------------------------------------------------------
+        loggingTime: It is also same with sleep time of the thread. Function will work at every logging time
+        -----------------------------------------------------------------------------------------------------------------
+        printColor: It is used for optional color printing for the logged data at terminal. Default color is green.
+        Note: Available colors are, purple, blue, cyan, green, yellow, red and normal
+        -----------------------------------------------------------------------------------------------------------------
+        bufferSize, sharedMemory, accumulator, database, sink, highRate: Sample publishing, see DataloggerPublisher.
+        -----------------------------------------------------------------------------------------------------------------
+        There are three main logger types, be sure that one of them is being used only especially Ah vs Wh!
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    dataFrameWh = ['Voltage', 'Current', 'Power', 'PositiveWh', 'NegativeWh', 'WhSeconds', 'WhHours']
+    fileName = 'WhDatalogger'
+    sampleClass = WhSample
+    template = ('Voltage: %sV, Current: %sA, Power: %sW, PositiveWh: %s, NegativeWh: %s, WhSeconds: %s, '
+                'WhHours: %s')
 
-    def ReadNegativePowerLimitSet(self, ReadNegativePowerLimitSet="SYSTem:LIMits:POWer:NEGative?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadNegativePowerLimitSet)
+    def __init__(self, IPV4, loggingTime, printColor='green', deamonState=True, highRate=False, consoleEcho=None,
+                 summaryInterval=10, bufferSize=3600, sharedMemory=False,
+                 accumulator=None, database=None, sink=None):
+        super().__init__()
+        self.IPV4 = IPV4
+        self.loggingTime = loggingTime
+        self.printColor = printColor
+        self.deamonState = deamonState
+        self.setDaemon(self.deamonState)
+        self.setupPublishing(printColor, highRate, consoleEcho, summaryInterval, bufferSize, sharedMemory, accumulator,
+                             database, sink)
+        self._stop_event = threading.Event()
+        self.finalName = f'{WhDataloggerOperation.fileName} {clock.now().strftime("%d_%m_%Y-%H_%M_%S")}.txt'
+        if self.textFile():
+            open(f'{self.finalName}', "w+").close()
+        self.dataFrameWh = ['Timestamp'] + WhDataloggerOperation.dataFrameWh
 
-    def HighlightFrontpanel(self, message="SYSTem:FROntpanel:HIGhlight\n"):
-        return Communication().sendMessage(self.IPV4, message=message)
+    def __str__(self):
+        return f'Wh Datalogger Operation, for details print object.__doc__'
 
-    def LockFrontPanel(self, setting):
-        message = f'SYSTem:FROntpanel[:STAtus] {setting}\n'
-        return Communication().sendMessage(self.IPV4, message=message)
+    def csvLogger(self):
+        csvFile = open(self.finalName, 'a', newline='')
+        write = csv.writer(csvFile)
+        write.writerow(self.dataFrameWh)
+        csvFile.close()
+        self.dataFrameWh[0] = clock.strftime('%d-%m-%Y %H:%M:%S')
+        return self.dataFrameWh
 
-    def ReadLockFrontpanelSet(self, ReadLockFrontpanelSet="SYSTem:FROntpanel[:STAtus]?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadLockFrontpanelSet)
+    def updateWhDataFrame(self):
+        values = [MeasureSubsystem(self.IPV4).MeasureVoltage(),
+                  MeasureSubsystem(self.IPV4).MeasureCurrent(),
+                  MeasureSubsystem(self.IPV4).MeasurePower(),
+                  MeasureSubsystem(self.IPV4).MeasureWhPositiveTotal(),
+                  MeasureSubsystem(self.IPV4).MeasureWhNegativeTotal(),
+                  MeasureSubsystem(self.IPV4).ReadWhMeasurementTimeSeconds(),
+                  MeasureSubsystem(self.IPV4).ReadWhMeasurementTimeHours()]
+        self.dataFrameWh[1:8] = values
+        self.publishSample(WhSample.fromReplies(clock.time(), *values))
+        if self.highRate:
+            return self.reportHighRate(self.dataFrameWh)
+        logger.debug(
+            f'Voltage: {self.dataFrameWh[1]}V, Current: {self.dataFrameWh[2]}A, '
+            f'Power: {self.dataFrameWh[3]}W, PositiveWh: {self.dataFrameWh[4]}, '
+            f'NegativeWh: {self.dataFrameWh[5]}, WhHours: {self.dataFrameWh[6]}, '
+            f'WhSeconds: {self.dataFrameWh[7]}, WhHours: {self.dataFrameWh[6]}')
+        cprint.printColorful(
+            f'Voltage: {self.dataFrameWh[1]}V, Current: {self.dataFrameWh[2]}A, '
+            f'Power: {self.dataFrameWh[3]}W, PositiveWh: {self.dataFrameWh[4]}, '
+            f'NegativeWh: {self.dataFrameWh[5]}, WhHours: {self.dataFrameWh[6]}, '
+            f'WhSeconds: {self.dataFrameWh[7]}, WhHours: {self.dataFrameWh[6]}',
+            self.printColor)
+        return self.dataFrameWh
 
-    def LockControlFrontpanel(self, setting):
-        message = f'SYSTem:FROntpanel:CONtrols {setting}\n'
-        return Communication().sendMessage(self.IPV4, message=message)
+    def dataFrame(self):
+        return self.dataFrameWh
 
-    def ReadLockControlFrontpanelSet(self, ReadLockControlFrontpanelSet="SYSTem:FROntpanel:CONtrols?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadLockControlFrontpanelSet)
+    def stop(self):
+        logger.debug('Datalogger stop event has been started!')
+        self._stop_event.set()
 
-    def SetTime(self, hour, minute, second):
-        message = f'SYSTem:TIMe {hour},{minute},{second}\n'
-        return Communication().sendMessage(self.IPV4, message=message)
+    def run(self):
+        logger.debug('Datalogger thread class has been started!')
+        MeasureSubsystem(self.IPV4).SetWhMeasurementState('ON')
+        while not self._stop_event.is_set():
+            logger.debug('Datalogger thread class for Wh dataframe is running!')
+            if self.textFile():
+                self.csvLogger()
+            try:
+                self.updateWhDataFrame()
+            except (OSError, ValueError) as error:
+                self.markGap(error)
+            clock.sleep(self.loggingTime)
+        self.closePublishing()
+        logger.debug('Datalogger thread class has been stopped!')
 
-    def ReadTimeSet(self, ReadTimeSet="SYSTem:TIMe?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadTimeSet)
 
-    def SetDate(self, year, month, day):
-        message = f'SYSTem:DATe {year},{month},{day}\n'
-        return Communication().sendMessage(self.IPV4, message=message)
+class CommunicationGaps:
+    """
+        Communication Gaps of the Operations
+        -----------------------------------------------------------------------------------------------------------------
+        communicationGap(error): A failed check is counted in gaps and reported, the operation keeps its state and
+        retries at its next check instead of dying with the output on.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    gaps = 0
 
-    def ReadDateSet(self, ReadDateSet="SYSTem:DATe?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadDateSet)
+    def communicationGap(self, error):
+        self.gaps += 1
+        logger.warning(f'Communication with {self.IPV4} has been failed, it is retried at next check: {error}')
+        cprint.printError(f'Communication with {self.IPV4} has been failed, it is retried at next check: {error}')
 
-    def ReadErrors(self, ReadErrors="SYSTem:ERRor?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadErrors)
 
-    def ReadWarnings(self, ReadWarnings="SYSTem:WARning?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadWarnings)
+class ChargingOperation(CommunicationGaps, threading.Thread):
+    """
+        Charging Functional Operation
+        -----------------------------------------------------------------------------------------------------------------
+        IPV4: Address of the desired device to start shutdown operation
+        -----------------------------------------------------------------------------------------------------------------
+        sleepTime: Sleep time of the thread, every sleep time, charging state is being checked.
+        -----------------------------------------------------------------------------------------------------------------
+        bulkCurrent: Current setting for the bulk stage
+        -----------------------------------------------------------------------------------------------------------------
+        bulkVoltage: Voltage setting for the bulk stage
+        -----------------------------------------------------------------------------------------------------------------
+        absorptionCurrent: Current setting for the absorption stage, absorptionCurrent = 0.8 * bulkCurrent
+        -----------------------------------------------------------------------------------------------------------------
+        absorptionVoltage: Voltage setting for the absorption stage, absorptionVoltage = bulkVoltage
+        -----------------------------------------------------------------------------------------------------------------
+        floatCurrent: Current setting for the floating stage, floatCurrent =  0.02 * bulkCurrent
+        -----------------------------------------------------------------------------------------------------------------
+        floatVoltage: Voltage setting for the floating stage
+        -----------------------------------------------------------------------------------------------------------------
+        floatTime: Time setting for the floating stage timer, when it is done charging operion stops!
+        -----------------------------------------------------------------------------------------------------------------
+        There are three main logger types, be sure that one of them is being used only especially Ah vs Wh!
+        -----------------------------------------------------------------------------------------------------------------
+    """
 
-    def SetWatchdog(self, timer):
-        message = f'SYSTem:COMmunicate:WATchdog SET,{timer}\n'
-        return Communication().sendMessage(self.IPV4, message=message)
+    def __init__(self, IPV4='0.0.0.0', sleepTime=10, bulkCurrent=0.0, bulkVoltage=0.0, floatVoltage=0.0, floatTime=0.0,
+                 deamonState=True):
+        super().__init__()
+        self.IPV4 = IPV4
+        self.sleepTime = sleepTime
+        self.bulkCurrent = bulkCurrent
+        self.bulkVoltage = bulkVoltage
+        self.absorptionCurrent = self.bulkCurrent * 0.8
+        self.absorptionVoltage = self.bulkVoltage
+        self.floatCurrent = self.bulkCurrent * 0.02
+        self.floatVoltage = floatVoltage
+        self.floatTime = floatTime
+        self.bulkMode = True
+        self.absorptionMode = False
+        self.floatingMode = False
+        self.deamonState = deamonState
+        self.setDaemon(self.deamonState)
+        self.gaps = 0
+        self._stop_event = threading.Event()
+        self.bulkInfo = 0
+        self.absorptionInfo = 0
+        self.reconciler = StateReconciler.of(self.IPV4)
 
-    def ReadWatchdogSet(self, ReadWatchdogSet="SYSTem:COMmunicate:WATchdog SET?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadWatchdogSet)
+    def __str__(self):
+        return f'Charging Operation, for details print object.__doc__'
 
-    def ReadCurrentWatchdogState(self, ReadCurrentWatchdogState="SYSTem:COMmunicate:WATchdog?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadCurrentWatchdogState)
+    def chargingLimits(self):
+        return {'voltageLimit': (self.bulkVoltage, 'ON'), 'currentLimit': (self.bulkCurrent + 10, 'ON'),
+                'powerLimit': (self.bulkVoltage * self.bulkCurrent + 500, 'ON')}
 
-    def DisableWatchdog(self, message="SYSTem:COMmunicate:WATchdog STOP\n"):
-        return Communication().sendMessage(self.IPV4, message=message)
+    def chargingValues(self, voltage, current, powerMargin=50):
+        return {'voltage': voltage, 'current': current, 'power': voltage * current + powerMargin}
 
-    def TestWatchdog(self, message="SYSTem:COMmunicate:WATchdog TEST\n"):
-        return Communication().sendMessage(self.IPV4, message=message)
+    def chargingInitialize(self):
+        logger.debug('Charging is being initialized!')
+        cprint.printFeedback('Charging is being initialized!')
+        SystemSubsystem(self.IPV4).HighlightFrontpanel()
+        self.reconciler.apply(self.chargingLimits())
+        clock.sleep(1)
 
-    def TestSystemSubsystem(self):
-        logger.debug("Remote Shut Down Set runs:")
-        self.SetRemoteShutDown('OFF')
-        logger.debug("Read Remote Shut Down Set runs:")
-        self.ReadRemoteShutDownSet()
-        logger.debug("Set Voltage Limit runs:")
-        self.SetVoltageLimit(50, 'ON')
-        logger.debug("Read Voltage Limit Set runs:")
-        self.ReadVoltageLimitSet()
-        logger.debug("Set Current Limit runs:")
-        self.SetCurrentLimit(100, 'ON')
-        logger.debug("Read Current Limit Set runs:")
-        self.ReadCurrentLimitSet()
-        logger.debug("Set Negative Current Limit runs:")
-        self.SetNegativeCurrentLimit(-100, 'ON')
-        logger.debug("Read Negative Current Limit Set runs:")
-        self.ReadNegativeCurrentLimitSet()
-        logger.debug("Set Power Limit runs:")
-        self.SetPowerLimit(4000, 'ON')
-        logger.debug("Read Power Limit Set runs:")
-        self.ReadPowerLimitSet()
-        logger.debug("Set Negative Power Limit runs:")
-        self.SetNegativePowerLimit(-4000, 'ON')
-        logger.debug("Read Negative Power Limit Set runs:")
-        self.ReadNegativePowerLimitSet()
-        logger.debug("Highlight Frontpanel Set runs:")
-        self.HighlightFrontpanel()
-        logger.debug("Set Lock Frontpanel runs:")
-        self.LockFrontPanel('ON')
-        logger.debug("Read Lock Frontpanel Set runs:")
-        self.ReadLockFrontpanelSet()
-        logger.debug("Set Lock Control Frontpanel runs:")
-        self.LockControlFrontpanel('ON')
-        logger.debug("Read Lock Control Frontpanel Set runs:")
-        self.ReadLockControlFrontpanelSet()
-        logger.debug("Time Set runs:")
-        self.SetTime(9, 10, 0)
-        logger.debug("Read Time Set runs:")
-        self.ReadTimeSet()
-        logger.debug("Date Set runs:")
-        self.SetDate(2021, 9, 8)
-        logger.debug("Read Date Set runs:")
-        self.ReadDateSet()
-        logger.debug("Read Errors runs:")
-        self.ReadErrors()
-        logger.debug("Read Warnings runs:")
-        self.ReadWarnings()
-        logger.debug("Set Watchdog runs:")
-        self.SetWatchdog(500)
-        logger.debug("Read Watchdog Set runs:")
-        self.ReadWatchdogSet()
-        logger.debug("Read Current Watchdog State runs:")
-        self.ReadCurrentWatchdogState()
-        logger.debug("Disable Watchdog runs:")
-        self.DisableWatchdog()
-        logger.debug("Test Watchdog runs:")
-        self.TestWatchdog()
+    def chargingFinalize(self):
+        logger.debug(f'Charging is being finalized!')
+        cprint.printFeedback(f'Charging is being finalized!')
+        SystemSubsystem(self.IPV4).HighlightFrontpanel()
+        ShutdownOperation(self.IPV4).shutdown()
+        clock.sleep(1)
 
+    def outputInitialize(self):
+        logger.debug('Output is Initialized!')
+        cprint.printFeedback('Output is Initialized!')
+        self.reconciler.apply({'output': 1})
+        clock.sleep(1)
 
-class OutputSubsystem:
-    """
-    Manual: Output Subsystem - page 17 - Queries and Commands
-    -----------------------------------------------------------------------------------------------------------------
-    SetOutput = "OUTPut<sp><boolean><term>" To switch power supply on/off - boolean = 0, 1, OFF, ON
-    -----------------------------------------------------------------------------------------------------------------
-    ReadOutputSet = "OUTPut?<term> To read the last stage of the output
-    -----------------------------------------------------------------------------------------------------------------
-    Note: All commands can be tested with 'TestOutputSubsystem Method'
-    :return Queries will return the Received Message!
-    :return Commands will return the Command has been sent!
-    """
+    def bulkStage(self):
+        logger.debug('Bulk Stage is Initialized!')
+        cprint.printFeedback('Bulk Stage is Initialized!')
+        self.reconciler.apply(self.chargingValues(self.bulkVoltage, self.bulkCurrent))
+        clock.sleep(1)
 
-    def __init__(self, IPV4):
-        self.IPV4 = IPV4
+    def absorptionStage(self):
+        logger.debug('Absorption Stage is Initialized!')
+        cprint.printFeedback('Absorption Stage is Initialized!')
+        self.reconciler.apply(self.chargingValues(self.absorptionVoltage, self.absorptionCurrent))
+        clock.sleep(1)
 
-    def __str__(self):
-        return f'Output Subsystem - page 17 - Queries and Commands, for details print object.__doc__'
+    def floatingStage(self):
+        logger.debug('Floating Stage is Initialized!')
+        cprint.printFeedback('Floating Stage is Initialized!')
+        self.reconciler.apply(self.chargingValues(self.floatVoltage, self.floatCurrent, 500))
+        clock.sleep(1)
 
-    def SetOutput(self, setting):
-        message = f'OUTPut {setting}\n'
-        return Communication().sendMessage(self.IPV4, message=message)
+    def checkChargingStage(self):
+        current = MeasureSubsystem(self.IPV4).typed.MeasureCurrent()
+        if current < self.absorptionCurrent and self.bulkMode:
+            self.absorptionStage()
+            self.bulkMode = False
+            self.absorptionMode = True
+        elif current < self.floatCurrent and self.absorptionMode:
+            self.floatingStage()
+            self.absorptionMode = False
+            self.floatingMode = True
 
-    def ReadOutputSet(self, ReadOutputSet="OUTPut?\n"):
-        return Communication().sendReceiveMessage(self.IPV4, message=ReadOutputSet)
+        if self.bulkMode:
+            logger.debug('Bulk Mode is active!')
+            if self.bulkInfo < 1:
+                cprint.printFeedback('Bulk Mode is active!')
+                self.bulkInfo += 1
+        elif self.absorptionMode:
+            logger.debug('Absorption mode is active!')
+            if self.absorptionInfo < 1:
+                cprint.printFeedback('Absorption mode is active!')
+                self.absorptionInfo += 1
+        elif self.floatingMode:
+            logger.debug('Floating mode is active!')
+            cprint.printFeedback('Floating mode is active!')
+            logger.debug(f'Float time is: {self.floatTime}')
+            clock.sleep(self.floatTime)
+            self.stop()
 
-    def TestOutputSubsystem(self):
-        logger.debug("Output State Set runs:")
-        self.SetOutput(1)
-        logger.debug("Read Output State runs: ")
-        self.ReadOutputSet()
-        logger.debug("Output State Set runs:")
-        self.SetOutput(0)
-        logger.debug("Read Output State runs: ")
-        self.ReadOutputSet()
+    def stop(self):
+        logger.debug('Charging stop event has been started!')
+        cprint.printFeedback('Charging stop event has been started!')
+        self._stop_event.set()
+
+    def run(self):
+        logger.debug('Charging thread class has been started!')
+        try:
+            self.chargingInitialize()
+            self.bulkStage()
+            self.outputInitialize()
+            while not self._stop_event.is_set():
+                logger.debug('Charging thread class is running!')
+                clock.sleep(self.sleepTime)
+                try:
+                    self.checkChargingStage()
+                except (OSError, ValueError) as error:
+                    self.communicationGap(error)
+        finally:
+            self.chargingFinalize()
+        logger.debug('Charging thread class has been stopped!')
 
 
-class ShutdownOperation:
+class DischargingOperation(CommunicationGaps, threading.Thread):
     """
-        Shutdown Functional Operation
+        Discharging Functional Operation
         -----------------------------------------------------------------------------------------------------------------
         IPV4: Address of the desired device to start shutdown operation
         -----------------------------------------------------------------------------------------------------------------
-        ShutdownOperation(IPV4).limitShutdownValues() -> limits all limit set points (voltage, current and power) to zero.
+        sleeptime: Sleep time of the thread, every sleep time, charging state is being checked.
         -----------------------------------------------------------------------------------------------------------------
-        ShutdownOperation(IPV4).setShutdownValues() -> Sets all set points (voltage, current and power) to zero.
+        dischargeCurrent: Maximum discharging current set
         -----------------------------------------------------------------------------------------------------------------
-        ShutdownOperation(IPV4).setShutdownOutput() -> Sets the output to zero.
+        dischargeVoltage: Minimum voltage that battery can be discharged
+        -----------------------------------------------------------------------------------------------------------------
+        cutoffCurrent: Minimum current to decide stop discharging operation
         -----------------------------------------------------------------------------------------------------------------
     """
 
-    def __init__(self, IPV4):
+    def __init__(self, IPV4='0.0.0.0', sleepTime=10, dischargeCurrent=0.0, dischargeVoltage=0.0, cutoffCurrent=0.0,
+                 deamonState=True):
+        super().__init__()
         self.IPV4 = IPV4
+        self.sleepTime = sleepTime
+        self.dischargeCurrent = dischargeCurrent
+        self.dischargeVoltage = dischargeVoltage
+        self.cutoffCurrent = cutoffCurrent
+        self.deamonState = deamonState
+        self.setDaemon(self.deamonState)
+        self.gaps = 0
+        self._stop_event = threading.Event()
+        self.reconciler = StateReconciler.of(self.IPV4)
 
     def __str__(self):
-        return f'Shutdown Operation, for details print object.__doc__'
+        return f'Discharging Operation, for details print object.__doc__'
 
-    def limitShutdownValues(self):
-        SystemSubsystem(self.IPV4).SetVoltageLimit(0, 'ON')
-        SystemSubsystem(self.IPV4).ReadVoltageLimitSet()
-        SystemSubsystem(self.IPV4).SetCurrentLimit(0, 'ON')
-        SystemSubsystem(self.IPV4).ReadVoltageLimitSet()
-        SystemSubsystem(self.IPV4).SetNegativeCurrentLimit(0, 'ON')
-        SystemSubsystem(self.IPV4).ReadNegativeCurrentLimitSet()
-        SystemSubsystem(self.IPV4).SetPowerLimit(0, 'ON')
-        SystemSubsystem(self.IPV4).ReadPowerLimitSet()
-        SystemSubsystem(self.IPV4).SetNegativePowerLimit(0, 'ON')
-        SystemSubsystem(self.IPV4).ReadNegativePowerLimitSet()
+    def dischargingLimits(self):
+        return {'voltageLimit': (self.dischargeVoltage, 'ON'),
+                'negativeCurrentLimit': (self.dischargeCurrent - 10, 'ON'),
+                'negativePowerLimit': (self.dischargeVoltage * self.dischargeCurrent - 500, 'ON')}
 
-    def setShutdownValues(self):
-        SourceSubsystem(self.IPV4).SetVoltage(0)
-        SourceSubsystem(self.IPV4).ReadVoltageSet()
-        SourceSubsystem(self.IPV4).SetCurrent(0)
-        SourceSubsystem(self.IPV4).ReadCurrentSet()
-        SourceSubsystem(self.IPV4).SetNegativeCurrent(0)
-        SourceSubsystem(self.IPV4).ReadNegativeCurrentSet()
-        SourceSubsystem(self.IPV4).SetPower(0)
-        SourceSubsystem(self.IPV4).ReadPowerSet()
-        SourceSubsystem(self.IPV4).SetNegativePower(0)
-        SourceSubsystem(self.IPV4).ReadNegativePowerSet()
+    def dischargingValues(self):
+        return {'voltage': self.dischargeVoltage, 'negativeCurrent': self.dischargeCurrent,
+                'negativePower': self.dischargeCurrent * self.dischargeVoltage - 50}
 
-    def setShutdownOutput(self):
-        OutputSubsystem(self.IPV4).SetOutput(0)
-        OutputSubsystem(self.IPV4).ReadOutputSet()
+    def dischargingInitialize(self):
+        logger.debug('Discharging is being initialized!')
         SystemSubsystem(self.IPV4).HighlightFrontpanel()
+        self.reconciler.apply(self.dischargingLimits())
+        clock.sleep(1)
 
-    def removeLimitShutdownValues(self):
-        SystemSubsystem(self.IPV4).SetVoltageLimit(0, 'OFF')
-        SystemSubsystem(self.IPV4).ReadVoltageLimitSet()
-        SystemSubsystem(self.IPV4).SetCurrentLimit(0, 'OFF')
-        SystemSubsystem(self.IPV4).ReadVoltageLimitSet()
-        SystemSubsystem(self.IPV4).SetNegativeCurrentLimit(0, 'OFF')
-        SystemSubsystem(self.IPV4).ReadNegativeCurrentLimitSet()
-        SystemSubsystem(self.IPV4).SetPowerLimit(0, 'OFF')
-        SystemSubsystem(self.IPV4).ReadPowerLimitSet()
-        SystemSubsystem(self.IPV4).SetNegativePowerLimit(0, 'OFF')
-        SystemSubsystem(self.IPV4).ReadNegativePowerLimitSet()
+    def dischargingFinalize(self):
+        logger.debug(f'Discharging is being finalized!')
+        SystemSubsystem(self.IPV4).HighlightFrontpanel()
+        ShutdownOperation(self.IPV4).shutdown()
+        clock.sleep(1)
 
+    def outputInitialize(self):
+        self.reconciler.apply({'output': 1})
+        clock.sleep(1)
 
-class WatchdogOperation(threading.Thread):
+    def dischargingStage(self):
+        logger.debug('Discharging stage is started!')
+        self.reconciler.apply(self.dischargingValues())
+        clock.sleep(1)
+
+    def checkDischargingStage(self):
+        if MeasureSubsystem(self.IPV4).typed.MeasureCurrent() > self.cutoffCurrent:
+            self.stop()
+        else:
+            logger.debug('Discharging is still running!')
+
+    def stop(self):
+        logger.debug('Discharging stop event has been started!')
+        self._stop_event.set()
+
+    def run(self):
+        logger.debug('Discharging thread class has been started!')
+        try:
+            self.dischargingInitialize()
+            self.dischargingStage()
+            self.outputInitialize()
+            while not self._stop_event.is_set():
+                logger.debug('Discharging thread class is running!')
+                clock.sleep(self.sleepTime)
+                try:
+                    self.checkDischargingStage()
+                except (OSError, ValueError) as error:
+                    self.communicationGap(error)
+        finally:
+            self.dischargingFinalize()
+        logger.debug('Discharging thread class has been stopped!')
+
+
+class CyclingOperation(CommunicationGaps, threading.Thread):
     """
-        Watchdog Functional Operation
+        Charging Functional Operation
         -----------------------------------------------------------------------------------------------------------------
         IPV4: Address of the desired device to start shutdown operation
         -----------------------------------------------------------------------------------------------------------------
-        Timer: It is the set point for the watchdog operation, if watchdog time cannot be triggered withing this time
-        period, it will switch of the output of the delta for safety.
+        sleepTime: Sleep time of the thread, every sleep time, charging state is being checked.
         -----------------------------------------------------------------------------------------------------------------
-        Sleeptime: This thread operates at given time period and sleeps at that timeline for the rest of the main operation.
+        cycleTime: Total number of cycling the battery, charging and discharging (discharging and charging), it counts as one cycling!
         -----------------------------------------------------------------------------------------------------------------
-        Be careful while setting it that timer is higher than sleep time for proper operation.
+        bulkCurrent: Current setting for the bulk stage
         -----------------------------------------------------------------------------------------------------------------
-        If device fails with watch operation, it must be resetted manualy for safety reasons.
+        bulkVoltage: Voltage setting for the bulk stage
+        -----------------------------------------------------------------------------------------------------------------
+        absorptionCurrent: Current setting for the absorption stage, absorptionCurrent = 0.8 * bulkCurrent
+        -----------------------------------------------------------------------------------------------------------------
+        absorptionVoltage: Voltage setting for the absorption stage, absorptionVoltage = bulkVoltage
+        -----------------------------------------------------------------------------------------------------------------
+        floatCurrent: Current setting for the floating stage, floatCurrent =  0.02 * bulkCurrent
+        -----------------------------------------------------------------------------------------------------------------
+        floatVoltage: Voltage setting for the floating stage
+        -----------------------------------------------------------------------------------------------------------------
+        floatTime: Time setting for the floating stage timer, when it is done charging operation stops!
+        -----------------------------------------------------------------------------------------------------------------
+        dischargeCurrent: Maximum discharging current set
+        -----------------------------------------------------------------------------------------------------------------
+        dischargeVoltage: Minimum voltage that battery can be discharged
+        -----------------------------------------------------------------------------------------------------------------
+        cutoffCurrent: Minimum current to decide stop discharging operation
+        -----------------------------------------------------------------------------------------------------------------
+        afterChargingRestTime: Timer to decide rest time after charging part is done!
+        -----------------------------------------------------------------------------------------------------------------
+        afterDischargingRestTime: Timer to decide rest time after discharging part is done!
+        -----------------------------------------------------------------------------------------------------------------
+        startCharging: Flag to decide starting stage (if True -> Charging starts , if False -> Discharging starts!)
+        -----------------------------------------------------------------------------------------------------------------
+        There are three main logger types, be sure that one of them is being used especially Ah or Wh!
+        -----------------------------------------------------------------------------------------------------------------
+        cycleSteps() is the state machine as a generator yielding the seconds to wait, run() sleeps them and
+        CyclingEngine schedules many of them on one timer heap with a small worker pool.
+        -----------------------------------------------------------------------------------------------------------------
+        summaryStore: CycleSummaryStore receiving one summary row per completed charge and discharge half cycle, the
+        last one is kept at object.lastSummary. The row is committed before the next checkpoint is saved, so a resumed
+        run never misses it. Checks read MeasureSubsystem.snapshot.
+        -----------------------------------------------------------------------------------------------------------------
+        checkpointFile: Checkpoint of the state machine (stage flags, counter, stage and wait start times, half cycle
+        Ah/Wh) written atomically at every step. Stage flags change together with the settings of the stage, before its
+        settle time, so the checkpoint always names the stage the device is in. CyclingOperation.resume(checkpointFile)
+        continues a crashed run from its stage, only limits, set points and output which differ on the device are sent
+        again.
         -----------------------------------------------------------------------------------------------------------------
     """
+    settleTime = 1
 
-    def __init__(self, IPV4, timer, sleeptime, deamonState=True):
+    def __init__(self, IPV4='0.0.0.0', sleepTime=10, cycleTime=0, bulkCurrent=0.0, bulkVoltage=0.0, floatVoltage=0.0,
+                 floatTime=0.0, dischargeCurrent=0.0, dischargeVoltage=0.0, cutoffCurrent=0.0,
+                 afterChargingRestTime=30.0, afterDischargingRestTime=30.0, startCharging=True, deamonState=True,
+                 summaryStore=None, checkpointFile=None):
         super().__init__()
         self.IPV4 = IPV4
-        self.timer = timer * 1000
-        self.sleeptime = sleeptime
+        self.sleepTime = sleepTime
+        self.cycleTime = cycleTime
+        self.bulkCurrent = bulkCurrent
+        self.bulkVoltage = bulkVoltage
+        self.absorptionCurrent = self.bulkCurrent * 0.8
+        self.absorptionVoltage = self.bulkVoltage
+        self.floatCurrent = self.bulkCurrent * 0.01
+        self.floatVoltage = floatVoltage
+        self.floatTime = floatTime
+        self.bulkMode = True
+        self.absorptionMode = False
+        self.floatingMode = False
+        self.chargingMode = False
+        self.dischargingMode = False
+        self.chargingInitializeMode = False
+        self.dischargingInitializeMode = False
+        self.dischargeCurrent = dischargeCurrent
+        self.dischargeVoltage = dischargeVoltage
+        self.cutoffCurrent = cutoffCurrent
+        self.afterChargingRestTime = afterChargingRestTime
+        self.afterDischargingRestTime = afterDischargingRestTime
+        self.startCharging = startCharging
         self.deamonState = deamonState
-        self._stop_event = threading.Event()
+        self.counter = 0
+        self.bulkInfo = 0
+        self.absorptionInfo = 0
         self.setDaemon(self.deamonState)
+        self.gaps = 0
+        self.summaryStore = summaryStore
+        self.halfCycle = HalfCycleTracker()
+        self.lastSummary = None
+        self.serial = None
+        self.waiting = None
+        self.resumed = False
+        self.checkpoint = Checkpoint(checkpointFile) if checkpointFile else None
+        self.reconciler = StateReconciler.of(self.IPV4)
+        self._stop_event = threading.Event()
+
+    def __str__(self):
+        return f'Cycling Operation, for details print object.__doc__'
+
+    def chargingLimits(self):
+        return {'voltageLimit': (self.bulkVoltage, 'ON'), 'currentLimit': (self.bulkCurrent + 10, 'ON'),
+                'powerLimit': (self.bulkVoltage * self.bulkCurrent + 500, 'ON')}
+
+    def chargingValues(self, voltage, current):
+        return {'voltage': voltage, 'current': current, 'power': voltage * current + 50}
+
+    def dischargingLimits(self):
+        return {'voltageLimit': (self.dischargeVoltage, 'ON'),
+                'negativeCurrentLimit': (self.dischargeCurrent - 10, 'ON'),
+                'negativePowerLimit': (self.dischargeVoltage * self.dischargeCurrent - 100, 'ON')}
+
+    def dischargingValues(self):
+        return {'voltage': self.dischargeVoltage, 'negativeCurrent': self.dischargeCurrent,
+                'negativePower': self.dischargeCurrent * self.dischargeVoltage - 50}
+
+    def cyclingFinalize(self):
+        logger.debug(f'Cycling is being finalized!')
+        cprint.printFeedback(f'Cycling is being finalized!')
+        SystemSubsystem(self.IPV4).HighlightFrontpanel()
+        ShutdownOperation(self.IPV4).shutdown()
+
+    def outputInitialize(self):
+        logger.debug(f'Output is being initialized!')
+        cprint.printFeedback(f'Output is being initialized!')
+        self.reconciler.apply({'output': 1})
+
+    def chargingInitialize(self):
+        logger.debug('Charging is being initialized!')
+        cprint.printFeedback('Charging is being initialized!')
+        SystemSubsystem(self.IPV4).HighlightFrontpanel()
+        self.reconciler.apply(self.chargingLimits())
+
+    def chargingFinalize(self):
+        logger.debug('Charging is being finalized!')
+        cprint.printFeedback('Charging is being finalized!')
+        SystemSubsystem(self.IPV4).HighlightFrontpanel()
+        ShutdownOperation(self.IPV4).shutdown(limits=False)
+
+    def bulkStage(self):
+        logger.debug('Bulk Stage is Initialized!')
+        cprint.printFeedback('Bulk Stage is Initialized!')
+        self.reconciler.apply(self.chargingValues(self.bulkVoltage, self.bulkCurrent))
+
+    def absorptionStage(self):
+        logger.debug('Absorption Stage is Initialized!')
+        cprint.printFeedback('Absorption Stage is Initialized!')
+        self.reconciler.apply(self.chargingValues(self.absorptionVoltage, self.absorptionCurrent))
+
+    def floatingStage(self):
+        logger.debug('Floating Stage is Initialized!')
+        cprint.printFeedback('Floating Stage is Initialized!')
+        self.reconciler.apply(self.chargingValues(self.floatVoltage, self.floatCurrent))
+
+    def checkChargingStage(self):
+        snapshot = MeasureSubsystem(self.IPV4).snapshot()
+        self.halfCycle.update(snapshot)
+        current = snapshot.current
+        if current < self.absorptionCurrent and self.bulkMode:
+            self.absorptionStage()
+            self.halfCycle.enterStage('absorption', clock.time())
+            self.bulkMode = False
+            self.absorptionMode = True
+            yield self.settleTime
+        elif current < self.floatCurrent and self.absorptionMode:
+            self.floatingStage()
+            self.halfCycle.enterStage('float', clock.time())
+            self.absorptionMode = False
+            self.floatingMode = True
+            yield self.settleTime
+
+        if self.bulkMode:
+            logger.debug('Bulk Mode is active!')
+            if self.bulkInfo < 1:
+                cprint.printFeedback('Bulk Mode is active!')
+                self.bulkInfo += 1
+        elif self.absorptionMode:
+            logger.debug('Absorption Mode is active!')
+            if self.absorptionInfo < 1:
+                cprint.printFeedback('Absorption Mode is active!')
+        elif self.floatingMode:
+            logger.debug('Floating mode is active!')
+            cprint.printFeedback('Floating mode is active!')
+            logger.debug(f'Float time is: {self.floatTime}')
+            if not self.isWaiting('chargeRest'):
+                yield from self.wait('float', self.floatTime)
+                self.chargingFinalize()
+                self.halfCycle.enterStage('rest', clock.time())
+            yield from self.wait('chargeRest', self.afterChargingRestTime)
+            self.completeHalfCycle()
+            self.bulkMode = True
+            self.absorptionMode = False
+            self.floatingMode = False
+            self.chargingMode = False
+            if not self.startCharging:
+                self.counter += 1
+            self.dischargingInitializeMode = True
+
+    def dischargingInitialize(self):
+        logger.debug('Discharging is being initialized!')
+        cprint.printFeedback('Discharging is being initialized!')
+        SystemSubsystem(self.IPV4).HighlightFrontpanel()
+        self.reconciler.apply(self.dischargingLimits())
+
+    def dischargingStage(self):
+        logger.debug('Discharging stage is started!')
+        cprint.printFeedback('Discharging stage is started!')
+        self.reconciler.apply(self.dischargingValues())
+
+    def dischargingFinalize(self):
+        logger.debug('Charging is being finalized!')
+        cprint.printFeedback('Charging is being finalized!')
+        SystemSubsystem(self.IPV4).HighlightFrontpanel()
+        ShutdownOperation(self.IPV4).shutdown(limits=False)
+
+    def checkDischargingStage(self):
+        snapshot = MeasureSubsystem(self.IPV4).snapshot()
+        self.halfCycle.update(snapshot)
+        if self.isWaiting('dischargeRest') or snapshot.current > self.cutoffCurrent:
+            if not self.isWaiting('dischargeRest'):
+                self.dischargingFinalize()
+                self.halfCycle.enterStage('rest', clock.time())
+            yield from self.wait('dischargeRest', self.afterDischargingRestTime)
+            self.completeHalfCycle()
+            if self.startCharging:
+                self.counter += 1
+            self.dischargingMode = False
+            self.chargingInitializeMode = True
+        else:
+            logger.debug('Discharging is still running!')
 
-    def __str__(self):
-        return f'Watchdog Operation, for details print object.__doc__'
+    def deviceSerial(self):
+        try:
+            identification = SM15K(self.IPV4).Identification()
+        except OSError as error:
+            logger.warning(f'Serial of {self.IPV4} could not be read, address is used instead: {error}')
+            return self.IPV4
+        parts = identification.split(',')
+        return parts[2].strip() if len(parts) > 2 else identification.strip()
+
+    def completeHalfCycle(self):
+        self.lastSummary = self.halfCycle.finish(self.serial, self.IPV4, clock.time())
+        if self.summaryStore is not None:
+            self.summaryStore.add(self.lastSummary)
+            self.summaryStore.flush()
+        return self.lastSummary
+
+    def isWaiting(self, name):
+        return self.waiting is not None and self.waiting[0] == name
+
+    def wait(self, name, seconds):
+        """
+        Timed wait of the state machine, its start is checkpointed so a resumed wait only yields the remaining time
+        """
+        if not self.isWaiting(name):
+            self.waiting = (name, clock.time())
+            self.saveCheckpoint()
+        yield max(0.0, seconds - (clock.time() - self.waiting[1]))
+        self.waiting = None
+
+    parameters = ('IPV4', 'sleepTime', 'cycleTime', 'bulkCurrent', 'bulkVoltage', 'floatVoltage', 'floatTime',
+                  'dischargeCurrent', 'dischargeVoltage', 'cutoffCurrent', 'afterChargingRestTime',
+                  'afterDischargingRestTime', 'startCharging')
+    flags = ('bulkMode', 'absorptionMode', 'floatingMode', 'chargingMode', 'dischargingMode', 'chargingInitializeMode',
+             'dischargingInitializeMode', 'bulkInfo', 'absorptionInfo', 'counter', 'gaps', 'serial')
+
+    def checkpointState(self):
+        return {'parameters': {name: getattr(self, name) for name in CyclingOperation.parameters},
+                'flags': {name: getattr(self, name) for name in CyclingOperation.flags},
+                'waiting': self.waiting, 'halfCycle': self.halfCycle.state(), 'savedAt': clock.time()}
+
+    def saveCheckpoint(self):
+        if self.checkpoint is not None:
+            self.checkpoint.save(self.checkpointState())
+
+    @classmethod
+    def resume(cls, checkpointFile, **kwargs):
+        """
+        :param checkpointFile: Checkpoint written by a previous run
+        :param kwargs: Arguments which are not checkpointed (deamonState, summaryStore)
+        :return: Operation continuing the checkpointed run (not started), None if there is no checkpoint
+        """
+        state = Checkpoint(checkpointFile).load()
+        if state is None:
+            return None
+        operation = cls(**state['parameters'], checkpointFile=checkpointFile, **kwargs)
+        for name, value in state['flags'].items():
+            setattr(operation, name, value)
+        operation.waiting = tuple(state['waiting']) if state['waiting'] else None
+        operation.halfCycle.restore(state['halfCycle'])
+        operation.resumed = True
+        logger.debug(f'Cycling of {operation.IPV4} is resumed at {operation.state()} from {checkpointFile}!')
+        return operation
+
+    def desiredState(self):
+        """
+        :return: Reconciler settings (see StateReconciler) the device has in the checkpointed stage
+        """
+        if self.isWaiting('chargeRest') or self.isWaiting('dischargeRest'):
+            return {'output': 0}
+        if self.chargingMode:
+            if self.floatingMode:
+                voltage, current = self.floatVoltage, self.floatCurrent
+            elif self.absorptionMode:
+                voltage, current = self.absorptionVoltage, self.absorptionCurrent
+            else:
+                voltage, current = self.bulkVoltage, self.bulkCurrent
+            return dict(self.chargingLimits(), **self.chargingValues(voltage, current), output=1)
+        if self.dischargingMode:
+            return dict(self.dischargingLimits(), **self.dischargingValues(), output=1)
+        return {}
+
+    def restoreDeviceState(self):
+        """
+        Reads the live device state of the checkpointed stage and sends only the settings which differ
+        :return: Names of the settings which have been sent again
+        """
+        desired = self.desiredState()
+        if not desired:
+            return []
+        self.reconciler.refresh(desired)
+        sent = self.reconciler.apply(desired, diff=True)
+        logger.debug(f'Device state of {self.IPV4} has been restored, {len(sent)} settings have been sent again!')
+        return sent
 
     def stop(self):
-        logger.debug("Stop watchdog thread has been called!")
-        return self._stop_event.set()
+        logger.debug('Cycling thread class stop event has been started!')
+        cprint.printFeedback('Cycling thread class stop event has been started!')
+        self._stop_event.set()
 
-    def disableWatchdog(self):
-        return SystemSubsystem(self.IPV4).DisableWatchdog()
+    def cycleStep(self):
+        """
+        One step of the cycling state machine, it yields the seconds to wait before continuing
+        """
+        if self.counter < self.cycleTime:
+            if self.chargingInitializeMode:
+                cprint.printFeedback('Charging mode initialized!')
+                self.halfCycle.begin('charge', self.counter, clock.time())
+                self.chargingInitialize()
+                yield self.settleTime
+                self.bulkStage()
+                yield self.settleTime
+                self.outputInitialize()
+                self.halfCycle.enterStage('bulk', clock.time())
+                self.chargingInitializeMode = False
+                self.chargingMode = True
+                yield self.settleTime
+            elif self.chargingMode:
+                cprint.printFeedback('Charging mode is running!')
+                yield self.sleepTime
+                yield from self.checkChargingStage()
+            elif self.dischargingInitializeMode:
+                cprint.printFeedback('Discharging mode initialized!')
+                self.halfCycle.begin('discharge', self.counter, clock.time())
+                self.dischargingInitialize()
+                yield self.settleTime
+                self.dischargingStage()
+                yield self.settleTime
+                self.outputInitialize()
+                self.halfCycle.enterStage('discharge', clock.time())
+                self.dischargingInitializeMode = False
+                self.dischargingMode = True
+                yield self.settleTime
+            elif self.dischargingMode:
+                cprint.printFeedback('Discharging mode is running!')
+                yield self.sleepTime
+                yield from self.checkDischargingStage()
+        else:
+            self.stop()
 
-    def run(self):
-        logger.debug("Watchdog thread has been started!")
-        SystemSubsystem(self.IPV4).SetWatchdog(self.timer)
+    def cycleSteps(self):
+        """
+        Cycling state machine until it is stopped, it yields the seconds to wait (used by run and CyclingEngine)
+        """
+        if not self.resumed:
+            self.chargingInitializeMode = self.startCharging
+            self.dischargingInitializeMode = not self.startCharging
+        if self.serial is None:
+            self.serial = self.deviceSerial()
+        restored = not self.resumed
         while not self._stop_event.is_set():
-            logger.debug("Watchdog thread is running!")
-            time.sleep(self.sleeptime)
-            if float(SystemSubsystem(self.IPV4).ReadWatchdogSet()) != 0:
-                logger.debug('Watchdog is still active!')
-            else:
-                logger.debug('Watchdog has been failed!')
-                self.stop()
-        logger.debug("Watchdog thread has been stopped!")
+            try:
+                if not restored:
+                    self.restoreDeviceState()
+                    restored = True
+                for delay in self.cycleStep():
+                    self.saveCheckpoint()
+                    yield delay
+            except (OSError, ValueError) as error:
+                self.communicationGap(error)
+                yield self.sleepTime
+
+    def finalizeSteps(self):
+        self.cyclingFinalize()
+        if self.checkpoint is not None:
+            self.checkpoint.remove()
+        yield self.settleTime
+
+    def state(self):
+        if self._stop_event.is_set():
+            return 'stopped'
+        for name in ('chargingInitializeMode', 'chargingMode', 'dischargingInitializeMode', 'dischargingMode'):
+            if getattr(self, name):
+                return name[:-len('Mode')]
+        return 'idle'
+
+    def run(self):
+        logger.debug('Cycling thread class has been started!')
+        try:
+            for delay in self.cycleSteps():
+                clock.sleep(delay)
+        except BaseException:
+            self.cyclingFinalize()
+            raise
+        for delay in self.finalizeSteps():
+            clock.sleep(delay)
+        cprint.printFeedback('Cycling thread class has been stopped!')
 
 
-class BasicDataloggerOperation(threading.Thread):
+class CyclingEngine(threading.Thread):
     """
-        Basic Datalogger Functional Operation
-        -----------------------------------------------------------------------------------------------------------------
-        Its own class attribute dataframe is; dataFrameBasic = ['Voltage', 'Current', 'Power']
+        Cycling Engine Functional Operation
         -----------------------------------------------------------------------------------------------------------------
-        IPV4: Address of the desired device to start shutdown operation
+        operations: CyclingOperation objects (not started), one per device, more can be added while it runs.
         -----------------------------------------------------------------------------------------------------------------
-        loggingTime: It is also same with sleep time of the thread. Function will work at every logging time
+        workers: Number of worker threads advancing the machines, the device I/O of a step runs on them.
         -----------------------------------------------------------------------------------------------------------------
-        printColor: It is used for optional color printing for the logged data at terminal. Default color is green.
-        Note: Available colors are, purple, blue, cyan, green, yellow, red and normal
+        The engine thread only keeps the timers of the cycling state machines (CyclingOperation.cycleSteps) of all
+        devices on a heap and hands the machine that is due to a small worker pool. Every machine yields the time it
+        waits, so bulk, absorption, float, discharge and rest semantics and the per device counters are the ones of
+        CyclingOperation. A slow or unreachable device only holds its worker, no lock is held during its I/O, and one
+        machine is never advanced by two workers at once.
         -----------------------------------------------------------------------------------------------------------------
-        There are three main logger types, be sure that one of them is being used only!
+        add(operation), stopOperation(IPV4) and report() can be called from other threads.
         -----------------------------------------------------------------------------------------------------------------
     """
-    dataFrameBasic = ['Voltage', 'Current', 'Power']
-    fileName = 'BasicDatalogger'
 
-    def __init__(self, IPV4, loggingTime, printColor='green', deamonState=True):
+    def __init__(self, operations=(), workers=4, deamonState=True):
         super().__init__()
-        self.IPV4 = IPV4
-        self.printColor = printColor
-        self.loggingTime = loggingTime
+        self.operations = {}
+        self.failures = {}
+        self.workers = max(1, workers)
         self.deamonState = deamonState
         self.setDaemon(self.deamonState)
+        self._timers = []
+        self._due = {}
+        self._steps = {}
+        self._finalizing = set()
+        self._running = set()
+        self._stopping = set()
+        self._ready = queue.Queue()
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
         self._stop_event = threading.Event()
-        self.finalName = f'{BasicDataloggerOperation.fileName} {datetime.datetime.now().strftime("%d_%m_%Y-%H_%M_%S")}.txt'
-        open(f'{self.finalName}', "w+").close()
-        BasicDataloggerOperation.dataFrameBasic.insert(0, 'Timestamp')
+        for operation in operations:
+            self.add(operation)
 
     def __str__(self):
-        return f'Basic Datalogger Operation, for details print object.__doc__'
+        return f'Cycling Engine of {len(self.operations)} devices, for details print object.__doc__'
+
+    def schedule(self, IPV4, delay):
+        wake = clock.monotonic() + delay
+        self._sequence += 1
+        self._due[IPV4] = wake
+        heapq.heappush(self._timers, (wake, self._sequence, IPV4))
+
+    def add(self, operation):
+        with self._lock:
+            if operation.IPV4 in self._running:
+                raise ValueError(f'Cycling of {operation.IPV4} is still running in the engine!')
+            self.operations[operation.IPV4] = operation
+            self._steps[operation.IPV4] = operation.cycleSteps()
+            self._finalizing.discard(operation.IPV4)
+            self.schedule(operation.IPV4, 0.0)
+        self._wakeup.set()
+        logger.debug(f'Cycling of {operation.IPV4} has been added to the engine!')
+
+    def stopOperation(self, IPV4):
+        with self._lock:
+            if IPV4 not in self._steps or IPV4 in self._finalizing:
+                return
+            if IPV4 in self._running:
+                self.operations[IPV4].stop()
+                self._stopping.add(IPV4)
+                return
+            self.finalize(IPV4)
+        self._wakeup.set()
+
+    def report(self):
+        """
+        :return: Dictionary of state, finished cycles and communication gaps per device
+        """
+        with self._lock:
+            return {IPV4: {'state': operation.state(), 'cycles': operation.counter, 'gaps': operation.gaps,
+                           'running': IPV4 in self._steps, 'error': self.failures.get(IPV4)}
+                    for IPV4, operation in self.operations.items()}
+
+    def finalize(self, IPV4):
+        operation = self.operations[IPV4]
+        operation.stop()
+        self._steps[IPV4].close()
+        self._steps[IPV4] = operation.finalizeSteps()
+        self._finalizing.add(IPV4)
+        self.schedule(IPV4, 0.0)
+
+    def advance(self, IPV4):
+        with self._lock:
+            steps = self._steps[IPV4]
+        delay = None
+        try:
+            delay = next(steps)
+        except StopIteration:
+            pass
+        except Exception as error:
+            with self._lock:
+                self.failures[IPV4] = repr(error)
+            logger.error(f'Cycling of {IPV4} has been failed: {error!r}')
+            cprint.printError(f'Cycling of {IPV4} has been failed: {error!r}')
+        with self._lock:
+            self._running.discard(IPV4)
+            stopping = IPV4 in self._stopping
+            self._stopping.discard(IPV4)
+            if delay is not None and not stopping:
+                self.schedule(IPV4, delay)
+            elif IPV4 in self._finalizing:
+                self.finished(IPV4)
+            else:
+                self.finalize(IPV4)
+        self._wakeup.set()
 
-    def csvLogger(self):
-        csvFile = open(self.finalName, 'a', newline='')
-        write = csv.writer(csvFile)
-        write.writerow(BasicDataloggerOperation.dataFrameBasic)
-        csvFile.close()
-        BasicDataloggerOperation.dataFrameBasic[0] = time.strftime('%d-%m-%Y %H:%M:%S')
-        return BasicDataloggerOperation.dataFrameBasic
+    def finished(self, IPV4):
+        del self._steps[IPV4]
+        self._finalizing.discard(IPV4)
+        logger.debug(f'Cycling of {IPV4} has been finished!')
 
-    def updateBasicDataFrame(self):
-        BasicDataloggerOperation.dataFrameBasic[1] = MeasureSubsystem(self.IPV4).MeasureVoltage()
-        BasicDataloggerOperation.dataFrameBasic[2] = MeasureSubsystem(self.IPV4).MeasureCurrent()
-        BasicDataloggerOperation.dataFrameBasic[3] = MeasureSubsystem(self.IPV4).MeasurePower()
-        logger.debug(
-            f'Voltage: {BasicDataloggerOperation.dataFrameBasic[1]}V, Current: {BasicDataloggerOperation.dataFrameBasic[2]}A, '
-            f'Power: {BasicDataloggerOperation.dataFrameBasic[3]}W')
-        cprint.printColorful(
-            f'Voltage: {BasicDataloggerOperation.dataFrameBasic[1]}V, Current: {BasicDataloggerOperation.dataFrameBasic[2]}A, '
-            f'Power: {BasicDataloggerOperation.dataFrameBasic[3]}W', self.printColor)
-        return BasicDataloggerOperation.dataFrameBasic
+    def worker(self):
+        while True:
+            IPV4 = self._ready.get()
+            if IPV4 is None:
+                return
+            self.advance(IPV4)
 
     def stop(self):
-        logger.debug('Datalogger stop event has been started!')
+        logger.debug('Cycling engine stop event has been started!')
+        for IPV4 in list(self.operations):
+            self.stopOperation(IPV4)
         self._stop_event.set()
+        self._wakeup.set()
 
     def run(self):
-        logger.debug('Datalogger thread class has been started!')
-        while not self._stop_event.is_set():
-            logger.debug('Datalogger thread class for basic dataframe is running!')
-            self.csvLogger()
-            self.updateBasicDataFrame()
-            time.sleep(self.loggingTime)
-        logger.debug('Datalogger thread class has been stopped!')
+        logger.debug('Cycling engine has been started!')
+        workers = [threading.Thread(target=self.worker, name=f'SM15K-cycling-{index}', daemon=True)
+                   for index in range(self.workers)]
+        for worker in workers:
+            worker.start()
+        while True:
+            with self._lock:
+                while self._timers and self._due.get(self._timers[0][2]) != self._timers[0][0]:
+                    heapq.heappop(self._timers)
+                if not self._steps and self._stop_event.is_set():
+                    break
+                delay = None
+                if self._timers:
+                    wake, _, IPV4 = self._timers[0]
+                    delay = wake - clock.monotonic()
+                    if delay <= 0:
+                        heapq.heappop(self._timers)
+                        del self._due[IPV4]
+                        if IPV4 in self._steps:
+                            self._running.add(IPV4)
+                            self._ready.put(IPV4)
+                        continue
+            clock.wait(self._wakeup, delay)
+            self._wakeup.clear()
+        for _ in workers:
+            self._ready.put(None)
+        for worker in workers:
+            worker.join()
+        logger.debug('Cycling engine has been stopped!')
+
+
+class RecipeError(ValueError):
+    """
+    Raised when a recipe is malformed or does not fit the device, problems lists every problem that has been found.
+    """
+
+    def __init__(self, problems):
+        self.problems = list(problems)
+        super().__init__('Recipe is not valid: ' + '; '.join(self.problems))
+
 
+RecipeStep = collections.namedtuple('RecipeStep', ['index', 'name', 'kind', 'compiled', 'checks', 'interval',
+                                                   'target', 'count'])
 
-class AhDataloggerOperation(threading.Thread):
+
+class Recipe:
     """
-        Ah Datalogger Functional Operation
+        Declarative Test Recipe
         -----------------------------------------------------------------------------------------------------------------
-        Its own class attribute dataframe is; dataFrameAh = ['Voltage', 'Current', 'Power', 'PositiveAh', 'NegativeAh', 'AhSeconds', 'AhHours']
+        definition: Dictionary of the recipe, Recipe.load(fileName) reads it from a .json or .toml (Python 3.11+) file.
         -----------------------------------------------------------------------------------------------------------------
-        IPV4: Address of the desired device to start shutdown operation
+        name: Name of the recipe. limits: Device limits switched ON before the first step, keys are voltage, current,
+        negativeCurrent, power and negativePower. logging: interval (seconds between checks, 10) and database (SQLite
+        file of the checked measurement snapshots, optional).
         -----------------------------------------------------------------------------------------------------------------
-        loggingTime: It is also same with sleep time of the thread. Function will work at every logging time
+        steps: List of steps, every step has a type, an optional name and interval and an until dictionary.
+            cc -> current (positive charges, negative discharges), voltage (ceiling or floor), power (optional)
+            cv -> voltage, current (optional, maximum of the device) and negativeCurrent (optional, 0)
+            cp -> power (positive charges, negative discharges), voltage (ceiling or floor), current (optional)
+            rest -> output off
+            loop -> to (index or name of an earlier step) and count (runs of the block in total)
         -----------------------------------------------------------------------------------------------------------------
-        printColor: It is used for optional color printing for the logged data at terminal. Default color is green.
-        Note: Available colors are, purple, blue, cyan, green, yellow, red and normal
+        until: A step ends when any of its conditions holds, e.g. {'voltage': '>= 14.4', 'current': '< 2'}. Quantities
+        are voltage, current, power, temperature (measured), ah, wh (signed, integrated over the step) and time
+        (seconds in the step, a plain number means '>=').
         -----------------------------------------------------------------------------------------------------------------
-        There are three main logger types, be sure that one of them is being used only especially Ah vs Wh!
+        validate(capabilities): Raises RecipeError listing every problem, capabilities are the maxima of the device
+        read by Recipe.capabilities(IPV4). Without capabilities only the structure is checked.
+        -----------------------------------------------------------------------------------------------------------------
+        compile(reconciler, capabilities): Tuple of RecipeStep with the precompiled command batch (StateReconciler
+        compile) and condition checks of every step, so running a recipe only sends and compares.
         -----------------------------------------------------------------------------------------------------------------
     """
-    dataFrameAh = ['Voltage', 'Current', 'Power', 'PositiveAh', 'NegativeAh', 'AhSeconds', 'AhHours']
-    fileName = 'AhDatalogger'
-
-    def __init__(self, IPV4, loggingTime, printColor='green', deamonState=True):
-        super().__init__()
-        self.IPV4 = IPV4
-        self.loggingTime = loggingTime
-        self.printColor = printColor
-        self.deamonState = deamonState
-        self.setDaemon(self.deamonState)
-        self._stop_event = threading.Event()
-        self.finalName = f'{AhDataloggerOperation.fileName} {datetime.datetime.now().strftime("%d_%m_%Y-%H_%M_%S")}.txt'
-        open(f'{self.finalName}', "w+").close()
-        AhDataloggerOperation.dataFrameAh.insert(0, 'Timestamp')
+    stepKinds = ('cc', 'cv', 'cp', 'rest', 'loop')
+    required = {'cc': ('current', 'voltage'), 'cv': ('voltage',), 'cp': ('power', 'voltage'), 'rest': (),
+                'loop': ('to', 'count')}
+    optional = {'cc': ('power',), 'cv': ('current', 'negativeCurrent'), 'cp': ('current',), 'rest': (), 'loop': ()}
+    quantities = ('voltage', 'current', 'power', 'temperature', 'ah', 'wh', 'time')
+    comparisons = collections.OrderedDict((('<=', operator.le), ('>=', operator.ge), ('<', operator.lt),
+                                           ('>', operator.gt)))
+    capabilityQueries = collections.OrderedDict((
+        ('voltage', 'SOURce:VOLtage:MAXimum?'), ('current', 'SOURce:CURrent:MAXimum?'),
+        ('negativeCurrent', 'SOURce:CURrent:NEGative:MAXimum?'), ('power', 'SOURce:POWer:MAXimum?'),
+        ('negativePower', 'SOURce:POWer:NEGative:MAXimum?')))
+    defaultInterval = 10
+
+    def __init__(self, definition):
+        self.definition = definition
+        self.name = definition.get('name', 'recipe')
+        self.limits = definition.get('limits', {})
+        self.logging = definition.get('logging', {})
+        self.steps = definition.get('steps', [])
+        self.interval = self.logging.get('interval', Recipe.defaultInterval)
 
     def __str__(self):
-        return f'Ah Datalogger Operation, for details print object.__doc__'
-
-    def csvLogger(self):
-        csvFile = open(self.finalName, 'a', newline='')
-        write = csv.writer(csvFile)
-        write.writerow(AhDataloggerOperation.dataFrameAh)
-        csvFile.close()
-        AhDataloggerOperation.dataFrameAh[0] = time.strftime('%d-%m-%Y %H:%M:%S')
-        return AhDataloggerOperation.dataFrameAh
+        return f'Recipe {self.name} of {len(self.steps)} steps, for details print object.__doc__'
+
+    @classmethod
+    def load(cls, fileName):
+        if fileName.lower().endswith('.toml'):
+            if tomllib is None:
+                raise RecipeError([f'{fileName} can not be read, TOML recipes need tomllib (Python 3.11+)'])
+            with open(fileName, 'rb') as file:
+                return cls(tomllib.load(file))
+        with open(fileName) as file:
+            return cls(json.load(file))
 
-    def updateAhDataFrame(self):
-        AhDataloggerOperation.dataFrameAh[1] = MeasureSubsystem(self.IPV4).MeasureVoltage()
-        AhDataloggerOperation.dataFrameAh[2] = MeasureSubsystem(self.IPV4).MeasureCurrent()
-        AhDataloggerOperation.dataFrameAh[3] = MeasureSubsystem(self.IPV4).MeasurePower()
-        AhDataloggerOperation.dataFrameAh[4] = MeasureSubsystem(self.IPV4).MeasureAhPositiveTotal()
-        AhDataloggerOperation.dataFrameAh[5] = MeasureSubsystem(self.IPV4).MeasureAhNegativeTotal()
-        AhDataloggerOperation.dataFrameAh[6] = MeasureSubsystem(self.IPV4).ReadAhMeasurementTimeSeconds()
-        AhDataloggerOperation.dataFrameAh[7] = MeasureSubsystem(self.IPV4).ReadAhMeasurementTimeHours()
-        logger.debug(
-            f'Voltage: {AhDataloggerOperation.dataFrameAh[1]}V, Current: {AhDataloggerOperation.dataFrameAh[2]}A, '
-            f'Power: {AhDataloggerOperation.dataFrameAh[3]}W, PositiveAh: {AhDataloggerOperation.dataFrameAh[4]}, '
-            f'NegativeAh: {AhDataloggerOperation.dataFrameAh[5]}, AhSeconds: {AhDataloggerOperation.dataFrameAh[6]} '
-            f'AhHours: {AhDataloggerOperation.dataFrameAh[7]}')
-        cprint.printColorful(
-            f'Voltage: {AhDataloggerOperation.dataFrameAh[1]}V, Current: {AhDataloggerOperation.dataFrameAh[2]}A, '
-            f'Power: {AhDataloggerOperation.dataFrameAh[3]}W, PositiveAh: {AhDataloggerOperation.dataFrameAh[4]}, '
-            f'NegativeAh: {AhDataloggerOperation.dataFrameAh[5]}, AhSeconds: {AhDataloggerOperation.dataFrameAh[6]} '
-            f'AhHours: {AhDataloggerOperation.dataFrameAh[7]}', self.printColor)
-        return AhDataloggerOperation.dataFrameAh
-
-    def stop(self):
-        logger.debug('Datalogger stop event has been started!')
-        self._stop_event.set()
-
-    def run(self):
-        logger.debug('Datalogger thread class has been started!')
-        MeasureSubsystem(self.IPV4).SetAhMeasurementState('ON')
-        while not self._stop_event.is_set():
-            logger.debug('Datalogger thread class for Ah dataframe is running!')
-            self.csvLogger()
-            self.updateAhDataFrame()
-            time.sleep(self.loggingTime)
-        logger.debug('Datalogger thread class has been stopped!')
+    @staticmethod
+    def capabilities(IPV4):
+        """
+        :return: Dictionary of the (absolute) maximum voltage, current, negativeCurrent, power and negativePower
+        """
+        values = Communication.queryBatch(IPV4, list(Recipe.capabilityQueries.values()))
+        return {name: abs(float(value)) for name, value in zip(Recipe.capabilityQueries, values)}
 
+    @staticmethod
+    def isNumber(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
 
-class WhDataloggerOperation(threading.Thread):
+    @staticmethod
+    def parseCondition(quantity, condition):
+        """
+        :return: (comparison function, threshold) of a condition such as '>= 14.4'
+        """
+        if Recipe.isNumber(condition):
+            if quantity != 'time':
+                raise ValueError(f'{quantity} condition {condition!r} has no comparison, e.g. ">= {condition}"')
+            return operator.ge, float(condition)
+        text = str(condition).strip()
+        for symbol, function in Recipe.comparisons.items():
+            if text.startswith(symbol):
+                try:
+                    return function, float(text[len(symbol):])
+                except ValueError:
+                    raise ValueError(f'{quantity} condition {condition!r} has no number after {symbol}') from None
+        raise ValueError(f'{quantity} condition {condition!r} does not start with <, <=, > or >=')
+
+    def stepName(self, index):
+        step = self.steps[index]
+        return str(step.get('name', f'{index}:{step.get("type")}')) if isinstance(step, dict) else str(index)
+
+    def loopTarget(self, step):
+        target = step.get('to')
+        if isinstance(target, str):
+            names = [self.stepName(index) for index in range(len(self.steps))]
+            return names.index(target) if target in names else None
+        return target if isinstance(target, int) and not isinstance(target, bool) else None
+
+    def settings(self, step, capabilities):
+        """
+        :return: StateReconciler settings of a step, missing optional values are the maxima of the device
+        """
+        kind = step['type']
+        if kind == 'rest':
+            return {'output': 0}
+        voltage = step['voltage']
+        if kind == 'cc':
+            current = step['current']
+            if current >= 0:
+                return {'voltage': voltage, 'current': current, 'negativeCurrent': 0,
+                        'power': abs(step.get('power', capabilities['power'])), 'output': 1}
+            return {'voltage': voltage, 'current': 0, 'negativeCurrent': -abs(current),
+                    'negativePower': -abs(step.get('power', capabilities['negativePower'])), 'output': 1}
+        if kind == 'cv':
+            return {'voltage': voltage, 'current': abs(step.get('current', capabilities['current'])),
+                    'negativeCurrent': -abs(step.get('negativeCurrent', 0)), 'power': capabilities['power'],
+                    'negativePower': -capabilities['negativePower'], 'output': 1}
+        power = step['power']
+        if power >= 0:
+            return {'voltage': voltage, 'current': abs(step.get('current', capabilities['current'])),
+                    'negativeCurrent': 0, 'power': power, 'output': 1}
+        return {'voltage': voltage, 'current': 0,
+                'negativeCurrent': -abs(step.get('current', capabilities['negativeCurrent'])), 'negativePower': power,
+                'output': 1}
+
+    def limitState(self):
+        return {f'{name}Limit': (value, 'ON') for name, value in self.limits.items()}
+
+    def problems(self, capabilities=None):
+        """
+        :return: List of every structural problem and, with capabilities, every value the device can not reach
+        """
+        problems = []
+        if not isinstance(self.steps, list) or not self.steps:
+            return ['steps must be a non empty list']
+        for name, value in self.limits.items():
+            if name not in Recipe.capabilityQueries:
+                problems.append(f'limit {name} is unknown, use one of {", ".join(Recipe.capabilityQueries)}')
+            elif not Recipe.isNumber(value):
+                problems.append(f'limit {name} must be a number')
+            elif capabilities is not None and abs(value) > capabilities[name]:
+                problems.append(f'limit {name} {value} exceeds the device maximum {capabilities[name]}')
+        if not Recipe.isNumber(self.interval) or self.interval <= 0:
+            problems.append('logging interval must be a positive number')
+        names = [self.stepName(index) for index in range(len(self.steps))]
+        for index, step in enumerate(self.steps):
+            label = f'step {names[index]}'
+            if not isinstance(step, dict) or step.get('type') not in Recipe.stepKinds:
+                problems.append(f'{label} must have a type of {", ".join(Recipe.stepKinds)}')
+                continue
+            kind = step['type']
+            if names.count(names[index]) > 1:
+                problems.append(f'{label} has a name which is used more than once')
+            for field in Recipe.required[kind]:
+                if field not in step:
+                    problems.append(f'{label} needs {field}')
+            for field in Recipe.required[kind] + Recipe.optional[kind]:
+                if field in step and field != 'to' and not Recipe.isNumber(step[field]):
+                    problems.append(f'{label} {field} must be a number')
+            if 'interval' in step and (not Recipe.isNumber(step['interval']) or step['interval'] <= 0):
+                problems.append(f'{label} interval must be a positive number')
+            if kind == 'loop':
+                target = self.loopTarget(step)
+                if target is None or not 0 <= target < index or self.steps[target].get('type') == 'loop':
+                    problems.append(f'{label} must go to an earlier step which is not a loop')
+                if 'count' in step and (not isinstance(step['count'], int) or step['count'] < 1):
+                    problems.append(f'{label} count must be an integer of at least 1')
+                continue
+            until = step.get('until')
+            if not isinstance(until, dict) or not until:
+                problems.append(f'{label} needs an until dictionary of at least one condition')
+                until = {}
+            for quantity, condition in until.items():
+                if quantity not in Recipe.quantities:
+                    problems.append(f'{label} condition {quantity} is unknown, '
+                                    f'use one of {", ".join(Recipe.quantities)}')
+                    continue
+                try:
+                    Recipe.parseCondition(quantity, condition)
+                except ValueError as error:
+                    problems.append(f'{label} {error}')
+            if capabilities is None or any(field not in step or not Recipe.isNumber(step[field])
+                                           for field in Recipe.required[kind]):
+                continue
+            for name, value in self.settings(step, capabilities).items():
+                if name == 'output':
+                    continue
+                if (name == 'voltage' and value < 0) or abs(value) > capabilities[name]:
+                    problems.append(f'{label} {name} {value} is out of the device range 0..{capabilities[name]}')
+                elif name in self.limits and Recipe.isNumber(self.limits[name]) and abs(value) > abs(self.limits[name]):
+                    problems.append(f'{label} {name} {value} exceeds the recipe limit {self.limits[name]}')
+        return problems
+
+    def validate(self, capabilities=None):
+        problems = self.problems(capabilities)
+        if problems:
+            raise RecipeError(problems)
+        return self
+
+    def compile(self, reconciler, capabilities):
+        """
+        :param reconciler: StateReconciler of the device, it builds the step rounded command batches
+        :param capabilities: Maxima of the device, see Recipe.capabilities
+        :return: Tuple of RecipeStep, loop steps have the target index and count instead of a batch
+        """
+        self.validate(capabilities)
+        steps = []
+        for index, step in enumerate(self.steps):
+            name = self.stepName(index)
+            if step['type'] == 'loop':
+                steps.append(RecipeStep(index, name, 'loop', None, (), 0, self.loopTarget(step), step['count']))
+                continue
+            checks = tuple((quantity,) + Recipe.parseCondition(quantity, condition)
+                           for quantity, condition in step['until'].items())
+            steps.append(RecipeStep(index, name, step['type'], reconciler.compile(self.settings(step, capabilities)),
+                                    checks, step.get('interval', self.interval), None, None))
+        return tuple(steps)
+
+
+class RecipeOperation(CommunicationGaps, threading.Thread):
     """
-        Ah Datalogger Functional Operation
+        Recipe Functional Operation
         -----------------------------------------------------------------------------------------------------------------
-        Its own class attribute dataframe is; dataFrameWh = ['Voltage', 'Current', 'Power', 'PositiveWh', 'NegativeWh', 'WhSeconds', 'WhHours']
+        IPV4: Address of the device running the recipe
         -----------------------------------------------------------------------------------------------------------------
-        IPV4: Address of the desired device to start shutdown operation
+        recipe: Recipe object, recipe dictionary or .json/.toml file name, see Recipe
         -----------------------------------------------------------------------------------------------------------------
-        loggingTime: It is also same with sleep time of the thread. Function will work at every logging time
+        database: SampleDatabase receiving the MeasurementSnapshot of every check (optional), if it is not given and
+        the recipe logging has a database file, the operation opens and closes its own SampleDatabase.
         -----------------------------------------------------------------------------------------------------------------
-        printColor: It is used for optional color printing for the logged data at terminal. Default color is green.
-        Note: Available colors are, purple, blue, cyan, green, yellow, red and normal
+        capabilities: Maxima of the device (optional), read from the device when the operation starts if not given.
         -----------------------------------------------------------------------------------------------------------------
-        There are three main logger types, be sure that one of them is being used only especially Ah vs Wh!
+        The recipe is validated and compiled once when the operation starts (RecipeError stops it before anything is
+        sent), a transition sends the precompiled batch of the step and a check compares one snapshot with the
+        precompiled conditions. cycleSteps() and finalizeSteps() yield the seconds to wait like CyclingOperation, so
+        one CyclingEngine can run the recipes of many devices.
+        -----------------------------------------------------------------------------------------------------------------
+        counter: Finished loop runs, stepName and stepIndex: Running step, stepAh and stepWh: Integrated in the step,
+        endReason: Quantity which ended the last step.
         -----------------------------------------------------------------------------------------------------------------
     """
-    dataFrameWh = ['Voltage', 'Current', 'Power', 'PositiveWh', 'NegativeWh', 'WhSeconds', 'WhHours']
-    fileName = 'WhDatalogger'
+    settleTime = 1
 
-    def __init__(self, IPV4, loggingTime, printColor='green', deamonState=True):
+    def __init__(self, IPV4='0.0.0.0', recipe=None, database=None, capabilities=None, deamonState=True):
         super().__init__()
         self.IPV4 = IPV4
-        self.loggingTime = loggingTime
-        self.printColor = printColor
+        if isinstance(recipe, str):
+            recipe = Recipe.load(recipe)
+        elif isinstance(recipe, dict):
+            recipe = Recipe(recipe)
+        self.recipe = recipe
+        self.database = database
+        self.ownDatabase = False
+        self.capabilities = capabilities
         self.deamonState = deamonState
         self.setDaemon(self.deamonState)
+        self.reconciler = StateReconciler.of(self.IPV4)
+        self.measure = MeasureSubsystem(self.IPV4)
+        self.steps = None
+        self.stepIndex = None
+        self.stepName = None
+        self.stepStart = None
+        self.stepAh = 0.0
+        self.stepWh = 0.0
+        self.endReason = None
+        self.lastSnapshot = None
+        self.counter = 0
+        self.gaps = 0
         self._stop_event = threading.Event()
-        self.finalName = f'{WhDataloggerOperation.fileName} {datetime.datetime.now().strftime("%d_%m_%Y-%H_%M_%S")}.txt'
-        open(f'{self.finalName}', "w+").close()
-        WhDataloggerOperation.dataFrameWh.insert(0, 'Timestamp')
 
     def __str__(self):
-        return f'Wh Datalogger Operation, for details print object.__doc__'
-
-    def csvLogger(self):
-        csvFile = open(self.finalName, 'a', newline='')
-        write = csv.writer(csvFile)
-        write.writerow(WhDataloggerOperation.dataFrameWh)
-        csvFile.close()
-        WhDataloggerOperation.dataFrameWh[0] = time.strftime('%d-%m-%Y %H:%M:%S')
-        return WhDataloggerOperation.dataFrameWh
-
-    def updateWhDataFrame(self):
-        WhDataloggerOperation.dataFrameWh[1] = MeasureSubsystem(self.IPV4).MeasureVoltage()
-        WhDataloggerOperation.dataFrameWh[2] = MeasureSubsystem(self.IPV4).MeasureCurrent()
-        WhDataloggerOperation.dataFrameWh[3] = MeasureSubsystem(self.IPV4).MeasurePower()
-        WhDataloggerOperation.dataFrameWh[4] = MeasureSubsystem(self.IPV4).MeasureWhPositiveTotal()
-        WhDataloggerOperation.dataFrameWh[5] = MeasureSubsystem(self.IPV4).MeasureWhNegativeTotal()
-        WhDataloggerOperation.dataFrameWh[6] = MeasureSubsystem(self.IPV4).ReadWhMeasurementTimeSeconds()
-        WhDataloggerOperation.dataFrameWh[7] = MeasureSubsystem(self.IPV4).ReadWhMeasurementTimeHours()
-        logger.debug(
-            f'Voltage: {WhDataloggerOperation.dataFrameWh[1]}V, Current: {WhDataloggerOperation.dataFrameWh[2]}A, '
-            f'Power: {WhDataloggerOperation.dataFrameWh[3]}W, PositiveWh: {WhDataloggerOperation.dataFrameWh[4]}, '
-            f'NegativeWh: {WhDataloggerOperation.dataFrameWh[5]}, WhHours: {WhDataloggerOperation.dataFrameWh[6]}, '
-            f'WhSeconds: {WhDataloggerOperation.dataFrameWh[7]}, WhHours: {WhDataloggerOperation.dataFrameWh[6]}')
-        cprint.printColorful(
-            f'Voltage: {WhDataloggerOperation.dataFrameWh[1]}V, Current: {WhDataloggerOperation.dataFrameWh[2]}A, '
-            f'Power: {WhDataloggerOperation.dataFrameWh[3]}W, PositiveWh: {WhDataloggerOperation.dataFrameWh[4]}, '
-            f'NegativeWh: {WhDataloggerOperation.dataFrameWh[5]}, WhHours: {WhDataloggerOperation.dataFrameWh[6]}, '
-            f'WhSeconds: {WhDataloggerOperation.dataFrameWh[7]}, WhHours: {WhDataloggerOperation.dataFrameWh[6]}',
-            self.printColor)
-        return WhDataloggerOperation.dataFrameWh
+        return f'Recipe Operation, for details print object.__doc__'
+
+    def prepare(self):
+        if self.capabilities is None:
+            self.capabilities = Recipe.capabilities(self.IPV4)
+        self.steps = self.recipe.compile(self.reconciler, self.capabilities)
+        if self.database is None and self.recipe.logging.get('database'):
+            self.database = SampleDatabase(self.recipe.logging['database'], deamonState=self.deamonState)
+            self.database.start()
+            self.ownDatabase = True
+        limits = self.recipe.limitState()
+        if limits:
+            self.reconciler.apply(limits)
+        logger.debug(f'Recipe {self.recipe.name} of {self.IPV4} has been compiled into {len(self.steps)} steps!')
+
+    def enterStep(self, step):
+        self.reconciler.send(step.compiled)
+        self.stepIndex = step.index
+        self.stepName = step.name
+        self.stepStart = clock.time()
+        self.stepAh = 0.0
+        self.stepWh = 0.0
+        self.lastSnapshot = None
+        logger.debug(f'Recipe step {step.name} of {self.IPV4} has been started!')
+        cprint.printFeedback(f'Recipe step {step.name} of {self.IPV4} has been started!')
+
+    def value(self, quantity, snapshot):
+        if quantity == 'time':
+            return clock.time() - self.stepStart
+        if quantity == 'ah':
+            return self.stepAh
+        if quantity == 'wh':
+            return self.stepWh
+        return getattr(snapshot, quantity)
+
+    def check(self, step):
+        """
+        :return: Quantity of the first condition which holds, None if the step goes on
+        """
+        snapshot = self.measure.snapshot()
+        last = self.lastSnapshot
+        if last is not None:
+            hours = (snapshot.timestamp - last.timestamp) / 3600
+            self.stepAh += (snapshot.current + last.current) / 2 * hours
+            self.stepWh += (snapshot.power + last.power) / 2 * hours
+        self.lastSnapshot = snapshot
+        if self.database is not None:
+            self.database.write(self.IPV4, snapshot)
+        for quantity, function, threshold in step.checks:
+            if function(self.value(quantity, snapshot), threshold):
+                return quantity
+        return None
 
     def stop(self):
-        logger.debug('Datalogger stop event has been started!')
+        logger.debug('Recipe thread class stop event has been started!')
         self._stop_event.set()
 
+    def cycleSteps(self):
+        """
+        Recipe steps until the last one ends or the operation is stopped, it yields the seconds to wait
+        """
+        while self.steps is None and not self._stop_event.is_set():
+            try:
+                self.prepare()
+            except RecipeError:
+                raise
+            except (OSError, ValueError) as error:
+                self.communicationGap(error)
+                yield self.recipe.interval
+        index = 0
+        runs = {}
+        while not self._stop_event.is_set() and index < len(self.steps):
+            step = self.steps[index]
+            if step.kind == 'loop':
+                self.counter += 1
+                remaining = runs.get(index, step.count) - 1
+                if remaining > 0:
+                    runs[index] = remaining
+                    index = step.target
+                else:
+                    runs.pop(index, None)
+                    index += 1
+                continue
+            try:
+                self.enterStep(step)
+            except (OSError, ValueError) as error:
+                self.communicationGap(error)
+                yield step.interval
+                continue
+            yield self.settleTime
+            while not self._stop_event.is_set():
+                try:
+                    self.endReason = self.check(step)
+                except (OSError, ValueError) as error:
+                    self.communicationGap(error)
+                    self.endReason = None
+                if self.endReason is not None:
+                    logger.debug(f'Recipe step {step.name} of {self.IPV4} has been ended by {self.endReason}!')
+                    break
+                yield step.interval
+            index += 1
+        self.stop()
+
+    def finalizeSteps(self):
+        ShutdownOperation(self.IPV4).shutdown()
+        if self.ownDatabase:
+            self.database.stop()
+        yield self.settleTime
+
+    def state(self):
+        if self._stop_event.is_set():
+            return 'stopped'
+        return 'preparing' if self.stepName is None else self.stepName
+
     def run(self):
-        logger.debug('Datalogger thread class has been started!')
-        MeasureSubsystem(self.IPV4).SetWhMeasurementState('ON')
-        while not self._stop_event.is_set():
-            logger.debug('Datalogger thread class for Wh dataframe is running!')
-            self.csvLogger()
-            self.updateWhDataFrame()
-            time.sleep(self.loggingTime)
-        logger.debug('Datalogger thread class has been stopped!')
+        logger.debug('Recipe thread class has been started!')
+        try:
+            for delay in self.cycleSteps():
+                clock.sleep(delay)
+        finally:
+            for delay in self.finalizeSteps():
+                clock.sleep(delay)
+        cprint.printFeedback('Recipe thread class has been stopped!')
 
 
-class ChargingOperation(threading.Thread):
+class TelemetryRing:
     """
-        Charging Functional Operation
-        -----------------------------------------------------------------------------------------------------------------
-        IPV4: Address of the desired device to start shutdown operation
+        Shared Memory Live Telemetry Ring Buffer
         -----------------------------------------------------------------------------------------------------------------
-        sleepTime: Sleep time of the thread, every sleep time, charging state is being checked.
+        IPV4: Address of the device.
         -----------------------------------------------------------------------------------------------------------------
-        bulkCurrent: Current setting for the bulk stage
+        kind: Record kind of the publisher, 'snapshot' (default, FleetManager) or 'basic', 'ah', 'wh' (dataloggers).
+        Shared memory block is named sm15k_<kind>_<IPV4> (dots are replaced with underscores).
         -----------------------------------------------------------------------------------------------------------------
-        bulkVoltage: Voltage setting for the bulk stage
+        capacity: Number of samples in the ring (only used by the publisher that creates the block). A publisher which
+        finds a smaller block of an earlier run keeps it and lowers capacity to what fits in it.
         -----------------------------------------------------------------------------------------------------------------
-        absorptionCurrent: Current setting for the absorption stage, absorptionCurrent = 0.8 * bulkCurrent
+        create: True for the publisher of the device, False (default) for readers on the same host.
         -----------------------------------------------------------------------------------------------------------------
-        absorptionVoltage: Voltage setting for the absorption stage, absorptionVoltage = bulkVoltage
+        close() detaches only, the block stays readable until unlink() or the exit of the publisher process. Readers
+        are not tracked: track=False on Python 3.13+, on older versions the block is unregistered from the private
+        multiprocessing resource_tracker, which would otherwise unlink it when the reader exits.
         -----------------------------------------------------------------------------------------------------------------
-        floatCurrent: Current setting for the floating stage, floatCurrent =  0.02 * bulkCurrent
+        Fixed binary layout (little endian):
+        header = magic '4s' (SM15), version 'H', record size 'H', capacity 'I', published count 'Q' -> padded to 24 bytes
+        record = sequence 'Q', timestamp, voltage, current, power, temperature, positiveAh, negativeAh, positiveWh,
+        negativeWh '9d', sequence 'Q' -> 88 bytes, record n (1, 2, ...) is at 24 + ((n - 1) % capacity) * 88
         -----------------------------------------------------------------------------------------------------------------
-        floatVoltage: Voltage setting for the floating stage
+        Writer sets both sequences to 2n-1 while writing record n and to 2n when done, readers take a record only if
+        both sequences are 2n, so readers never lock and never see torn records. Missing values are nan.
         -----------------------------------------------------------------------------------------------------------------
-        floatTime: Time setting for the floating stage timer, when it is done charging operion stops!
+        publish(sample): Writes a MeasurementSnapshot (or any record with the same fields, missing ones are nan).
         -----------------------------------------------------------------------------------------------------------------
-        There are three main logger types, be sure that one of them is being used only especially Ah vs Wh!
+        latest() -> (n, MeasurementSnapshot) of the last record, read(since) -> list of (n, snapshot) newer than since.
         -----------------------------------------------------------------------------------------------------------------
     """
-
-    def __init__(self, IPV4='0.0.0.0', sleepTime=10, bulkCurrent=0.0, bulkVoltage=0.0, floatVoltage=0.0, floatTime=0.0,
-                 deamonState=True):
-        super().__init__()
+    magic = b'SM15'
+    version = 1
+    header = struct.Struct('<4sHHIQ')
+    headerSize = 24
+    countOffset = 12
+    record = struct.Struct('<Q9dQ')
+    fields = MeasurementSnapshot.__slots__
+
+    def __init__(self, IPV4, kind=MeasurementSnapshot.kind, capacity=1024, create=False):
         self.IPV4 = IPV4
-        self.sleepTime = sleepTime
-        self.bulkCurrent = bulkCurrent
-        self.bulkVoltage = bulkVoltage
-        self.absorptionCurrent = self.bulkCurrent * 0.8
-        self.absorptionVoltage = self.bulkVoltage
-        self.floatCurrent = self.bulkCurrent * 0.02
-        self.floatVoltage = floatVoltage
-        self.floatTime = floatTime
-        self.bulkMode = True
-        self.absorptionMode = False
-        self.floatingMode = False
-        self.deamonState = deamonState
-        self.setDaemon(self.deamonState)
-        self._stop_event = threading.Event()
-        self.bulkInfo = 0
-        self.absorptionInfo = 0
+        self.kind = kind
+        self.name = TelemetryRing.blockName(IPV4, kind)
+        self.create = create
+        if create:
+            size = TelemetryRing.headerSize + capacity * TelemetryRing.record.size
+            try:
+                self.block = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+            except FileExistsError:
+                self.block = shared_memory.SharedMemory(name=self.name)
+                fitting = (self.block.size - TelemetryRing.headerSize) // TelemetryRing.record.size
+                if fitting < capacity:
+                    logger.debug(f'Shared memory block {self.name} fits {fitting} of {capacity} samples!')
+                    capacity = fitting
+                if capacity < 1:
+                    raise ValueError(f'Shared memory block {self.name} is too small for a telemetry ring!')
+                size = TelemetryRing.headerSize + capacity * TelemetryRing.record.size
+                self.block.buf[:size] = bytes(size)
+            TelemetryRing.header.pack_into(self.block.buf, 0, TelemetryRing.magic, TelemetryRing.version,
+                                           TelemetryRing.record.size, capacity, 0)
+            self.count = 0
+        else:
+            self.block = TelemetryRing.attach(self.name)
+            magic, version, recordSize, capacity, _ = TelemetryRing.header.unpack_from(self.block.buf, 0)
+            if magic != TelemetryRing.magic or version != TelemetryRing.version or \
+                    recordSize != TelemetryRing.record.size:
+                raise ValueError(f'Shared memory block {self.name} is not a telemetry ring!')
+        self.capacity = capacity
 
     def __str__(self):
-        return f'Charging Operation, for details print object.__doc__'
-
-    def chargingInitialize(self):
-        logger.debug('Charging is being initialized!')
-        cprint.printFeedback('Charging is being initialized!')
-        SystemSubsystem(self.IPV4).HighlightFrontpanel()
-        SystemSubsystem(self.IPV4).SetVoltageLimit(self.bulkVoltage, 'ON')
-        SystemSubsystem(self.IPV4).ReadVoltageLimitSet()
-        SystemSubsystem(self.IPV4).SetCurrentLimit(self.bulkCurrent + 10, 'ON')
-        SystemSubsystem(self.IPV4).ReadCurrentLimitSet()
-        SystemSubsystem(self.IPV4).SetPowerLimit(self.bulkVoltage * self.bulkCurrent + 500, 'ON')
-        SystemSubsystem(self.IPV4).ReadPowerLimitSet()
-        time.sleep(1)
-
-    def chargingFinalize(self):
-        logger.debug(f'Charging is being finalized!')
-        cprint.printFeedback(f'Charging is being finalized!')
-        ShutdownOperation(self.IPV4).setShutdownOutput()
-        ShutdownOperation(self.IPV4).setShutdownValues()
-        ShutdownOperation(self.IPV4).limitShutdownValues()
-        time.sleep(1)
-
-    def outputInitialize(self):
-        logger.debug('Output is Initialized!')
-        cprint.printFeedback('Output is Initialized!')
-        OutputSubsystem(self.IPV4).SetOutput(1)
-        OutputSubsystem(self.IPV4).ReadOutputSet()
-        time.sleep(1)
-
-    def bulkStage(self):
-        logger.debug('Bulk Stage is Initialized!')
-        cprint.printFeedback('Bulk Stage is Initialized!')
-        SourceSubsystem(self.IPV4).SetVoltage(self.bulkVoltage)
-        SourceSubsystem(self.IPV4).ReadVoltageSet()
-        SourceSubsystem(self.IPV4).SetCurrent(self.bulkCurrent)
-        SourceSubsystem(self.IPV4).SetPower(self.bulkCurrent * self.bulkVoltage + 50)
-        SourceSubsystem(self.IPV4).ReadPowerSet()
-        time.sleep(1)
+        return f'Telemetry Ring of {self.IPV4} at {self.name}, for details print object.__doc__'
 
-    def absorptionStage(self):
-        logger.debug('Absorption Stage is Initialized!')
-        cprint.printFeedback('Absorption Stage is Initialized!')
-        SourceSubsystem(self.IPV4).SetVoltage(self.absorptionVoltage)
-        SourceSubsystem(self.IPV4).ReadVoltageSet()
-        SourceSubsystem(self.IPV4).SetCurrent(self.absorptionCurrent)
-        SourceSubsystem(self.IPV4).SetPower(self.absorptionVoltage * self.absorptionCurrent + 50)
-        SourceSubsystem(self.IPV4).ReadPowerSet()
-        time.sleep(1)
+    @staticmethod
+    def blockName(IPV4, kind=MeasurementSnapshot.kind):
+        return '_'.join(('sm15k', kind, ''.join(character if character.isalnum() else '_' for character in IPV4)))
 
-    def floatingStage(self):
-        logger.debug('Floating Stage is Initialized!')
-        cprint.printFeedback('Floating Stage is Initialized!')
-        SourceSubsystem(self.IPV4).SetVoltage(self.floatVoltage)
-        SourceSubsystem(self.IPV4).ReadVoltageSet()
-        SourceSubsystem(self.IPV4).SetCurrent(self.floatCurrent)
-        SourceSubsystem(self.IPV4).ReadCurrentSet()
-        SourceSubsystem(self.IPV4).SetPower(self.floatCurrent * self.floatVoltage + 500)
-        SourceSubsystem(self.IPV4).ReadPowerSet()
-        time.sleep(1)
+    @staticmethod
+    def attach(name):
+        if sys.version_info >= (3, 13):
+            return shared_memory.SharedMemory(name=name, track=False)
+        block = shared_memory.SharedMemory(name=name)
+        if os.name == 'posix':
+            resource_tracker.unregister(block._name, 'shared_memory')
+        return block
+
+    def _offset(self, number):
+        return TelemetryRing.headerSize + ((number - 1) % self.capacity) * TelemetryRing.record.size
+
+    def publish(self, sample):
+        values = [getattr(sample, field, math.nan) for field in TelemetryRing.fields]
+        number = self.count + 1
+        offset = self._offset(number)
+        buffer = self.block.buf
+        struct.pack_into('<Q', buffer, offset, 2 * number - 1)
+        struct.pack_into('<Q', buffer, offset + TelemetryRing.record.size - 8, 2 * number - 1)
+        TelemetryRing.record.pack_into(buffer, offset, 2 * number - 1, *values, 2 * number - 1)
+        struct.pack_into('<Q', buffer, offset + TelemetryRing.record.size - 8, 2 * number)
+        struct.pack_into('<Q', buffer, offset, 2 * number)
+        struct.pack_into('<Q', buffer, TelemetryRing.countOffset, number)
+        self.count = number
+        return number
+
+    def published(self):
+        return struct.unpack_from('<Q', self.block.buf, TelemetryRing.countOffset)[0]
+
+    def _read(self, number, attempts=3):
+        for _ in range(attempts):
+            values = TelemetryRing.record.unpack_from(self.block.buf, self._offset(number))
+            if values[0] == values[-1] == 2 * number:
+                return MeasurementSnapshot(*values[1:-1])
+        return None
 
-    def checkChargingStage(self):
-        if (float(MeasureSubsystem(self.IPV4).MeasureCurrent()) < self.absorptionCurrent) and self.bulkMode:
-            self.absorptionStage()
-            self.bulkMode = False
-            self.absorptionMode = True
-        elif (float(MeasureSubsystem(self.IPV4).MeasureCurrent()) < self.floatCurrent) and self.absorptionMode:
-            self.floatingStage()
-            self.absorptionMode = False
-            self.floatingMode = True
+    def latest(self):
+        for _ in range(3):
+            number = self.published()
+            if number == 0:
+                return None
+            snapshot = self._read(number, attempts=1)
+            if snapshot is not None:
+                return number, snapshot
+        return None
 
-        if self.bulkMode:
-            logger.debug('Bulk Mode is active!')
-            if self.bulkInfo < 1:
-                cprint.printFeedback('Bulk Mode is active!')
-                self.bulkInfo += 1
-        elif self.absorptionMode:
-            logger.debug('Absorption mode is active!')
-            if self.absorptionInfo < 1:
-                cprint.printFeedback('Absorption mode is active!')
-                self.absorptionInfo += 1
-        elif self.floatingMode:
-            logger.debug('Floating mode is active!')
-            cprint.printFeedback('Floating mode is active!')
-            logger.debug(f'Float time is: {self.floatTime}')
-            time.sleep(self.floatTime)
-            self.stop()
+    def read(self, since=0):
+        number = self.published()
+        records = []
+        for current in range(max(since + 1, number - self.capacity + 1, 1), number + 1):
+            snapshot = self._read(current)
+            if snapshot is not None:
+                records.append((current, snapshot))
+        return records
 
-    def stop(self):
-        logger.debug('Charging stop event has been started!')
-        cprint.printFeedback('Charging stop event has been started!')
-        self._stop_event.set()
+    def close(self):
+        self.block.close()
 
-    def run(self):
-        logger.debug('Charging thread class has been started!')
-        self.chargingInitialize()
-        self.bulkStage()
-        self.outputInitialize()
-        while not self._stop_event.is_set():
-            logger.debug('Charging thread class is running!')
-            time.sleep(self.sleepTime)
-            self.checkChargingStage()
-        self.chargingFinalize()
-        logger.debug('Charging thread class has been stopped!')
+    def unlink(self):
+        if self.create:
+            self.block.unlink()
 
 
-class DischargingOperation(threading.Thread):
+class DeviceDiscovery:
     """
-        Discharging Functional Operation
+        Parallel Device Discovery
+        -----------------------------------------------------------------------------------------------------------------
+        network: CIDR range (e.g. '192.168.0.0/24') or list of IPV4 addresses to scan
+        -----------------------------------------------------------------------------------------------------------------
+        port: Port of the devices, default is Communication.port_name (8462)
         -----------------------------------------------------------------------------------------------------------------
-        IPV4: Address of the desired device to start shutdown operation
+        connectTimeout, replyTimeout: Tight timeouts (seconds) of connecting and of every reply of one address
         -----------------------------------------------------------------------------------------------------------------
-        sleeptime: Sleep time of the thread, every sleep time, charging state is being checked.
+        parallel: Maximum number of addresses probed at the same time
         -----------------------------------------------------------------------------------------------------------------
-        dischargeCurrent: Maximum discharging current set
+        cacheFile: JSON inventory written atomically after a scan, None (default) disables the cache
         -----------------------------------------------------------------------------------------------------------------
-        dischargeVoltage: Minimum voltage that battery can be discharged
+        scan(): All addresses are probed from one thread with non blocking connects and a selector. Every address that
+        accepts gets *IDN? and then the maxima, one query after the other (one ';' message with Communication.compound),
+        a /24 takes about connectTimeout + a few replyTimeout.
         -----------------------------------------------------------------------------------------------------------------
-        cutoffCurrent: Minimum current to decide stop discharging operation
+        discover(maximumAge): Inventory of the cache if it is of the same network and younger than maximumAge seconds,
+        otherwise of a new scan. Entries are dictionaries of IPV4, manufacturer, model, serial, firmware and
+        capabilities (maxima as Recipe.capabilities, None if the device did not answer them).
         -----------------------------------------------------------------------------------------------------------------
     """
+    identifyQuery = b'*IDN?\n'
 
-    def __init__(self, IPV4='0.0.0.0', sleepTime=10, dischargeCurrent=0.0, dischargeVoltage=0.0, cutoffCurrent=0.0,
-                 deamonState=True):
-        super().__init__()
-        self.IPV4 = IPV4
-        self.sleepTime = sleepTime
-        self.dischargeCurrent = dischargeCurrent
-        self.dischargeVoltage = dischargeVoltage
-        self.cutoffCurrent = cutoffCurrent
-        self.deamonState = deamonState
-        self.setDaemon(self.deamonState)
-        self._stop_event = threading.Event()
+    @staticmethod
+    def capabilityQueries():
+        """
+        :return: Messages asking the maxima, one compound message if Communication.compound else one per query
+        """
+        queries = list(Recipe.capabilityQueries.values())
+        if Communication.compound:
+            return [(';'.join(queries) + '\n').encode('utf-8')]
+        return [f'{query}\n'.encode('utf-8') for query in queries]
+
+    def __init__(self, network, port=None, connectTimeout=0.5, replyTimeout=1.0, parallel=256, cacheFile=None):
+        self.network = network
+        self.port = Communication.port_name if port is None else port
+        self.connectTimeout = connectTimeout
+        self.replyTimeout = replyTimeout
+        self.parallel = parallel
+        self.cacheFile = cacheFile
+        self.inventory = []
 
     def __str__(self):
-        return f'Discharging Operation, for details print object.__doc__'
-
-    def dischargingInitialize(self):
-        logger.debug('Discharging is being initialized!')
-        SystemSubsystem(self.IPV4).HighlightFrontpanel()
-        SystemSubsystem(self.IPV4).SetVoltageLimit(self.dischargeVoltage, 'ON')
-        SystemSubsystem(self.IPV4).ReadVoltageLimitSet()
-        SystemSubsystem(self.IPV4).SetNegativeCurrentLimit(self.dischargeCurrent - 10, 'ON')
-        SystemSubsystem(self.IPV4).ReadNegativeCurrentLimitSet()
-        SystemSubsystem(self.IPV4).SetNegativePowerLimit(self.dischargeVoltage * self.dischargeCurrent - 500, 'ON')
-        SystemSubsystem(self.IPV4).ReadNegativePowerLimitSet()
-        time.sleep(1)
+        return f'Device Discovery of {self.network}, for details print object.__doc__'
 
-    def dischargingFinalize(self):
-        logger.debug(f'Discharging is being finalized!')
-        ShutdownOperation(self.IPV4).setShutdownOutput()
-        ShutdownOperation(self.IPV4).setShutdownValues()
-        ShutdownOperation(self.IPV4).limitShutdownValues()
-        time.sleep(1)
-
-    def outputInitialize(self):
-        OutputSubsystem(self.IPV4).SetOutput(1)
-        OutputSubsystem(self.IPV4).ReadOutputSet()
-        time.sleep(1)
+    def addresses(self):
+        if isinstance(self.network, str):
+            return [str(address) for address in ipaddress.ip_network(self.network, strict=False).hosts()]
+        return [str(address) for address in self.network]
 
-    def dischargingStage(self):
-        logger.debug('Discharging stage is started!')
-        SourceSubsystem(self.IPV4).SetVoltage(self.dischargeVoltage)
-        SourceSubsystem(self.IPV4).ReadVoltageSet()
-        SourceSubsystem(self.IPV4).SetNegativeCurrent(self.dischargeCurrent)
-        SourceSubsystem(self.IPV4).ReadNegativeCurrentSet()
-        SourceSubsystem(self.IPV4).SetNegativePower(self.dischargeCurrent * self.dischargeVoltage - 50)
-        SourceSubsystem(self.IPV4).ReadNegativePowerSet()
-        time.sleep(1)
-
-    def checkDischargingStage(self):
-        if float(MeasureSubsystem(self.IPV4).MeasureCurrent()) > self.cutoffCurrent:
-            self.stop()
+    @staticmethod
+    def entry(IPV4, identification, capabilities):
+        parts = [part.strip() for part in identification.split(',')] + [''] * 4
+        ratings = None
+        if capabilities is not None:
+            values = capabilities.replace('\n', ';').split(';')
+            if len(values) == len(Recipe.capabilityQueries):
+                try:
+                    ratings = {name: abs(float(value)) for name, value in zip(Recipe.capabilityQueries, values)}
+                except ValueError:
+                    ratings = None
+        return {'IPV4': IPV4, 'manufacturer': parts[0], 'model': parts[1], 'serial': parts[2], 'firmware': parts[3],
+                'capabilities': ratings}
+
+    def _open(self, selector, IPV4):
+        probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        probe.setblocking(False)
+        error = probe.connect_ex((IPV4, self.port))
+        if error not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN):
+            probe.close()
+            return None
+        state = {'IPV4': IPV4, 'stage': 'connect', 'deadline': time.monotonic() + self.connectTimeout,
+                 'buffer': b'', 'identification': None}
+        selector.register(probe, selectors.EVENT_WRITE, state)
+        return probe
+
+    def _close(self, selector, probe, probes):
+        state = probes.pop(probe)
+        selector.unregister(probe)
+        probe.close()
+        if state['identification'] is not None:
+            replies = state['replies'] if state['stage'] == 'done' else None
+            self.inventory.append(DeviceDiscovery.entry(state['IPV4'], state['identification'],
+                                                        None if replies is None else ';'.join(replies)))
+
+    def _advance(self, selector, probe, state, probes):
+        if state['stage'] == 'connect':
+            if probe.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR):
+                return self._close(selector, probe, probes)
+            probe.send(DeviceDiscovery.identifyQuery)
+            state['stage'] = 'identify'
+            state['deadline'] = time.monotonic() + self.replyTimeout
+            selector.modify(probe, selectors.EVENT_READ, state)
+            return
+        try:
+            chunk = probe.recv(Communication.buffer_size)
+        except OSError:
+            chunk = b''
+        if not chunk:
+            return self._close(selector, probe, probes)
+        state['buffer'] += chunk
+        if b'\n' not in state['buffer']:
+            return
+        line, _, state['buffer'] = state['buffer'].partition(b'\n')
+        if state['stage'] == 'identify':
+            state['identification'] = line.decode('utf-8', 'replace')
+            state['pending'] = DeviceDiscovery.capabilityQueries()
+            state['replies'] = []
+            state['stage'] = 'capabilities'
         else:
-            logger.debug('Discharging is still running!')
-
-    def stop(self):
-        logger.debug('Discharging stop event has been started!')
-        self._stop_event.set()
-
-    def run(self):
-        logger.debug('Discharging thread class has been started!')
-        self.dischargingInitialize()
-        self.dischargingStage()
-        self.outputInitialize()
-        while not self._stop_event.is_set():
-            logger.debug('Discharging thread class is running!')
-            time.sleep(self.sleepTime)
-            self.checkDischargingStage()
-        self.dischargingFinalize()
-        logger.debug('Discharging thread class has been stopped!')
+            state['replies'].append(line.decode('utf-8', 'replace'))
+        if not state['pending']:
+            state['stage'] = 'done'
+            return self._close(selector, probe, probes)
+        probe.send(state['pending'].pop(0))
+        state['deadline'] = time.monotonic() + self.replyTimeout
+
+    def scan(self):
+        """
+        :return: Inventory of every address which answered *IDN?, sorted by address
+        """
+        start = time.monotonic()
+        pending = collections.deque(self.addresses())
+        scanned = len(pending)
+        self.inventory = []
+        probes = {}
+        with selectors.DefaultSelector() as selector:
+            while pending or probes:
+                while pending and len(probes) < self.parallel:
+                    IPV4 = pending.popleft()
+                    probe = self._open(selector, IPV4)
+                    if probe is not None:
+                        probes[probe] = selector.get_key(probe).data
+                if not probes:
+                    continue
+                timeout = max(0.0, min(state['deadline'] for state in probes.values()) - time.monotonic())
+                for key, _ in selector.select(timeout):
+                    if key.fileobj in probes:
+                        self._advance(selector, key.fileobj, key.data, probes)
+                now = time.monotonic()
+                for probe in [probe for probe, state in probes.items() if state['deadline'] <= now]:
+                    self._close(selector, probe, probes)
+        self.inventory.sort(key=lambda entry: ipaddress.ip_address(entry['IPV4']))
+        logger.debug(f'{scanned} addresses of {self.network} have been scanned in {time.monotonic() - start:.2f} s, '
+                     f'{len(self.inventory)} devices have been found!')
+        if self.cacheFile:
+            Checkpoint(self.cacheFile).save({'network': str(self.network), 'port': self.port,
+                                             'scannedAt': clock.time(), 'inventory': self.inventory})
+        return self.inventory
+
+    def discover(self, maximumAge=None):
+        """
+        :param maximumAge: Age (seconds) of a cached inventory that is still used, None always scans again
+        """
+        if maximumAge is not None and self.cacheFile:
+            cached = Checkpoint(self.cacheFile).load()
+            if cached is not None and cached.get('network') == str(self.network) and \
+                    cached.get('port') == self.port and clock.time() - cached.get('scannedAt', 0) <= maximumAge:
+                self.inventory = cached['inventory']
+                logger.debug(f'Inventory of {self.network} has been loaded from {self.cacheFile}!')
+                return self.inventory
+        return self.scan()
 
 
-class CyclingOperation(threading.Thread):
+def fleetWorker(index, devices, controlConnection, telemetryConnection, heartbeat, telemetryInterval):
     """
-        Charging Functional Operation
+    Worker process of FleetManager. It runs the operation threads of its devices, answers control messages and sends
+    packed telemetry of its devices every telemetryInterval seconds. Telemetry is the last sample of a running
+    datalogger of the device, a snapshot is only taken of devices without one. Both loops update the heartbeat.
+    """
+    operations = {}
+    stopEvent = threading.Event()
+
+    def lastSample(IPV4):
+        samples = [operation.samples.latest() for (device, _), operation in list(operations.items())
+                   if device == IPV4 and operation.is_alive() and hasattr(operation, 'samples')]
+        samples = [sample for sample in samples if sample is not None]
+        if not samples:
+            return None
+        sample = max(samples, key=lambda sample: sample.timestamp)
+        return MeasurementSnapshot(*(getattr(sample, field, math.nan) for field in MeasurementSnapshot.__slots__))
+
+    def publishTelemetry():
+        while not stopEvent.wait(telemetryInterval):
+            heartbeat.value = time.time()
+            batch = bytearray()
+            for IPV4 in devices:
+                snapshot = lastSample(IPV4)
+                if snapshot is None:
+                    try:
+                        snapshot = MeasureSubsystem(IPV4).snapshot()
+                    except (OSError, ValueError) as error:
+                        logger.debug(f'Fleet telemetry of {IPV4} has been missed: {error}')
+                        snapshot = MeasurementSnapshot(clock.time(), *([math.nan] * 8))
+                batch += FleetManager.telemetryRecord.pack(IPV4.encode('utf-8'), *snapshot)
+            try:
+                telemetryConnection.send_bytes(bytes(batch))
+            except OSError:
+                return
+
+    def status(IPV4, name):
+        operation = operations.get((IPV4, name))
+        if operation is None:
+            return None
+        state = {'alive': operation.is_alive()}
+        for attribute in ('counter', 'gaps', 'bulkMode', 'absorptionMode', 'floatingMode', 'chargingMode',
+                          'dischargingMode'):
+            if hasattr(operation, attribute):
+                state[attribute] = getattr(operation, attribute)
+        return state
+
+    def handle(command):
+        action, IPV4, name = command['action'], command.get('IPV4'), command.get('operation')
+        if action == 'start':
+            current = operations.get((IPV4, name))
+            if current is not None and current.is_alive():
+                return status(IPV4, name)
+            operation = FleetManager.operations[name](IPV4, **command.get('kwargs', {}))
+            operations[(IPV4, name)] = operation
+            operation.start()
+            return status(IPV4, name)
+        if action == 'stop':
+            operation = operations.get((IPV4, name))
+            if operation is not None:
+                operation.stop()
+            return status(IPV4, name)
+        if action == 'query':
+            if name is not None:
+                return status(IPV4, name)
+            return {operationName: status(device, operationName) for device, operationName in operations
+                    if IPV4 is None or device == IPV4}
+        raise ValueError(f'Fleet action {action} is not known!')
+
+    threading.Thread(target=publishTelemetry, daemon=True).start()
+    logger.debug(f'Fleet worker {index} has been started for {devices}!')
+    while True:
+        heartbeat.value = time.time()
+        if not controlConnection.poll(min(1.0, telemetryInterval)):
+            continue
+        try:
+            command = controlConnection.recv()
+        except EOFError:
+            break
+        if command['action'] == 'shutdown':
+            break
+        try:
+            controlConnection.send({'result': handle(command)})
+        except Exception as error:
+            controlConnection.send({'error': f'{type(error).__name__}: {error}'})
+    stopEvent.set()
+    for operation in operations.values():
+        if operation.is_alive():
+            operation.stop()
+    logger.debug(f'Fleet worker {index} has been stopped!')
+
+
+class FleetManager:
+    """
+        Multi Process Fleet Manager
         -----------------------------------------------------------------------------------------------------------------
-        IPV4: Address of the desired device to start shutdown operation
+        devices: List of IPV4 addresses, they are spread round robin across the worker processes.
         -----------------------------------------------------------------------------------------------------------------
-        sleepTime: Sleep time of the thread, every sleep time, charging state is being checked.
+        processes: Number of worker processes, default is number of CPUs (not more than number of devices).
         -----------------------------------------------------------------------------------------------------------------
-        cycleTime: Total number of cycling the battery, charging and discharging (discharging and charging), it counts as one cycling!
+        telemetryInterval: Every worker sends the last sample of its devices at this period (seconds) as one packed
+        binary batch, no per sample pickling. Sample of a running datalogger is used (no extra transaction), devices
+        without one are read with one MeasurementSnapshot. Latest snapshot per device is at telemetry(IPV4), fields
+        the datalogger does not measure are nan.
         -----------------------------------------------------------------------------------------------------------------
-        bulkCurrent: Current setting for the bulk stage
+        heartbeatTimeout: Worker process that is dead or has no heartbeat within this time (seconds) is restarted and
+        the operations of its devices are started again.
         -----------------------------------------------------------------------------------------------------------------
-        bulkVoltage: Voltage setting for the bulk stage
+        startOperation(IPV4, 'CyclingOperation', **kwargs) / stopOperation(IPV4, name) / queryOperation(IPV4, name):
+        Control API of the operation threads, name is one of FleetManager.operations.
         -----------------------------------------------------------------------------------------------------------------
-        absorptionCurrent: Current setting for the absorption stage, absorptionCurrent = 0.8 * bulkCurrent
+        health(): Dictionary of alive, pid, restarts, last heartbeat age and devices per worker.
         -----------------------------------------------------------------------------------------------------------------
-        absorptionVoltage: Voltage setting for the absorption stage, absorptionVoltage = bulkVoltage
+        sharedMemory: Publishes the telemetry of every device to its TelemetryRing for readers on the same host.
         -----------------------------------------------------------------------------------------------------------------
-        floatCurrent: Current setting for the floating stage, floatCurrent =  0.02 * bulkCurrent
+    """
+    operations = {}
+    telemetryRecord = struct.Struct('<16s9d')
+
+    def __init__(self, devices, processes=None, telemetryInterval=1.0, heartbeatTimeout=10.0, controlTimeout=10.0,
+                 telemetryCallback=None, startMethod=None, sharedMemory=False):
+        self.devices = list(devices)
+        processes = processes or multiprocessing.cpu_count()
+        self.processes = max(1, min(processes, len(self.devices)))
+        self.telemetryInterval = telemetryInterval
+        self.heartbeatTimeout = heartbeatTimeout
+        self.controlTimeout = controlTimeout
+        self.telemetryCallback = telemetryCallback
+        self.context = multiprocessing.get_context(startMethod)
+        self.assignment = {IPV4: index % self.processes for index, IPV4 in enumerate(self.devices)}
+        self.workers = [None] * self.processes
+        self.restarts = [0] * self.processes
+        self.latest = {}
+        self.sharedMemory = sharedMemory
+        self.rings = {}
+        self._desired = {}
+        self._retired = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def __str__(self):
+        return f'Fleet Manager of {len(self.devices)} devices, for details print object.__doc__'
+
+    def workerDevices(self, index):
+        return [IPV4 for IPV4, worker in self.assignment.items() if worker == index]
+
+    def _spawn(self, index):
+        control, workerControl = self.context.Pipe()
+        telemetry, workerTelemetry = self.context.Pipe(duplex=False)
+        heartbeat = self.context.Value('d', time.time(), lock=False)
+        process = self.context.Process(target=fleetWorker, name=f'SM15K-fleet-{index}', daemon=True,
+                                       args=(index, self.workerDevices(index), workerControl, workerTelemetry,
+                                             heartbeat, self.telemetryInterval))
+        process.start()
+        workerControl.close()
+        workerTelemetry.close()
+        self.workers[index] = {'process': process, 'control': control, 'telemetry': telemetry,
+                               'heartbeat': heartbeat, 'lock': threading.Lock()}
+        logger.debug(f'Fleet worker {index} has been spawned with pid {process.pid}!')
+
+    def start(self):
+        if self.sharedMemory:
+            self.rings = {IPV4: TelemetryRing(IPV4, MeasurementSnapshot.kind, create=True) for IPV4 in self.devices}
+        for index in range(self.processes):
+            self._spawn(index)
+        threading.Thread(target=self._monitor, name='SM15K-fleet-monitor', daemon=True).start()
+        threading.Thread(target=self._collect, name='SM15K-fleet-telemetry', daemon=True).start()
+        return self
+
+    def _request(self, IPV4, command):
+        worker = self.workers[self.assignment[IPV4]]
+        with worker['lock']:
+            worker['control'].send(command)
+            if not worker['control'].poll(self.controlTimeout):
+                raise TimeoutError(f'Fleet worker of {IPV4} has not answered!')
+            reply = worker['control'].recv()
+        if 'error' in reply:
+            raise RuntimeError(reply['error'])
+        return reply['result']
+
+    def startOperation(self, IPV4, operation, **kwargs):
+        if operation not in FleetManager.operations:
+            raise ValueError(f'Operation {operation} is not one of {sorted(FleetManager.operations)}!')
+        with self._lock:
+            self._desired[(IPV4, operation)] = kwargs
+        return self._request(IPV4, {'action': 'start', 'IPV4': IPV4, 'operation': operation, 'kwargs': kwargs})
+
+    def stopOperation(self, IPV4, operation):
+        with self._lock:
+            self._desired.pop((IPV4, operation), None)
+        return self._request(IPV4, {'action': 'stop', 'IPV4': IPV4, 'operation': operation})
+
+    def queryOperation(self, IPV4, operation=None):
+        return self._request(IPV4, {'action': 'query', 'IPV4': IPV4, 'operation': operation})
+
+    def telemetry(self, IPV4=None):
+        with self._lock:
+            return dict(self.latest) if IPV4 is None else self.latest.get(IPV4)
+
+    def health(self):
+        now = time.time()
+        return {index: {'alive': worker['process'].is_alive(), 'pid': worker['process'].pid,
+                        'restarts': self.restarts[index], 'heartbeatAge': now - worker['heartbeat'].value,
+                        'devices': self.workerDevices(index)}
+                for index, worker in enumerate(self.workers) if worker is not None}
+
+    def restartWorker(self, index):
+        worker = self.workers[index]
+        logger.warning(f'Fleet worker {index} is being restarted!')
+        with worker['lock']:
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+            worker['process'].join(5)
+            worker['control'].close()
+            with self._lock:
+                self._retired.append(worker['telemetry'])
+            self._spawn(index)
+            self.restarts[index] += 1
+        with self._lock:
+            desired = [(IPV4, operation, kwargs) for (IPV4, operation), kwargs in self._desired.items()
+                       if self.assignment[IPV4] == index]
+        for IPV4, operation, kwargs in desired:
+            self._request(IPV4, {'action': 'start', 'IPV4': IPV4, 'operation': operation, 'kwargs': kwargs})
+
+    def _monitor(self):
+        while not self._stop_event.wait(min(1.0, self.heartbeatTimeout / 2)):
+            for index, worker in enumerate(self.workers):
+                stale = time.time() - worker['heartbeat'].value > self.heartbeatTimeout
+                if not self._stop_event.is_set() and (not worker['process'].is_alive() or stale):
+                    try:
+                        self.restartWorker(index)
+                    except (OSError, RuntimeError, TimeoutError) as error:
+                        logger.warning(f'Fleet worker {index} restart has been failed: {error}')
+
+    def _collect(self):
+        record = FleetManager.telemetryRecord
+        while not self._stop_event.is_set():
+            with self._lock:
+                connections = [worker['telemetry'] for worker in self.workers] + self._retired
+            for connection in multiprocessing.connection.wait(connections, timeout=0.5):
+                try:
+                    batch = connection.recv_bytes()
+                except (EOFError, OSError):
+                    with self._lock:
+                        if connection in self._retired:
+                            self._retired.remove(connection)
+                            connection.close()
+                    continue
+                snapshots = {}
+                for values in record.iter_unpack(batch):
+                    snapshots[values[0].rstrip(b'\0').decode('utf-8')] = MeasurementSnapshot(*values[1:])
+                with self._lock:
+                    self.latest.update(snapshots)
+                for IPV4, snapshot in snapshots.items():
+                    if IPV4 in self.rings:
+                        self.rings[IPV4].publish(snapshot)
+                if self.telemetryCallback is not None:
+                    self.telemetryCallback(snapshots)
+
+    def shutdown(self):
+        self._stop_event.set()
+        for worker in self.workers:
+            if worker is None:
+                continue
+            try:
+                with worker['lock']:
+                    worker['control'].send({'action': 'shutdown'})
+            except OSError:
+                pass
+        for worker in self.workers:
+            if worker is not None:
+                worker['process'].join(5)
+                if worker['process'].is_alive():
+                    worker['process'].terminate()
+        for ring in self.rings.values():
+            ring.close()
+            ring.unlink()
+        logger.debug('Fleet manager has been stopped!')
+
+
+FleetManager.operations.update({operation.__name__: operation for operation in (
+    WatchdogOperation, WatchdogKeepaliveOperation, BasicDataloggerOperation, AhDataloggerOperation,
+    WhDataloggerOperation, ChargingOperation, DischargingOperation, CyclingOperation)})
+
+
+class BatteryModel:
+    """
+        Battery Equivalent Circuit Model
         -----------------------------------------------------------------------------------------------------------------
-        floatVoltage: Voltage setting for the floating stage
+        cells: Number of simulated cells, all of them are integrated at once (numpy arrays when numpy is installed).
         -----------------------------------------------------------------------------------------------------------------
-        floatTime: Time setting for the floating stage timer, when it is done charging operation stops!
+        capacity: Capacity in Ah, one value for all cells or one value per cell.
         -----------------------------------------------------------------------------------------------------------------
-        dischargeCurrent: Maximum discharging current set
+        ocvCurve: Open circuit voltage as (soc, voltage) points, soc from 0 to 1, linear in between.
         -----------------------------------------------------------------------------------------------------------------
-        dischargeVoltage: Minimum voltage that battery can be discharged
+        seriesResistance: Ohmic series resistance in Ohm, one value for all cells or one value per cell.
         -----------------------------------------------------------------------------------------------------------------
-        cutoffCurrent: Minimum current to decide stop discharging operation
+        rcPairs: (resistance, capacitance) of the RC pairs in series, each one is a polarization with time constant R*C.
         -----------------------------------------------------------------------------------------------------------------
-        afterChargingRestTime: Timer to decide rest time after charging part is done!
+        soc: Initial state of charge from 0 to 1, one value for all cells or one value per cell.
         -----------------------------------------------------------------------------------------------------------------
-        afterDischargingRestTime: Timer to decide rest time after discharging part is done!
+        maximumStep: Longest integration step in seconds, longer intervals are split into equal steps.
         -----------------------------------------------------------------------------------------------------------------
-        startCharging: Flag to decide starting stage (if True -> Charging starts , if False -> Discharging starts!)
+        step(dt, voltage, current, negativeCurrent, power, negativePower, output) integrates the cells behind supplies
+        with these set points. The supply regulates to whichever of voltage, current or power limits first, positive
+        current charges the cell. chargeIn/chargeOut (Ah) and energyIn/energyOut (Wh) are counted at the terminals.
         -----------------------------------------------------------------------------------------------------------------
-        There are three main logger types, be sure that one of them is being used especially Ah or Wh!
+    """
+    defaultOcvCurve = ((0.0, 10.5), (0.05, 11.6), (0.2, 12.1), (0.5, 12.5), (0.8, 12.8), (0.9, 13.1), (0.97, 13.8),
+                       (1.0, 14.8))
+
+    class ScalarOperations:
+        minimum = staticmethod(min)
+        maximum = staticmethod(max)
+        sqrt = staticmethod(math.sqrt)
+
+    def __init__(self, cells=1, capacity=100.0, ocvCurve=None, seriesResistance=0.01, rcPairs=((0.005, 2000.0),),
+                 soc=0.5, maximumStep=1.0):
+        self.cells = cells
+        self.ocvCurve = tuple(sorted(ocvCurve or BatteryModel.defaultOcvCurve))
+        self._socPoints = [point[0] for point in self.ocvCurve]
+        self._voltagePoints = [point[1] for point in self.ocvCurve]
+        self.rcPairs = tuple(rcPairs)
+        self.maximumStep = maximumStep
+        self.capacity = self.vector(capacity)
+        self.seriesResistance = self.vector(seriesResistance)
+        self.soc = self.vector(soc)
+        self.polarization = [self.vector(0.0) for _ in self.rcPairs]
+        self.current = self.vector(0.0)
+        self.chargeIn = self.vector(0.0)
+        self.chargeOut = self.vector(0.0)
+        self.energyIn = self.vector(0.0)
+        self.energyOut = self.vector(0.0)
+        self.voltage = self.vector([self.ocv(soc) for soc in self.soc])
+
+    def __str__(self):
+        return f'Battery Model of {self.cells} cells, for details print object.__doc__'
+
+    def vector(self, value):
+        if isinstance(value, (int, float)):
+            value = [float(value)] * self.cells
+        if numpy is not None:
+            return numpy.array(value, dtype=float)
+        return [float(item) for item in value]
+
+    def ocv(self, soc):
+        if numpy is not None:
+            return numpy.interp(soc, self._socPoints, self._voltagePoints)
+        points = self._socPoints
+        if soc <= points[0]:
+            return self._voltagePoints[0]
+        if soc >= points[-1]:
+            return self._voltagePoints[-1]
+        index = bisect.bisect_right(points, soc)
+        low, high = points[index - 1], points[index]
+        lowVoltage, highVoltage = self._voltagePoints[index - 1], self._voltagePoints[index]
+        return lowVoltage + (highVoltage - lowVoltage) * (soc - low) / (high - low)
+
+    @staticmethod
+    def driveCurrent(operations, electromotive, resistance, voltage, current, negativeCurrent, power, negativePower,
+                     output):
+        """
+        :return: Current of a supply in front of electromotive force and series resistance, voltage regulation is
+        bounded by the current set points and by the power set points (i * (e + i * r) = p solved for i)
+        """
+        drive = operations.minimum(operations.maximum((voltage - electromotive) / resistance, negativeCurrent), current)
+        square = electromotive * electromotive
+        powerBound = (operations.sqrt(operations.maximum(square + 4 * resistance * power, 0.0)) - electromotive) / \
+            (2 * resistance)
+        negativePowerBound = (operations.sqrt(operations.maximum(square + 4 * resistance * negativePower, 0.0)) -
+                              electromotive) / (2 * resistance)
+        return operations.minimum(operations.maximum(drive, negativePowerBound), powerBound) * output
+
+    def _advance(self, operations, dt, soc, polarization, capacity, resistance, setpoints):
+        electromotive = self.ocv(soc) + sum(polarization)
+        current = self.driveCurrent(operations, electromotive, resistance, *setpoints)
+        voltage = electromotive + current * resistance
+        soc = operations.minimum(operations.maximum(soc + current * dt / (capacity * 3600.0), 0.0), 1.0)
+        polarization = [value * decay + current * pairResistance * (1.0 - decay) for value, decay, pairResistance in
+                        zip(polarization, (math.exp(-dt / (r * c)) for r, c in self.rcPairs),
+                            (r for r, c in self.rcPairs))]
+        return soc, polarization, current, voltage
+
+    def step(self, dt, voltage, current, negativeCurrent, power, negativePower, output):
+        """
+        :param dt: Elapsed time in seconds
+        :param voltage ... output: Set point vectors of the supplies, output is 1 for ON and 0 for OFF
+        :return: Terminal voltage and current vectors at the end of the interval
+        """
+        steps = max(1, int(math.ceil(dt / self.maximumStep))) if dt > 0 else 0
+        interval = dt / steps if steps else 0.0
+        setpoints = (voltage, current, negativeCurrent, power, negativePower, output)
+        if numpy is not None:
+            for _ in range(steps):
+                self.soc, self.polarization, stepCurrent, stepVoltage = self._advance(
+                    numpy, interval, self.soc, self.polarization, self.capacity, self.seriesResistance, setpoints)
+                self.count(stepCurrent, stepVoltage, interval)
+            electromotive = self.ocv(self.soc) + sum(self.polarization)
+            self.current = self.driveCurrent(numpy, electromotive, self.seriesResistance, *setpoints)
+            self.voltage = electromotive + self.current * self.seriesResistance
+            return self.voltage, self.current
+        operations = BatteryModel.ScalarOperations
+        for cell in range(self.cells):
+            cellSetpoints = tuple(setpoint[cell] for setpoint in setpoints)
+            soc = self.soc[cell]
+            polarization = [pair[cell] for pair in self.polarization]
+            for _ in range(steps):
+                soc, polarization, stepCurrent, stepVoltage = self._advance(
+                    operations, interval, soc, polarization, self.capacity[cell], self.seriesResistance[cell],
+                    cellSetpoints)
+                self.countCell(cell, stepCurrent, stepVoltage, interval)
+            self.soc[cell] = soc
+            for pair, value in zip(self.polarization, polarization):
+                pair[cell] = value
+            electromotive = self.ocv(soc) + sum(polarization)
+            self.current[cell] = self.driveCurrent(operations, electromotive, self.seriesResistance[cell],
+                                                   *cellSetpoints)
+            self.voltage[cell] = electromotive + self.current[cell] * self.seriesResistance[cell]
+        return self.voltage, self.current
+
+    def count(self, current, voltage, interval):
+        hours = interval / 3600.0
+        self.chargeIn += numpy.maximum(current, 0.0) * hours
+        self.chargeOut += numpy.minimum(current, 0.0) * hours
+        self.energyIn += numpy.maximum(current * voltage, 0.0) * hours
+        self.energyOut += numpy.minimum(current * voltage, 0.0) * hours
+
+    def countCell(self, cell, current, voltage, interval):
+        hours = interval / 3600.0
+        if current >= 0:
+            self.chargeIn[cell] += current * hours
+            self.energyIn[cell] += current * voltage * hours
+        else:
+            self.chargeOut[cell] += current * hours
+            self.energyOut[cell] += current * voltage * hours
+
+
+class DeviceSimulator(threading.Thread):
+    """
+        Device Simulator Functional Operation
+        -----------------------------------------------------------------------------------------------------------------
+        devices: Addresses served by the simulator, e.g. 127.0.0.1, 127.0.0.2 (loopback addresses on Linux), every
+        device drives its own cell of the battery model.
+        -----------------------------------------------------------------------------------------------------------------
+        battery: BatteryModel with one cell per device, default is BatteryModel(cells=len(devices))
+        -----------------------------------------------------------------------------------------------------------------
+        maximumVoltage, maximumCurrent, maximumPower: Ratings of the simulated supply, answered to the MAXimum queries.
+        -----------------------------------------------------------------------------------------------------------------
+        port: Port of the devices, default is Communication.port_name
+        -----------------------------------------------------------------------------------------------------------------
+        Source, measure (Ah and Wh instruments included), output, system limit and watchdog commands are answered, the
+        battery is advanced to the time of every request. Set points are clamped to the ratings and to the system limits
+        which are ON, power set points start at the ratings. Watchdog timer is set and answered in ms like the device,
+        an expired watchdog switches the output off and answers 0 until it is set or stopped again (-1 when it is off).
+        Other queries are answered with 0. Connections of a device are served in the order they have been accepted.
         -----------------------------------------------------------------------------------------------------------------
     """
 
-    def __init__(self, IPV4='0.0.0.0', sleepTime=10, cycleTime=0, bulkCurrent=0.0, bulkVoltage=0.0, floatVoltage=0.0,
-                 floatTime=0.0, dischargeCurrent=0.0, dischargeVoltage=0.0, cutoffCurrent=0.0,
-                 afterChargingRestTime=30.0, afterDischargingRestTime=30.0, startCharging=True, deamonState=True):
+    def __init__(self, devices=('127.0.0.1',), battery=None, maximumVoltage=60.0, maximumCurrent=250.0,
+                 maximumPower=15000.0, port=None, deamonState=True):
         super().__init__()
-        self.IPV4 = IPV4
-        self.sleepTime = sleepTime
-        self.cycleTime = cycleTime
-        self.bulkCurrent = bulkCurrent
-        self.bulkVoltage = bulkVoltage
-        self.absorptionCurrent = self.bulkCurrent * 0.8
-        self.absorptionVoltage = self.bulkVoltage
-        self.floatCurrent = self.bulkCurrent * 0.01
-        self.floatVoltage = floatVoltage
-        self.floatTime = floatTime
-        self.bulkMode = True
-        self.absorptionMode = False
-        self.floatingMode = False
-        self.chargingMode = False
-        self.dischargingMode = False
-        self.chargingInitializeMode = False
-        self.dischargingInitializeMode = False
-        self.dischargeCurrent = dischargeCurrent
-        self.dischargeVoltage = dischargeVoltage
-        self.cutoffCurrent = cutoffCurrent
-        self.afterChargingRestTime = afterChargingRestTime
-        self.afterDischargingRestTime = afterDischargingRestTime
-        self.startCharging = startCharging
+        self.devices = list(devices)
+        self.battery = battery if battery is not None else BatteryModel(cells=len(self.devices))
+        self.maximumVoltage = maximumVoltage
+        self.maximumCurrent = maximumCurrent
+        self.maximumPower = maximumPower
+        self.port = port if port is not None else Communication.port_name
         self.deamonState = deamonState
-        self.counter = 0
-        self.bulkInfo = 0
-        self.absorptionInfo = 0
         self.setDaemon(self.deamonState)
         self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self.requests = 0
+        vector = self.battery.vector
+        self.setpoints = {'voltage': vector(0.0), 'current': vector(0.0), 'negativeCurrent': vector(0.0),
+                          'power': vector(maximumPower), 'negativePower': vector(-maximumPower),
+                          'output': vector(0.0)}
+        self.limits = [{'VOLtage': [maximumVoltage, 'OFF'], 'CURrent': [maximumCurrent, 'OFF'],
+                        'CURrent:NEGative': [-maximumCurrent, 'OFF'], 'POWer': [maximumPower, 'OFF'],
+                        'POWer:NEGative': [-maximumPower, 'OFF']} for _ in self.devices]
+        self.instruments = [{'AH': self.instrument('OFF', 0), 'WH': self.instrument('OFF', 0)} for _ in self.devices]
+        self.watchdogs = [0.0 for _ in self.devices]
+        self.watchdogTimeouts = [False for _ in self.devices]
+        self.lastContact = [clock.monotonic() for _ in self.devices]
+        self._last = clock.monotonic()
+        self.servers = [self.createServer(index, IPV4) for index, IPV4 in enumerate(self.devices)]
 
     def __str__(self):
-        return f'Cycling Operation, for details print object.__doc__'
-
-    def cyclingFinalize(self):
-        logger.debug(f'Cycling is being finalized!')
-        cprint.printFeedback(f'Cycling is being finalized!')
-        ShutdownOperation(self.IPV4).setShutdownOutput()
-        ShutdownOperation(self.IPV4).setShutdownValues()
-        ShutdownOperation(self.IPV4).limitShutdownValues()
-        time.sleep(1)
-
-    def outputInitialize(self):
-        logger.debug(f'Output is being initialized!')
-        cprint.printFeedback(f'Output is being initialized!')
-        OutputSubsystem(self.IPV4).SetOutput(1)
-        OutputSubsystem(self.IPV4).ReadOutputSet()
-        time.sleep(1)
-
-    def chargingInitialize(self):
-        logger.debug('Charging is being initialized!')
-        cprint.printFeedback('Charging is being initialized!')
-        SystemSubsystem(self.IPV4).HighlightFrontpanel()
-        SystemSubsystem(self.IPV4).SetVoltageLimit(self.bulkVoltage, 'ON')
-        SystemSubsystem(self.IPV4).ReadVoltageLimitSet()
-        SystemSubsystem(self.IPV4).SetCurrentLimit(self.bulkCurrent + 10, 'ON')
-        SystemSubsystem(self.IPV4).ReadCurrentLimitSet()
-        SystemSubsystem(self.IPV4).SetPowerLimit(self.bulkVoltage * self.bulkCurrent + 500, 'ON')
-        SystemSubsystem(self.IPV4).ReadPowerLimitSet()
-        time.sleep(1)
-
-    def chargingFinalize(self):
-        logger.debug('Charging is being finalized!')
-        cprint.printFeedback('Charging is being finalized!')
-        SystemSubsystem(self.IPV4).HighlightFrontpanel()
-        ShutdownOperation(self.IPV4).setShutdownOutput()
-        ShutdownOperation(self.IPV4).setShutdownValues()
-
-    def bulkStage(self):
-        logger.debug('Bulk Stage is Initialized!')
-        cprint.printFeedback('Bulk Stage is Initialized!')
-        SourceSubsystem(self.IPV4).SetVoltage(self.bulkVoltage)
-        SourceSubsystem(self.IPV4).ReadVoltageSet()
-        SourceSubsystem(self.IPV4).SetCurrent(self.bulkCurrent)
-        SourceSubsystem(self.IPV4).SetPower(self.bulkCurrent * self.bulkVoltage + 50)
-        SourceSubsystem(self.IPV4).ReadPowerSet()
-        time.sleep(1)
+        return f'Device Simulator of {len(self.devices)} devices, for details print object.__doc__'
+
+    def createServer(self, index, IPV4):
+        simulator = self
+
+        class SimulatorServer(socketserver.ThreadingTCPServer):
+            # Connections are served in the order they have been accepted, like the device does, so a command sent
+            # without waiting for a reply is not overtaken by the query of the next connection
+            def __init__(self, *arguments, **keywords):
+                super().__init__(*arguments, **keywords)
+                self.accepted = 0
+                self.served = 0
+                self.turn = threading.Condition()
+                self.tickets = {}
+
+            def process_request(self, request, client_address):
+                with self.turn:
+                    self.tickets[request] = self.accepted
+                    self.accepted += 1
+                super().process_request(request, client_address)
+
+        class SimulatorHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                with server.turn:
+                    ticket = server.tickets.pop(self.request)
+                try:
+                    for line in self.rfile:
+                        if ticket is not None:
+                            with server.turn:
+                                server.turn.wait_for(lambda: server.served >= ticket, timeout=0.5)
+                        reply = simulator.handleMessage(index, line.decode('utf-8'))
+                        if ticket is not None:
+                            self.serve(ticket)
+                            ticket = None
+                        if reply is not None:
+                            self.wfile.write((reply + '\n').encode('utf-8'))
+                finally:
+                    if ticket is not None:
+                        self.serve(ticket)
+
+            @staticmethod
+            def serve(ticket):
+                with server.turn:
+                    server.served = max(server.served, ticket + 1)
+                    server.turn.notify_all()
+
+        server = SimulatorServer((IPV4, self.port), SimulatorHandler, bind_and_activate=False)
+        server.allow_reuse_address = True
+        server.daemon_threads = True
+        server.request_queue_size = 128
+        server.server_bind()
+        server.server_activate()
+        return server
 
-    def absorptionStage(self):
-        logger.debug('Absorption Stage is Initialized!')
-        cprint.printFeedback('Absorption Stage is Initialized!')
-        SourceSubsystem(self.IPV4).SetVoltage(self.absorptionVoltage)
-        SourceSubsystem(self.IPV4).ReadVoltageSet()
-        SourceSubsystem(self.IPV4).SetCurrent(self.absorptionCurrent)
-        SourceSubsystem(self.IPV4).SetPower(self.absorptionVoltage * self.absorptionCurrent + 50)
-        SourceSubsystem(self.IPV4).ReadPowerSet()
-        time.sleep(1)
-
-    def floatingStage(self):
-        logger.debug('Floating Stage is Initialized!')
-        cprint.printFeedback('Floating Stage is Initialized!')
-        SourceSubsystem(self.IPV4).SetVoltage(self.floatVoltage)
-        SourceSubsystem(self.IPV4).ReadVoltageSet()
-        SourceSubsystem(self.IPV4).SetCurrent(self.floatCurrent)
-        SourceSubsystem(self.IPV4).ReadCurrentSet()
-        SourceSubsystem(self.IPV4).SetPower(self.floatCurrent * self.floatVoltage + 50)
-        SourceSubsystem(self.IPV4).ReadPowerSet()
-        time.sleep(1)
+    @staticmethod
+    def instrument(state, started, chargeIn=0.0, chargeOut=0.0, energyIn=0.0, energyOut=0.0):
+        return {'state': state, 'started': started, 'elapsed': 0.0, 'chargeIn': chargeIn, 'chargeOut': chargeOut,
+                'energyIn': energyIn, 'energyOut': energyOut}
+
+    def advance(self):
+        now = clock.monotonic()
+        setpoints = self.setpoints
+        for index, timer in enumerate(self.watchdogs):
+            if timer > 0 and not self.watchdogTimeouts[index] and now - self.lastContact[index] > timer:
+                self.watchdogTimeouts[index] = True
+                setpoints['output'][index] = 0.0
+                logger.debug(f'Simulated watchdog of {self.devices[index]} has switched the output off!')
+        self.battery.step(now - self._last, setpoints['voltage'], setpoints['current'], setpoints['negativeCurrent'],
+                          setpoints['power'], setpoints['negativePower'], setpoints['output'])
+        self._last = now
+        return now
+
+    def handleMessage(self, index, message):
+        replies = []
+        with self._lock:
+            now = self.advance()
+            self.lastContact[index] = now
+            self.requests += 1
+            for part in message.strip().split(';'):
+                part = part.strip()
+                if not part:
+                    continue
+                if part.endswith('?'):
+                    replies.append(self.query(index, part, now))
+                else:
+                    self.command(index, part, now)
+        return ';'.join(replies) if replies else None
+
+    def clamp(self, index, name, value):
+        limit, state = self.limits[index][name]
+        if name.endswith('NEGative'):
+            value = max(value, -self.maximumCurrent if name.startswith('CUR') else -self.maximumPower)
+            return max(value, limit) if state == 'ON' else value
+        value = min(value, {'VOLtage': self.maximumVoltage, 'CURrent': self.maximumCurrent,
+                            'POWer': self.maximumPower}[name])
+        return min(value, limit) if state == 'ON' else value
+
+    def command(self, index, part, now):
+        header, _, argument = part.partition(' ')
+        arguments = [item.strip() for item in argument.split(',')] if argument else []
+        sources = {'SOURce:VOLtage': ('voltage', 'VOLtage'), 'SOURce:CURrent': ('current', 'CURrent'),
+                   'SOURce:CURrent:NEGative': ('negativeCurrent', 'CURrent:NEGative'),
+                   'SOURce:POWer': ('power', 'POWer'), 'SOURce:POWer:NEGative': ('negativePower', 'POWer:NEGative')}
+        if header in sources:
+            name, limit = sources[header]
+            value = float(arguments[0])
+            if name.startswith('negative'):
+                value = -abs(value)
+            self.setpoints[name][index] = self.clamp(index, limit, value)
+        elif header.startswith('SYSTem:LIMits:'):
+            name = header[len('SYSTem:LIMits:'):]
+            value = float(arguments[0])
+            self.limits[index][name] = [-abs(value) if name.endswith('NEGative') else value,
+                                        arguments[1].upper() if len(arguments) > 1 else 'ON']
+        elif header == 'OUTPut':
+            self.setpoints['output'][index] = 1.0 if arguments[0].upper() in ('1', 'ON') else 0.0
+        elif header == 'MEASure:INStrument':
+            self.setInstrument(index, arguments[0].upper(), arguments[2].upper(), now)
+        elif header == 'SYSTem:COMmunicate:WATchdog':
+            self.watchdogs[index] = float(arguments[1]) / 1000 if arguments and arguments[0].upper() == 'SET' else 0.0
+            self.watchdogTimeouts[index] = False
+        else:
+            logger.debug(f'Simulator of {self.devices[index]} has ignored {part}!')
+
+    def setInstrument(self, index, kind, state, now):
+        instrument = self.instruments[index][kind]
+        battery = self.battery
+        if state == 'ON':
+            self.instruments[index][kind] = self.instrument('ON', now, battery.chargeIn[index],
+                                                            battery.chargeOut[index], battery.energyIn[index],
+                                                            battery.energyOut[index])
+        elif state == 'OFF':
+            self.instruments[index][kind] = self.instrument('OFF', 0)
+        elif state == 'SUSPEND' and instrument['state'] in ('ON', 'RESUME'):
+            instrument.update(self.instrumentTotals(index, instrument, now))
+            instrument['state'] = 'SUSPEND'
+        elif state == 'RESUME' and instrument['state'] == 'SUSPEND':
+            self.instruments[index][kind] = self.instrument('RESUME', now, *(
+                getattr(battery, name)[index] - instrument[name] for name in
+                ('chargeIn', 'chargeOut', 'energyIn', 'energyOut')))
+            self.instruments[index][kind]['elapsed'] = instrument['elapsed']
+
+    def instrumentTotals(self, index, instrument, now):
+        if instrument['state'] == 'OFF':
+            return {'elapsed': 0.0, 'chargeIn': 0.0, 'chargeOut': 0.0, 'energyIn': 0.0, 'energyOut': 0.0}
+        if instrument['state'] == 'SUSPEND':
+            return {name: instrument[name] for name in ('elapsed', 'chargeIn', 'chargeOut', 'energyIn', 'energyOut')}
+        totals = {name: getattr(self.battery, name)[index] - instrument[name] for name in
+                  ('chargeIn', 'chargeOut', 'energyIn', 'energyOut')}
+        totals['elapsed'] = instrument['elapsed'] + now - instrument['started']
+        return totals
+
+    def query(self, index, part, now):
+        battery = self.battery
+        setpoints = self.setpoints
+        if part.startswith('MEASure:INStrument '):
+            fields = part[len('MEASure:INStrument '):-1].upper().split(',')
+            instrument = self.instruments[index][fields[0]]
+            if fields[1] == 'STATE':
+                return instrument['state']
+            totals = self.instrumentTotals(index, instrument, now)
+            if fields[1] == 'TIMESEC':
+                return f'{totals["elapsed"]:.1f}'
+            if fields[1] == 'TIMEHR':
+                return f'{totals["elapsed"] / 3600.0:.3f}'
+            if fields[2] == 'TOTAL':
+                name = ('charge' if fields[0] == 'AH' else 'energy') + ('In' if fields[1] == 'POS' else 'Out')
+                return f'{totals[name]:.6E}'
+            return '0'
+        answers = {
+            'MEASure:VOLtage?': lambda: f'{battery.voltage[index]:.4f}',
+            'MEASure:CURrent?': lambda: f'{battery.current[index] + 0.0:.4f}',
+            'MEASure:POWer?': lambda: f'{battery.voltage[index] * battery.current[index] + 0.0:.3f}',
+            'MEASure:TEMperature?': lambda: '35.0',
+            'SOURce:VOLtage?': lambda: f'{setpoints["voltage"][index]:.4f}',
+            'SOURce:CURrent?': lambda: f'{setpoints["current"][index]:.4f}',
+            'SOURce:CURrent:NEGative?': lambda: f'{setpoints["negativeCurrent"][index]:.4f}',
+            'SOURce:POWer?': lambda: f'{setpoints["power"][index]:.3f}',
+            'SOURce:POWer:NEGative?': lambda: f'{setpoints["negativePower"][index]:.3f}',
+            'SOURce:VOLtage:MAXimum?': lambda: f'{self.maximumVoltage:.4f}',
+            'SOURce:CURrent:MAXimum?': lambda: f'{self.maximumCurrent:.4f}',
+            'SOURce:CURrent:NEGative:MAXimum?': lambda: f'{-self.maximumCurrent:.4f}',
+            'SOURce:POWer:MAXimum?': lambda: f'{self.maximumPower:.3f}',
+            'SOURce:POWer:NEGative:MAXimum?': lambda: f'{-self.maximumPower:.3f}',
+            'SOURce:VOLtage:STEpsize?': lambda: '0.001',
+            'SOURce:CURrent:STEpsize?': lambda: '0.01',
+            'SOURce:POWer:STEpsize?': lambda: '1',
+            'OUTPut?': lambda: '1' if setpoints['output'][index] else '0',
+            'SYSTem:COMmunicate:WATchdog SET?': lambda: f'{round(self.watchdogs[index] * 1000)}',
+            'SYSTem:COMmunicate:WATchdog?': lambda: self.watchdogState(index, now),
+            'SYSTem:ERRor?': lambda: '0, "No error"',
+            'SYSTem:WARning?': lambda: '0, "No warning"',
+            '*IDN?': lambda: f'DELTA ELEKTRONIKA BV, SM15K SIMULATOR, SIM{index:05d}, 1.0'}
+        if part.startswith('SYSTem:LIMits:'):
+            value, state = self.limits[index][part[len('SYSTem:LIMits:'):-1]]
+            return f'{value:.4f},{state}'
+        answer = answers.get(part)
+        return answer() if answer is not None else '0'
+
+    def watchdogState(self, index, now):
+        if self.watchdogTimeouts[index]:
+            return '0'
+        if self.watchdogs[index] <= 0:
+            return '-1'
+        return f'{max(1, round((self.watchdogs[index] - (now - self.lastContact[index])) * 1000))}'
 
-    def checkChargingStage(self):
-        if (float(MeasureSubsystem(self.IPV4).MeasureCurrent()) < self.absorptionCurrent) and self.bulkMode:
-            self.absorptionStage()
-            self.bulkMode = False
-            self.absorptionMode = True
-        elif (float(MeasureSubsystem(self.IPV4).MeasureCurrent()) < self.floatCurrent) and self.absorptionMode:
-            self.floatingStage()
-            self.absorptionMode = False
-            self.floatingMode = True
+    def stop(self):
+        logger.debug('Device simulator stop event has been started!')
+        self._stop_event.set()
 
-        if self.bulkMode:
-            logger.debug('Bulk Mode is active!')
-            if self.bulkInfo < 1:
-                cprint.printFeedback('Bulk Mode is active!')
-                self.bulkInfo += 1
-        elif self.absorptionMode:
-            logger.debug('Absorption Mode is active!')
-            if self.absorptionInfo < 1:
-                cprint.printFeedback('Absorption Mode is active!')
-        elif self.floatingMode:
-            logger.debug('Floating mode is active!')
-            cprint.printFeedback('Floating mode is active!')
-            logger.debug(f'Float time is: {self.floatTime}')
-            time.sleep(self.floatTime)
-            self.chargingFinalize()
-            time.sleep(self.afterChargingRestTime)
-            self.bulkMode = True
-            self.absorptionMode = False
-            self.floatingMode = False
-            self.chargingMode = False
-            if not self.startCharging:
-                self.counter += 1
-            self.dischargingInitializeMode = True
+    def run(self):
+        logger.debug(f'Device simulator has been started for {", ".join(self.devices)}!')
+        threads = [threading.Thread(target=server.serve_forever, daemon=True) for server in self.servers]
+        for thread in threads:
+            thread.start()
+        self._stop_event.wait()
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        logger.debug('Device simulator has been stopped!')
+
+
+class SelfTestRunner:
+    """
+        Parallel Self Test Functional Operation
+        -----------------------------------------------------------------------------------------------------------------
+        devices: Addresses of the devices to test, e.g. a whole rack from DeviceDiscovery
+        -----------------------------------------------------------------------------------------------------------------
+        checks: Names of the checks to run (keys of SelfTestRunner.checks), default is all of them in order
+        -----------------------------------------------------------------------------------------------------------------
+        parallel: Maximum number of devices tested at the same time, the checks of one device always run one by one
+        -----------------------------------------------------------------------------------------------------------------
+        destructive: False (default) runs only the read only queries of every subsystem (SelfTestRunner.queries), the
+        device state is not changed. True calls the Test*Subsystem method of every subsystem instead, they reset the
+        device, switch the output, set limits, lock the front panel, set the clock and arm the watchdog. The state
+        they change is read before the checks and sent back after them (RestoreState check), Ah and Wh instrument
+        totals restart and cannot be restored.
+        -----------------------------------------------------------------------------------------------------------------
+        Every transaction of the calling thread is recorded by a Communication hook with its latency and outcome. A
+        query passes if its typed reply (TypedResults) can be parsed, a check passes if all of its transactions passed
+        and the error queue (SYSTem:ERRor?) is empty after it. Remaining checks of a device are skipped once the device
+        cannot be reached. The known state of StateReconciler.of(IPV4) is invalidated after the checks.
+        -----------------------------------------------------------------------------------------------------------------
+        run(): Tests all devices and returns report(), a dictionary of the devices, checks and commands.
+        -----------------------------------------------------------------------------------------------------------------
+        saveJson(fileName), saveJunit(fileName): Writes the report as JSON or as JUnit XML (one test suite per device).
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    checks = collections.OrderedDict([('GeneralInstructions', (None, 'TestGeneralInstructions')),
+                                      ('SourceSubsystem', ('source', 'TestSourceSubsystem')),
+                                      ('MeasureSubsystem', ('measure', 'TestMeasureSubsystem')),
+                                      ('SystemSubsystem', ('system', 'TestSystemSubsystem')),
+                                      ('OutputSubsystem', ('output', 'TestOutputSubsystem'))])
+    queries = {'GeneralInstructions': ('Identification', 'ProtectedUserData'),
+               'SourceSubsystem': ('MaximumVoltage', 'MaximumCurrent', 'MaximumNegativeCurrent', 'MaximumPower',
+                                   'MaximumNegativePower', 'ReadVoltageSet', 'ReadCurrentSet', 'ReadNegativeCurrentSet',
+                                   'ReadPowerSet', 'ReadNegativePowerSet', 'ReadVoltageStepSize',
+                                   'ReadCurrentStepSize', 'ReadPowerStepSize'),
+               'MeasureSubsystem': ('MeasureVoltage', 'MeasureCurrent', 'MeasurePower', 'ReadAhMeasurementSetState',
+                                    'ReadAhMeasurementTimeSeconds', 'MeasureAhPositiveTotal', 'MeasureAhNegativeTotal',
+                                    'ReadWhMeasurementSetState', 'ReadWhMeasurementTimeSeconds',
+                                    'MeasureWhPositiveTotal', 'MeasureWhNegativeTotal', 'MeasureTemperature'),
+               'SystemSubsystem': ('ReadRemoteShutDownSet', 'ReadVoltageLimitSet', 'ReadCurrentLimitSet',
+                                   'ReadNegativeCurrentLimitSet', 'ReadPowerLimitSet', 'ReadNegativePowerLimitSet',
+                                   'ReadLockFrontpanelSet', 'ReadLockControlFrontpanelSet', 'ReadTimeSet',
+                                   'ReadDateSet', 'ReadWarnings', 'ReadWatchdogSet'),
+               'OutputSubsystem': ('ReadOutputSet',)}
+    errorQuery = 'SYSTem:ERRor?\n'
+    _recording = threading.local()
+
+    def __init__(self, devices, checks=None, parallel=32, destructive=False):
+        self.devices = list(collections.OrderedDict.fromkeys(devices))
+        self.destructive = destructive
+        self.selected = list(SelfTestRunner.checks) if checks is None else list(checks)
+        unknown = [name for name in self.selected if name not in SelfTestRunner.checks]
+        if unknown:
+            raise ValueError(f'Unknown self test checks: {", ".join(unknown)}')
+        self.parallel = max(1, parallel)
+        self.results = collections.OrderedDict((IPV4, []) for IPV4 in self.devices)
+        self.startedAt = None
+        self.duration = 0.0
+        self._afterHook = self.recordTransaction
 
-    def dischargingInitialize(self):
-        logger.debug('Discharging is being initialized!')
-        cprint.printFeedback('Discharging is being initialized!')
-        SystemSubsystem(self.IPV4).HighlightFrontpanel()
-        SystemSubsystem(self.IPV4).SetVoltageLimit(self.dischargeVoltage, 'ON')
-        SystemSubsystem(self.IPV4).ReadVoltageLimitSet()
-        SystemSubsystem(self.IPV4).SetNegativeCurrentLimit(self.dischargeCurrent - 10, 'ON')
-        SystemSubsystem(self.IPV4).ReadNegativeCurrentLimitSet()
-        SystemSubsystem(self.IPV4).SetNegativePowerLimit(self.dischargeVoltage * self.dischargeCurrent - 100, 'ON')
-        SystemSubsystem(self.IPV4).ReadNegativePowerLimitSet()
-        time.sleep(1)
+    def __str__(self):
+        return f'Self Test of {len(self.devices)} devices, for details print object.__doc__'
 
-    def dischargingStage(self):
-        logger.debug('Discharging stage is started!')
-        cprint.printFeedback('Discharging stage is started!')
-        SourceSubsystem(self.IPV4).SetVoltage(self.dischargeVoltage)
-        SourceSubsystem(self.IPV4).ReadVoltageSet()
-        SourceSubsystem(self.IPV4).SetNegativeCurrent(self.dischargeCurrent)
-        SourceSubsystem(self.IPV4).ReadNegativeCurrentSet()
-        SourceSubsystem(self.IPV4).SetNegativePower(self.dischargeCurrent * self.dischargeVoltage - 50)
-        SourceSubsystem(self.IPV4).ReadNegativePowerSet()
-        time.sleep(1)
+    @staticmethod
+    def recordTransaction(IPV4, message, sentBytes, receivedBytes, start, end, error):
+        commands = getattr(SelfTestRunner._recording, 'commands', None)
+        if commands is None:
+            return
+        reply = None if receivedBytes is None else receivedBytes.decode('UTF-8', 'replace').rstrip('\n')
+        problem = None if error is None else f'{type(error).__name__}: {error}'
+        if problem is None and reply is not None:
+            try:
+                TypedResults.parseReply(message, reply)
+            except (ValueError, IndexError) as parseError:
+                problem = f'Reply {reply!r} cannot be parsed: {parseError}'
+        commands.append({'message': message.strip(), 'reply': reply, 'latency': end - start,
+                         'passed': problem is None, 'error': problem})
+
+    def runCheck(self, delta, name):
+        subsystem, method = SelfTestRunner.checks[name]
+        commands = []
+        SelfTestRunner._recording.commands = commands
+        start = time.perf_counter()
+        error = None
+        unreachable = False
+        try:
+            target = delta if subsystem is None else getattr(delta, subsystem)
+            if self.destructive:
+                getattr(target, method)()
+            else:
+                for query in SelfTestRunner.queries[name]:
+                    getattr(target, query)()
+            code, message = TypedResults.parseMessage(Communication.sendReceiveMessage(delta.IPV4,
+                                                                                       SelfTestRunner.errorQuery))
+            if code != 0:
+                error = f'Device error {code}: {message}'
+        except OSError as exception:
+            error = f'{type(exception).__name__}: {exception}'
+            unreachable = True
+        except Exception as exception:
+            error = f'{type(exception).__name__}: {exception}'
+        finally:
+            SelfTestRunner._recording.commands = None
+        failed = [command for command in commands if not command['passed']]
+        if error is None and failed:
+            error = f'{failed[0]["message"]} failed, {failed[0]["error"]}'
+        return {'name': name, 'passed': error is None, 'skipped': False, 'duration': time.perf_counter() - start,
+                'error': error, 'commands': commands}, unreachable
 
-    def dischargingFinalize(self):
-        logger.debug('Charging is being finalized!')
-        cprint.printFeedback('Charging is being finalized!')
-        SystemSubsystem(self.IPV4).HighlightFrontpanel()
-        ShutdownOperation(self.IPV4).setShutdownOutput()
-        ShutdownOperation(self.IPV4).setShutdownValues()
+    @staticmethod
+    def snapshotState(delta):
+        """
+        :return: Settings which the destructive checks change, read before them so restoreState can send them back
+        """
+        system, measure = delta.system.typed, delta.measure.typed
+        return {'reconciled': StateReconciler.of(delta.IPV4).refresh(),
+                'remoteShutDown': system.ReadRemoteShutDownSet(), 'frontpanel': system.ReadLockFrontpanelSet(),
+                'frontpanelControls': system.ReadLockControlFrontpanelSet(),
+                'watchdog': (system.ReadCurrentWatchdogState(), system.ReadWatchdogSet()),
+                'instruments': (measure.ReadAhMeasurementSetState(), measure.ReadWhMeasurementSetState()),
+                'clock': (system.ReadDateSet(), system.ReadTimeSet(), time.monotonic())}
 
-    def checkDischargingStage(self):
-        if float(MeasureSubsystem(self.IPV4).MeasureCurrent()) > self.cutoffCurrent:
-            self.dischargingFinalize()
-            time.sleep(self.afterDischargingRestTime)
-            if self.startCharging:
-                self.counter += 1
-            self.dischargingMode = False
-            self.chargingInitializeMode = True
+    @staticmethod
+    def restoreState(delta, state):
+        reconciled = dict(state['reconciled'])
+        output = reconciled.pop('output', None)
+        messages = list(reconciled.values())
+        if output is not None:
+            if StateReconciler.outputSetting(output.split()[-1]):
+                messages.append(output)
+            else:
+                messages.insert(0, output)
+        StateReconciler.of(delta.IPV4).send((tuple(messages), state['reconciled']))
+        delta.system.SetRemoteShutDown(state['remoteShutDown'].value)
+        delta.system.LockFrontPanel(state['frontpanel'].value)
+        delta.system.LockControlFrontpanel(state['frontpanelControls'].value)
+        remaining, timer = state['watchdog']
+        if remaining > 0:
+            delta.system.SetWatchdog(int(timer))
         else:
-            logger.debug('Discharging is still running!')
-
-    def stop(self):
-        logger.debug('Cycling thread class stop event has been started!')
-        cprint.printFeedback('Cycling thread class stop event has been started!')
-        self._stop_event.set()
+            delta.system.DisableWatchdog()
+        if state['instruments'][0] is State.OFF:
+            delta.measure.SetAhMeasurementState('OFF')
+        if state['instruments'][1] is State.OFF:
+            delta.measure.SetWhMeasurementState('OFF')
+        date, clockTime, readAt = state['clock']
+        if date is not None and clockTime is not None and len(date) == 3 and len(clockTime) == 3:
+            now = datetime.datetime(*date, *clockTime) + datetime.timedelta(seconds=time.monotonic() - readAt)
+            delta.system.SetDate(now.year, now.month, now.day)
+            delta.system.SetTime(now.hour, now.minute, now.second)
+
+    def testDevice(self, IPV4):
+        logger.debug(f'Self test of {IPV4} runs!')
+        delta = SM15K(IPV4)
+        results = self.results[IPV4]
+        unreachable = False
+        state = None
+        if self.destructive:
+            try:
+                state = SelfTestRunner.snapshotState(delta)
+            except (OSError, ValueError) as error:
+                unreachable = True
+                results.append({'name': 'SnapshotState', 'passed': False, 'skipped': False, 'duration': 0.0,
+                                'error': f'{type(error).__name__}: {error}', 'commands': []})
+        try:
+            for name in self.selected:
+                if unreachable:
+                    results.append({'name': name, 'passed': False, 'skipped': True, 'duration': 0.0,
+                                    'error': 'Device is unreachable', 'commands': []})
+                    continue
+                result, unreachable = self.runCheck(delta, name)
+                results.append(result)
+                if not result['passed']:
+                    logger.debug(f'Self test check {name} of {IPV4} has been failed: {result["error"]}!')
+            if state is not None:
+                start = time.perf_counter()
+                try:
+                    SelfTestRunner.restoreState(delta, state)
+                    error = None
+                except (OSError, ValueError) as exception:
+                    error = f'{type(exception).__name__}: {exception}'
+                    logger.error(f'Device state of {IPV4} has not been restored after the self test: {error}')
+                    cprint.printError(f'Device state of {IPV4} has not been restored after the self test: {error}')
+                results.append({'name': 'RestoreState', 'passed': error is None, 'skipped': False,
+                                'duration': time.perf_counter() - start, 'error': error, 'commands': []})
+        finally:
+            StateReconciler.of(IPV4).invalidate()
+        logger.debug(f'Self test of {IPV4} has been finished!')
+
+    def worker(self, pending):
+        while True:
+            try:
+                IPV4 = pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                self.testDevice(IPV4)
+            except Exception:
+                logger.exception(f'Self test of {IPV4} has been failed!')
 
     def run(self):
-        logger.debug('Cycling thread class has been started!')
-        if self.startCharging:
-            self.chargingInitializeMode = True
-            self.dischargingInitializeMode = False
-            while not self._stop_event.is_set():
-                if self.counter < self.cycleTime:
-                    if self.chargingInitializeMode:
-                        cprint.printFeedback('Charging mode initialized!')
-                        self.chargingInitialize()
-                        self.bulkStage()
-                        self.outputInitialize()
-                        self.chargingInitializeMode = False
-                        self.chargingMode = True
-                    elif self.chargingMode:
-                        cprint.printFeedback('Charging mode is running!')
-                        time.sleep(self.sleepTime)
-                        self.checkChargingStage()
-                    elif self.dischargingInitializeMode:
-                        cprint.printFeedback('Discharging mode initialized!')
-                        self.dischargingInitialize()
-                        self.dischargingStage()
-                        self.outputInitialize()
-                        self.dischargingInitializeMode = False
-                        self.dischargingMode = True
-                    elif self.dischargingMode:
-                        cprint.printFeedback('Discharging mode is running!')
-                        time.sleep(self.sleepTime)
-                        self.checkDischargingStage()
-                else:
-                    self.stop()
-        else:
-            self.chargingInitializeMode = False
-            self.dischargingInitializeMode = True
-            while not self._stop_event.is_set():
-                if self.counter < self.cycleTime:
-                    if self.chargingInitializeMode:
-                        cprint.printFeedback('Charging mode initialized!')
-                        self.chargingInitialize()
-                        self.bulkStage()
-                        self.outputInitialize()
-                        self.chargingInitializeMode = False
-                        self.chargingMode = True
-                    elif self.chargingMode:
-                        cprint.printFeedback('Charging mode is running!')
-                        time.sleep(self.sleepTime)
-                        self.checkChargingStage()
-                    elif self.dischargingInitializeMode:
-                        cprint.printFeedback('Discharging mode is initialized!')
-                        self.dischargingInitialize()
-                        self.dischargingStage()
-                        self.outputInitialize()
-                        self.dischargingInitializeMode = False
-                        self.dischargingMode = True
-                    elif self.dischargingMode:
-                        cprint.printFeedback('Discharging mode is running!')
-                        time.sleep(self.sleepTime)
-                        self.checkDischargingStage()
-                else:
-                    self.stop()
-        self.cyclingFinalize()
-        cprint.printFeedback('Cycling thread class has been stopped!')
+        for results in self.results.values():
+            del results[:]
+        pending = queue.Queue()
+        for IPV4 in self.devices:
+            pending.put(IPV4)
+        self.startedAt = datetime.datetime.now().isoformat(timespec='seconds')
+        start = time.perf_counter()
+        Communication.addHook(after=self._afterHook)
+        try:
+            workers = [threading.Thread(target=self.worker, args=(pending,), daemon=True)
+                       for _ in range(min(self.parallel, len(self.devices)))]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        finally:
+            Communication.removeHook(after=self._afterHook)
+        self.duration = time.perf_counter() - start
+        report = self.report()
+        summary = report['summary']
+        printer = cprint.printFeedback if summary['failed'] == 0 else cprint.printError
+        printer(f'Self test of {summary["devices"]} devices: {summary["passed"]} checks passed, '
+                f'{summary["failed"]} failed, {summary["skipped"]} skipped in {self.duration:.2f} s')
+        return report
+
+    def report(self):
+        checks = [result for results in self.results.values() for result in results]
+        latencies = [command['latency'] for result in checks for command in result['commands']]
+        return {'startedAt': self.startedAt, 'duration': self.duration,
+                'summary': {'devices': len(self.devices), 'checks': len(checks),
+                            'passed': sum(1 for result in checks if result['passed']),
+                            'failed': sum(1 for result in checks if not result['passed'] and not result['skipped']),
+                            'skipped': sum(1 for result in checks if result['skipped']),
+                            'commands': len(latencies),
+                            'maximumLatency': max(latencies) if latencies else None},
+                'devices': collections.OrderedDict(
+                    (IPV4, {'passed': all(result['passed'] for result in results), 'checks': results})
+                    for IPV4, results in self.results.items())}
+
+    def saveJson(self, fileName):
+        with open(fileName, 'w') as reportFile:
+            json.dump(self.report(), reportFile, indent=2)
+        logger.debug(f'Self test report has been written to {fileName}!')
+        return fileName
+
+    def junit(self):
+        suites = xml.etree.ElementTree.Element('testsuites', name='SM15K self test', time=f'{self.duration:.6f}')
+        for IPV4, results in self.results.items():
+            suite = xml.etree.ElementTree.SubElement(
+                suites, 'testsuite', name=IPV4, tests=str(len(results)),
+                failures=str(sum(1 for result in results if not result['passed'] and not result['skipped'])),
+                skipped=str(sum(1 for result in results if result['skipped'])),
+                time=f'{sum(result["duration"] for result in results):.6f}', timestamp=self.startedAt or '')
+            for result in results:
+                case = xml.etree.ElementTree.SubElement(suite, 'testcase', classname=f'SM15K.{IPV4}',
+                                                        name=result['name'], time=f'{result["duration"]:.6f}')
+                if result['skipped']:
+                    xml.etree.ElementTree.SubElement(case, 'skipped', message=result['error'])
+                elif not result['passed']:
+                    xml.etree.ElementTree.SubElement(case, 'failure', message=result['error'])
+                lines = [f'{command["latency"] * 1000:9.3f} ms {"PASS" if command["passed"] else "FAIL"} '
+                         f'{command["message"]}' + ('' if command['reply'] is None else f' -> {command["reply"]}')
+                         for command in result['commands']]
+                if lines:
+                    xml.etree.ElementTree.SubElement(case, 'system-out').text = '\n'.join(lines)
+        return suites
+
+    def saveJunit(self, fileName):
+        xml.etree.ElementTree.ElementTree(self.junit()).write(fileName, encoding='utf-8', xml_declaration=True)
+        logger.debug(f'Self test JUnit report has been written to {fileName}!')
+        return fileName
 
 
 class TestOperations:
@@ -1883,5 +6510,248 @@ class TestOperations:
         Cycling.start()
 
 
+class CommandLine:
+    """
+        Command Line Interface (sm15k)
+        -----------------------------------------------------------------------------------------------------------------
+        log: Datalogger (basic, ah or wh frame) of one or more devices, samples are streamed to stdout (SampleStream)
+        -----------------------------------------------------------------------------------------------------------------
+        charge, discharge, cycle: Charging, Discharging and Cycling operation of one device, with --log-interval basic
+        samples of the device are streamed to stdout while the operation runs
+        -----------------------------------------------------------------------------------------------------------------
+        shutdown: Shutdown state of one or more devices, one JSON line per device
+        -----------------------------------------------------------------------------------------------------------------
+        discover: DeviceDiscovery of a network, one JSON line per device of the inventory
+        -----------------------------------------------------------------------------------------------------------------
+        stdout carries the records only (--format ndjson or binary), feedback of the operations is printed to stderr.
+        Operations run until they finish, --duration passes, the reader goes away or Ctrl+C is pressed, then they are
+        stopped and finalized. Exit code is 0 if all succeeded, 1 if an operation thread has died with an exception or
+        the reader has gone away before all samples were delivered.
+        -----------------------------------------------------------------------------------------------------------------
+        main() is meant as the sm15k console script entry point (sm15k = SM15K:main). The repository ships no packaging
+        metadata, so without an installed entry point it runs as python SM15K.py.
+        -----------------------------------------------------------------------------------------------------------------
+    """
+    dataloggers = {'basic': BasicDataloggerOperation, 'ah': AhDataloggerOperation, 'wh': WhDataloggerOperation}
+
+    def __init__(self, output=None):
+        self.output = sys.stdout.buffer if output is None else output
+        self.options = None
+
+    def __str__(self):
+        return f'Command Line Interface, for details print object.__doc__'
+
+    @staticmethod
+    def parser():
+        parser = argparse.ArgumentParser(prog='sm15k', description='Delta Elektronika SM15K power supply operations.')
+        parser.add_argument('--version', action='version', version=f'%(prog)s {__version__}')
+        parser.add_argument('--port', type=int, default=Communication.port_name, help='port of the devices')
+        parser.add_argument('--format', dest='outputFormat', choices=('ndjson', 'binary'), default='ndjson',
+                            help='format of the streamed samples (default ndjson)')
+        parser.add_argument('--capacity', type=int, default=1024, help='maximum number of samples waiting for stdout')
+        parser.add_argument('--drop', action='store_true',
+                            help='drop samples when stdout is slow instead of slowing the dataloggers down')
+        parser.add_argument('--duration', type=float, default=None, help='stop the operation after seconds')
+        commands = parser.add_subparsers(dest='command', required=True)
+
+        log = commands.add_parser('log', help='stream samples of devices')
+        log.add_argument('devices', nargs='+', help='IPV4 addresses of the devices')
+        log.add_argument('--frame', choices=tuple(CommandLine.dataloggers), default='basic', help='sample frame')
+        log.add_argument('--interval', type=float, default=1.0, help='seconds between samples')
+
+        charge = commands.add_parser('charge', help='3 step charging of a device')
+        charge.add_argument('device', help='IPV4 address of the device')
+        charge.add_argument('--bulk-current', type=float, required=True)
+        charge.add_argument('--bulk-voltage', type=float, required=True)
+        charge.add_argument('--float-voltage', type=float, required=True)
+        charge.add_argument('--float-time', type=float, default=0.0, help='seconds of the floating stage')
+
+        discharge = commands.add_parser('discharge', help='discharging of a device')
+        discharge.add_argument('device', help='IPV4 address of the device')
+        discharge.add_argument('--discharge-current', type=float, required=True)
+        discharge.add_argument('--discharge-voltage', type=float, required=True)
+        discharge.add_argument('--cutoff-current', type=float, required=True)
+
+        cycle = commands.add_parser('cycle', help='charge and discharge cycling of a device')
+        cycle.add_argument('device', help='IPV4 address of the device')
+        cycle.add_argument('--cycles', type=int, required=True, help='number of cycles')
+        cycle.add_argument('--bulk-current', type=float, required=True)
+        cycle.add_argument('--bulk-voltage', type=float, required=True)
+        cycle.add_argument('--float-voltage', type=float, required=True)
+        cycle.add_argument('--float-time', type=float, default=0.0, help='seconds of the floating stage')
+        cycle.add_argument('--discharge-current', type=float, required=True)
+        cycle.add_argument('--discharge-voltage', type=float, required=True)
+        cycle.add_argument('--cutoff-current', type=float, required=True)
+        cycle.add_argument('--charged-rest', type=float, default=30.0, help='seconds of rest after charging')
+        cycle.add_argument('--discharged-rest', type=float, default=30.0, help='seconds of rest after discharging')
+        cycle.add_argument('--start-discharging', action='store_true', help='start with discharging')
+        cycle.add_argument('--checkpoint', default=None, help='checkpoint file, an existing one is resumed')
+
+        for operation in (charge, discharge, cycle):
+            operation.add_argument('--sleep-time', type=float, default=10.0, help='seconds between stage checks')
+            operation.add_argument('--log-interval', type=float, default=None,
+                                   help='stream basic samples of the device every seconds')
+
+        shutdown = commands.add_parser('shutdown', help='bring devices to the shutdown state')
+        shutdown.add_argument('devices', nargs='+', help='IPV4 addresses of the devices')
+        shutdown.add_argument('--keep-limits', action='store_true', help='do not set the shutdown limits')
+
+        discover = commands.add_parser('discover', help='scan a network for devices')
+        discover.add_argument('network', help='CIDR range, e.g. 192.168.0.0/24')
+        discover.add_argument('--connect-timeout', type=float, default=0.5)
+        discover.add_argument('--reply-timeout', type=float, default=1.0)
+        discover.add_argument('--parallel', type=int, default=256)
+        discover.add_argument('--cache', default=None, help='inventory cache file, no cache unless given')
+        discover.add_argument('--maximum-age', type=float, default=None, help='seconds a cached inventory is used')
+        return parser
+
+    def emit(self, record):
+        self.output.write((json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8'))
+        self.output.flush()
+
+    def silence(self):
+        # The reader has gone away (e.g. | head), the interpreter must not fail while flushing stdout at exit
+        try:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), self.output.fileno())
+        except (AttributeError, OSError, ValueError):
+            pass
+
+    def stream(self):
+        return SampleStream(self.output, self.options.outputFormat, self.options.capacity, not self.options.drop)
+
+    def datalogger(self, IPV4, frame, interval, stream):
+        return CommandLine.dataloggers[frame](IPV4, interval, highRate=True, consoleEcho=False,
+                                              bufferSize=max(1, int(60 / interval)), sink=stream)
+
+    def supervise(self, operation, companions=(), stream=None):
+        """
+        Runs the operation (and its companion threads) until it finishes, the duration passes, the reader of the stream
+        goes away or Ctrl+C is pressed, then all of them are stopped and joined (operations finalize themselves).
+        :return: 1 if a thread has died with an exception or samples have not been delivered, 0 otherwise
+        """
+        threads = [operation] + list(companions)
+        failed = []
+        excepthook = threading.excepthook
+
+        def recordFailure(arguments):
+            if arguments.thread in threads:
+                failed.append(arguments.thread)
+            excepthook(arguments)
+
+        threading.excepthook = recordFailure
+        try:
+            if stream is not None:
+                stream.start()
+            for thread in threads:
+                thread.start()
+            deadline = None if self.options.duration is None else time.monotonic() + self.options.duration
+            try:
+                while operation.is_alive():
+                    operation.join(0.2)
+                    if (deadline is not None and time.monotonic() >= deadline) or \
+                            (stream is not None and stream.broken) or failed:
+                        break
+            except KeyboardInterrupt:
+                cprint.printError('Operation has been interrupted, it is being stopped!')
+            for thread in threads:
+                thread.stop()
+            for thread in threads:
+                thread.join()
+        finally:
+            threading.excepthook = excepthook
+        undelivered = 0
+        if stream is not None:
+            stream.stop()
+            stream.join()
+            undelivered = stream.undelivered()
+            logger.debug(f'{stream.written} samples have been streamed, {stream.dropped} dropped, '
+                         f'{undelivered} undelivered!')
+            if stream.broken:
+                self.silence()
+        for thread in failed:
+            cprint.printError(f'{thread.name} has died with an exception!')
+        if undelivered:
+            cprint.printError(f'Reader has gone away, {undelivered} samples have not been delivered!')
+        return 1 if failed or undelivered else 0
+
+    def companions(self, stream):
+        if self.options.log_interval is None:
+            return []
+        return [self.datalogger(self.options.device, 'basic', self.options.log_interval, stream)]
+
+    def log(self):
+        stream = self.stream()
+        dataloggers = [self.datalogger(IPV4, self.options.frame, self.options.interval, stream)
+                       for IPV4 in self.options.devices]
+        return self.supervise(dataloggers[0], dataloggers[1:], stream)
+
+    def charge(self):
+        options = self.options
+        stream = self.stream() if options.log_interval is not None else None
+        charging = ChargingOperation(options.device, options.sleep_time, options.bulk_current, options.bulk_voltage,
+                                     options.float_voltage, options.float_time)
+        return self.supervise(charging, self.companions(stream), stream)
+
+    def discharge(self):
+        options = self.options
+        stream = self.stream() if options.log_interval is not None else None
+        discharging = DischargingOperation(options.device, options.sleep_time, options.discharge_current,
+                                           options.discharge_voltage, options.cutoff_current)
+        return self.supervise(discharging, self.companions(stream), stream)
+
+    def cycle(self):
+        options = self.options
+        stream = self.stream() if options.log_interval is not None else None
+        cycling = CyclingOperation.resume(options.checkpoint) if options.checkpoint else None
+        if cycling is None:
+            cycling = CyclingOperation(options.device, options.sleep_time, options.cycles, options.bulk_current,
+                                       options.bulk_voltage, options.float_voltage, options.float_time,
+                                       options.discharge_current, options.discharge_voltage, options.cutoff_current,
+                                       options.charged_rest, options.discharged_rest, not options.start_discharging,
+                                       checkpointFile=options.checkpoint)
+        return self.supervise(cycling, self.companions(stream), stream)
+
+    def shutdown(self):
+        failed = 0
+        for IPV4 in self.options.devices:
+            try:
+                ShutdownOperation(IPV4).shutdown(limits=not self.options.keep_limits)
+                self.emit({'device': IPV4, 'shutdown': True})
+            except OSError as error:
+                failed += 1
+                self.emit({'device': IPV4, 'shutdown': False, 'error': f'{type(error).__name__}: {error}'})
+        return 1 if failed else 0
+
+    def discover(self):
+        options = self.options
+        discovery = DeviceDiscovery(options.network, port=options.port, connectTimeout=options.connect_timeout,
+                                    replyTimeout=options.reply_timeout, parallel=options.parallel,
+                                    cacheFile=options.cache)
+        for entry in discovery.discover(options.maximum_age):
+            self.emit(entry)
+        return 0
+
+    def run(self, arguments=None):
+        self.options = CommandLine.parser().parse_args(arguments)
+        Communication.port_name = self.options.port
+        console = sys.stdout
+        sys.stdout = sys.stderr
+        try:
+            return getattr(self, self.options.command)()
+        except BrokenPipeError:
+            cprint.printError('Reader has gone away, records have not been delivered!')
+            self.silence()
+            return 1
+        finally:
+            sys.stdout = console
+
+
+def main(arguments=None):
+    """
+    Entry point of the sm15k command, e.g. sm15k log 192.168.0.2 --interval 0.5 | jq .voltage
+    """
+    return CommandLine().run(arguments)
+
+
 if __name__ == '__main__':
-    pass
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""
+    Per call host CPU of the message encoding, without network, in microseconds.
+    Baseline is the encoding of Communication.sendMessage before precompilation (bytes(message, 'utf-8') of an
+    f-string), run with: python tests/benchmark_encoding.py [iterations]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import SM15K
+
+
+def baselineEncode(message):
+    return bytes(message, 'utf-8')
+
+
+def benchmark(iterations=100000):
+    source = SM15K.SourceSubsystem('0.0.0.0')
+    source.setStepSizes(voltage=0.001)
+    voltageMessage = source.voltageMessage
+    query = "MEASure:VOLtage?\n"
+    results = {
+        'queryBaseline': timeit.timeit(lambda: baselineEncode(query), number=iterations),
+        'queryPrecompiled': timeit.timeit(lambda: SM15K.CommandEncoder.encode(query), number=iterations),
+        'setterBaseline': timeit.timeit(lambda: baselineEncode(f'SOURce:VOLtage {14.5}\n'), number=iterations),
+        'setterPrecompiled': timeit.timeit(lambda: SM15K.CommandEncoder.encode(voltageMessage(14.5)),
+                                           number=iterations)}
+    return {name: duration / iterations * 1e6 for name, duration in results.items()}
+
+
+if __name__ == '__main__':
+    for name, microseconds in benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100000).items():
+        print(f'{name:<18} {microseconds:.3f} us')
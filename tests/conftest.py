@@ -0,0 +1,54 @@
+import itertools
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import SM15K  # noqa: E402
+
+_addresses = (f'127.0.{block}.{host}' for block, host in itertools.product(range(10, 250), range(2, 250)))
+
+
+def nextAddresses(count=1):
+    return [next(_addresses) for _ in range(count)]
+
+
+@pytest.fixture
+def devices(request):
+    """
+    Addresses of a fresh DeviceSimulator, every test gets unused loopback addresses (and so fresh per device caches).
+    Use @pytest.mark.parametrize('devices', [count], indirect=True) for more than one device.
+    """
+    count = getattr(request, 'param', 1)
+    addresses = nextAddresses(count)
+    simulator = SM15K.DeviceSimulator(addresses)
+    simulator.start()
+    time.sleep(0.05)
+    yield addresses
+    simulator.stop()
+    simulator.join(5)
+
+
+@pytest.fixture
+def simulator():
+    """
+    DeviceSimulator of one device for tests which look at its state, the address is simulator.devices[0].
+    """
+    simulator = SM15K.DeviceSimulator(nextAddresses(1))
+    simulator.start()
+    time.sleep(0.05)
+    yield simulator
+    simulator.stop()
+    simulator.join(5)
+
+
+@pytest.fixture(autouse=True)
+def transportDefaults():
+    saved = (SM15K.Communication.resilience, SM15K.Communication.timeouts, SM15K.Communication.coalescing,
+             SM15K.Communication.transport, SM15K.Communication.metrics, SM15K.clock)
+    yield
+    (SM15K.Communication.resilience, SM15K.Communication.timeouts, SM15K.Communication.coalescing,
+     SM15K.Communication.transport, SM15K.Communication.metrics, SM15K.clock) = saved
@@ -0,0 +1,33 @@
+import math
+
+import pytest
+
+import SM15K
+
+
+def testAhAndWhAreIntegratedFromKnownSamples():
+    accumulator = SM15K.ChargeAccumulator(capacity=100.0, soc=0.5)
+    for sample in (SM15K.BasicSample(0.0, 12.0, 10.0, 120.0), SM15K.BasicSample(1800.0, 12.0, 10.0, 120.0),
+                   SM15K.BasicSample(3600.0, 12.0, 20.0, 240.0)):
+        accumulator.update(sample)
+    assert accumulator.charge == pytest.approx(12.5) and accumulator.energy == pytest.approx(150.0)
+    assert accumulator.soc == pytest.approx(0.625)
+    accumulator.update(SM15K.BasicSample(5400.0, math.nan, math.nan, math.nan))
+    accumulator.update(SM15K.BasicSample(7200.0, 12.0, -20.0, -240.0))
+    assert accumulator.charge == pytest.approx(12.5)
+    accumulator.update(SM15K.BasicSample(9000.0, 12.0, -20.0, -240.0))
+    assert accumulator.charge == pytest.approx(2.5) and accumulator.energy == pytest.approx(30.0)
+    accumulator.setSoc(1.0)
+    assert accumulator.soc == 1.0
+    assert accumulator.report()['samples'] == 6 and accumulator.corrections == 0
+
+
+def testDeviceTotalsCorrectTheDrift():
+    accumulator = SM15K.ChargeAccumulator(correctionGain=0.5)
+    accumulator.update(SM15K.AhSample(0.0, 12.0, 10.0, 120.0, 0.0, 0.0, 0.0, 0.0))
+    accumulator.update(SM15K.AhSample(3600.0, 12.0, 10.0, 120.0, 11.0, -0.0, 3600.0, 1.0))
+    assert accumulator.charge == 11.0 and accumulator.chargeDrift == pytest.approx(1.0)
+    assert accumulator.currentOffset == pytest.approx(-0.5)
+    accumulator.update(SM15K.WhSample(7200.0, 12.0, 10.0, 120.0, 130.0, -10.0, 7200.0, 2.0))
+    assert accumulator.charge == pytest.approx(21.5) and accumulator.energy == 120.0
+    assert accumulator.energyDrift == pytest.approx(120.0 - 240.0) and accumulator.corrections == 3
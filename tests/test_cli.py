@@ -0,0 +1,82 @@
+import io
+import json
+import threading
+
+import SM15K
+from conftest import nextAddresses
+
+
+class BrokenOutput(io.RawIOBase):
+    def writable(self):
+        return True
+
+    def write(self, data):
+        raise BrokenPipeError('reader has gone away')
+
+
+class FailingOperation(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.stopped = threading.Event()
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        raise RuntimeError('operation has failed')
+
+
+def testLogStreamsSamplesToTheSink(devices):
+    output = io.BytesIO()
+    code = SM15K.CommandLine(output).run(['--duration', '0.5', 'log', devices[0], '--interval', '0.1'])
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert code == 0
+    assert records and all(record['device'] == devices[0] and record['record'] == 'basic_sample'
+                           for record in records)
+
+
+def testLogKeepsTheSamplesOfEveryDeviceApart():
+    devices = nextAddresses(2)
+    simulator = SM15K.DeviceSimulator(devices, battery=SM15K.BatteryModel(cells=2, soc=(0.05, 0.97)))
+    simulator.start()
+    try:
+        output = io.BytesIO()
+        code = SM15K.CommandLine(output).run(['--duration', '1', 'log', *devices, '--interval', '0.005'])
+    finally:
+        simulator.stop()
+        simulator.join(5)
+    voltages = {IPV4: set() for IPV4 in devices}
+    for line in output.getvalue().splitlines():
+        record = json.loads(line)
+        voltages[record['device']].add(round(record['voltage'], 1))
+    assert code == 0
+    assert voltages == {devices[0]: {11.6}, devices[1]: {13.8}}
+    assert SM15K.BasicDataloggerOperation.dataFrameBasic == ['Voltage', 'Current', 'Power']
+
+
+def testSuperviseFailsWhenTheOperationThreadDies():
+    commandLine = SM15K.CommandLine(io.BytesIO())
+    commandLine.options = SM15K.CommandLine.parser().parse_args(['--duration', '5', 'shutdown', '127.0.0.1'])
+    operation = FailingOperation()
+    excepthook = threading.excepthook
+    assert commandLine.supervise(operation) == 1
+    assert operation.stopped.is_set()
+    assert threading.excepthook is excepthook
+
+
+def testLogFailsWhenTheReaderGoesAway(devices):
+    commandLine = SM15K.CommandLine(BrokenOutput())
+    code = commandLine.run(['--duration', '5', 'log', devices[0], '--interval', '0.1'])
+    assert code == 1
+
+
+def testUndeliveredCountsOnlyAfterTheReaderHasGoneAway():
+    stream = SM15K.SampleStream(BrokenOutput(), capacity=4)
+    sample = SM15K.BasicSample(0.0, 1.0, 2.0, 2.0)
+    assert stream.undelivered() == 0
+    stream.start()
+    stream.write('127.0.0.1', sample)
+    stream.join(5)
+    stream.write('127.0.0.1', sample)
+    assert stream.broken and stream.written == 0
+    assert stream.undelivered() == 2
@@ -0,0 +1,49 @@
+import threading
+import time
+
+import SM15K
+
+
+def runTogether(count, function):
+    barrier = threading.Barrier(count)
+    results = []
+
+    def call():
+        barrier.wait()
+        results.append(function())
+
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def testConcurrentIdenticalQueriesSendOneRequest(simulator):
+    IPV4 = simulator.devices[0]
+    coalescer = SM15K.QueryCoalescer(window=0.5)
+    SM15K.Communication.coalescing = coalescer
+    measure = SM15K.MeasureSubsystem(IPV4)
+    requests = simulator.requests
+    replies = runTogether(8, measure.MeasureVoltage)
+    assert len(replies) == 8 and len(set(replies)) == 1
+    assert simulator.requests - requests == 1
+    assert coalescer.report() == {'queries': 8, 'requests': 1, 'shared': 7}
+    time.sleep(0.6)
+    measure.MeasureVoltage()
+    assert simulator.requests - requests == 2
+
+
+def testSettersAndQueueQueriesAreNeverCoalesced(simulator):
+    IPV4 = simulator.devices[0]
+    coalescer = SM15K.QueryCoalescer(window=10)
+    SM15K.Communication.coalescing = coalescer
+    requests = simulator.requests
+    runTogether(5, lambda: SM15K.SourceSubsystem(IPV4).SetVoltage(12))
+    for _ in range(3):
+        SM15K.Communication.sendReceiveMessage(IPV4, 'SYSTem:ERRor?\n')
+    assert simulator.requests - requests == 5 + 3
+    assert coalescer.report() == {'queries': 0, 'requests': 0, 'shared': 0}
+    assert not coalescer.isShareable('SOURce:VOLtage?;SOURce:VOLtage 12\n')
+    assert coalescer.isShareable('SOURce:VOLtage?;SOURce:CURrent?\n')
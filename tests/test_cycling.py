@@ -0,0 +1,89 @@
+import threading
+import time
+
+import SM15K
+
+
+class FakeCycling:
+    def __init__(self, IPV4, block=None):
+        self.IPV4 = IPV4
+        self.block = block
+        self.counter = 0
+        self.gaps = 0
+        self.finalized = threading.Event()
+        self._stop_event = threading.Event()
+
+    def state(self):
+        return 'finalized' if self.finalized.is_set() else 'cycling'
+
+    def stop(self):
+        self._stop_event.set()
+
+    def cycleSteps(self):
+        while not self._stop_event.is_set():
+            if self.block is not None:
+                self.block.wait(5)
+            self.counter += 1
+            yield 0.01
+
+    def finalizeSteps(self):
+        self.finalized.set()
+        yield 0.0
+
+
+def testSlowDeviceDoesNotHoldTheOthers():
+    block = threading.Event()
+    slow, fast = FakeCycling('10.0.0.1', block), FakeCycling('10.0.0.2')
+    engine = SM15K.CyclingEngine([slow, fast], workers=2)
+    engine.start()
+    try:
+        time.sleep(0.3)
+        assert fast.counter > 5 and slow.counter == 0
+        assert engine.report()['10.0.0.2']['running']
+        engine.stopOperation('10.0.0.1')
+        engine.stopOperation('10.0.0.2')
+        assert fast.finalized.wait(2) and not slow.finalized.is_set()
+        block.set()
+        assert slow.finalized.wait(2)
+    finally:
+        block.set()
+        engine.stop()
+        engine.join(5)
+    assert not engine.is_alive()
+    assert not any(device['running'] for device in engine.report().values())
+
+
+def testHalfCycleSummaryIsCommittedAtOnce(tmp_path):
+    import sqlite3
+    store = SM15K.CycleSummaryStore(str(tmp_path / 'CycleSummary.sqlite'), batchSize=16, flushInterval=3600)
+    try:
+        operation = SM15K.CyclingOperation('10.0.0.1', summaryStore=store)
+        operation.completeHalfCycle()
+        with sqlite3.connect(store.fileName) as reader:
+            assert reader.execute('SELECT device FROM cycle_summary').fetchall() == [('10.0.0.1',)]
+    finally:
+        store.close()
+
+
+def testResumeDuringSettleTimeRestoresTheNewStage(simulator, tmp_path):
+    IPV4 = simulator.devices[0]
+    checkpointFile = str(tmp_path / 'Cycling.json')
+    cycling = SM15K.CyclingOperation(IPV4, sleepTime=1, cycleTime=1, bulkCurrent=100.0, bulkVoltage=12.6,
+                                     floatVoltage=12.6, checkpointFile=checkpointFile)
+    steps = cycling.cycleSteps()
+    while cycling.halfCycle.stage != 'absorption':
+        next(steps)
+    # crash while the absorption stage settles, the checkpoint of this yield is all that is left
+    resumed = SM15K.CyclingOperation.resume(checkpointFile)
+    assert resumed.state() == 'charging'
+    assert (resumed.bulkMode, resumed.absorptionMode, resumed.floatingMode) == (False, True, False)
+    assert resumed.halfCycle.stage == 'absorption'
+    source = SM15K.SourceSubsystem(IPV4)
+    source.SetCurrent(5)
+    SM15K.OutputSubsystem(IPV4).SetOutput(0)
+    assert sorted(resumed.restoreDeviceState()) == ['current', 'output']
+    assert float(source.ReadCurrentSet()) == 80.0 and float(source.ReadVoltageSet()) == 12.6
+    steps = resumed.cycleSteps()
+    next(steps)
+    next(steps)
+    assert resumed.absorptionMode and resumed.halfCycle.durations['absorption'] == 0.0
@@ -0,0 +1,29 @@
+import sqlite3
+import time
+
+import SM15K
+
+
+def testDataloggerRowsAreWrittenToSQLite(simulator, tmp_path):
+    IPV4 = simulator.devices[0]
+    fileName = str(tmp_path / 'Datalogger.sqlite')
+    database = SM15K.SampleDatabase(fileName, batchSize=4, flushInterval=0.1)
+    database.start()
+    datalogger = SM15K.BasicDataloggerOperation(IPV4, 0.02, highRate=True, database=database)
+    datalogger.start()
+    time.sleep(0.3)
+    datalogger.stop()
+    datalogger.join(5)
+    database.write(IPV4, SM15K.BasicSample.fromReplies(time.time(), 'GAP', 'GAP', 'GAP'))
+    database.stop()
+    database.join(5)
+    assert list(tmp_path.glob('*.txt')) == []
+    with sqlite3.connect(fileName) as connection:
+        rows = connection.execute('SELECT device, timestamp, voltage, current, power FROM basic_sample '
+                                  'ORDER BY rowid').fetchall()
+    samples = [datalogger.samples[index] for index in range(len(datalogger.samples))]
+    assert len(rows) == len(samples) + 1 == database.written and len(samples) >= 5
+    for row, sample in zip(rows, samples):
+        assert row == (IPV4, sample.timestamp, sample.voltage, sample.current, sample.power)
+        assert row[2] == 12.5
+    assert rows[-1][0] == IPV4 and rows[-1][2:] == (None, None, None)
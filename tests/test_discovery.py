@@ -0,0 +1,29 @@
+import pytest
+
+import SM15K
+from conftest import nextAddresses
+
+
+@pytest.mark.parametrize('devices', [2], indirect=True)
+def testDiscoveryFindsSimulatedDevicesAndCachesTheInventory(devices, tmp_path):
+    cacheFile = tmp_path / 'Inventory.json'
+    network = devices + nextAddresses(1)
+    discovery = SM15K.DeviceDiscovery(network, connectTimeout=0.5, replyTimeout=1.0, cacheFile=str(cacheFile))
+    inventory = discovery.scan()
+    assert [entry['IPV4'] for entry in inventory] == devices
+    assert inventory[1] == {'IPV4': devices[1], 'manufacturer': 'DELTA ELEKTRONIKA BV', 'model': 'SM15K SIMULATOR',
+                            'serial': 'SIM00001', 'firmware': '1.0',
+                            'capabilities': {'voltage': 60.0, 'current': 250.0, 'negativeCurrent': 250.0,
+                                             'power': 15000.0, 'negativePower': 15000.0}}
+    assert cacheFile.exists()
+    cached = SM15K.DeviceDiscovery(network, cacheFile=str(cacheFile))
+    cached.scan = None
+    assert cached.discover(maximumAge=3600) == inventory
+    assert SM15K.DeviceDiscovery(nextAddresses(1), connectTimeout=0.2).discover(maximumAge=3600) == []
+
+
+def testDiscoveryWritesNoCacheByDefault(simulator, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    inventory = SM15K.DeviceDiscovery(simulator.devices).discover()
+    assert [entry['serial'] for entry in inventory] == ['SIM00000']
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,24 @@
+import SM15K
+
+
+def testSetterRoundsToStepAndPrintsItsDigits():
+    voltage = SM15K.CommandEncoder.setter('SOURce:VOLtage', 0.001)
+    current = SM15K.CommandEncoder.setter('SOURce:CURrent', 0.005)
+    assert voltage(14.5) == 'SOURce:VOLtage 14.500\n'
+    assert current(10.0012) == 'SOURce:CURrent 10.000\n'
+    assert SM15K.CommandEncoder.setter('SOURce:VOLtage')(14.5) == 'SOURce:VOLtage 14.5\n'
+
+
+def testSetterSendsStringsAsBefore():
+    voltage = SM15K.CommandEncoder.setter('SOURce:VOLtage', 0.001)
+    limit = SM15K.CommandEncoder.setter('SYSTem:LIMits:VOLtage', 0.005, withSetting=True)
+    assert voltage('MAX') == 'SOURce:VOLtage MAX\n'
+    assert voltage('14.5') == 'SOURce:VOLtage 14.5\n'
+    assert limit('MAX', 'ON') == 'SYSTem:LIMits:VOLtage MAX,ON\n'
+    assert limit(50, 'OFF') == 'SYSTem:LIMits:VOLtage 50.000,OFF\n'
+
+
+def testBenchmarkScriptRuns():
+    import benchmark_encoding
+    assert set(benchmark_encoding.benchmark(10)) == {'queryBaseline', 'queryPrecompiled', 'setterBaseline',
+                                                     'setterPrecompiled'}
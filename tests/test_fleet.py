@@ -0,0 +1,66 @@
+import multiprocessing
+import threading
+import types
+
+import SM15K
+from conftest import nextAddresses
+
+
+def startWorker(devices, interval):
+    control, workerControl = multiprocessing.Pipe()
+    telemetry, workerTelemetry = multiprocessing.Pipe(duplex=False)
+    heartbeat = types.SimpleNamespace(value=0.0)
+    worker = threading.Thread(target=SM15K.fleetWorker, args=(0, devices, workerControl, workerTelemetry, heartbeat,
+                                                              interval), daemon=True)
+    worker.start()
+    return worker, control, telemetry, heartbeat
+
+
+def testFleetTelemetryReusesDataloggerSamples(simulator, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    IPV4 = simulator.devices[0]
+    worker, control, telemetry, heartbeat = startWorker([IPV4], 0.2)
+    try:
+        assert telemetry.poll(5)
+        record = SM15K.FleetManager.telemetryRecord
+        values = next(record.iter_unpack(telemetry.recv_bytes()))
+        assert values[5] == 35.0 and heartbeat.value > 0
+        control.send({'action': 'start', 'IPV4': IPV4, 'operation': 'BasicDataloggerOperation',
+                      'kwargs': {'loggingTime': 0.05, 'highRate': True}})
+        assert control.poll(5) and control.recv()['result']['alive']
+        while telemetry.poll(0):
+            telemetry.recv_bytes()
+        requests = simulator.requests
+        assert telemetry.poll(5)
+        values = next(record.iter_unpack(telemetry.recv_bytes()))
+        assert values[2] == 12.5 and values[5] != values[5]
+        assert simulator.requests - requests < 3 * 0.25 / 0.05 + 3
+    finally:
+        control.send({'action': 'shutdown'})
+        worker.join(5)
+
+
+def testFleetTelemetryOfDevicesInOneWorkerIsKeptApart(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    devices = nextAddresses(2)
+    simulator = SM15K.DeviceSimulator(devices, battery=SM15K.BatteryModel(cells=2, soc=(0.05, 0.97)))
+    simulator.start()
+    worker, control, telemetry, heartbeat = startWorker(devices, 0.2)
+    try:
+        for IPV4 in devices:
+            control.send({'action': 'start', 'IPV4': IPV4, 'operation': 'BasicDataloggerOperation',
+                          'kwargs': {'loggingTime': 0.005, 'highRate': True}})
+            assert control.poll(5) and control.recv()['result']['alive']
+        record = SM15K.FleetManager.telemetryRecord
+        for _ in range(5):
+            while telemetry.poll(0):
+                telemetry.recv_bytes()
+            assert telemetry.poll(5)
+            voltages = {values[0].rstrip(b'\0').decode('utf-8'): round(values[2], 1)
+                        for values in record.iter_unpack(telemetry.recv_bytes())}
+            assert voltages == {devices[0]: 11.6, devices[1]: 13.8}
+    finally:
+        control.send({'action': 'shutdown'})
+        worker.join(5)
+        simulator.stop()
+        simulator.join(5)
@@ -0,0 +1,49 @@
+import pytest
+
+import SM15K
+from conftest import nextAddresses
+
+
+@pytest.fixture
+def hooks():
+    yield
+    SM15K.Communication.clearHooks()
+
+
+def testHooksGetTheTransactionAndCanBeRemoved(simulator, hooks):
+    IPV4 = simulator.devices[0]
+    unreachable = nextAddresses(1)[0]
+    before, after = [], []
+
+    def beforeHook(*arguments):
+        before.append(arguments)
+
+    def afterHook(*arguments):
+        after.append(arguments)
+
+    def failingHook(*arguments):
+        raise RuntimeError('hooks must not break the transaction')
+
+    SM15K.Communication.addHook(before=beforeHook, after=afterHook)
+    SM15K.Communication.addHook(before=failingHook, after=failingHook)
+    assert SM15K.MeasureSubsystem(IPV4).MeasureVoltage() == '12.5000'
+    SM15K.SourceSubsystem(IPV4).SetVoltage(12)
+    with pytest.raises(ConnectionRefusedError):
+        SM15K.MeasureSubsystem(unreachable).MeasureVoltage()
+
+    assert [arguments[:3] for arguments in before] == [
+        (IPV4, 'MEASure:VOLtage?\n', b'MEASure:VOLtage?\n'),
+        (IPV4, 'SOURce:VOLtage 12\n', b'SOURce:VOLtage 12\n'),
+        (unreachable, 'MEASure:VOLtage?\n', b'MEASure:VOLtage?\n')]
+    query, command, failure = after
+    assert query[:5] == (IPV4, 'MEASure:VOLtage?\n', b'MEASure:VOLtage?\n', b'12.5000\n', before[0][3])
+    assert query[4] <= query[5] and query[6] is None
+    assert command[3] is None and command[6] is None
+    assert failure[3] is None and isinstance(failure[6], ConnectionRefusedError)
+
+    SM15K.Communication.removeHook(before=beforeHook, after=afterHook)
+    SM15K.MeasureSubsystem(IPV4).MeasureVoltage()
+    assert len(before) == 3 and len(after) == 3
+    assert SM15K.Communication._beforeHooks == (failingHook,)
+    SM15K.Communication.clearHooks()
+    assert SM15K.Communication._beforeHooks == () and SM15K.Communication._afterHooks == ()
@@ -0,0 +1,40 @@
+import time
+
+import SM15K
+
+
+def testKeepaliveHoldsTheSimulatedWatchdogOverOneConnection(simulator):
+    IPV4 = simulator.devices[0]
+    SM15K.OutputSubsystem(IPV4).SetOutput(1)
+    keepalive = SM15K.WatchdogKeepaliveOperation(IPV4, timer=0.3, sleeptime=0.1)
+    keepalive.start()
+    time.sleep(1.0)
+    assert simulator.watchdogs[0] == 0.3
+    assert not simulator.watchdogTimeouts[0]
+    assert SM15K.OutputSubsystem(IPV4).ReadOutputSet() == '1'
+    keepalive.stop()
+    keepalive.join(1)
+    assert not keepalive.is_alive()
+    report = keepalive.report()
+    assert report['interval']['count'] >= 5 and report['roundTrip']['count'] >= 5
+    assert report['reconnects'] == 0 and report['warnings'] == 0
+    assert 0.1 < report['minimumMargin'] < 0.3
+    time.sleep(0.5)
+    assert SM15K.SystemSubsystem(IPV4).ReadCurrentWatchdogState() == '0'
+    assert SM15K.OutputSubsystem(IPV4).ReadOutputSet() == '0'
+
+
+def testKeepaliveStopsPromptlyAndCountsMissedHeartbeats(simulator):
+    IPV4 = simulator.devices[0]
+    keepalive = SM15K.WatchdogKeepaliveOperation(IPV4, timer=1.0, sleeptime=0.1, minimumSleeptime=0.1)
+    keepalive.start()
+    time.sleep(0.3)
+    simulator.stop()
+    simulator.join(5)
+    keepalive.connection.close()
+    time.sleep(1.2)
+    assert keepalive.warnings > 0
+    start = time.monotonic()
+    keepalive.stop()
+    keepalive.join(1)
+    assert not keepalive.is_alive() and time.monotonic() - start < 0.5
@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+import urllib.request
+
+import pytest
+
+import SM15K
+from conftest import nextAddresses
+
+
+def testMetricsAreOptIn():
+    default = subprocess.run([sys.executable, '-c', 'import SM15K; print(SM15K.Communication.metrics)'],
+                             cwd=os.path.dirname(os.path.abspath(SM15K.__file__)), capture_output=True, text=True)
+    assert default.stdout.strip() == 'None'
+
+
+def testPrometheusTextAfterTransactions(simulator):
+    IPV4 = simulator.devices[0]
+    unreachable = nextAddresses(1)[0]
+    metrics = SM15K.CommunicationMetrics(buckets=(0.5, 5.0))
+    SM15K.Communication.metrics = metrics
+    source = SM15K.SourceSubsystem(IPV4)
+    source.ReadVoltageSet()
+    source.ReadVoltageSet()
+    source.SetVoltage(12)
+    with pytest.raises(ConnectionRefusedError):
+        SM15K.SourceSubsystem(unreachable).ReadVoltageSet()
+    lines = metrics.prometheusText().splitlines()
+    assert f'sm15k_requests_total{{device="{IPV4}",command="SOURce:VOLtage?",outcome="ok"}} 2' in lines
+    assert f'sm15k_requests_total{{device="{IPV4}",command="SOURce:VOLtage",outcome="ok"}} 1' in lines
+    assert f'sm15k_requests_total{{device="{unreachable}",command="SOURce:VOLtage?",' \
+           f'outcome="connection_refused"}} 1' in lines
+    labels = f'device="{IPV4}",command="SOURce:VOLtage?",outcome="ok"'
+    assert f'sm15k_request_duration_seconds_bucket{{{labels},le="0.5"}} 2' in lines
+    assert f'sm15k_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in lines
+    assert f'sm15k_request_duration_seconds_count{{{labels}}} 2' in lines
+    assert '# TYPE sm15k_request_duration_seconds histogram' in lines
+
+
+def testExporterSwitchesMetricsOnAndServesThem(simulator):
+    SM15K.Communication.metrics = None
+    exporter = SM15K.MetricsExporter(port=0)
+    assert isinstance(SM15K.Communication.metrics, SM15K.CommunicationMetrics)
+    exporter.start()
+    try:
+        SM15K.MeasureSubsystem(simulator.devices[0]).MeasureVoltage()
+        with urllib.request.urlopen(f'http://127.0.0.1:{exporter.port}/metrics', timeout=5) as response:
+            body = response.read().decode('utf-8')
+        assert f'command="MEASure:VOLtage?",outcome="ok"}} 1' in body
+    finally:
+        exporter.stop()
+        exporter.join(5)
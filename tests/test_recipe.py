@@ -0,0 +1,79 @@
+import operator
+
+import pytest
+
+import SM15K
+
+capabilities = {'voltage': 60.0, 'current': 250.0, 'negativeCurrent': 250.0, 'power': 15000.0,
+                'negativePower': 15000.0}
+
+
+def testParseCondition():
+    assert SM15K.Recipe.parseCondition('voltage', '>= 14.4') == (operator.ge, 14.4)
+    assert SM15K.Recipe.parseCondition('current', '<2') == (operator.lt, 2.0)
+    assert SM15K.Recipe.parseCondition('ah', '<= -1.5') == (operator.le, -1.5)
+    assert SM15K.Recipe.parseCondition('time', 60) == (operator.ge, 60.0)
+    for quantity, condition in (('voltage', 14), ('voltage', '= 14'), ('voltage', '>= x')):
+        with pytest.raises(ValueError):
+            SM15K.Recipe.parseCondition(quantity, condition)
+
+
+def testProblemsOfMalformedRecipes():
+    recipe = SM15K.Recipe({'limits': {'voltage': 80, 'frequency': 50}, 'steps': [
+        {'type': 'ramp'},
+        {'name': 'charge', 'type': 'cc', 'current': 300, 'voltage': 14.4, 'until': {'voltage': 14.4}},
+        {'name': 'hold', 'type': 'cv', 'voltage': 14.4, 'until': {'soc': '> 0.9', 'current': '2'}},
+        {'name': 'again', 'type': 'loop', 'to': 'end', 'count': 2},
+        {'name': 'end', 'type': 'rest', 'until': {'time': 10}}]})
+    problems = recipe.problems(capabilities)
+    expected = ['limit voltage 80 exceeds the device maximum 60.0',
+                'limit frequency is unknown',
+                'step 0:ramp must have a type of cc, cv, cp, rest, loop',
+                'step charge voltage condition 14.4 has no comparison',
+                'step charge current 300 is out of the device range 0..250.0',
+                'step hold condition soc is unknown',
+                "step hold current condition '2' does not start with <, <=, > or >=",
+                'step again must go to an earlier step which is not a loop']
+    assert len(problems) == len(expected)
+    for problem, start in zip(problems, expected):
+        assert problem.startswith(start), problem
+    assert recipe.problems() == [problem for problem in problems if 'device' not in problem]
+    with pytest.raises(SM15K.RecipeError) as error:
+        recipe.validate(capabilities)
+    assert error.value.problems == problems
+    assert SM15K.Recipe({'steps': []}).problems() == ['steps must be a non empty list']
+
+
+class RecordingRecipeOperation(SM15K.RecipeOperation):
+    def __init__(self, *arguments, **keywords):
+        super().__init__(*arguments, **keywords)
+        self.entered = []
+        self.ended = []
+
+    def enterStep(self, step):
+        super().enterStep(step)
+        self.entered.append(step.name)
+
+    def check(self, step):
+        reason = super().check(step)
+        if reason is not None:
+            self.ended.append((step.name, reason))
+        return reason
+
+
+def testRecipeOperationRunsStepsAndLoops(simulator):
+    SM15K.clock = SM15K.VirtualClock(speed=100.0)
+    IPV4 = simulator.devices[0]
+    recipe = {'name': 'short', 'logging': {'interval': 0.5}, 'steps': [
+        {'name': 'charge', 'type': 'cc', 'current': 10, 'voltage': 14.4, 'until': {'current': '> 5', 'time': 60}},
+        {'name': 'pause', 'type': 'rest', 'until': {'time': 2}},
+        {'type': 'loop', 'to': 'charge', 'count': 2}]}
+    operation = RecordingRecipeOperation(IPV4, recipe)
+    operation.start()
+    operation.join(20)
+    assert not operation.is_alive()
+    assert operation.entered == ['charge', 'pause', 'charge', 'pause']
+    assert operation.ended == [('charge', 'current'), ('pause', 'time')] * 2
+    assert operation.counter == 2 and operation.endReason == 'time' and operation.gaps == 0
+    assert operation.capabilities == capabilities
+    assert SM15K.OutputSubsystem(IPV4).ReadOutputSet() == '0'
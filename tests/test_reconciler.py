@@ -0,0 +1,17 @@
+import SM15K
+
+
+def testApplySendsTheFullBatchUnlessDiffIsRequested(simulator):
+    IPV4 = simulator.devices[0]
+    reconciler = SM15K.StateReconciler.of(IPV4)
+    desired = {'voltageLimit': (15, 'ON'), 'voltage': 14.5, 'current': 10}
+    assert reconciler.apply(desired) == ['voltageLimit', 'voltage', 'current']
+    SM15K.SourceSubsystem(IPV4).SetVoltage(3)
+    assert reconciler.apply(desired, diff=True) == []
+    assert reconciler.apply(desired) == ['voltageLimit', 'voltage', 'current']
+    assert simulator.setpoints['voltage'][0] == 14.5
+    SM15K.SourceSubsystem(IPV4).SetVoltage(3)
+    reconciler.refresh()
+    assert reconciler.apply(desired, diff=True) == ['voltage']
+    with SM15K.SafetyScope():
+        assert reconciler.apply(desired, verify=False, diff=True) == ['voltageLimit', 'voltage', 'current']
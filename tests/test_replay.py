@@ -0,0 +1,42 @@
+import json
+
+import SM15K
+
+
+def writeSession(path, exchanges, torn=False):
+    with open(path, 'w', encoding='utf-8') as sessionFile:
+        sessionFile.write(json.dumps({'version': 1, 'started': 0.0}) + '\n')
+        for offset, (IPV4, message, reply) in enumerate(exchanges):
+            sessionFile.write(json.dumps([float(offset), 0.001, IPV4, message, reply, 'ok']) + '\n')
+        if torn:
+            sessionFile.write('[12.0, 0.001, "10.0.0.1", "MEAS')
+    return str(path)
+
+
+def testQueriesFollowRecordedCommandsPerDevice(tmp_path):
+    session = writeSession(tmp_path / 'Session.jsonl', [
+        ('10.0.0.1', 'SOURce:VOLtage?\n', '0.000\n'),
+        ('10.0.0.2', 'SOURce:VOLtage?\n', '5.000\n'),
+        ('10.0.0.1', 'SOURce:VOLtage 12\n', None),
+        ('10.0.0.1', 'SOURce:VOLtage?\n', '12.000\n')], torn=True)
+    replay = SM15K.ReplayTransport(session).install()
+    try:
+        source = SM15K.SourceSubsystem('10.0.0.1')
+        assert source.ReadVoltageSet() == '0.000'
+        assert source.ReadVoltageSet() == '0.000'
+        SM15K.Communication.sendMessage('10.0.0.1', 'SOURce:VOLtage 12\n')
+        assert source.ReadVoltageSet() == '12.000'
+        assert SM15K.SourceSubsystem('10.0.0.2').ReadVoltageSet() == '5.000'
+    finally:
+        replay.uninstall()
+
+
+def testRecordedSessionIsReadableBeforeStop(simulator, tmp_path):
+    IPV4 = simulator.devices[0]
+    recorder = SM15K.SessionRecorder(str(tmp_path / 'Session.jsonl')).start()
+    try:
+        SM15K.MeasureSubsystem(IPV4).MeasureVoltage()
+        header, exchanges = SM15K.SessionRecorder.load(recorder.fileName)
+        assert header['version'] == 1 and exchanges[-1][2:5] == [IPV4, 'MEASure:VOLtage?\n', '12.5000\n']
+    finally:
+        recorder.stop()
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+import SM15K
+from conftest import nextAddresses
+
+
+def startSimulator(IPV4):
+    simulator = SM15K.DeviceSimulator([IPV4])
+    simulator.start()
+    time.sleep(0.05)
+    return simulator
+
+
+def testQueriesAreRetriedWithBackoffCommandsAreNot():
+    IPV4 = nextAddresses(1)[0]
+    policy = SM15K.ResiliencePolicy(retries=2, backoffBase=0.05, backoffMaximum=1.0, jitter=0, failureThreshold=100)
+    SM15K.Communication.resilience = policy
+    breaker = policy.breaker(IPV4)
+    start = time.monotonic()
+    with pytest.raises(ConnectionRefusedError):
+        SM15K.SourceSubsystem(IPV4).ReadVoltageSet()
+    assert breaker.failures == 3 and time.monotonic() - start >= 0.05 + 0.1
+    with pytest.raises(ConnectionRefusedError):
+        SM15K.SourceSubsystem(IPV4).SetVoltage(12)
+    assert breaker.failures == 4
+    with pytest.raises(ConnectionRefusedError):
+        SM15K.Communication.sendReceiveMessage(IPV4, 'SYSTem:ERRor?\n')
+    assert breaker.failures == 5
+    assert [policy.backoff(attempt) for attempt in range(6)] == [0.05, 0.1, 0.2, 0.4, 0.8, 1.0]
+    jittered = SM15K.ResiliencePolicy(backoffBase=0.1, jitter=0.5)
+    assert all(0.1 <= jittered.backoff(1) <= 0.2 for _ in range(50))
+
+
+def testBreakerOpensHalfOpensWithOneTrialAndCloses():
+    IPV4 = nextAddresses(1)[0]
+    policy = SM15K.ResiliencePolicy(retries=0, failureThreshold=2, resetTimeout=0.2)
+    SM15K.Communication.resilience = policy
+    breaker = policy.breaker(IPV4)
+    source = SM15K.SourceSubsystem(IPV4)
+    for _ in range(2):
+        with pytest.raises(ConnectionRefusedError):
+            source.ReadVoltageSet()
+    assert breaker.state == SM15K.CircuitBreaker.open and breaker.opens == 1
+    with pytest.raises(SM15K.DeviceUnavailableError):
+        source.ReadVoltageSet()
+    assert breaker.failures == 2
+    time.sleep(0.25)
+    with pytest.raises(ConnectionRefusedError):
+        source.ReadVoltageSet()
+    assert breaker.state == SM15K.CircuitBreaker.open and breaker.opens == 2
+    time.sleep(0.25)
+    assert breaker.allow() and breaker.state == SM15K.CircuitBreaker.halfOpen
+    assert not breaker.allow()
+    breaker.releaseTrial()
+    simulator = startSimulator(IPV4)
+    try:
+        assert float(source.ReadVoltageSet()) == 0.0
+    finally:
+        simulator.stop()
+        simulator.join(5)
+    report = policy.report()[IPV4]
+    assert report['state'] == SM15K.CircuitBreaker.closed and report['failures'] == 0
+    assert report['reconnects'] == 1 and report['downtime'] >= 0.5
+
+
+def testShutdownPassesAnOpenBreaker():
+    IPV4 = nextAddresses(1)[0]
+    policy = SM15K.ResiliencePolicy(retries=0, failureThreshold=1, resetTimeout=60)
+    SM15K.Communication.resilience = policy
+    with pytest.raises(ConnectionRefusedError):
+        SM15K.MeasureSubsystem(IPV4).MeasureVoltage()
+    simulator = startSimulator(IPV4)
+    try:
+        simulator.setpoints['output'][0] = 1.0
+        simulator.setpoints['voltage'][0] = 12.0
+        with pytest.raises(SM15K.DeviceUnavailableError):
+            SM15K.MeasureSubsystem(IPV4).MeasureVoltage()
+        SM15K.ShutdownOperation(IPV4).shutdown()
+        assert simulator.setpoints['output'][0] == 0.0 and simulator.setpoints['voltage'][0] == 0.0
+        assert policy.breaker(IPV4).state == SM15K.CircuitBreaker.closed
+    finally:
+        simulator.stop()
+        simulator.join(5)
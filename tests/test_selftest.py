@@ -0,0 +1,27 @@
+import pytest
+
+import SM15K
+
+
+@pytest.mark.parametrize('devices', [2], indirect=True)
+def testSelfTestIsReadOnlyByDefault(devices):
+    runner = SM15K.SelfTestRunner(devices)
+    report = runner.run()
+    assert report['summary']['checks'] == 2 * len(SM15K.SelfTestRunner.checks)
+    commands = [command['message'] for results in runner.results.values() for result in results
+                for command in result['commands']]
+    assert commands and all(message.endswith('?') for message in commands)
+
+
+def testDestructiveSelfTestRestoresTheState(simulator):
+    IPV4 = simulator.devices[0]
+    reconciler = SM15K.StateReconciler.of(IPV4)
+    reconciler.apply({'voltageLimit': (20, 'ON'), 'voltage': 12.0, 'current': 3.0, 'output': 1})
+    before = reconciler.refresh()
+    runner = SM15K.SelfTestRunner([IPV4], destructive=True)
+    runner.run()
+    results = {result['name']: result for result in runner.results[IPV4]}
+    assert results['RestoreState']['passed'], results['RestoreState']['error']
+    assert reconciler.known == {}
+    assert reconciler.refresh() == before
+    assert simulator.watchdogs[0] == 0.0
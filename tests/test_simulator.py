@@ -0,0 +1,29 @@
+import time
+
+import SM15K
+
+
+def testWatchdogIsSetInMillisecondsAndSwitchesOutputOff(simulator):
+    IPV4 = simulator.devices[0]
+    system = SM15K.SystemSubsystem(IPV4)
+    assert system.ReadCurrentWatchdogState() == '-1'
+    SM15K.OutputSubsystem(IPV4).SetOutput(1)
+    system.SetWatchdog(500)
+    assert system.ReadWatchdogSet() == '500'
+    assert 0 < int(system.ReadCurrentWatchdogState()) <= 500
+    time.sleep(0.7)
+    assert system.ReadCurrentWatchdogState() == '0'
+    assert SM15K.OutputSubsystem(IPV4).ReadOutputSet() == '0'
+    system.DisableWatchdog()
+    assert system.ReadCurrentWatchdogState() == '-1'
+
+
+def testOutputDrivesCurrentWithDefaultPowerSetPoints(simulator):
+    IPV4 = simulator.devices[0]
+    source = SM15K.SourceSubsystem(IPV4)
+    source.SetVoltage(14.0)
+    source.SetCurrent(10.0)
+    SM15K.OutputSubsystem(IPV4).SetOutput(1)
+    time.sleep(0.1)
+    current = SM15K.MeasureSubsystem(IPV4).typed.MeasureCurrent()
+    assert 0 < current <= 10.0
@@ -0,0 +1,28 @@
+import SM15K
+
+
+def testPublisherReusesSmallerBlockAndReadersSurviveStop():
+    IPV4 = '127.0.99.1'
+    small = SM15K.TelemetryRing(IPV4, 'ah', capacity=4, create=True)
+    try:
+        ring = SM15K.TelemetryRing(IPV4, 'ah', capacity=1024, create=True)
+        assert ring.capacity < 1024 and ring.capacity >= 4
+        reader = SM15K.TelemetryRing(IPV4, 'ah')
+        assert reader.capacity == ring.capacity
+        for index in range(10):
+            ring.publish(SM15K.AhSample(float(index), 12.5, 3.0, 37.5, 1.0, 0.0, 0.0, 0.0))
+        ring.close()
+        number, snapshot = reader.latest()
+        assert number == 10 and snapshot.voltage == 12.5 and snapshot.positiveAh == 1.0
+        assert snapshot.temperature != snapshot.temperature
+        assert [number for number, _ in reader.read(since=8)] == [9, 10]
+        reader.close()
+    finally:
+        small.close()
+        small.unlink()
+
+
+def testKindsHaveTheirOwnBlocks():
+    assert SM15K.TelemetryRing.blockName('192.168.100.200', 'snapshot') == 'sm15k_snapshot_192_168_100_200'
+    assert SM15K.TelemetryRing.blockName('10.0.0.1', SM15K.BasicSample.kind) != \
+        SM15K.TelemetryRing.blockName('10.0.0.1', SM15K.AhSample.kind)
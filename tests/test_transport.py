@@ -0,0 +1,131 @@
+import os
+import socket
+import threading
+import time
+
+import SM15K
+from conftest import nextAddresses
+
+
+def splitReplyDevice(IPV4, reply, pause=0.05):
+    """
+    Device answering every connection with reply split into two TCP segments.
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((IPV4, SM15K.Communication.port_name))
+    server.listen(8)
+
+    def serve():
+        while True:
+            try:
+                connection, _ = server.accept()
+            except OSError:
+                return
+            with connection:
+                connection.recv(1024)
+                connection.sendall(reply[:len(reply) // 2])
+                time.sleep(pause)
+                connection.sendall(reply[len(reply) // 2:])
+
+    threading.Thread(target=serve, daemon=True).start()
+    return server
+
+
+def testSplitReplyIsJoined():
+    IPV4 = nextAddresses()[0]
+    server = splitReplyDevice(IPV4, b'12.5000;3.0000;37.500;35.0\n')
+    try:
+        for timeouts in (None, SM15K.AdaptiveTimeouts()):
+            SM15K.Communication.timeouts = timeouts
+            SM15K.Communication.compound = True
+            try:
+                snapshot = SM15K.MeasureSubsystem(IPV4).snapshot()
+            finally:
+                SM15K.Communication.compound = False
+            assert (snapshot.voltage, snapshot.current, snapshot.power, snapshot.temperature) == (12.5, 3.0, 37.5, 35.0)
+    finally:
+        server.close()
+
+
+def testExpectedRepliesCountsQueryLines():
+    assert SM15K.Communication.expectedReplies(b'MEASure:VOLtage?\n') == 1
+    assert SM15K.Communication.expectedReplies(b'MEASure:VOLtage?;MEASure:CURrent?\n') == 1
+    assert SM15K.Communication.expectedReplies(b'MEASure:VOLtage?\nMEASure:CURrent?\n') == 2
+
+
+def testBatchesAreSentPerQueryUnlessCompound(simulator):
+    IPV4 = simulator.devices[0]
+    requests = simulator.requests
+    snapshot = SM15K.MeasureSubsystem(IPV4).snapshot(ah=True)
+    assert simulator.requests - requests == 6
+    assert snapshot.voltage > 0 and snapshot.temperature == 35.0
+    SM15K.Communication.compound = True
+    try:
+        requests = simulator.requests
+        SM15K.MeasureSubsystem(IPV4).snapshot(ah=True)
+        assert simulator.requests - requests == 1
+    finally:
+        SM15K.Communication.compound = False
+
+
+def testShortCompoundReplyIsValueError(devices):
+    SM15K.Communication.compound = True
+    try:
+        IPV4 = devices[0]
+        try:
+            SM15K.Communication.queryBatch(IPV4, ['MEASure:VOLtage?', 'SYSTem:NOThing'])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('a reply with missing values must raise ValueError')
+    finally:
+        SM15K.Communication.compound = False
+
+
+def testValueErrorIsCommunicationGapAndOutputIsSwitchedOff(simulator):
+    IPV4 = simulator.devices[0]
+    SM15K.clock = SM15K.VirtualClock(speed=100.0)
+    charging = SM15K.ChargingOperation(IPV4, sleepTime=1, bulkCurrent=10, bulkVoltage=14, floatVoltage=13.5,
+                                       floatTime=3600)
+
+    def shortReply():
+        raise ValueError('short reply')
+
+    charging.checkChargingStage = shortReply
+    charging.start()
+    deadline = time.monotonic() + 5
+    while charging.gaps < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert charging.is_alive() and charging.gaps > 0
+    assert simulator.setpoints['output'][0] == 1.0
+    charging.stop()
+    charging.join(5)
+    assert simulator.setpoints['output'][0] == 0.0
+
+
+def testAdaptiveTimeoutsAreOptInAndCappedAtCommunicationTimeout(monkeypatch):
+    import subprocess
+    import sys
+    default = subprocess.run([sys.executable, '-c', 'import SM15K; print(SM15K.Communication.timeouts)'],
+                             cwd=os.path.dirname(os.path.abspath(SM15K.__file__)), capture_output=True, text=True)
+    assert default.stdout.strip() == 'None'
+    IPV4 = nextAddresses()[0]
+    silent = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    silent.bind((IPV4, SM15K.Communication.port_name))
+    silent.listen(8)
+    monkeypatch.setattr(SM15K.Communication, 'timeout', 0.3)
+    SM15K.Communication.timeouts = SM15K.AdaptiveTimeouts()
+    try:
+        start = time.monotonic()
+        try:
+            SM15K.MeasureSubsystem(IPV4).MeasureVoltage()
+        except socket.timeout:
+            pass
+        else:
+            raise AssertionError('a silent device must time out')
+        assert time.monotonic() - start < 1.0
+        connect, read = SM15K.Communication.timeouts.estimators(IPV4)
+        assert connect.ceiling == read.ceiling == 0.3 and read.expired == 1
+    finally:
+        silent.close()
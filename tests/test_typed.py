@@ -0,0 +1,20 @@
+import SM15K
+
+
+def testTypedQueriesMatchTheSubsystemMethods():
+    subsystems = (SM15K.SM15K, SM15K.SourceSubsystem, SM15K.MeasureSubsystem, SM15K.SystemSubsystem,
+                  SM15K.OutputSubsystem)
+    for name, query in SM15K.TypedSubsystem.queries.items():
+        methods = [getattr(subsystem, name) for subsystem in subsystems if hasattr(subsystem, name)]
+        assert len(methods) == 1, name
+        assert methods[0].__defaults__[0].strip() == query
+        assert query in SM15K.TypedResults.parsers
+
+
+def testTypedQueriesParseRepliesAndPassCommandsThrough(devices):
+    delta = SM15K.SM15K(devices[0])
+    assert delta.source.typed.MaximumVoltage() == 60.0
+    assert delta.system.typed.ReadVoltageLimitSet() == SM15K.LimitSetting(60.0, SM15K.State.OFF)
+    assert delta.output.typed.ReadOutputSet() is SM15K.State.OFF
+    assert delta.output.typed.SetOutput(1) == b'OUTPut 1\n'
+    assert delta.output.typed.ReadOutputSet() is SM15K.State.ON